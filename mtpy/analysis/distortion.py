@@ -19,7 +19,12 @@ constraints depend on the application, the actual place for further functions
 
 
     Functions:
-
+        find_distortion         distortion tensor of a single Z object
+        find_1d_distortion      distortion from the 1D part of a Z object
+        find_2d_distortion      distortion from the 2D part of a Z object
+        remove_distortion       remove distortion from a Z object
+        find_distortion_survey  distortion tensors of many stations at once
+        remove_distortion_survey remove distortion from many stations at once
 
 @UofA, 2013
 (LK)
@@ -33,6 +38,7 @@ import mtpy.core.z as MTz
 import mtpy.analysis.geometry as MTge 
 import mtpy.utils.exceptions as MTex
 import mtpy.utils.calculator as MTcc
+import mtpy.analysis.niblettbostick as MTnb
 
 #reload(MTex)
 #reload(MTz)
@@ -67,237 +73,272 @@ def find_distortion(z_object, g = 'det', lo_dims = None):
 
     automatically determine the dimensionality over all frequencies, then find
     the appropriate distortion tensor D
+
+    this is find_distortion_survey for a single station.
     """
 
     z_obj = z_object
 
-    if lo_dims is None :
-        lo_dims = MTge.dimensionality(z_object = z_obj)
-    try:
-        if len(lo_dims) != len(z_obj.z):
-            lo_dims = MTge.dimensionality(z_object = z_obj)
-    except:
-        pass
-    
-    #dictionary of values that should be no distortion in case distortion
-    #cannot be calculated for that component
-    dis_dict = {(0,0):1, (0,1):0, (1,0):0, (1,1):1}
+    if lo_dims is not None:
+        try:
+            if len(lo_dims) != len(z_obj.z):
+                lo_dims = None
+        except TypeError:
+            lo_dims = None
 
-    lo_dis = []
-    lo_diserr = []
+    if lo_dims is not None:
+        lo_dims = np.array(lo_dims)[np.newaxis]
 
-    if 1 in lo_dims:
-        idx_1 = np.where(np.array(lo_dims) == 1)[0]
+    z_err = None
+    if z_obj.zerr is not None:
+        z_err = z_obj.zerr[np.newaxis]
 
-        for idx in idx_1:
+    dis, diserr = find_distortion_survey(z_obj.z[np.newaxis], 
+                                         z_err_array=z_err,
+                                         g=g, 
+                                         dims=lo_dims)
 
-            realz = np.real(z_obj.z[idx])
-            imagz = np.imag(z_obj.z[idx])
+    return dis[0], diserr[0]
 
-            mat1 = np.matrix([[0, -1],[1, 0]])
 
+def _weighted_average(dis_array, diserr_array, mask):
+    """
+    weighted average of the distortion estimates dis_array 
+    (n_station, 2, 2, n_estimates) with weights 1/diserr_array**2 using only 
+    estimates where mask (n_station, n_estimates) is True.
+    
+    components where the weights sum up to 0 are set to no distortion.
+    """
 
-            if g in ['01','10']:
-                gr = np.abs(realz[int(g[0]),int(g[1])])
-                gi = np.abs(imagz[int(g[0]),int(g[1])])
-            else:
-                gr = np.sqrt(np.linalg.det(realz))
-                gi = np.sqrt(np.linalg.det(imagz))
+    mask = mask[:, np.newaxis, np.newaxis, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weights = np.where(mask, 1./diserr_array**2, 0)
+        weight_sum = weights.sum(axis=-1)
+        dis = (np.where(mask, dis_array, 0)*weights).sum(axis=-1)/weight_sum
+        diserr = np.sqrt(1./weight_sum)
+
+    no_weight = weight_sum == 0
+    for ss, ii, jj in zip(*np.nonzero(no_weight)):
+        print ('Could not get distortion for dis[{0}, {1}]'.format(ii, jj)+
+               ' of station {0}, setting value to {1}'.format(ss, 
+                                                        int(ii == jj)))
+    identity = np.identity(2)[np.newaxis]
+    dis[no_weight] = np.broadcast_to(identity, dis.shape)[no_weight]
+    diserr[no_weight] = np.broadcast_to(identity*1e-6, dis.shape)[no_weight]
 
-            lo_dis.append(1./gr*np.dot(realz,mat1))  
-            lo_dis.append(1./gi*np.dot(imagz,mat1))  
+    return dis, diserr
 
-            if z_obj.zerr is not None:
-                #find errors of entries for calculating weights
 
-                lo_diserr.append(1./gr*\
-                                np.array([[np.abs(z_obj.zerr[idx][0,1]),
-                                           np.abs(z_obj.zerr[idx][0,0])],
-                                           [np.abs(z_obj.zerr[idx][1,1]),
-                                           np.abs(z_obj.zerr[idx][1,0])]])) 
+def _find_1d_distortion_array(z_array, z_err_array, g):
+    """
+    distortion estimates (n_station, 2, 2, 2*n_freq) from the 1D formula for 
+    every frequency, alternating real and imaginary part.
+    """
 
-                lo_diserr.append(1./gi*\
-                                 np.array([[np.abs(z_obj.zerr[idx][0,1]),
-                                            np.abs(z_obj.zerr[idx][0,0])],
-                                            [np.abs(z_obj.zerr[idx][1,1]),
-                                             np.abs(z_obj.zerr[idx][1,0])]])) 
+    n_station, n_freq = z_array.shape[0:2]
+    dis_array = np.zeros((n_station, 2, 2, n_freq, 2))
+    diserr_array = np.ones((n_station, 2, 2, n_freq, 2))
 
+    for kk, zz in enumerate([z_array.real, z_array.imag]):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if g in ['01', '10']:
+                gg = np.abs(zz[..., int(g[0]), int(g[1])])
             else:
-                #otherwise go for evenly weighted average
-                lo_diserr.append(np.ones((2, 2)))
-                lo_diserr.append(np.ones((2, 2)))
+                gg = np.sqrt(zz[..., 0, 0]*zz[..., 1, 1]-
+                             zz[..., 0, 1]*zz[..., 1, 0])
+            gg = 1./gg
 
-        
-        dis = np.identity(2)
-        diserr = np.identity(2)
-        for i in range(2):
-            for j in range(2):
-                try:
-                    dis[i,j], dummy = np.average(np.array([k[i, j] 
-                                                          for k in lo_dis]), 
-                                                 weights=np.array([1./(k[i,j])**2 
-                                                          for k in lo_diserr]),
-                                                 returned=True)
-                    diserr[i,j] = np.sqrt(1./dummy)
-                    
-                    #if the distortion came out as nan set it to an appropriate
-                    #value 
-                    if np.nan_to_num(dis[i,j]) == 0:
-                        dis[i, j] = dis_dict[i, j]
-                        diserr[i, j] = dis_dict[i, j]
-
-                except ZeroDivisionError:
-                    
-                    print ('Could not get distortion for dis[{0}, {1}]'.format(
-                           i, j)+' setting value to {0}'.format(dis_dict[i,j]))
-                    dis[i, j] = dis_dict[i, j]
-                    diserr[i, j] = dis_dict[i, j]*1e-6
-    
-        return dis, diserr
+        # 1/g * Z * [[0, -1], [1, 0]]
+        dis_array[:, 0, 0, :, kk] = gg*zz[..., 0, 1]
+        dis_array[:, 0, 1, :, kk] = -gg*zz[..., 0, 0]
+        dis_array[:, 1, 0, :, kk] = gg*zz[..., 1, 1]
+        dis_array[:, 1, 1, :, kk] = -gg*zz[..., 1, 0]
 
-    if 2 in lo_dims:
-        idx_2 = np.where(np.array(lo_dims) == 2)[0]
-        #follow bibby et al. 2005 first alternative: P = 1
-        P = 1
+        if z_err_array is not None:
+            z_err = np.abs(z_err_array)
+            diserr_array[:, 0, 0, :, kk] = gg*z_err[..., 0, 1]
+            diserr_array[:, 0, 1, :, kk] = gg*z_err[..., 0, 0]
+            diserr_array[:, 1, 0, :, kk] = gg*z_err[..., 1, 1]
+            diserr_array[:, 1, 1, :, kk] = gg*z_err[..., 1, 0]
 
-        lo_strikes = MTge.strike_angle(z_object = z_obj)
-        lo_tetms = []
-        lo_t = []
-        lo_tetm_errs =[]
+    return (dis_array.reshape(n_station, 2, 2, 2*n_freq),
+            diserr_array.reshape(n_station, 2, 2, 2*n_freq))
 
-        for idx in idx_2:
-
-            mat = z_obj.z[idx]
-            ang = -lo_strikes[idx][0]
-            if np.isnan(ang):
-                ang = 0.
-
-            errmat = None
-            if z_obj.zerr is not None:
-                errmat = z_obj.zerr[idx]
-            tetm_mat, tetm_err = MTcc.rotatematrix_incl_errors(mat, 
-                                                               ang, 
-                                                               inmatrix_err=errmat)
-
-            lo_tetms.append(tetm_mat)
-         
-            lo_tetm_errs.append(tetm_err)
-
-            realz = np.real(tetm_mat)
-            imagz = np.imag(tetm_mat)
-            lo_t.append(-4*P*realz[0,1]*realz[1,0]/np.linalg.det(realz) )
-            lo_t.append(-4*P*imagz[0,1]*imagz[1,0]/np.linalg.det(imagz) )
-
-        #since there is no 'wrong' solution by a different value of T, no 
-        #error is given/calculated for T !
-        try:
-            #just add 0.1% for avoiding numerical issues in the squareroots
-            #later on
-            T = np.sqrt(max(lo_t))+0.001
-        except:
-            T = 2
 
+def _find_2d_distortion_array(z_array, z_err_array, strike, mask):
+    """
+    distortion estimates (n_station, 2, 2, 2*n_freq) from the 2D formula 
+    (Bibby et al. 2005, P = 1) for every frequency, alternating real and 
+    imaginary part.  T is estimated for each station from the frequencies 
+    where mask (n_station, n_freq) is True.
+    """
 
-        for idx in range(len(lo_tetms)):
+    n_station, n_freq = z_array.shape[0:2]
+    P = 1
+
+    ang = -np.nan_to_num(strike)
+    tetm_array, tetm_err = MTcc.rotatematrices_incl_errors(z_array, ang,
+                                                inmatrices_err=z_err_array)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        zz_list = [tetm_array.real, tetm_array.imag]
+        det_list = [zz[..., 0, 0]*zz[..., 1, 1]-zz[..., 0, 1]*zz[..., 1, 0]
+                    for zz in zz_list]
+        t_array = np.array([-4*P*zz[..., 0, 1]*zz[..., 1, 0]/det
+                            for zz, det in zip(zz_list, det_list)])
+        t_array = t_array.transpose(1, 2, 0).reshape(n_station, 2*n_freq)
+
+    #since there is no 'wrong' solution by a different value of T, no 
+    #error is given/calculated for T !
+    #just add 0.1% for avoiding numerical issues in the squareroots later on
+    t_mask = np.repeat(mask, 2, axis=1)
+    t_first = t_array[np.arange(n_station), np.argmax(t_mask, axis=1)]
+    with np.errstate(invalid='ignore'):
+        t_max = np.where(t_mask, t_array, -np.inf)
+        t_max = np.where(np.isnan(t_max), -np.inf, t_max).max(axis=1)
+        t_max[np.isnan(t_first)] = np.nan
+        T = np.sqrt(t_max)[:, np.newaxis]+0.001
+
+    dis_array = np.zeros((n_station, 2, 2, n_freq, 2))
+    diserr_array = np.ones((n_station, 2, 2, n_freq, 2))
+
+    for kk, (zz, det) in enumerate(zip(zz_list, det_list)):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ss = np.sqrt(T**2+4*P*zz[..., 0, 1]*zz[..., 1, 0]/det)
+            par = 1./(2*zz[..., 0, 1]/(T-ss))
+            orth = 1./(2*zz[..., 1, 0]/(T+ss))
+
+            # Z * [[0, 1/orth], [1/par, 0]]
+            dis_array[:, 0, 0, :, kk] = zz[..., 0, 1]*par
+            dis_array[:, 0, 1, :, kk] = zz[..., 0, 0]*orth
+            dis_array[:, 1, 0, :, kk] = zz[..., 1, 1]*par
+            dis_array[:, 1, 1, :, kk] = zz[..., 1, 0]*orth
+
+            if tetm_err is not None:
+                err = tetm_err
+                det_ss = det**2*ss
+                sigma_s = np.sqrt((-(2*P*zz[..., 0, 1]*zz[..., 1, 0]*\
+                                     zz[..., 1, 1]*err[..., 0, 0])/det_ss)**2+\
+                                  ((2*P*zz[..., 0, 0]*zz[..., 1, 0]*\
+                                    zz[..., 1, 1]*err[..., 0, 1])/det_ss)**2+\
+                                  ((2*P*zz[..., 0, 0]*zz[..., 0, 1]*\
+                                    zz[..., 1, 1]*err[..., 1, 0])/det_ss)**2+\
+                                  (-(2*P*zz[..., 0, 1]*zz[..., 1, 0]*\
+                                     zz[..., 0, 0]*err[..., 1, 1])/det_ss)**2)
+
+                diserr_array[:, 0, 0, :, kk] = 0.5*sigma_s
+                diserr_array[:, 1, 1, :, kk] = 0.5*sigma_s
+                diserr_array[:, 0, 1, :, kk] = np.sqrt(
+                                (orth/zz[..., 0, 0]*err[..., 0, 0])**2+\
+                                (orth/zz[..., 1, 0]*err[..., 1, 0])**2+\
+                                (0.5*zz[..., 0, 0]/zz[..., 1, 0]*sigma_s)**2)
+                diserr_array[:, 1, 0, :, kk] = np.sqrt(
+                                (par/zz[..., 1, 1]*err[..., 1, 1])**2+\
+                                (par/zz[..., 0, 1]*err[..., 0, 1])**2+\
+                                (0.5*zz[..., 1, 1]/zz[..., 0, 1]*sigma_s)**2)
+
+    return (dis_array.reshape(n_station, 2, 2, 2*n_freq),
+            diserr_array.reshape(n_station, 2, 2, 2*n_freq))
+
+
+def find_distortion_survey(z_array, z_err_array=None, g='det', dims=None):
+    """
+    find the optimal distortion tensor for many stations at once, this gives
+    the same result as find_distortion for each station.
 
-            realz = np.real(lo_tetms[idx])
-            imagz = np.imag(lo_tetms[idx])
-            errmat = lo_tetm_errs[idx]
-            
-            sr = np.sqrt(T**2+4*P*realz[0, 1]*realz[1, 0]/np.linalg.det(realz))
-            si = np.sqrt(T**2+4*P*imagz[0, 1]*imagz[1, 0]/np.linalg.det(imagz))
+    For each station the dimensionality of each frequency is determined, if
+    there are 1D frequencies D is estimated from those, otherwise from the
+    2D frequencies, if there are only 3D frequencies D is the identity.
 
-            par_r = 2*realz[0, 1]/(T-sr)
-            orth_r = 2*realz[1, 0]/(T+sr)
-            par_i = 2*imagz[0, 1]/(T-si)
-            orth_i = 2*imagz[1, 0]/(T+si)
+    Arguments
+    -------------
+        **z_array** : np.ndarray(n_station, n_freq, 2, 2)
+                      impedance tensors, stations with fewer frequencies
+                      can be padded with nan, these are ignored.
 
-            mat2_r = np.matrix([[0, 1./orth_r], [1./par_r, 0]])
-            mat2_i = np.matrix([[0, 1./orth_i], [1./par_i ,0]])
+        **z_err_array** : np.ndarray(n_station, n_freq, 2, 2)
+                          errors of the impedance tensors, if None all 
+                          frequencies are weighted equally.
 
-            lo_dis.append(np.dot(realz,mat2_r))
-            lo_dis.append(np.dot(imagz,mat2_i))
+        **g** : [ 'det' | '01' | '10' ]
+                assumption for the gain of the 1D distortion tensor.
+                *default* is 'det'
 
-            if z_obj.zerr is not None:
-                #find errors of entries for calculating weights
-                sigma_sr = np.sqrt((-(2*P*realz[0,1]*realz[1,0]*\
-                                      realz[1,1]*errmat[0,0])/\
-                                      (np.linalg.det(realz)**2*sr))**2+\
-                                    ((2*P*realz[0,0]*realz[1,0]*\
-                                     realz[1,1]*errmat[0,1])/\
-                                    (np.linalg.det(realz)**2*sr))**2+\
-                                    ((2*P*realz[0,0]* realz[0,1]*\
-                                      realz[1,1]*errmat[1,0])/\
-                                      (np.linalg.det(realz)**2*sr))**2 +\
-                                    (-(2*P*realz[0,1]* realz[1,0]*\
-                                     realz[0,0]*errmat[1,1])/\
-                                     (np.linalg.det(realz)**2*sr))**2)
-
-                sigma_dr_11 = 0.5*sigma_sr
-                sigma_dr_22 = 0.5*sigma_sr
-
-                sigma_dr_12 = np.sqrt((mat2_r[0,1]/realz[0,0]*errmat[0,0])**2+\
-                                      (mat2_r[0,1]/realz[1,0]*errmat[1,0])**2+\
-                                      (0.5*realz[0,0]/realz[1,0]*sigma_sr)**2)
-                sigma_dr_21 = np.sqrt((mat2_r[1,0]/realz[1,1]*errmat[1,1])**2+\
-                                      (mat2_r[1,0]/realz[0,1]*errmat[0,1])**2+\
-                                      (0.5*realz[1,1]/realz[0,1]*sigma_sr)**2)
-
-                lo_diserr.append(np.array([[sigma_dr_11, sigma_dr_12],
-                                           [sigma_dr_21, sigma_dr_22]]))
-
-                sigma_si = np.sqrt((-(2*P*imagz[0,1]*imagz[1,0]*\
-                                      imagz[1,1]*errmat[0,0])/\
-                                      (np.linalg.det(imagz)**2*sr))**2+\
-                                     ((2*P*imagz[0,0]*imagz[1,0]*\
-                                      imagz[1,1]*errmat[0,1])/\
-                                      (np.linalg.det(imagz)**2*sr))**2+\
-                                     ((2*P*imagz[0,0]*imagz[0,1]*\
-                                      imagz[1,1]*errmat[1,0])/\
-                                      (np.linalg.det(imagz)**2*sr))**2+\
-                                     (-(2*P*imagz[0,1]*imagz[1,0]*\
-                                      imagz[0,0]*errmat[1,1])/\
-                                      (np.linalg.det(imagz)**2*sr))**2)
-
-                sigma_di_11 = 0.5*sigma_si
-                sigma_di_22 = 0.5*sigma_si
-                sigma_di_12 = np.sqrt((mat2_i[0,1]/imagz[0,0]*errmat[0,0])**2+\
-                                      (mat2_i[0,1]/imagz[1,0]*errmat[1,0])**2+\
-                                      (0.5*imagz[0,0]/imagz[1,0]*sigma_si)**2)
-                sigma_di_21 = np.sqrt((mat2_i[1,0]/imagz[1,1]*errmat[1,1])**2+\
-                                      (mat2_i[1,0]/imagz[0,1]*errmat[0,1])**2+\
-                                      (0.5*imagz[1,1]/imagz[0,1]*sigma_si)**2)
-
-                lo_diserr.append(np.array([[sigma_di_11, sigma_di_12],
-                                           [sigma_di_21, sigma_di_22]]))
+        **dims** : np.ndarray(n_station, n_freq)
+                   dimensionality of each frequency, if None it is computed
+                   with niblettbostick.get_dimensionality_strike.  Entries
+                   that are not 1, 2 or 3 are ignored.
 
-            else:
-                #otherwise go for evenly weighted average
-                lo_diserr.append(np.ones((2, 2)))
-                lo_diserr.append(np.ones((2, 2)))
+    Returns
+    ------------
+        **dis** : np.ndarray(n_station, 2, 2)
+                  distortion tensor of each station
 
+        **diserr** : np.ndarray(n_station, 2, 2)
+                     error of the distortion tensor of each station
 
-        dis = np.zeros((2, 2))
-        diserr = np.zeros((2, 2))
-        for i in range(2):
-            for j in range(2):
+    :Example: ::
 
-                dis[i, j], dummy = np.average(np.array([k[i, j] 
-                                                       for k in lo_dis]), 
-                                              weights=np.array([1./(k[i,j])**2
-                                                       for k in lo_diserr]),
-                                              returned=True )
-                diserr[i, j] = np.sqrt(1./dummy)
+        >>> import mtpy.analysis.distortion as distortion
+        >>> dis, diserr = distortion.find_distortion_survey(z_array, z_err)
+    """
 
-        return dis, diserr
+    z_array = np.asarray(z_array)
+    if z_array.ndim != 4 or z_array.shape[-2:] != (2, 2):
+        raise MTex.MTpyError_inputarguments('z_array must have the shape '
+                                            '(n_station, n_freq, 2, 2)')
+    if z_err_array is not None:
+        z_err_array = np.asarray(z_err_array)
+        if z_err_array.shape != z_array.shape:
+            raise MTex.MTpyError_inputarguments('z_err_array must have the '
+                                                'same shape as z_array')
+
+    n_station = z_array.shape[0]
+    valid = np.isfinite(z_array).all(axis=(-2, -1))
+
+    with np.errstate(invalid='ignore'):
+        z_dims, strike = MTnb.get_dimensionality_strike(
+                                        np.where(valid[..., np.newaxis, 
+                                                       np.newaxis], z_array, 
+                                                 0))
+    if dims is None:
+        dims = z_dims
+    dims = np.where(valid, dims, 0)
+
+    dis = np.zeros((n_station, 2, 2))
+    dis[:] = np.identity(2)
+    diserr = np.zeros((n_station, 2, 2))
+
+    #--> stations with 1D frequencies
+    mask_1 = dims == 1
+    s_1 = mask_1.any(axis=1)
+    if s_1.any():
+        dis_array, diserr_array = _find_1d_distortion_array(z_array[s_1],
+                    None if z_err_array is None else z_err_array[s_1], g)
+        dis_1, diserr_1 = _weighted_average(dis_array, diserr_array, 
+                                            np.repeat(mask_1[s_1], 2, axis=1))
+
+        #if the distortion came out as nan set it to no distortion
+        no_dis = np.nan_to_num(dis_1) == 0
+        identity = np.broadcast_to(np.identity(2), dis_1.shape)
+        dis_1[no_dis] = identity[no_dis]
+        diserr_1[no_dis] = identity[no_dis]
+        dis[s_1] = dis_1
+        diserr[s_1] = diserr_1
+
+    #--> stations without 1D but with 2D frequencies
+    mask_2 = dims == 2
+    s_2 = mask_2.any(axis=1) & ~s_1
+    if s_2.any():
+        dis_array, diserr_array = _find_2d_distortion_array(z_array[s_2],
+                    None if z_err_array is None else z_err_array[s_2],
+                    strike[s_2], mask_2[s_2])
+        dis[s_2], diserr[s_2] = _weighted_average(dis_array, diserr_array,
+                                            np.repeat(mask_2[s_2], 2, axis=1))
 
-    #if only 3D, use identity matrix - no distortion calculated
-    dis = np.identity(2)
-    diserr = diserr = np.zeros((2, 2))
     return dis, diserr
 
 
-
 def find_1d_distortion(z_object, include_non1d = False):
     """
     find 1D distortion tensor from z object
@@ -359,6 +400,119 @@ def find_2d_distortion(z_object, include_non2d=False):
 
     return  find_distortion(z_obj, lo_dims = lo_dims)
 
+def remove_distortion_survey(z_array=None, z_err_array=None, 
+                             z_object_list=None, g='det'):
+    """
+    find and remove the distortion of many stations at once, the same as
+    remove_distortion for each station.
+
+    Arguments
+    -------------
+        **z_array** : np.ndarray(n_station, n_freq, 2, 2)
+                      impedance tensors, stations with fewer frequencies
+                      can be padded with nan.
+
+        **z_err_array** : np.ndarray(n_station, n_freq, 2, 2)
+                          errors of the impedance tensors
+
+        **z_object_list** : list of mtpy.core.z.Z objects, used if z_array
+                            is None, they can have different frequencies.
+
+        **g** : [ 'det' | '01' | '10' ] see find_distortion_survey
+
+    Returns
+    ------------
+        **dis** : np.ndarray(n_station, 2, 2)
+                  distortion tensor of each station, identity where it 
+                  could not be removed
+
+        **z_corrected** : np.ndarray(n_station, n_freq, 2, 2) or list of
+                          new Z objects if z_object_list is input
+
+        **z_corrected_err** : np.ndarray(n_station, n_freq, 2, 2), only
+                              returned for z_array input
+
+    :Example: ::
+
+        >>> import mtpy.core.mt as mt
+        >>> import mtpy.analysis.distortion as distortion
+        >>> mt_list = [mt.MT(edi_fn) for edi_fn in edi_list]
+        >>> dis, z_list = distortion.remove_distortion_survey(
+        >>> ...                  z_object_list=[mt_obj.Z for mt_obj in mt_list])
+    """
+
+    if z_array is None:
+        if z_object_list is None:
+            raise MTex.MTpyError_inputarguments('Need to input z_array or '
+                                                'z_object_list')
+        n_freq = max([len(z_obj.z) for z_obj in z_object_list])
+        z_array = np.zeros((len(z_object_list), n_freq, 2, 2), 
+                           dtype=np.complex)
+        z_array[:] = np.nan
+        z_err_array = np.zeros(z_array.shape)
+        for ii, z_obj in enumerate(z_object_list):
+            z_array[ii, :len(z_obj.z)] = z_obj.z
+            if z_obj.zerr is not None:
+                z_err_array[ii, :len(z_obj.z)] = z_obj.zerr
+
+    z_array = np.asarray(z_array)
+    if z_err_array is None:
+        z_err_array = np.zeros(z_array.shape)
+
+    dis, diserr = find_distortion_survey(z_array, z_err_array, g=g)
+    zd, zd_err, singular = _remove_distortion_array(z_array, z_err_array, 
+                                                    dis, diserr)
+    for ss in np.nonzero(singular)[0]:
+        print 'Could not compute distortion tensor of station {0}'.format(ss)
+    dis[singular] = np.identity(2)
+
+    if z_object_list is None:
+        return dis, zd, zd_err
+
+    new_z_list = []
+    for ii, z_obj in enumerate(z_object_list):
+        n_freq = len(z_obj.z)
+        new_z_obj = MTz.Z(z_array=zd[ii, :n_freq], 
+                          zerr_array=zd_err[ii, :n_freq],
+                          freq=z_obj.freq)
+        new_z_list.append(new_z_obj)
+
+    return dis, new_z_list
+
+
+def _remove_distortion_array(z_array, z_err_array, dis, diserr):
+    """
+    Z0 = D^-1 * Z with errors for stacks of stations, as in 
+    mtpy.core.z.Z.no_distortion.  z_array is left unchanged for stations 
+    with a singular D.
+
+    returns z, z_err and a boolean array of stations with a singular D
+    """
+
+    det = dis[:, 0, 0]*dis[:, 1, 1]-dis[:, 0, 1]*dis[:, 1, 0]
+    singular = det == 0
+
+    dis = dis.copy()
+    dis[singular] = np.identity(2)
+    diserr = diserr.copy()
+    diserr[singular] = 0
+    dis_inv = np.linalg.inv(dis)
+
+    # error of the inverse: sum_kl | -DI_ik * DI_lj * Derr_kl |
+    dis_inv_err = np.abs(np.einsum('sik,slj,skl->sijkl', dis_inv, dis_inv, 
+                                   diserr)).sum(axis=(-2, -1))
+
+    zd = np.einsum('sik,sfkj->sfij', dis_inv, z_array)
+    zd_err = np.einsum('sik,sfkj->sfij', np.abs(dis_inv_err), 
+                       np.abs(z_array))+\
+             np.einsum('sik,sfkj->sfij', np.abs(dis_inv), np.abs(z_err_array))
+
+    zd[singular] = z_array[singular]
+    zd_err[singular] = z_err_array[singular]
+
+    return zd, zd_err, singular
+
+
 def remove_distortion(z_array=None, z_object=None):
 
     if z_array is not None:
@@ -32,7 +32,6 @@ import mtpy.utils.exceptions as MTex
 
 # reload(MTex)
 # reload(MTz)
-reload(MTpt)
 
 
 #=================================================================
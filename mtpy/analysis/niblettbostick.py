@@ -25,15 +25,18 @@ Niblett-Bostick transformations are possible in 1D and 2D.
 
 #=================================================================
 import numpy as np
-import scipy.interpolate as spi
 
 import mtpy.core.z as MTz 
 import mtpy.analysis.geometry as MTge 
+import mtpy.analysis.pt as MTpt
 import mtpy.utils.exceptions as MTex
 import mtpy.utils.calculator as MTcc
+import mtpy.utils.lazyimport as MTlazy
 import copy
+import os
+
+spi = MTlazy.lazy_import('scipy.interpolate')
 
-reload(MTz)
 
 
 def rhophi2rhodepth(rho, phase, period):
@@ -216,32 +219,9 @@ def calculate_depth_nb(z_object = None, z_array = None, periods = None):
         z = z_array 
         periods = periods
 
-    dimensions = MTge.dimensionality(z_array=z)
-    angles = MTge.strike_angle(z_array=z)
-
-    #reduce actual Z by the 3D layers:
-#    z_2d = z[np.where(dimensions != 3)[0]]
-    angles_2d = np.nan_to_num(angles[np.where(dimensions != 3)][:, 0])
-    periods_2d = periods[np.where(dimensions != 3)]
-    
-    # interperpolate strike angle onto all periods
-    # make a function for strike using only 2d angles
-    strike_interp = spi.interp1d(periods_2d, angles_2d, 
-                                 bounds_error=False,
-                                 fill_value=0)
-    strike_angles = strike_interp(periods)
-    
-    # rotate z to be along the interpolated strike angles
-    z_rot = MTz.rotate_z(z, strike_angles)[0]
-    
-#    angles_incl1D = interpolate_strike_angles(angles_2d, periods_2d)
-	
-#    z3 = MTz.rotate_z(z_2d, -angles_incl1D)[0]
-
-    #at this point we assume that the two modes are the off-diagonal elements!!
-    #TE is element (1,2), TM at (2,1)
-#    lo_nb_max = []
-#    lo_nb_min = []
+    # use the batched calculation for a single station
+    nb_array = calculate_depth_nb_survey(z_array=z[np.newaxis], 
+                                         periods=periods)[0]
     
     depth_array = np.zeros(periods.shape[0], 
                            dtype=[('period', np.float),
@@ -249,35 +229,437 @@ def calculate_depth_nb(z_object = None, z_array = None, periods = None):
                                   ('depth_max', np.float),
                                   ('rho_min', np.float),
                                   ('rho_max', np.float)])
-
-#    app_res, app_res_err, phase, phase_err = MTz.z2resphi(z3, periods_2d)
-    app_res, app_res_err, phase, phase_err = MTz.z2resphi(z_rot, periods)
-
-    for ii, per in enumerate(periods):
-        te_rho, te_depth = rhophi2rhodepth(app_res[ii, 0, 1], 
-                                           phase[ii, 0, 1], 
-                                           per)
-        tm_rho, tm_depth = rhophi2rhodepth(app_res[ii, 1, 0], 
-                                           phase[ii, 1, 0], 
-                                           per)
-        depth_array[ii]['period'] = per
-        depth_array[ii]['depth_min'] = min([te_depth, tm_depth]) 
-        depth_array[ii]['depth_max'] = max([te_depth, tm_depth]) 
-        depth_array[ii]['rho_min'] = min([te_rho, tm_rho]) 
-        depth_array[ii]['rho_max'] = max([te_rho, tm_rho])
+    for key in depth_array.dtype.names:
+        depth_array[key] = nb_array[key]
         
     return depth_array
-#        if te_rho > tm_rho:
-#            lo_nb_max.append([te_depth, te_rho])
-#            lo_nb_min.append([tm_depth, tm_rho])
-#            
-#        else:
-#            lo_nb_min.append([te_depth, te_rho])
-#            lo_nb_max.append([tm_depth, tm_rho])
-            
-    # return arrays of the min and max depths
 
-#    return np.array(lo_nb_max), np.array(lo_nb_min)
+
+#=================================================================
+# batched Niblett-Bostick for a survey
+#=================================================================
+def _get_pt_array(z_array):
+    """
+    phase tensors of an array of impedance tensors (..., 2, 2), singular
+    real parts give a phase tensor of zeros like PhaseTensor does.
+    """
+    
+    return MTpt.z2pt_array(z_array)[0]
+    
+def get_dimensionality_strike(z_array, beta_threshold=5, 
+                              eccentricity_threshold=0.1):
+    """
+    dimensionality and strike angle of an array of impedance tensors with
+    the criteria of Bibby et al. [2005], the same as 
+    mtpy.analysis.geometry.dimensionality and strike_angle, for any number
+    of stations at once.
+    
+    Arguments
+    -------------
+        **z_array** : np.ndarray(..., 2, 2) 
+                      impedance tensors, for instance 
+                      (num_stations, num_periods, 2, 2)
+                      
+        **beta_threshold** : angle in degrees, if beta is smaller than this 
+                             it is 2D. *default* is 5
+                             
+        **eccentricity_threshold** : if the eccentricity is smaller than 
+                                     this it is 1D. *default* is 0.1
+                                     
+    Returns
+    ------------
+        **dimensions** : np.ndarray(z_array.shape[:-2]) of 1, 2 or 3
+        
+        **strike** : np.ndarray(z_array.shape[:-2]) 
+                     smaller of the two strike angles in degrees, nan 
+                     where 1D
+    """
+    
+    pt_array = _get_pt_array(z_array)
+    pt_sum = pt_array[..., 0, 1]+pt_array[..., 1, 0]
+    pt_diff = pt_array[..., 0, 1]-pt_array[..., 1, 0]
+    pt_trace = pt_array[..., 0, 0]+pt_array[..., 1, 1]
+    pt_trace_diff = pt_array[..., 0, 0]-pt_array[..., 1, 1]
+    
+    alpha = np.degrees(0.5*np.arctan2(pt_sum, pt_trace_diff))
+    beta = np.degrees(0.5*np.arctan2(pt_diff, pt_trace))
+    pi1 = 0.5*np.sqrt(pt_trace_diff**2+pt_sum**2)
+    pi2 = 0.5*np.sqrt(pt_trace**2+pt_diff**2)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        eccentricity = pi1/pi2
+        
+    dimensions = np.ones(pt_array.shape[:-2], dtype=np.int)
+    dimensions[eccentricity > eccentricity_threshold] = 2
+    dimensions[beta > beta_threshold] = 3
+    
+    strike = (alpha-beta)%90
+    strike = np.where((strike > 0) & (strike < 45), strike, strike-90)
+    strike[dimensions == 1] = np.nan
+    
+    return dimensions, strike
+
+def _interpolate_strike(periods, strike, valid):
+    """
+    linear interpolation of strike onto all periods for each station only 
+    using periods where valid is True, outside the valid periods the 
+    strike is 0.
+    
+    periods (num_periods), strike and valid (num_stations, num_periods)
+    """
+    
+    n_periods = periods.shape[0]
+    order = np.argsort(periods, kind='mergesort')
+    p_sort = periods[order]
+    s_sort = strike[:, order]
+    v_sort = valid[:, order]
+    
+    # index of the nearest valid period at or before and at or after
+    index = np.arange(n_periods)
+    i_before = np.maximum.accumulate(np.where(v_sort, index, -1), axis=1)
+    i_after = np.minimum.accumulate(np.where(v_sort, index, n_periods)[:, ::-1],
+                                    axis=1)[:, ::-1]
+    inside = (i_before >= 0) & (i_after < n_periods)
+    i_before = np.clip(i_before, 0, n_periods-1)
+    i_after = np.clip(i_after, 0, n_periods-1)
+    
+    rows = np.arange(strike.shape[0])[:, np.newaxis]
+    s_before = s_sort[rows, i_before]
+    s_after = s_sort[rows, i_after]
+    p_before = p_sort[i_before]
+    p_after = p_sort[i_after]
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (s_after-s_before)/(p_after-p_before)
+    s_interp = np.where(i_after == i_before, s_before,
+                        s_before+slope*(p_sort-p_before))
+    s_interp[~inside] = 0
+    
+    strike_interp = np.zeros_like(s_interp)
+    strike_interp[:, order] = s_interp
+    
+    return strike_interp
+    
+def _rotate_z_array(z_array, angles):
+    """
+    rotate impedance tensors (..., 2, 2) clockwise by angles in degrees,
+    nan angles are not rotated.  Same convention as mtpy.core.z.Z.rotate
+    """
+    
+    angles = np.nan_to_num(np.radians(angles%360))
+    cphi = np.cos(angles)
+    sphi = np.sin(angles)
+    zxx, zxy = z_array[..., 0, 0], z_array[..., 0, 1]
+    zyx, zyy = z_array[..., 1, 0], z_array[..., 1, 1]
+    
+    z_rot = np.zeros_like(z_array)
+    z_rot[..., 0, 0] = cphi*(cphi*zxx+sphi*zyx)+sphi*(cphi*zxy+sphi*zyy)
+    z_rot[..., 0, 1] = -sphi*(cphi*zxx+sphi*zyx)+cphi*(cphi*zxy+sphi*zyy)
+    z_rot[..., 1, 0] = cphi*(-sphi*zxx+cphi*zyx)+sphi*(-sphi*zxy+cphi*zyy)
+    z_rot[..., 1, 1] = -sphi*(-sphi*zxx+cphi*zyx)+cphi*(-sphi*zxy+cphi*zyy)
+    
+    return z_rot
+    
+def calculate_depth_nb_survey(z_array=None, periods=None, z_object_list=None,
+                              beta_threshold=5, eccentricity_threshold=0.1):
+    """
+    Niblett-Bostick depth transform for all stations of a survey at once,
+    the same steps as calculate_depth_nb:
+    
+        1) Determine the dimensionality of Z(T) for all stations
+        2) Interpolate the strike angle of the 1D and 2D parts onto all
+           periods, 3D parts are left out
+        3) Rotate all Z(T) onto strike
+        4) Transform the off-diagonal components by Niblett-Bostick
+        
+    Arguments
+    -------------
+        **z_array** : np.ndarray(num_stations, num_periods, 2, 2)
+                      impedance tensors of all stations
+                      
+        **periods** : np.ndarray(num_periods)
+                      periods in s, the same for all stations
+                      
+        **z_object_list** : list of mtpy.core.z.Z objects, all with the same
+                            frequencies, use instead of z_array
+                            
+        **beta_threshold** : angle in degrees, if beta is smaller than this 
+                             it is 2D. *default* is 5
+                             
+        **eccentricity_threshold** : if the eccentricity is smaller than 
+                                     this it is 1D. *default* is 0.1
+        
+    Returns
+    ------------
+        **nb_array** : np.ndarray(num_stations, num_periods, 
+                                  dtype=['period', 'depth_min', 'depth_max',
+                                         'rho_min', 'rho_max', 'depth_te',
+                                         'depth_tm', 'rho_te', 'rho_tm',
+                                         'dimensionality', 'strike'])
+                       numpy structured array with keywords.
+                            - period    --> period in s
+                            - depth_min --> minimum depth estimated (m) 
+                            - depth_max --> maximum depth estimated (m) 
+                            - rho_min --> minimum resistivity estimated (Ohm-m) 
+                            - rho_max --> maximum resistivity estimated (Ohm-m) 
+                            - depth_te --> depth from Z[0, 1] on strike (m)
+                            - depth_tm --> depth from Z[1, 0] on strike (m)
+                            - rho_te --> resistivity from Z[0, 1] (Ohm-m)
+                            - rho_tm --> resistivity from Z[1, 0] (Ohm-m)
+                            - dimensionality --> 1, 2 or 3
+                            - strike --> interpolated strike (deg)
+                            
+    :Example: ::
+    
+        >>> import mtpy.analysis.niblettbostick as nb
+        >>> import mtpy.modeling.modem_new as modem
+        >>> m_data = modem.Data()
+        >>> m_data.read_data_file(r"/home/ModEM/Inv1/ModEM_Data.dat")
+        >>> nb_array = nb.calculate_depth_nb_survey(
+        >>> ...                         z_array=m_data.data_array['z'],
+        >>> ...                         periods=m_data.period_list)
+    """
+    
+    if z_object_list is not None:
+        freq = z_object_list[0].freq
+        for z_obj in z_object_list[1:]:
+            if z_obj.freq.shape != freq.shape or \
+               not np.allclose(z_obj.freq, freq):
+                raise MTex.MTpyError_inputarguments('All Z objects need '+
+                                                    'the same frequencies')
+        z_array = np.array([z_obj.z for z_obj in z_object_list])
+        periods = 1./freq
+        
+    if z_array is None or periods is None:
+        raise MTex.MTpyError_inputarguments('Need to input z_array and '+
+                                            'periods or z_object_list')
+    z_array = np.asarray(z_array)
+    periods = np.asarray(periods, dtype=np.float)
+    if z_array.ndim != 4 or z_array.shape[1] != periods.shape[0]:
+        raise MTex.MTpyError_inputarguments('z_array needs the shape '+
+                                            '(num_stations, num_periods, '+
+                                            '2, 2)')
+    
+    dimensions, strike = get_dimensionality_strike(z_array, 
+                              beta_threshold=beta_threshold,
+                              eccentricity_threshold=eccentricity_threshold)
+
+    # strike of 1D parts is taken as 0, 3D parts are left out
+    strike_angles = _interpolate_strike(periods, np.nan_to_num(strike),
+                                        dimensions != 3)
+    z_rot = _rotate_z_array(z_array, strike_angles)
+    
+    # resistivity and phase of the off-diagonal components
+    freq = np.array(1./periods)[np.newaxis, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        te_rho, te_depth = rhophi2rhodepth(
+                                np.abs(z_rot[:, :, 0, 1])**2/freq*0.2,
+                                np.angle(z_rot[:, :, 0, 1], deg=True),
+                                periods[np.newaxis, :])
+        tm_rho, tm_depth = rhophi2rhodepth(
+                                np.abs(z_rot[:, :, 1, 0])**2/freq*0.2,
+                                np.angle(z_rot[:, :, 1, 0], deg=True),
+                                periods[np.newaxis, :])
+    
+    nb_array = np.zeros(z_array.shape[0:2], 
+                        dtype=[('period', np.float),
+                               ('depth_min', np.float),
+                               ('depth_max', np.float),
+                               ('rho_min', np.float),
+                               ('rho_max', np.float),
+                               ('depth_te', np.float),
+                               ('depth_tm', np.float),
+                               ('rho_te', np.float),
+                               ('rho_tm', np.float),
+                               ('dimensionality', np.int),
+                               ('strike', np.float)])
+    nb_array['period'] = periods[np.newaxis, :]
+    nb_array['depth_min'] = np.minimum(te_depth, tm_depth)
+    nb_array['depth_max'] = np.maximum(te_depth, tm_depth)
+    nb_array['rho_min'] = np.minimum(te_rho, tm_rho)
+    nb_array['rho_max'] = np.maximum(te_rho, tm_rho)
+    nb_array['depth_te'] = te_depth
+    nb_array['depth_tm'] = tm_depth
+    nb_array['rho_te'] = te_rho
+    nb_array['rho_tm'] = tm_rho
+    nb_array['dimensionality'] = dimensions
+    nb_array['strike'] = strike_angles
+    
+    return nb_array
+    
+def _interpolate_rows(x, y, x_new):
+    """
+    linear interpolation of y(x) onto x_new for each row of x and y
+    (num_rows, num_x), pairs that are not finite are left out.
+    Returns (num_rows, num_new) with nan outside the range of each row.
+    """
+    
+    x = np.where(np.isfinite(x) & np.isfinite(y), x, np.inf)
+    order = np.argsort(x, axis=1, kind='mergesort')
+    rows = np.arange(x.shape[0])[:, np.newaxis]
+    x = x[rows, order]
+    y = y[rows, order]
+    n_valid = np.isfinite(x).sum(axis=1)[:, np.newaxis]
+    
+    # number of x values smaller than x_new, the index of the x after it
+    i_after = (x[:, :, np.newaxis] < x_new[np.newaxis, np.newaxis, :]).sum(axis=1)
+    at_first = x[:, 0][:, np.newaxis] == x_new[np.newaxis, :]
+    inside = (i_after < n_valid) & ((i_after > 0) | at_first)
+    i_after = np.clip(i_after, 0, x.shape[1]-1)
+    i_before = np.clip(i_after-1, 0, x.shape[1]-1)
+    
+    x_before = x[rows, i_before]
+    x_after = x[rows, i_after]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y_new = y[rows, i_before]+(y[rows, i_after]-y[rows, i_before])*\
+                    (x_new[np.newaxis, :]-x_before)/(x_after-x_before)
+    y_new = np.where(at_first, y[:, 0][:, np.newaxis], y_new)
+    y_new[~inside] = np.nan
+    
+    return y_new
+    
+def get_depth_slices(nb_array, depth_list):
+    """
+    interpolate the Niblett-Bostick resistivities of all stations onto
+    depths.  Each mode is interpolated linearly in log10(depth) and 
+    log10(resistivity), then the minimum and maximum of the two modes is
+    taken at each depth.
+    
+    Arguments
+    -------------
+        **nb_array** : np.ndarray(num_stations, num_periods) output of
+                       calculate_depth_nb_survey
+                       
+        **depth_list** : np.ndarray(num_depths) depths in meters
+        
+    Returns
+    ------------
+        **rho_min** : np.ndarray(num_stations, num_depths) minimum 
+                      resistivity (Ohm-m), nan where the depth is not
+                      covered by the data
+                      
+        **rho_max** : np.ndarray(num_stations, num_depths) maximum 
+                      resistivity (Ohm-m)
+    """
+    
+    log_depth = np.log10(np.asarray(depth_list, dtype=np.float))
+    rho_list = []
+    for mode in ['te', 'tm']:
+        depth = nb_array['depth_{0}'.format(mode)]
+        rho = nb_array['rho_{0}'.format(mode)]
+        valid = (depth > 0) & (rho > 0) & np.isfinite(rho)
+        log_d = np.log10(np.where(valid, depth, np.nan))
+        log_r = np.log10(np.where(valid, rho, np.nan))
+        rho_list.append(10**_interpolate_rows(log_d, log_r, log_depth))
+    
+    rho_min = np.fmin(rho_list[0], rho_list[1])
+    rho_max = np.fmax(rho_list[0], rho_list[1])
+    
+    return rho_min, rho_max
+    
+def write_depth_slices(nb_array, depth_list, station_east, station_north,
+                       save_path=None, cell_size=None, grid_east=None,
+                       grid_north=None, fn_basename='NB_DepthSlice'):
+    """
+    grid the Niblett-Bostick resistivity of all stations onto a regular 
+    east-north grid for each depth and write one file per depth with
+    columns east, north, rho_min, rho_max.  Points outside the stations 
+    are written as nan.
+    
+    Arguments
+    -------------
+        **nb_array** : np.ndarray(num_stations, num_periods) output of
+                       calculate_depth_nb_survey
+                       
+        **depth_list** : np.ndarray(num_depths) depths in meters
+        
+        **station_east** : np.ndarray(num_stations) relative east locations
+                           of the stations in meters
+                           
+        **station_north** : np.ndarray(num_stations) relative north 
+                            locations of the stations in meters
+                            
+        **save_path** : directory to save files to, *default* is cwd
+        
+        **cell_size** : size of grid cells in meters, *default* is 1/50 of 
+                        the largest extent of the stations
+                        
+        **grid_east** : np.ndarray of east grid values, overrides cell_size
+        
+        **grid_north** : np.ndarray of north grid values, overrides
+                         cell_size
+                         
+        **fn_basename** : base name of the files, the depth is appended.
+                          *default* is 'NB_DepthSlice'
+                          
+    Returns
+    ------------
+        **fn_list** : list of files written
+        
+        **rho_grid** : np.ndarray(num_depths, num_north, num_east, 2) 
+                       gridded minimum and maximum resistivity
+                       
+    :Example: ::
+    
+        >>> nb_array = nb.calculate_depth_nb_survey(
+        >>> ...                         z_array=m_data.data_array['z'],
+        >>> ...                         periods=m_data.period_list)
+        >>> fn_list, rho_grid = nb.write_depth_slices(nb_array, 
+        >>> ...                         np.logspace(2, 5, 20),
+        >>> ...                         m_data.data_array['rel_east'],
+        >>> ...                         m_data.data_array['rel_north'],
+        >>> ...                         save_path=r"/home/MT/NB")
+    """
+    
+    if save_path is None:
+        save_path = os.getcwd()
+    if not os.path.isdir(save_path):
+        os.mkdir(save_path)
+        
+    depth_list = np.atleast_1d(np.asarray(depth_list, dtype=np.float))
+    station_east = np.asarray(station_east, dtype=np.float)
+    station_north = np.asarray(station_north, dtype=np.float)
+    
+    if grid_east is None or grid_north is None:
+        if cell_size is None:
+            cell_size = max(np.ptp(station_east), np.ptp(station_north))/50.
+            if cell_size == 0:
+                cell_size = 1.
+        grid_east = np.arange(station_east.min(), 
+                              station_east.max()+cell_size, cell_size)
+        grid_north = np.arange(station_north.min(), 
+                               station_north.max()+cell_size, cell_size)
+    mesh_east, mesh_north = np.meshgrid(grid_east, grid_north)
+    
+    rho_min, rho_max = get_depth_slices(nb_array, depth_list)
+    
+    rho_grid = np.zeros((depth_list.shape[0], grid_north.shape[0], 
+                         grid_east.shape[0], 2))
+    rho_grid[:] = np.nan
+    fn_list = []
+    for dd, depth in enumerate(depth_list):
+        for ii, rho in enumerate([rho_min[:, dd], rho_max[:, dd]]):
+            good = np.isfinite(rho)
+            if good.sum() > 3:
+                rho_grid[dd, :, :, ii] = 10**spi.griddata(
+                                        (station_east[good], 
+                                         station_north[good]),
+                                        np.log10(rho[good]),
+                                        (mesh_east, mesh_north),
+                                        method='linear')
+            
+        slice_fn = os.path.join(save_path, '{0}_{1:.0f}m.txt'.format(
+                                                   fn_basename, depth))
+        np.savetxt(slice_fn, 
+                   np.column_stack((mesh_east.ravel(), mesh_north.ravel(), 
+                                    rho_grid[dd, :, :, 0].ravel(),
+                                    rho_grid[dd, :, :, 1].ravel())),
+                   fmt='%.3f %.3f %.6e %.6e',
+                   header='depth = {0:.3f} m\n'.format(depth)+
+                          'east(m) north(m) rho_min(Ohm-m) rho_max(Ohm-m)')
+        fn_list.append(slice_fn)
+        
+    return fn_list, rho_grid
 
 
 def calculate_rho_minmax(z_object = None, z_array = None, periods = None):
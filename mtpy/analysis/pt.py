@@ -45,6 +45,7 @@ Contains classes and functions for handling Phase Tensor analysis of given imped
     Functions:
 
     - z2pt
+    - z2pt_array
     - z_object2pt
     - edi_object2pt
     - edi_file2pt
@@ -1336,6 +1337,97 @@ def z2pt(z_array, zerr_array = None):
 
 
 
+def z2pt_array(z_array, zerr_array=None):
+    """
+        Calculate Phase Tensors from an array of impedance tensors at once 
+        (incl. uncertainties), the same as z2pt for a single matrix.  
+
+        Input:
+        - Z : (..., 2, 2) complex valued Numpy array, for instance 
+              (nf, 2, 2) for one station or (ns, nf, 2, 2) for a survey
+
+        Optional:
+        - Z-error : (..., 2, 2) real valued Numpy array
+
+        Return:
+        - PT : (..., 2, 2) real valued Numpy array
+        - PT-error : (..., 2, 2) real valued Numpy array, None if no Z-error 
+                     is given
+
+        Singular real parts of Z give a PT of zeros (and PT-error of zeros), 
+        the same as PhaseTensor does.
+    """
+
+    z_array = np.asarray(z_array)
+    if z_array.ndim < 2 or z_array.shape[-2:] != (2, 2):
+        raise MTex.MTpyError_PT('Error - incorrect z array: %s instead of '\
+                                '(...,2,2)'%(str(z_array.shape)))
+    if zerr_array is not None:
+        zerr_array = np.asarray(zerr_array, dtype=np.float)
+        if zerr_array.shape != z_array.shape:
+            raise MTex.MTpyError_PT('Error - z-array and z-err-array have '\
+                                    'different shape: %s;%s'%(
+                                    str(z_array.shape), str(zerr_array.shape)))
+
+    realz = np.real(z_array)
+    imagz = np.imag(z_array)
+    r00, r01 = realz[..., 0, 0], realz[..., 0, 1]
+    r10, r11 = realz[..., 1, 0], realz[..., 1, 1]
+    i00, i01 = imagz[..., 0, 0], imagz[..., 0, 1]
+    i10, i11 = imagz[..., 1, 0], imagz[..., 1, 1]
+    detreal = r00*r11-r01*r10
+
+    singular = detreal == 0
+    detreal = np.where(singular, 1., detreal)
+    absdet = np.abs(detreal)
+
+    pt_array = np.zeros(z_array.shape, dtype=np.float)
+    pt_array[..., 0, 0] = (r11*i00-r01*i10)/detreal
+    pt_array[..., 0, 1] = (r11*i01-r01*i11)/detreal
+    pt_array[..., 1, 0] = (r00*i10-r10*i00)/detreal
+    pt_array[..., 1, 1] = (r00*i11-r10*i01)/detreal
+    pt_array[singular] = 0
+
+    if zerr_array is None:
+        return pt_array, None
+
+    #Z entries are independent -> use Gaussian error propagation 
+    #(squared sums/2-norm), the same terms as z2pt
+    e00, e01 = zerr_array[..., 0, 0], zerr_array[..., 0, 1]
+    e10, e11 = zerr_array[..., 1, 0], zerr_array[..., 1, 1]
+    pt00, pt01 = pt_array[..., 0, 0], pt_array[..., 0, 1]
+    pt10, pt11 = pt_array[..., 1, 0], pt_array[..., 1, 1]
+
+    pterr_array = np.zeros(z_array.shape, dtype=np.float)
+    pterr_array[..., 0, 0] = 1/absdet*np.sqrt((-pt00*r11*e00)**2+
+                                              (pt00*r01*e10)**2+
+                                              ((i00*r10-r00*i10)/absdet*r00*e01)**2+
+                                              ((i10*r00-r10*i11)/absdet*r01*e11)**2+
+                                              (r11*e00)**2+
+                                              (r01*e10)**2)
+    pterr_array[..., 0, 1] = 1/absdet*np.sqrt((-pt01*r11*e00)**2+
+                                              (pt01*r01*e10)**2+
+                                              ((i01*r10-r00*i11)/absdet*r11*e01)**2+
+                                              ((i11*r00-r01*i10)/absdet*r01*e11)**2+
+                                              (r11*e01)**2+
+                                              (r01*e11)**2)
+    pterr_array[..., 1, 0] = 1/absdet*np.sqrt((pt10*r10*e01)**2+
+                                              (-pt10*r00*e11)**2+
+                                              ((i00*r11-r01*i11)/absdet*r10*e00)**2+
+                                              ((i10*r01-r11*i00)/absdet*r00*e01)**2+
+                                              (r10*e00)**2+
+                                              (r00*e10)**2)
+    pterr_array[..., 1, 1] = 1/absdet*np.sqrt((pt11*r10*e01)**2+
+                                              (-pt11*r00*e11)**2+
+                                              ((i01*r11-r01*i11)/absdet*r10*e00)**2+
+                                              ((i11*r01-r11*i01)/absdet*r00*e01)**2+
+                                              (-r10*e01)**2+
+                                              (r00*e11)**2)
+    pterr_array[singular] = 0
+
+    return pt_array, pterr_array
+
+
 def z_object2pt(z_object):
     """
         Calculate Phase Tensor from Z object (incl. uncertainties)
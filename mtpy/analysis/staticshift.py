@@ -15,7 +15,9 @@ Created on Mon Aug 19 10:06:21 2013
 import mtpy.core.mt as mt
 import os
 import numpy as np
-import mtpy.imaging.mtplot as mtplot
+import mtpy.utils.lazyimport as lazyimport
+
+mtplot = lazyimport.lazy_import('mtpy.imaging.mtplot')
 #==============================================================================
 
 def remove_static_shift_spatial_filter(edi_fn, radius=1000, num_freq=20, 
@@ -0,0 +1,646 @@
+# -*- coding: utf-8 -*-
+"""
+Strike angle statistics for a whole survey.
+
+Estimates the geoelectric strike from the invariants of the impedance
+tensor (Weaver et al. [2003]), the phase tensor azimuth (Caldwell et al.
+[2004]) and the real induction arrows for all stations and periods at once,
+puts them onto a common period list and computes histograms and statistics
+for period bands.  This is what PlotStrike and PlotStrike2D plot, but it can
+be used without plotting, for instance to write a table of strike angles.
+
+Angles are kept as they are plotted in the rose diagrams, measured counter
+clockwise from East (the strike angle is 90-angle).  Periods where a strike
+angle could not be estimated are nan.
+
+:Example: ::
+
+    >>> import mtpy.analysis.strike as MTstrike
+    >>> import mtpy.imaging.mtplottools as mtpl
+    >>> mt_list = mtpl.get_mtlist(fn_list=edi_list)
+    >>> strike_obj = MTstrike.StrikeStatistics(mt_list=mt_list,
+    >>> ...                                    pt_error_floor=5)
+    >>> strike_obj.strike_array['pt'].shape
+    (n_periods, n_stations)
+    >>> band_list = strike_obj.get_decade_list()
+    >>> stat_array = strike_obj.get_statistics(band_list)
+    >>> strike_obj.write_strike_table(r"/home/MT/strike.csv")
+
+@author: jpeacock
+"""
+
+#==============================================================================
+import numpy as np
+import warnings
+import mtpy.analysis.pt as MTpt
+import mtpy.analysis.zinvariants as MTinv
+import mtpy.analysis.niblettbostick as MTnb
+import mtpy.utils.exceptions as MTex
+
+#==============================================================================
+# estimators of the strike angle: invariants, phase tensor and tipper
+estimator_list = ['inv', 'pt', 'tip']
+
+#==============================================================================
+def fold_angles(angles, fold=True):
+    """
+    fold angles measured counter clockwise from East the same way for all
+    estimators.
+
+    Arguments
+    -------------
+        **angles** : np.ndarray
+                     angles in degrees, is changed in place
+
+        **fold** : [ True | False ]
+                   * True to fold into the range (-90, 90]
+                   * False to put into the range [0, 360)
+
+    Returns
+    ------------
+        **angles** : np.ndarray of folded angles
+    """
+
+    angles = np.asarray(angles)
+    with np.errstate(invalid='ignore'):
+        if fold == True:
+            angles[angles > 90] -= 180
+            angles[angles < -90] += 180
+        else:
+            angles[angles < 0] += 360
+            angles[angles == 360] = 0
+
+    return angles
+
+def get_strike_angles(z_array, z_err_array=None, tipper_array=None,
+                      fold=True, pt_error_floor=None, skew_threshold=None):
+    """
+    strike angles from the invariants, phase tensor and tipper for any number
+    of stations and periods at once.
+
+    Arguments
+    -------------
+        **z_array** : np.ndarray(..., 2, 2)
+                      impedance tensors, for instance
+                      (num_stations, num_periods, 2, 2)
+
+        **z_err_array** : np.ndarray(..., 2, 2)
+                          impedance tensor errors, used for the error of the
+                          phase tensor azimuth. *default* is None
+
+        **tipper_array** : np.ndarray(..., 1, 2)
+                           tipper, if None the tipper strike is nan.
+                           *default* is None
+
+        **fold** : [ True | False ]
+                   * True to fold into the range (-90, 90]
+                   * False to put into the range [0, 360)
+
+        **pt_error_floor** : float
+                             phase tensor azimuths with an error larger than
+                             this in degrees are nan. *default* is None
+
+        **skew_threshold** : float
+                             if given only estimate strike where the phase
+                             tensor says the data are 2D (Bibby et al.
+                             [2005]) with this threshold on beta in degrees.
+                             *default* is None
+
+    Returns
+    ------------
+        **strike_array** : np.ndarray(z_array.shape[:-2],
+                                      dtype=['inv', 'pt', 'pt_err', 'tip'])
+                           structured array of angles in degrees measured
+                           counter clockwise from East, nan where there is
+                           no estimate
+    """
+
+    z_array = np.asarray(z_array)
+    strike_array = np.zeros(z_array.shape[:-2],
+                            dtype=[(key, np.float) for key in
+                                   ['inv', 'pt', 'pt_err', 'tip']])
+    strike_array['tip'] = np.nan
+
+    #--> strike from the invariants, add 90 degrees because the invariants
+    # assume 0 is north, the plots assume 0 is east and measure counter
+    # clockwise
+    strike_array['inv'] = 90-MTinv.compute_invariants(z_array)['strike']
+
+    #--> strike from the phase tensor azimuth
+    if z_err_array is None:
+        z_err_array = np.zeros(z_array.shape)
+    pt_array, pterr_array = MTpt.z2pt_array(z_array, z_err_array)
+
+    x = pt_array[..., 0, 0]-pt_array[..., 1, 1]
+    y = pt_array[..., 0, 1]+pt_array[..., 1, 0]
+    xb = pt_array[..., 0, 0]+pt_array[..., 1, 1]
+    yb = pt_array[..., 0, 1]-pt_array[..., 1, 0]
+    x_err = np.sqrt(pterr_array[..., 0, 0]**2+pterr_array[..., 1, 1]**2)
+    y_err = np.sqrt(pterr_array[..., 0, 1]**2+pterr_array[..., 1, 0]**2)
+
+    alpha = np.degrees(0.5*np.arctan2(y, x))
+    beta = np.degrees(0.5*np.arctan2(yb, xb))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        alpha_err = 0.5/(x**2+y**2)*np.sqrt(y**2*x_err**2+x**2*y_err**2)
+        beta_err = 0.5/(xb**2+yb**2)*np.sqrt(yb**2*x_err**2+xb**2*y_err**2)
+        strike_array['pt_err'] = np.sqrt(alpha_err+beta_err)
+    strike_array['pt'] = 90-(alpha-beta)
+
+    if pt_error_floor:
+        with np.errstate(invalid='ignore'):
+            strike_array['pt'][strike_array['pt_err'] > pt_error_floor] = np.nan
+
+    #--> strike from the real induction arrow, needs to be negative because
+    # measures clockwise
+    if tipper_array is not None:
+        tipper_array = np.asarray(tipper_array)
+        tx = tipper_array[..., 0, 0].real
+        ty = tipper_array[..., 0, 1].real
+        strike_array['tip'] = -np.degrees(np.arctan2(-ty, -tx))
+        strike_array['tip'][(tx == 0) & (ty == 0)] = np.nan
+
+    #--> only keep the 2D parts
+    if skew_threshold is not None:
+        dimensions = MTnb.get_dimensionality_strike(z_array,
+                                        beta_threshold=skew_threshold)[0]
+        for key in ['inv', 'pt', 'tip']:
+            strike_array[key][dimensions != 2] = np.nan
+
+    for key in ['inv', 'pt', 'tip']:
+        fold_angles(strike_array[key], fold=fold)
+
+    return strike_array
+
+def match_periods(period, period_list, period_tolerance=.05):
+    """
+    find which periods in period_list each period matches within a
+    tolerance, period_list has to be sorted.
+
+    Arguments
+    -------------
+        **period** : np.ndarray(num_periods)
+                     periods to match
+
+        **period_list** : np.ndarray(num_list)
+                          sorted periods to match onto
+
+        **period_tolerance** : float
+                               a period matches if it is within
+                               period*(1 +/- period_tolerance)
+
+    Returns
+    ------------
+        **index** : np.ndarray of indices into period
+
+        **list_index** : np.ndarray of indices into period_list,
+                         period[index] matches period_list[list_index]
+    """
+
+    period = np.asarray(period, dtype=np.float)
+    period_list = np.asarray(period_list, dtype=np.float)
+
+    # matching periods are in a continuous range of period_list, look
+    # a little wider and check the exact criteria on the candidates
+    p_min = np.searchsorted(period_list,
+                            period/(1+period_tolerance)*(1-1e-12),
+                            side='left')
+    p_max = np.searchsorted(period_list,
+                            period/(1-period_tolerance)*(1+1e-12),
+                            side='right')
+    n_max = max(int((p_max-p_min).max()) if period.size > 0 else 0, 0)
+
+    candidates = p_min[:, np.newaxis]+np.arange(n_max)[np.newaxis, :]
+    valid = candidates < p_max[:, np.newaxis]
+    candidates = np.clip(candidates, 0, max(period_list.size-1, 0))
+    p_cand = period_list[candidates]
+    valid &= (period[:, np.newaxis] > p_cand*(1-period_tolerance)) & \
+             (period[:, np.newaxis] < p_cand*(1+period_tolerance))
+    index, n_index = np.nonzero(valid)
+
+    return index, candidates[index, n_index]
+
+
+class StrikeStatistics(object):
+    """
+    Strike angles from the invariants, phase tensor and tipper for a whole
+    survey on a common period list, with histograms and statistics for
+    period bands.
+
+    Input either a list of mt objects, which can have different periods, or
+    arrays of all stations that have the same periods.  For a list of mt
+    objects the common period list is logarithmically spaced between the
+    shortest and longest period, with as many periods as the station with
+    the most periods and the periods of each station are put onto it within
+    period_tolerance.
+
+    Arguments:
+    ----------
+        **mt_list** : list of mtpy.imaging.mtplottools.MTplot objects
+
+        **z_array** : np.ndarray(num_stations, num_periods, 2, 2)
+                      impedance tensors of all stations
+
+        **z_err_array** : np.ndarray(num_stations, num_periods, 2, 2)
+                          errors of the impedance tensors
+
+        **tipper_array** : np.ndarray(num_stations, num_periods, 1, 2)
+                           tipper of all stations
+
+        **period** : np.ndarray(num_periods)
+                     periods of z_array in s
+
+        **station_list** : list of station names for z_array
+
+        **fold** : [ True | False ]
+                   * True to fold angles into the range (-90, 90]
+                   * False to put angles into the range [0, 360)
+                   *default* is True
+
+        **pt_error_floor** : float
+                             maximum error in degrees of the phase tensor
+                             azimuth to use. *default* is None
+
+        **period_tolerance** : float
+                               tolerance to match periods of different
+                               stations. *default* is 0.05
+
+        **skew_threshold** : float
+                             if given only use periods where the data are
+                             2D, threshold on beta in degrees.
+                             *default* is None
+
+    ======================= ===================================================
+    Attributes              Description
+    ======================= ===================================================
+    fold                    fold angles into (-90, 90] or [0, 360)
+    period                  np.ndarray(num_periods) common period list (s)
+    period_range            (min, max) period of the data (s)
+    period_tolerance        tolerance to match periods
+    pt_error_floor          maximum phase tensor azimuth error (deg)
+    skew_threshold          threshold on beta to find the 2D parts
+    station_list            list of station names
+    strike_array            np.ndarray(num_periods, num_stations) structured
+                            array with keys 'inv', 'pt', 'tip' of angles
+                            measured counter clockwise from East, nan where
+                            there is no estimate
+    ======================= ===================================================
+
+    ======================= ===================================================
+    Methods                 Description
+    ======================= ===================================================
+    compute_strike          compute the strike angles for all stations
+    get_band_index          boolean array of periods in each period band
+    get_decade_list         period bands for each decade of the data
+    get_histograms          histograms of the angles in each period band
+    get_statistics          mean, median and mode strike of each band
+    write_strike_table      write the strike angles of each station and
+                            period to a csv file
+    ======================= ===================================================
+
+    :Example: ::
+
+        >>> import mtpy.analysis.strike as MTstrike
+        >>> import mtpy.modeling.modem_new as modem
+        >>> m_data = modem.Data()
+        >>> m_data.read_data_file(r"/home/ModEM/Inv1/ModEM_Data.dat")
+        >>> strike_obj = MTstrike.StrikeStatistics(
+        >>> ...                z_array=m_data.data_array['z'],
+        >>> ...                tipper_array=m_data.data_array['tip'],
+        >>> ...                period=m_data.period_list,
+        >>> ...                station_list=m_data.data_array['station'])
+        >>> bin_edges, hist_dict = strike_obj.get_histograms([(1, 10)])
+    """
+
+    def __init__(self, mt_list=None, z_array=None, z_err_array=None,
+                 tipper_array=None, period=None, station_list=None, **kwargs):
+
+        self.fold = kwargs.pop('fold', True)
+        self.pt_error_floor = kwargs.pop('pt_error_floor', None)
+        self.period_tolerance = kwargs.pop('period_tolerance', .05)
+        self.skew_threshold = kwargs.pop('skew_threshold', None)
+
+        self.period = None
+        self.period_range = None
+        self.station_list = None
+        self.strike_array = None
+
+        if mt_list is not None or z_array is not None:
+            self.compute_strike(mt_list=mt_list, z_array=z_array,
+                                z_err_array=z_err_array,
+                                tipper_array=tipper_array, period=period,
+                                station_list=station_list)
+
+    def _get_hist_range(self):
+        """
+        range of the histograms
+        """
+        if self.fold == True:
+            return (-180, 180)
+        else:
+            return (0, 360)
+
+    hist_range = property(_get_hist_range, doc="range of the histograms")
+
+    def compute_strike(self, mt_list=None, z_array=None, z_err_array=None,
+                       tipper_array=None, period=None, station_list=None):
+        """
+        compute the strike angles for all stations and put them onto the
+        common period list, see StrikeStatistics for the arguments.
+        """
+
+        if mt_list is not None:
+            self._compute_strike_mt_list(mt_list)
+            return
+
+        if z_array is None or period is None:
+            raise MTex.MTpyError_inputarguments('Need to input mt_list or '+
+                                                'z_array and period')
+
+        z_array = np.asarray(z_array)
+        period = np.asarray(period, dtype=np.float)
+        if z_array.ndim != 4 or z_array.shape[1] != period.shape[0]:
+            raise MTex.MTpyError_inputarguments('z_array needs the shape '+
+                                                '(num_stations, num_periods,'+
+                                                ' 2, 2)')
+
+        if station_list is None:
+            station_list = ['{0:03}'.format(ii)
+                            for ii in range(z_array.shape[0])]
+        self.station_list = list(station_list)
+
+        s_array = get_strike_angles(z_array, z_err_array=z_err_array,
+                                    tipper_array=tipper_array,
+                                    fold=self.fold,
+                                    pt_error_floor=self.pt_error_floor,
+                                    skew_threshold=self.skew_threshold)
+
+        self.period = period.copy()
+        self.period_range = (period.min(), period.max())
+        self.strike_array = np.zeros((period.shape[0], z_array.shape[0]),
+                                     dtype=[(key, np.float)
+                                            for key in estimator_list])
+        for key in estimator_list:
+            self.strike_array[key] = s_array[key].T
+
+    def _compute_strike_mt_list(self, mt_list):
+        """
+        stack the stations into arrays padded with nan, compute the strike
+        in one go and put each station onto the common period list
+        """
+
+        n_stations = len(mt_list)
+        n_periods = max([len(mt.period) for mt in mt_list])
+
+        z_array = np.zeros((n_stations, n_periods, 2, 2), dtype='complex')
+        z_array[:] = np.nan
+        z_err_array = np.zeros((n_stations, n_periods, 2, 2))
+        tipper_array = np.zeros((n_stations, n_periods, 1, 2),
+                                dtype='complex')
+        period_array = np.zeros((n_stations, n_periods))
+        period_array[:] = np.nan
+
+        for ii, mt in enumerate(mt_list):
+            nf = len(mt.period)
+            period_array[ii, :nf] = mt.period
+            z_array[ii, :nf] = mt._Z.z
+            if mt._Z.zerr is not None:
+                z_err_array[ii, :nf] = mt._Z.zerr
+            if mt._Tipper.tipper is not None:
+                tipper_array[ii, :nf] = mt._Tipper.tipper
+
+        s_array = get_strike_angles(z_array, z_err_array=z_err_array,
+                                    tipper_array=tipper_array,
+                                    fold=self.fold,
+                                    pt_error_floor=self.pt_error_floor,
+                                    skew_threshold=self.skew_threshold)
+
+        # only the 2D periods set the period range
+        if self.skew_threshold is not None:
+            has_data = MTnb.get_dimensionality_strike(z_array,
+                                beta_threshold=self.skew_threshold)[0] == 2
+        else:
+            has_data = np.isfinite(period_array)
+        if not has_data.any():
+            raise MTex.MTpyError_inputarguments('No periods to estimate '+
+                                                'strike from')
+        min_period = period_array[has_data].min()
+        max_period = period_array[has_data].max()
+
+        #make a list of periods from the longest period list
+        self.period = np.logspace(np.log10(min_period), np.log10(max_period),
+                                  num=n_periods, base=10)
+        self.period_range = (min_period, max_period)
+        self.station_list = [mt.station for mt in mt_list]
+
+        self.strike_array = np.zeros((n_periods, n_stations),
+                                     dtype=[(key, np.float)
+                                            for key in estimator_list])
+        self.strike_array[:] = np.nan
+
+        station_index, period_index = np.nonzero(has_data)
+        index, list_index = match_periods(
+                                period_array[station_index, period_index],
+                                self.period,
+                                period_tolerance=self.period_tolerance)
+        for key in estimator_list:
+            self.strike_array[key][list_index, station_index[index]] = \
+                      s_array[key][station_index[index], period_index[index]]
+
+    def get_decade_list(self, period_range='data'):
+        """
+        get period bands of one decade that cover the data
+
+        Arguments
+        -------------
+            **period_range** : [ 'data' | (log10(period_min),
+                                          log10(period_max)) ]
+                               range of the decades, *default* is 'data'
+
+        Returns
+        ------------
+            **decade_list** : np.ndarray of the log10 of the start of each
+                              decade
+        """
+
+        if period_range == 'data':
+            return np.arange(np.floor(np.log10(self.period_range[0])),
+                             np.ceil(np.log10(self.period_range[1])), 1)
+        else:
+            return np.arange(np.floor(period_range[0]),
+                             np.ceil(period_range[1]), 1)
+
+    def get_band_index(self, band_list):
+        """
+        find which periods of the common period list are inside each band
+
+        Arguments
+        -------------
+            **band_list** : list of (period_min, period_max) in s, periods
+                            have to be strictly inside the band
+
+        Returns
+        ------------
+            **band_index** : np.ndarray(num_bands, num_periods) of bool
+        """
+
+        band_list = np.asarray(band_list, dtype=np.float).reshape(-1, 2)
+
+        return (self.period[np.newaxis, :] > band_list[:, 0:1]) & \
+               (self.period[np.newaxis, :] < band_list[:, 1:2])
+
+    def get_histograms(self, band_list, bin_width=5):
+        """
+        histograms of the strike angles of all stations in each period band
+
+        Arguments
+        -------------
+            **band_list** : list of (period_min, period_max) in s
+
+            **bin_width** : width of the bins in degrees. *default* is 5
+
+        Returns
+        ------------
+            **bin_edges** : np.ndarray(num_bins+1) edges of the bins in
+                            degrees, measured counter clockwise from East
+
+            **hist_dict** : dictionary with keys 'inv', 'pt', 'tip' of
+                            np.ndarray(num_bands, num_bins) counts in each
+                            bin
+        """
+
+        n_bins = int(360./bin_width)
+        h_min, h_max = self.hist_range
+        bin_edges = np.linspace(h_min, h_max, n_bins+1)
+
+        band_index = self.get_band_index(band_list).astype(np.int)
+        n_periods = self.period.shape[0]
+
+        hist_dict = {}
+        for key in estimator_list:
+            angles = self.strike_array[key]
+            with np.errstate(invalid='ignore'):
+                good = (angles >= h_min) & (angles <= h_max)
+
+            # the last bin includes its right edge like np.histogram
+            bin_index = np.searchsorted(bin_edges, angles[good],
+                                        side='right')-1
+            bin_index[bin_index == n_bins] = n_bins-1
+            period_index = np.nonzero(good)[0]
+
+            # count each period then add up the periods in each band
+            period_counts = np.bincount(period_index*n_bins+bin_index,
+                                        minlength=n_periods*n_bins)
+            period_counts = period_counts.reshape(n_periods, n_bins)
+            hist_dict[key] = np.dot(band_index, period_counts)
+
+        return bin_edges, hist_dict
+
+    def get_statistics(self, band_list, bin_width=5):
+        """
+        mean, median and mode of the strike angle of all stations in each
+        period band.
+
+        Arguments
+        -------------
+            **band_list** : list of (period_min, period_max) in s
+
+            **bin_width** : width of the bins for the mode in degrees.
+                            *default* is 5
+
+        Returns
+        ------------
+            **stat_array** : np.ndarray(num_bands) structured array with keys
+                             'period_min', 'period_max' and '<key>_mean',
+                             '<key>_median', '<key>_mode', '<key>_count'
+                             for key in 'inv', 'pt' and 'tip'.  Angles are
+                             strike angles, 0 is North and positive
+                             clockwise, nan if there is no estimate.
+        """
+
+        band_list = np.asarray(band_list, dtype=np.float).reshape(-1, 2)
+        band_index = self.get_band_index(band_list)
+        bin_edges, hist_dict = self.get_histograms(band_list,
+                                                   bin_width=bin_width)
+
+        dtype = [('period_min', np.float), ('period_max', np.float)]
+        for key in estimator_list:
+            dtype += [('{0}_{1}'.format(key, stat), np.float)
+                      for stat in ['mean', 'median', 'mode']]
+            dtype += [('{0}_count'.format(key), np.int)]
+        stat_array = np.zeros(band_list.shape[0], dtype=dtype)
+        stat_array['period_min'] = band_list[:, 0]
+        stat_array['period_max'] = band_list[:, 1]
+
+        for key in estimator_list:
+            # bands are the rows, nan where there is no estimate
+            angles = np.where(band_index[:, :, np.newaxis],
+                              self.strike_array[key][np.newaxis, :, :],
+                              np.nan)
+            angles = angles.reshape(band_list.shape[0], -1)
+            count = np.isfinite(angles).sum(axis=1)
+            with np.errstate(invalid='ignore'), warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                a_mean = np.nanmean(angles, axis=1)
+                a_median = np.nanmedian(angles, axis=1)
+            a_mode = bin_edges[np.argmax(hist_dict[key], axis=1)]
+            a_mode = np.where(count > 0, a_mode, np.nan)
+
+            #need to subtract from 90 to put 0 North and measure clockwise
+            stat_array['{0}_mean'.format(key)] = _to_strike(a_mean)
+            stat_array['{0}_median'.format(key)] = _to_strike(a_median)
+            stat_array['{0}_mode'.format(key)] = _to_strike(a_mode)
+            stat_array['{0}_count'.format(key)] = count
+
+        return stat_array
+
+    def write_strike_table(self, csv_fn, estimator_list=estimator_list):
+        """
+        write the strike angles of each station and period to a comma
+        separated file.  Angles are strike angles, 0 is North and positive
+        clockwise, empty where there is no estimate.
+
+        Arguments
+        -------------
+            **csv_fn** : full path to file to write to
+
+            **estimator_list** : list of keys to write, *default* is
+                                 ['inv', 'pt', 'tip']
+
+        Returns
+        ------------
+            **csv_fn** : full path to file
+        """
+
+        n_periods, n_stations = self.strike_array.shape
+        station_array = np.repeat(np.array(self.station_list, dtype=np.str),
+                                  n_periods)
+        period_array = np.tile(self.period, n_stations)
+
+        column_list = [np.char.mod('%.6e', period_array)]
+        for key in estimator_list:
+            values = _to_strike(self.strike_array[key].T.ravel())
+            column = np.char.mod('%.2f', values)
+            column[~np.isfinite(values)] = ''
+            column_list.append(column)
+
+        lines = ['station,period,'+','.join(estimator_list)]
+        lines += [','.join(row) for row in
+                  zip(station_array, *column_list)]
+
+        with open(csv_fn, 'w') as fid:
+            fid.write('\n'.join(lines)+'\n')
+
+        print 'Wrote strike table to {0}'.format(csv_fn)
+        return csv_fn
+
+#==============================================================================
+def _to_strike(angles):
+    """
+    angles measured counter clockwise from East to strike angles measured
+    clockwise from North in the range [0, 360)
+    """
+
+    strike = 90-np.asarray(angles, dtype=np.float)
+    with np.errstate(invalid='ignore'):
+        strike[strike < 0] += 360
+    return strike
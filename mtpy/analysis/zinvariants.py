@@ -10,6 +10,93 @@ Interpreted from matlab code written by Stephan Thiel 2005
 import numpy as np
 import mtpy.core.z as mtz
 
+#==============================================================================
+# names of the invariants in the order of Weaver et al. [2000], q is the 
+# dependent invariant
+invariant_names = ['inv1', 'inv2', 'inv3', 'inv4', 'inv5', 'inv6', 'inv7',
+                   'q', 'strike', 'strike_err']
+
+#==============================================================================
+def compute_invariants(z_array):
+    """
+    Computes the invariants of Weaver et al., [2000, 2003] for all impedance
+    tensors in z_array at once.
+    
+    Arguments:
+    ----------
+        **z_array** : complex np.array(..., 2, 2)
+                      impedance tensors, can be (nf, 2, 2) for one station
+                      or (ns, nf, 2, 2) for a survey
+                      
+    Returns:
+    --------
+        **inv_array** : np.ndarray(z_array.shape[:-2]) structured array with
+                        fields inv1, ..., inv7, q, strike and strike_err, see
+                        Zinvariants for a description.  Tensors where the
+                        invariants can not be computed (the real and imaginary
+                        parts are not independent, or z is nan) are nan.
+                        
+    :Example: ::
+    
+        >>> import mtpy.analysis.zinvariants as zinv
+        >>> z_arr = np.array([mt_obj.Z.z for mt_obj in mt_list])
+        >>> inv_array = zinv.compute_invariants(z_arr)
+        >>> inv_array['strike'].shape
+        (n_stations, n_frequencies)
+    """
+    
+    z_array = np.asarray(z_array)
+    zr = z_array.real
+    zi = z_array.imag
+    
+    #compute the mathematical invariants
+    x1 = .5 * (zr[..., 0, 0] + zr[..., 1, 1]) #trace
+    x2 = .5 * (zr[..., 0, 1] + zr[..., 1, 0])
+    x3 = .5 * (zr[..., 0, 0] - zr[..., 1, 1])
+    x4 = .5 * (zr[..., 0, 1] - zr[..., 1, 0]) #berd
+    e1 = .5 * (zi[..., 0, 0] + zi[..., 1, 1]) #trace
+    e2 = .5 * (zi[..., 0, 1] + zi[..., 1, 0])
+    e3 = .5 * (zi[..., 0, 0] - zi[..., 1, 1])
+    e4 = .5 * (zi[..., 0, 1] - zi[..., 1, 0]) #berd
+    ex = x1 * e1 - x2 * e2 - x3 * e3 + x4 * e4
+    
+    inv_array = np.zeros(ex.shape, dtype=[(key, np.float) 
+                                          for key in invariant_names])
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d12 = (x1*e2-x2*e1)/ex
+        d34 = (x3*e4-x4*e3)/ex
+        d13 = (x1*e3-x3*e1)/ex
+        d24 = (x2*e4-x4*e2)/ex
+        d41 = (x4*e1-x1*e4)/ex
+        d23 = (x2*e3-x3*e2)/ex
+        
+        inv1 = np.sqrt(x4**2 + x1**2)
+        inv2 = np.sqrt(e4**2 + e1**2)
+        inv_array['inv1'] = inv1
+        inv_array['inv2'] = inv2
+        inv_array['inv3'] = np.sqrt(x2**2 + x3**2)/inv1
+        inv_array['inv4'] = np.sqrt(e2**2 + e3**2)/inv2
+        
+        s41 = (x4*e1+x1*e4)/ex
+        
+        inv_array['inv5'] = s41*ex/(inv1*inv2)
+        inv_array['inv6'] = d41*ex/(inv1*inv2)
+        
+        q = np.sqrt((d12-d34)**2 + (d13+d24)**2)
+        inv7 = (d41-d23)/q
+        inv_array['q'] = q
+        inv_array['inv7'] = inv7
+        
+        inv_array['strike'] = .5*np.arctan2(d12-d34, d13+d24)*(180/np.pi)
+        inv_array['strike_err'] = abs(.5*np.arcsin(inv7))*(180/np.pi)
+    
+    # mask the tensors that could not be computed
+    inv_array[ex == 0.0] = tuple([np.nan]*len(invariant_names))
+    
+    return inv_array
+    
+
 class Zinvariants:
     """
     calculates invariants from Weaver et al. [2000, 2003].  At the moment it 
@@ -87,7 +174,7 @@ class Zinvariants:
         
         #--> read in z_object
         if z_object is not None:
-            if z_object.freq==None:
+            if z_object.freq is None:
                 raise AttributeError('z_object needs to have attrtibute'+\
                                      'freq filled')
             
@@ -106,11 +193,13 @@ class Zinvariants:
             
             self._Z.freq = freq
             
-        #--> rotate data if desired
-        self.rotate(rot_z)
-        
-        # compute the invariants
-        self.compute_invariants()
+        #--> rotate data if desired, this computes the invariants.  Rotating
+        # by 0 does not change z, so skip the per frequency rotation
+        if rot_z != 0:
+            self.rotate(rot_z)
+        else:
+            self.rot_z = rot_z
+            self.compute_invariants()
 
     def compute_invariants(self):
         """
@@ -147,83 +236,21 @@ class Zinvariants:
         nz = self._Z.z.shape[0]
         
         # set some empty arrays to put stuff into
-        self.inv1 = np.zeros(nz)
-        self.inv2 = np.zeros(nz)
-        self.inv3 = np.zeros(nz)
-        self.inv4 = np.zeros(nz)
-        self.inv5 = np.zeros(nz)
-        self.inv6 = np.zeros(nz)
-        self.inv7 = np.zeros(nz)
-        self.q = np.zeros(nz)
-        self.strike = np.zeros(nz)
-        self.strike_err = np.zeros(nz)
+        for key in invariant_names:
+            setattr(self, key, np.zeros(nz))
         
         c_tf = self._Z.z.all() == 0.0
         if c_tf == True:
             return
-        # loop over each freq
-        for ii in range(nz):
-            #compute the mathematical invariants
-            x1 = .5 * (self._Z.z[ii,0,0].real + self._Z.z[ii,1,1].real) #trace
-            x2 = .5 * (self._Z.z[ii,0,1].real + self._Z.z[ii,1,0].real)
-            x3 = .5 * (self._Z.z[ii,0,0].real - self._Z.z[ii,1,1].real)
-            x4 = .5 * (self._Z.z[ii,0,1].real - self._Z.z[ii,1,0].real) #berd
-            e1 = .5 * (self._Z.z[ii,0,0].imag + self._Z.z[ii,1,1].imag) #trace
-            e2 = .5 * (self._Z.z[ii,0,1].imag + self._Z.z[ii,1,0].imag)
-            e3 = .5 * (self._Z.z[ii,0,0].imag - self._Z.z[ii,1,1].imag)
-            e4 = .5 * (self._Z.z[ii,0,1].imag - self._Z.z[ii,1,0].imag) #berd
-            ex = x1 * e1 - x2 * e2 - x3 * e3 + x4 * e4
             
-            if ex == 0.0:
-                print 'Could not compute invariants for {0:5e} Hz'.format(
-                       self._Z.freq[ii])
-                self.inv1[ii] = np.nan
-                self.inv2[ii] = np.nan
-                self.inv3[ii] = np.nan
-                self.inv4[ii] = np.nan
-                self.inv5[ii] = np.nan
-                self.inv6[ii] = np.nan
-                self.inv7[ii] = np.nan
-                self.q[ii] = np.nan
-                self.strike[ii] = np.nan
-                self.strike_err[ii] = np.nan
-            else:
-                    
-                d12 = (x1*e2-x2*e1)/ex
-                d34 = (x3*e4-x4*e3)/ex
-                d13 = (x1*e3-x3*e1)/ex
-                d24 = (x2*e4-x4*e2)/ex
-                d41 = (x4*e1-x1*e4)/ex
-                d23 = (x2*e3-x3*e2)/ex
-                
-                inv1 = np.sqrt(x4**2 + x1**2)
-                inv2 = np.sqrt(e4**2 + e1**2)
-                inv3 = np.sqrt(x2**2 + x3**2)/inv1
-                inv4 = np.sqrt(e2**2 + e3**2)/inv2
-                
-                s41 = (x4*e1+x1*e4)/ex
-                
-                inv5 = s41*ex/(inv1*inv2)
-                inv6 = d41*ex/(inv1*inv2)
-                
-                q = np.sqrt((d12-d34)**2 + (d13+d24)**2)
-                
-                inv7 = (d41-d23)/q
-                
-                strikeang = .5*np.arctan2(d12-d34,d13+d24)*(180/np.pi)
-                strikeangerr = abs(.5*np.arcsin(inv7))*(180/np.pi)
-                
-                self.inv1[ii] = inv1
-                self.inv2[ii] = inv2
-                self.inv3[ii] = inv3
-                self.inv4[ii] = inv4
-                self.inv5[ii] = inv5
-                self.inv6[ii] = inv6
-                self.inv7[ii] = inv7
-                self.q[ii] = q
-                self.strike[ii] = strikeang
-                self.strike_err[ii] = strikeangerr
+        inv_array = compute_invariants(self._Z.z)
+        for key in invariant_names:
+            setattr(self, key, inv_array[key])
             
+        nan_find = np.isnan(inv_array['inv1'])
+        if nan_find.any():
+            print 'Could not compute invariants for {0} of {1} frequencies'.format(
+                   nan_find.sum(), nz)
             
     def rotate(self, rot_z):
         """
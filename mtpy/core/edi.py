@@ -17,7 +17,9 @@ Functions
     - combine_edifiles
     - validate_edifile
     - rotate_edifile
+    - format_value_block
     - _generate_edifile_string
+    - _write_edifile_sections
     - _cut_sectionstring
     - _validate_edifile_string 
 
@@ -32,6 +34,7 @@ import os,sys
 import os.path as op
 import time, calendar, datetime
 import copy
+from cStringIO import StringIO
 #required for finding HMEAS and EMEAS at once:
 import re
 
@@ -41,12 +44,7 @@ import mtpy.utils.calculator as MTcc
 import mtpy.utils.exceptions as MTex
 import mtpy.utils.filehandling as MTfh
 import mtpy.core.z as MTz
-
-#for interactive debugging:
-reload(MTex)
-reload(MTft)
-reload(MTcc)
-reload(MTz)
+import mtpy.utils.timing as timing
 
 # try:
 #     import ipdb
@@ -147,6 +145,7 @@ class Edi(object):
         if filename is not None:
             self.readfile(self.filename, datatype = datatype)
 
+    @timing.timed('edi.readfile')
     def readfile(self, fn, datatype = 'z'):
         """
         Read in an EDI file.
@@ -188,6 +187,7 @@ class Edi(object):
 
         with open(infile,'r') as F:
             edistring = F.read()
+        timing.add_read(len(edistring))
 
         #validate edi file string following MTpy standard
         if not _validate_edifile_string(edistring):
@@ -332,7 +332,7 @@ class Edi(object):
         """
         Set freq by a list of periods (values in seconds).
         """
-        if len(period_lst) is not len(self.Z.z):
+        if len(period_lst) != len(self.Z.z):
             print 'length of periods list not correct'+\
                   '({0} instead of {1})'.format(len(period_lst), 
                                                 len(self.Z.z))
@@ -1198,6 +1198,7 @@ class Edi(object):
 
 
     #--------------Write out file---------------------------------------------
+    @timing.timed('edi.writefile')
     def writefile(self, fn=None, allow_overwrite=False, use_info_string=False):
         """
             Write out the edi object into an EDI file.
@@ -1259,6 +1260,7 @@ class Edi(object):
         try:
             with open(outfilename , 'w') as F:
                 F.write(outstring)
+            timing.add_written(len(outstring))
         except:
             raise MTex.MTpyError_edi_file('Cannot write EDI file:'+\
                                           '{0}'.format(outfilename))
@@ -1565,9 +1567,9 @@ class Edi(object):
                                           'literal(s)')
 
         if np.iterable(angle):
-            if len(angle) is not len(self.Z.z):
+            if len(angle) != len(self.Z.z):
                 print 'length of angle list not correct'+\
-                      '({0} instead of {1})'.format(len(angle), len(self.z))
+                      '({0} instead of {1})'.format(len(angle), len(self.Z.z))
                 return
             try:
                 angle = [float(i%360) for i in angle]
@@ -1665,6 +1667,9 @@ def combine_edifiles(fn1, fn2,  merge_freq=None, out_fn = None,
     Outputs:
     - instance of Edi class, containing merged information
     - full path of the output EDI file
+
+    To merge more than two files, or the files of many stations at once,
+    see mtpy.core.edimerge.
     """
 
     #edi objects:
@@ -2174,6 +2179,71 @@ def _generate_edifile_string(edidict,use_info_string=False):
     sections:
     HEAD, INFO, DEFINEMEAS, HMEAS_EMEAS, MTSECT, ZROT, FREQ, Z, TIPPER
 
+    The sections are streamed into a buffer by _write_edifile_sections, 
+    use that function directly to write into an open file.
+
+    """
+
+    edibuffer = StringIO()
+    stationname = _write_edifile_sections(edidict, edibuffer, 
+                                          use_info_string=use_info_string)
+    edistring = edibuffer.getvalue()
+    edibuffer.close()
+
+    return edistring, stationname
+
+
+def format_value_block(values, n_columns=5):
+    """
+    Format a list of numbers into the block layout of EDI data sections.
+
+    Each value is written as '%E' preceded by a tab, n_columns values per 
+    line, tabs are expanded to 4 spaces.  The last line has no newline. 
+    The whole block is formatted with one format operation instead of 
+    value by value.
+
+    Input:
+    - list/array of values
+
+    optional input:
+    - number of values per line (default 5)
+
+    Output:
+    - string
+    """
+
+    values = np.asarray(values, dtype='float').ravel()
+    n_rows, n_rest = divmod(values.shape[0], n_columns)
+
+    lo_formats = ['\t%E'*n_columns]*n_rows
+    if n_rest > 0:
+        lo_formats.append('\t%E'*n_rest)
+
+    return ('\n'.join(lo_formats)%tuple(values.tolist())).expandtabs(4)
+
+
+def _write_edifile_sections(edidict, fid, use_info_string=False):
+    """
+    Write the sections of an edi file dictionary into an open file or buffer.
+
+    Using the standard sections:
+    HEAD, INFO, DEFINEMEAS, HMEAS_EMEAS, MTSECT, ZROT, FREQ, Z, TIPPER
+
+    Every section is assembled on its own and written to fid as soon as it 
+    is complete, numeric sections are formatted as blocks (see 
+    format_value_block).  The output is the same as the former 
+    string concatenation.
+
+    Input:
+    - edi file dictionary (see Edi.edi_dict)
+    - object with a write method (open file, StringIO)
+
+    optional input:
+    - write the info_string verbatim (default False)
+
+    Output:
+    - station name (None if not found)
+
     Can be extended later on...
 
     """
@@ -2182,7 +2252,6 @@ def _generate_edifile_string(edidict,use_info_string=False):
     lo_sectionheads = ['HEAD', 'INFO', 'DEFINEMEAS', 'HMEAS_EMEAS', 'MTSECT',
                        'ZROT', 'FREQ', 'Z', 'TIPPER']
 
-    edistring = ''
     stationname = None
     ZROTflag = 0
 
@@ -2192,14 +2261,15 @@ def _generate_edifile_string(edidict,use_info_string=False):
 
 
     for sectionhead in lo_sectionheads:
+        #list of strings making up the current section
+        section = []
 
         if sectionhead == 'HEAD':
             if not sectionhead in edidict:
                 raise MTex.MTpyError_edi_file('Cannot write file - required'+\
                                               'section "HEAD" missing!')
-            edistring += '>HEAD\n'
+            section.append('>HEAD\n')
             head_dict = edidict['HEAD']
-            checkdate = 0
 
             for k in  sorted(head_dict.iterkeys()):
                 v = str(head_dict[k])
@@ -2213,27 +2283,27 @@ def _generate_edifile_string(edidict,use_info_string=False):
 
                 if k.lower() in  ['lat','long']:
                     v = MTft.convert_degrees2dms_tuple(v)
-                    edistring += '\t{0}={1}:{2}:{3:.2f}\n'.format(k.upper(),
-                                                        int(v[0]),int(v[1]),v[2])
+                    section.append('\t{0}={1}:{2}:{3:.2f}\n'.format(k.upper(),
+                                                    int(v[0]),int(v[1]),v[2]))
                     continue 
 
                 if len(v) == 0:
-                    edistring += '\t%s=""\n'%(k.upper())
+                    section.append('\t%s=""\n'%(k.upper()))
                 elif len(v.split()) > 1:
-                    edistring += '\t%s="%s"\n'%(k.upper(),v)
+                    section.append('\t%s="%s"\n'%(k.upper(),v))
                 else:
                     try:
                         v = v.upper()
                     except:
                         pass
-                    edistring += '\t%s=%s\n'%(k.upper(),v)
+                    section.append('\t%s=%s\n'%(k.upper(),v))
 
             #update time stamp of the file:
             todaystring = datetime.datetime.utcnow().strftime(
                                                     '%Y/%m/%d %H:%M:%S UTC')
                         
             todaystring = '\tfiledate="%s"\n'%(todaystring)
-            edistring += todaystring.upper()
+            section.append(todaystring.upper())
  
 
         if sectionhead == 'INFO':
@@ -2243,25 +2313,19 @@ def _generate_edifile_string(edidict,use_info_string=False):
             info_dict = edidict['INFO']
             info_dict = dict((k.lower(),v) for k,v in info_dict.items())
 
-            # if 'max lines' in info_dict:
-            #     edistring += '>INFO  MAX LINES={0}\n'.format(
-            #                             int(float(info_dict.pop('max lines'))))
-            # else:
-            edistring += '>INFO \n'
+            section.append('>INFO \n')
 
             #If an existing info string is to be written verbatim
             #to not lose any original information (even if uunnecessary/wrong):
             if use_info_string is True:
                 try:                
-                    edistring += edidict['info_string']
+                    section.append(edidict['info_string'])
                 except:
                     pass
-                edistring += '\n'
+                section.append('\n')
             #otherwise use the standard way of writing dict contents:
             else:
                 for k in sorted(info_dict.iterkeys()):
-                    # if k.startswith('__'):
-                    #     continue
                     v = str(info_dict[k])
                     #get station name (to be returned aside with the edistring, 
                     #                  allowing for proper naming of output file)
@@ -2272,9 +2336,9 @@ def _generate_edifile_string(edidict,use_info_string=False):
                         continue
 
                     if len(v) == 0 or len(v.split()) > 1:
-                        edistring += '\t%s: "%s"\n'%(k,v)
+                        section.append('\t%s: "%s"\n'%(k,v))
                     else:
-                        edistring += '\t%s: %s\n'%(k,v)
+                        section.append('\t%s: %s\n'%(k,v))
 
 
 
@@ -2285,35 +2349,41 @@ def _generate_edifile_string(edidict,use_info_string=False):
             defm_dict = edidict['DEFINEMEAS']
             defm_dict = dict((k.upper(),v) for k,v in defm_dict.items())
 
-            edistring += '>=DEFINEMEAS \n'
+            section.append('>=DEFINEMEAS \n')
 
             for k in sorted(defm_dict.iterkeys()):
                 v = str(defm_dict[k])
                 if k == 'REFLAT':
                     v = MTft.convert_degrees2dms_tuple(edidict['HEAD']['lat'])
-                    edistring += '\tREFLAT={0}:{1}:{2:.2f}\n'.format(int(v[0]),int(v[1]),v[2])
+                    section.append('\tREFLAT={0}:{1}:{2:.2f}\n'.format(
+                                                    int(v[0]),int(v[1]),v[2]))
                     continue
                 if k == 'REFLONG':
                     v = MTft.convert_degrees2dms_tuple(edidict['HEAD']['long'])
-                    edistring += '\tREFLONG={0}:{1}:{2:.2f}\n'.format(int(v[0]),int(v[1]),v[2])
+                    section.append('\tREFLONG={0}:{1}:{2:.2f}\n'.format(
+                                                    int(v[0]),int(v[1]),v[2]))
                     continue
                 if k == 'REFELEV':
-                    edistring += '\tREFELEV={0:.1f}\n'.format(float(edidict['HEAD']['elev']))
+                    section.append('\tREFELEV={0:.1f}\n'.format(
+                                            float(edidict['HEAD']['elev'])))
                     continue
 
                 if len(v) == 0  or len(v.split()) > 1:
-                    edistring += '\t%s=""\n'%(k)
+                    section.append('\t%s=""\n'%(k))
                 else:
-                    edistring += '\t%s=%s\n'%(k,v)
+                    section.append('\t%s=%s\n'%(k,v))
             
-            if 'REFLAT' not in sorted(defm_dict.iterkeys()):
+            if 'REFLAT' not in defm_dict:
                 v = MTft.convert_degrees2dms_tuple(edidict['HEAD']['lat'])
-                edistring += '\tREFLAT={0}:{1}:{2:.2f}\n'.format(int(v[0]),int(v[1]),v[2])
-            if 'REFLONG' not in sorted(defm_dict.iterkeys()):
+                section.append('\tREFLAT={0}:{1}:{2:.2f}\n'.format(int(v[0]),
+                                                              int(v[1]),v[2]))
+            if 'REFLONG' not in defm_dict:
                 v = MTft.convert_degrees2dms_tuple(edidict['HEAD']['long'])
-                edistring += '\tREFLONG={0}:{1}:{2:.2f}\n'.format(int(v[0]),int(v[1]),v[2])
-            if 'REFELEV' not in sorted(defm_dict.iterkeys()):
-                edistring += '\tREFELEV={0:.1f}\n'.format(edidict['HEAD']['elev'])
+                section.append('\tREFLONG={0}:{1}:{2:.2f}\n'.format(int(v[0]),
+                                                               int(v[1]),v[2]))
+            if 'REFELEV' not in defm_dict:
+                section.append('\tREFELEV={0:.1f}\n'.format(
+                                                    edidict['HEAD']['elev']))
 
 
         if sectionhead == 'HMEAS_EMEAS':
@@ -2323,7 +2393,7 @@ def _generate_edifile_string(edidict,use_info_string=False):
             lo_hemeas = edidict['HMEAS_EMEAS']
 
             for hemeas in lo_hemeas:
-                edistring += ('>'+' '.join(hemeas.split())+'\n').upper()
+                section.append(('>'+' '.join(hemeas.split())+'\n').upper())
 
 
         if sectionhead == 'MTSECT':
@@ -2333,14 +2403,14 @@ def _generate_edifile_string(edidict,use_info_string=False):
             mtsct_dict = edidict['MTSECT']
             mtsct_dict = dict((k.upper(),v) for k,v in mtsct_dict.items())
 
-            edistring += '>=MTSECT \n'
+            section.append('>=MTSECT \n')
 
             for k in sorted(mtsct_dict.iterkeys()):
                 v = str(mtsct_dict[k])
                 if len(v) == 0 or len(v.split()) > 1:
-                    edistring += '\t%s=""\n'%(k)
+                    section.append('\t%s=""\n'%(k))
                 else:
-                    edistring += '\t%s=%s\n'%(k,v)
+                    section.append('\t%s=%s\n'%(k,v))
 
 
         if sectionhead == 'FREQ':
@@ -2349,13 +2419,8 @@ def _generate_edifile_string(edidict,use_info_string=False):
                                               'section "FREQ" missing!')
             lo_freqs = edidict['FREQ']
 
-            #edistring += '>!****FREQUENCIES****!\n'
-            edistring+= '>FREQ // {0}\n'.format(len(lo_freqs))
-
-            for i,freq in enumerate(lo_freqs):
-                edistring += '\t%E'%(freq)
-                if (i+1)%5 == 0 and (i != len(lo_freqs) - 1) and i > 0:
-                    edistring += '\n'
+            section.append('>FREQ // {0}\n'.format(len(lo_freqs)))
+            section.append(format_value_block(lo_freqs))
 
         if sectionhead == 'ZROT':
 
@@ -2364,13 +2429,8 @@ def _generate_edifile_string(edidict,use_info_string=False):
             except:
                 continue
 
-            #edistring += '>!****IMPEDANCE ROTATION ANGLES****!\n'
-            edistring+= '>ZROT // {0}\n'.format(len(lo_rots))
-
-            for i,angle in enumerate(lo_rots):
-                edistring += '\t%E'%(angle)
-                if (i+1)%5 == 0 and (i != len(lo_rots) - 1) and i > 0:
-                    edistring += '\n'
+            section.append('>ZROT // {0}\n'.format(len(lo_rots)))
+            section.append(format_value_block(lo_rots))
 
             ZROTflag = 1
 
@@ -2385,30 +2445,26 @@ def _generate_edifile_string(edidict,use_info_string=False):
                 raise MTex.MTpyError_edi_file('Cannot write file - required'+\
                                               'section "Z" missing!')
 
-            #edistring += '>!****IMPEDANCES****!\n'
             for idx_comp,comp in enumerate(compstrings):
                 for idx_zentry,zentry in enumerate(Z_entries):
-                    section = comp + zentry
-                    if not section in z_dict:
+                    sectionname = comp + zentry
+                    if not sectionname in z_dict:
                         raise MTex.MTpyError_edi_file('Cannot write file - '+\
-                          'required subsection "{0}" missing!'.format(section))
-                    lo_vals = z_dict[section]
+                      'required subsection "{0}" missing!'.format(sectionname))
+                    lo_vals = np.asarray(z_dict[sectionname], dtype='float')
                     #convert stddev into VAR:
                     if zentry.lower()=='.var':
-                        lo_vals = [i**2 for i in lo_vals]
+                        lo_vals = lo_vals**2
 
                     if ZROTflag == 1:
-                        edistring += '>{0} ROT=ZROT // {1}\n'.format(section,
-                                                                 len(lo_freqs))
+                        section.append('>{0} ROT=ZROT // {1}\n'.format(
+                                                 sectionname, len(lo_freqs)))
                     else:
-                        edistring += '>{0} // {1}\n'.format(section,
-                                                            len(lo_freqs))
+                        section.append('>{0} // {1}\n'.format(sectionname,
+                                                              len(lo_freqs)))
 
-                    for i,val in enumerate(lo_vals):
-                        edistring += '\t%E'%(float(val))
-                        if (i+1)%5 == 0 and (i != len(lo_vals) - 1) and i > 0:
-                            edistring += '\n'
-                    edistring += '\n'
+                    section.append(format_value_block(lo_vals))
+                    section.append('\n')
 
 
         if sectionhead == 'TIPPER' and (edidict.has_key('TIPPER')):
@@ -2424,42 +2480,39 @@ def _generate_edifile_string(edidict,use_info_string=False):
             except:
                 continue
 
-            #edistring += '>!****TIPPER PARAMETERS****!\n'
             for idx_comp,comp in enumerate(compstrings):
                 for idx_tentry,tentry in enumerate(T_entries):
-                    section = comp + tentry
+                    sectionname = comp + tentry
                     outsection = comp + Tout_entries[idx_tentry]
-                    if not section in t_dict:
+                    if not sectionname in t_dict:
                         raise MTex.MTpyError_edi_file('Cannot write file -'+\
-                          'required subsection "{0}" missing!'.format(section))
-                    lo_vals = t_dict[section]
+                      'required subsection "{0}" missing!'.format(sectionname))
+                    lo_vals = np.asarray(t_dict[sectionname], dtype='float')
                     #convert stddev into VAR:
                     if tentry.lower()=='var':
-                        lo_vals = [i**2 for i in lo_vals]
+                        lo_vals = lo_vals**2
 
                     if ZROTflag == 1:
-                        edistring += '>{0} ROT=ZROT // {1}\n'.format(outsection,
-                                                                 len(lo_freqs))
+                        section.append('>{0} ROT=ZROT // {1}\n'.format(
+                                                  outsection, len(lo_freqs)))
                     else:
-                        edistring += '>{0} // {1}\n'.format(outsection,
-                                                            len(lo_freqs))
-
-                    for i,val in enumerate(lo_vals):
-                        edistring += '\t%E'%(float(val))
-                        if (i+1)%5 == 0 and (i != len(lo_vals) - 1) and i > 0:
-                            edistring += '\n'
-
-                    edistring += '\n'
+                        section.append('>{0} // {1}\n'.format(outsection,
+                                                              len(lo_freqs)))
 
+                    section.append(format_value_block(lo_vals))
+                    section.append('\n')
 
 
-        edistring += '\n'
+        section.append('\n')
+        #sections always start at the beginning of a line, so expanding the 
+        #tabs section by section is the same as for the whole file
+        fid.write(''.join(section).expandtabs(4))
 
 
-    edistring += '>END\n'
+    fid.write('>END\n')
 
 
-    return edistring.expandtabs(4), stationname
+    return stationname
 
 
 
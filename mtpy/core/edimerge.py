@@ -0,0 +1,616 @@
+#!/usr/bin/env python
+
+"""
+=============
+edimerge
+=============
+
+Merge the EDI files of different instruments or processing runs, like AMT,
+broadband and long period, into one EDI file per station.
+
+Each EDI file is read once.  The frequencies of all files of a station are
+put into one array and the frequencies to keep are found for all files at
+once:
+
+    * the files are sorted by their highest frequency, files that lie
+      completely inside the range of a higher frequency file are left out
+    * between neighbouring files there is one merge frequency, the higher
+      frequency file is used above it, the lower frequency file at and
+      below it
+    * merge_method 'frequency' puts the merge frequency in the middle of the
+      overlap on a log scale (or uses the given merge frequencies),
+      merge_method 'error' puts it where the relative impedance errors of
+      the two files cross, so the file with the smaller error in the
+      overlap is used
+    * optionally the merged data are averaged into the period bins of
+      mtpy.utils.merge_periods.regular_periods, weighted by 1/error**2
+
+merge_edi_files does all stations of a survey across a process pool.
+
+Functions
+----------
+    - get_relative_error
+    - get_merge_index
+    - merge_edi_objects
+    - regularize_edi_object
+    - merge_edi_files
+
+:Example: ::
+
+    >>> import mtpy.core.edimerge as edimerge
+    >>> station_dict = {'mt01':[r"/home/amt/mt01.edi",
+    >>> ...                     r"/home/bb/mt01.edi",
+    >>> ...                     r"/home/lp/mt01.edi"]}
+    >>> fn_dict = edimerge.merge_edi_files(station_dict, r"/home/merged",
+    >>> ...                                merge_method='error',
+    >>> ...                                n_periods=40)
+
+"""
+
+#=================================================================
+import os
+import time
+import calendar
+import datetime
+import numpy as np
+
+import mtpy.core.edi as MTedi
+import mtpy.core.z as MTz
+import mtpy.utils.exceptions as MTex
+import mtpy.utils.merge_periods as MTmp
+import mtpy.utils.parallel as MTparallel
+
+#=================================================================
+
+def get_relative_error(z_array, zerr_array):
+    """
+    relative error of the impedance at each frequency, the median of
+    zerr/|z| over the components that are not 0.
+
+    Arguments:
+    -----------
+        **z_array** : np.ndarray(n_freq, 2, 2, dtype=complex)
+
+        **zerr_array** : np.ndarray(n_freq, 2, 2)
+
+    Returns:
+    ---------
+        **rel_err** : np.ndarray(n_freq)
+                      relative error, inf where all components are 0
+    """
+
+    z_abs = np.abs(np.asarray(z_array)).reshape(len(z_array), -1)
+    zerr = np.abs(np.asarray(zerr_array, dtype=np.float)).reshape(
+                                                        len(z_array), -1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rel_err = np.where(z_abs > 0, zerr/z_abs, np.nan)
+
+    # all nan rows give a warning in nanmedian, they are set to inf
+    valid = np.isfinite(rel_err).any(axis=1)
+    median_err = np.repeat(np.inf, len(z_abs))
+    if valid.any():
+        median_err[valid] = np.nanmedian(rel_err[valid], axis=1)
+
+    return median_err
+
+def _get_error_merge_freq(freq_upper, err_upper, freq_lower, err_lower):
+    """
+    merge frequency between two files where the file with the smaller
+    relative error is used on as many of the overlapping frequencies as
+    possible.  Returns None if the files do not overlap.
+    """
+
+    f_min = freq_upper.min()
+    f_max = freq_lower.max()
+    if f_min > f_max:
+        return None
+
+    # candidate frequencies in the overlap, decreasing
+    cand = np.concatenate((freq_upper, freq_lower))
+    cand = np.unique(cand[(cand >= f_min) & (cand <= f_max)])[::-1]
+    log_cand = np.log10(cand)
+
+    def interp_err(freq, err):
+        order = np.argsort(freq)
+        log_err = np.log10(np.clip(err[order], 1e-12, 1e12))
+        return np.interp(log_cand, np.log10(freq[order]), log_err)
+
+    prefer_upper = interp_err(freq_upper, err_upper) <= \
+                   interp_err(freq_lower, err_lower)
+
+    # the upper file takes the first s candidates, the lower file the rest
+    n_upper = np.append(0, np.cumsum(prefer_upper))
+    n_lower = np.append(np.cumsum(np.invert(prefer_upper)[::-1])[::-1], 0)
+    split = np.argmax(n_upper+n_lower)
+
+    if split == len(cand):
+        # everything in the overlap from the upper file
+        return np.nextafter(cand[-1], 0)
+
+    return cand[split]
+
+def get_merge_index(lo_freq, lo_rel_err=None, merge_freq=None,
+                    merge_method='frequency'):
+    """
+    find which frequencies of which files to keep when merging.
+
+    Arguments:
+    -----------
+        **lo_freq** : list of np.ndarray
+                      frequencies of each file
+
+        **lo_rel_err** : list of np.ndarray
+                         relative errors of each file, see
+                         get_relative_error.  Needed for
+                         merge_method='error'
+
+        **merge_freq** : float or list of floats
+                         merge frequencies between the files ordered from
+                         high to low frequency, one less than there are
+                         files used.  Only used with
+                         merge_method='frequency', *default* is None, which
+                         is the middle of the overlap on a log scale.
+
+        **merge_method** : [ 'frequency' | 'error' ]
+                           how to choose the merge frequency, see the
+                           module description. *default* is 'frequency'
+
+    Returns:
+    ---------
+        **merge_index** : np.ndarray(n_merged, dtype=int)
+                          index into the concatenated arrays of all files,
+                          ordered by decreasing frequency
+
+        **merge_freq** : np.ndarray(n_used-1)
+                         merge frequencies between the files used, high to
+                         low
+
+        **file_index** : np.ndarray(n_used)
+                         index of the files used ordered from high to low
+                         frequency
+    """
+
+    if merge_method not in ['frequency', 'error']:
+        raise MTex.MTpyError_inputarguments('merge_method {0} '.format(
+                                            merge_method)+
+                                            'not understood, use frequency '
+                                            'or error')
+
+    lo_freq = [np.asarray(freq, dtype=np.float) for freq in lo_freq]
+    n_files = len(lo_freq)
+    if n_files == 0:
+        raise MTex.MTpyError_inputarguments('Need at least one file to merge')
+    if merge_method == 'error':
+        if lo_rel_err is None or len(lo_rel_err) != n_files:
+            raise MTex.MTpyError_inputarguments('merge_method error needs '
+                                                'relative errors for every '
+                                                'file')
+        lo_rel_err = [np.asarray(err, dtype=np.float) for err in lo_rel_err]
+
+    f_max = np.array([freq.max() for freq in lo_freq])
+    f_min = np.array([freq.min() for freq in lo_freq])
+
+    # high to low frequency, leave out files inside a higher frequency file
+    file_index = []
+    for ii in np.argsort(-f_max, kind='mergesort'):
+        if len(file_index) > 0 and f_min[ii] >= f_min[file_index[-1]]:
+            print 'freq range of file {0} is fully contained in '.format(ii)+\
+                  'the range of file {0} => not merged'.format(file_index[-1])
+            continue
+        file_index.append(ii)
+    file_index = np.array(file_index, dtype=np.int)
+    n_used = len(file_index)
+
+    if merge_freq is not None and merge_method == 'frequency':
+        merge_freq = np.atleast_1d(np.asarray(merge_freq, dtype=np.float))
+        if len(merge_freq) != n_used-1:
+            raise MTex.MTpyError_inputarguments('Need {0} merge '.format(
+                                                n_used-1)+
+                                                'frequencies, got '
+                                                '{0}'.format(len(merge_freq)))
+    else:
+        # middle of the overlap, or of the gap, on a log scale
+        merge_freq = np.sqrt(f_max[file_index[1:]]*f_min[file_index[:-1]])
+        if merge_method == 'error':
+            for jj in range(n_used-1):
+                upper, lower = file_index[jj], file_index[jj+1]
+                err_freq = _get_error_merge_freq(lo_freq[upper],
+                                                 lo_rel_err[upper],
+                                                 lo_freq[lower],
+                                                 lo_rel_err[lower])
+                if err_freq is not None:
+                    merge_freq[jj] = err_freq
+
+    # each used file keeps merge_freq[k] < freq <= merge_freq[k-1]
+    upper_bound = np.repeat(np.inf, n_files)
+    lower_bound = np.repeat(np.inf, n_files)
+    upper_bound[file_index] = np.append(np.inf, merge_freq)
+    lower_bound[file_index] = np.append(merge_freq, -np.inf)
+
+    n_freq = np.array([len(freq) for freq in lo_freq])
+    source = np.repeat(np.arange(n_files), n_freq)
+    freq_all = np.concatenate(lo_freq)
+    keep = (freq_all > lower_bound[source]) & \
+           (freq_all <= upper_bound[source])
+
+    merge_index = np.nonzero(keep)[0]
+    merge_index = merge_index[np.argsort(-freq_all[merge_index],
+                                         kind='mergesort')]
+
+    return merge_index, merge_freq, file_index
+
+#=================================================================
+# header sections
+
+_date_formats = ['%Y/%m/%d %H:%M:%S UTC', '%d.%m.%y %H:%M:%S UTC',
+                 '%d.%m.%Y %H:%M:%S UTC', '%Y/%m/%d', '%d/%m/%y', '%d.%m.%y',
+                 '%d.%m.%Y']
+
+def _read_date(date_string):
+    """
+    seconds since the epoch of a date string in one of the EDI date formats,
+    None if it is not understood
+    """
+
+    for date_format in _date_formats:
+        try:
+            return calendar.timegm(time.strptime(str(date_string).strip(),
+                                                 date_format))
+        except ValueError:
+            continue
+    return None
+
+def _merge_section_dicts(lo_dicts):
+    """
+    merge the dictionaries of an EDI section (HEAD, INFO or DEFINEMEAS) of
+    several files.
+
+    Keys in only some files are taken from those, equal values are kept,
+    coordinates are averaged, dataid and station are joined with +, the
+    earliest acqdate and latest enddate are used and anything else is taken
+    from the first file that has it.
+    """
+
+    lo_dicts = [dict((str(key).lower(), value) for key, value in dd.items())
+                for dd in lo_dicts if dd is not None]
+
+    key_list = []
+    for dd in lo_dicts:
+        key_list.extend([key for key in dd.keys() if key not in key_list])
+
+    section_dict = {}
+    for key in key_list:
+        values = [dd[key] for dd in lo_dicts if key in dd]
+        if len(values) == 1 or all([vv == values[0] for vv in values[1:]]):
+            section_dict[key] = values[0]
+            continue
+
+        if key == 'refloc':
+            section_dict[key] = ''
+            continue
+
+        if 'lat' in key or 'lon' in key or 'elev' in key or key == 'ele':
+            try:
+                section_dict[key] = np.mean([float(vv) for vv in values])
+            except (TypeError, ValueError):
+                raise MTex.MTpyError_edi_file('Cannot merge files: wrong '
+                                              'format of "{0}" '.format(key)+
+                                              'coordinate')
+            continue
+
+        if key in ['dataid', 'station']:
+            section_dict[key] = '+'.join([str(vv) for vv in values])
+            continue
+
+        if key == 'filedate':
+            section_dict[key] = datetime.datetime.utcnow().strftime(
+                                                       _date_formats[0])
+            continue
+
+        if key in ['acqdate', 'enddate']:
+            dates = [_read_date(vv) for vv in values]
+            if None not in dates:
+                if key == 'acqdate':
+                    section_dict[key] = values[int(np.argmin(dates))]
+                else:
+                    section_dict[key] = values[int(np.argmax(dates))]
+                continue
+
+        section_dict[key] = values[0]
+
+    return section_dict
+
+#=================================================================
+
+def merge_edi_objects(lo_edi_objects, merge_freq=None,
+                      merge_method='frequency'):
+    """
+    merge Edi objects into a new Edi object.
+
+    Arguments:
+    -----------
+        **lo_edi_objects** : list of mtpy.core.edi.Edi
+                             Edi objects of one station, in any order.  The
+                             sections that are not merged, like HMEAS and
+                             EMEAS, are taken from the first one.
+
+        **merge_freq**, **merge_method** : see get_merge_index
+
+    Returns:
+    ---------
+        **edi_object** : mtpy.core.edi.Edi
+                         merged data with the merge frequencies in the INFO
+                         section.  The tipper is only merged if all files
+                         have one.
+    """
+
+    lo_edi_objects = list(lo_edi_objects)
+    if len(lo_edi_objects) == 0:
+        raise MTex.MTpyError_inputarguments('Need at least one Edi object '
+                                            'to merge')
+
+    lo_freq = [np.asarray(eo.freq, dtype=np.float) for eo in lo_edi_objects]
+    lo_rel_err = [get_relative_error(eo.Z.z, eo.Z.zerr)
+                  for eo in lo_edi_objects]
+    merge_index, merge_freq, file_index = get_merge_index(lo_freq,
+                                                    lo_rel_err=lo_rel_err,
+                                                    merge_freq=merge_freq,
+                                                    merge_method=merge_method)
+
+    def merged(lo_arrays):
+        return np.concatenate(lo_arrays)[merge_index]
+
+    new_freq = merged(lo_freq)
+    new_z = MTz.Z(z_array=merged([eo.Z.z for eo in lo_edi_objects]),
+                  zerr_array=merged([eo.Z.zerr for eo in lo_edi_objects]),
+                  freq=new_freq)
+
+    lo_zrot = []
+    for eo in lo_edi_objects:
+        if eo.zrot is None or len(eo.zrot) != len(eo.Z.z):
+            lo_zrot.append(np.zeros(len(eo.Z.z)))
+        else:
+            lo_zrot.append(np.asarray(eo.zrot, dtype=np.float))
+
+    edi_object = MTedi.Edi()
+    edi_object.set_Z(new_z)
+    if all([eo.Tipper.tipper is not None for eo in lo_edi_objects]):
+        new_tipper = MTz.Tipper(
+                       tipper_array=merged([eo.Tipper.tipper
+                                            for eo in lo_edi_objects]),
+                       tippererr_array=merged([eo.Tipper.tippererr
+                                               for eo in lo_edi_objects]),
+                       freq=new_freq)
+        edi_object.set_Tipper(new_tipper)
+    edi_object.zrot = merged(lo_zrot)
+
+    # header sections
+    edi_object.head = _merge_section_dicts([eo.head
+                                            for eo in lo_edi_objects])
+    info_dict = _merge_section_dicts([eo.info_dict for eo in lo_edi_objects])
+    info_dict['merge_freq'] = ','.join(['{0:.6g}'.format(ff)
+                                        for ff in merge_freq])
+    info_dict['merge_method'] = merge_method
+    edi_object.info_dict = info_dict
+    edi_object.info_string = ''.join(['\n\t=== File {0}: ===\n{1}\n'.format(
+                                      ii+1, eo.info_string)
+                                      for ii, eo in enumerate(lo_edi_objects)
+                                      if eo.info_string is not None])
+    edi_object.definemeas = _merge_section_dicts([eo.definemeas
+                                                  for eo in lo_edi_objects])
+    edi_object.hmeas_emeas = lo_edi_objects[0].hmeas_emeas
+
+    mtsect = dict((key.lower(), value)
+                  for key, value in lo_edi_objects[0].mtsect.items())
+    mtsect['nfreq'] = edi_object.n_freq()
+    sectid_list = [str(lo_edi_objects[ii].mtsect.get('sectid', ''))
+                   for ii in file_index]
+    if len(set(sectid_list)) > 1:
+        mtsect['sectid'] = '+'.join(sectid_list)
+    edi_object.mtsect = mtsect
+
+    return edi_object
+
+def _bin_average(values, errors, bin_index, n_bins):
+    """
+    average values into bins weighted by 1/errors**2 along the first axis.
+    Bins where all errors are 0 get the plain mean and an error of 0.
+    """
+
+    shape = (n_bins,)+values.shape[1:]
+    with np.errstate(divide='ignore'):
+        weight = np.where(errors > 0, 1./errors**2, 0.)
+
+    w_sum = np.zeros(shape)
+    wv_sum = np.zeros(shape, dtype=values.dtype)
+    v_sum = np.zeros(shape, dtype=values.dtype)
+    np.add.at(w_sum, bin_index, weight)
+    np.add.at(wv_sum, bin_index, weight*values)
+    np.add.at(v_sum, bin_index, values)
+    count = np.bincount(bin_index, minlength=n_bins).reshape(
+                                    (n_bins,)+(1,)*(values.ndim-1))
+
+    has_weight = w_sum > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(has_weight, wv_sum/w_sum, v_sum/count)
+        error = np.where(has_weight, 1./np.sqrt(w_sum), 0.)
+
+    return mean, error
+
+def regularize_edi_object(edi_object, merge_threshold=15, n_periods=None,
+                          t_min=None, t_max=None):
+    """
+    average the data of an Edi object into the period bins of
+    mtpy.utils.merge_periods.regular_periods.
+
+    Arguments:
+    -----------
+        **edi_object** : mtpy.core.edi.Edi
+                         data to regularize
+
+        **merge_threshold**, **n_periods**, **t_min**, **t_max** :
+                         passed on to merge_periods.get_period_bins as
+                         merge_threshold, no_periods, t_min and t_max
+
+    Returns:
+    ---------
+        **edi_object** : mtpy.core.edi.Edi
+                         new Edi object with one frequency per bin that has
+                         data, periods outside the bins are left out.  The
+                         data in a bin are averaged weighted by 1/error**2.
+    """
+
+    period = 1./np.asarray(edi_object.freq, dtype=np.float)
+    bin_periods, bin_min, bin_max = MTmp.get_period_bins(period,
+                                                    merge_threshold,
+                                                    no_periods=n_periods,
+                                                    t_min=t_min, t_max=t_max)
+    bin_index = MTmp.get_bin_index(period, bin_min, bin_max)
+
+    in_bin = np.nonzero(bin_index >= 0)[0]
+    used_bins, bin_index = np.unique(bin_index[in_bin], return_inverse=True)
+    n_bins = len(used_bins)
+
+    # increasing period is decreasing frequency like the edi files
+    new_freq = 1./bin_periods[used_bins]
+
+    z, zerr = _bin_average(edi_object.Z.z[in_bin], edi_object.Z.zerr[in_bin],
+                           bin_index, n_bins)
+    new_edi = MTedi.Edi()
+    new_edi.set_Z(MTz.Z(z_array=z, zerr_array=zerr, freq=new_freq))
+    if edi_object.Tipper.tipper is not None:
+        tipper, tippererr = _bin_average(edi_object.Tipper.tipper[in_bin],
+                                         edi_object.Tipper.tippererr[in_bin],
+                                         bin_index, n_bins)
+        new_edi.set_Tipper(MTz.Tipper(tipper_array=tipper,
+                                      tippererr_array=tippererr,
+                                      freq=new_freq))
+    if edi_object.zrot is not None:
+        zrot = np.bincount(bin_index, weights=edi_object.zrot[in_bin],
+                           minlength=n_bins)/np.bincount(bin_index,
+                                                         minlength=n_bins)
+        new_edi.zrot = zrot
+
+    new_edi.head = edi_object.head
+    new_edi.info_dict = dict(edi_object.info_dict)
+    new_edi.info_dict['merge_threshold'] = merge_threshold
+    new_edi.info_string = edi_object.info_string
+    new_edi.definemeas = edi_object.definemeas
+    new_edi.hmeas_emeas = edi_object.hmeas_emeas
+    new_edi.mtsect = dict(edi_object.mtsect)
+    new_edi.mtsect['nfreq'] = n_bins
+
+    return new_edi
+
+#=================================================================
+
+def _merge_station_job(job):
+    """
+    read the edi files of a station, merge them and write the merged edi
+    file.  Defined at module level so it can be sent to a multiprocessing
+    pool.
+
+    **job** : tuple (station, lo_edi_files, save_fn, merge_freq, merge_method,
+                     regular_kwargs)
+
+    **Returns** : (station, save_fn)
+    """
+
+    station, lo_edi_files, save_fn, merge_freq, merge_method, \
+                                                    regular_kwargs = job
+
+    lo_edi_objects = [MTedi.Edi(edi_fn) for edi_fn in lo_edi_files]
+    edi_object = merge_edi_objects(lo_edi_objects, merge_freq=merge_freq,
+                                   merge_method=merge_method)
+    if regular_kwargs is not None:
+        edi_object = regularize_edi_object(edi_object, **regular_kwargs)
+
+    return station, edi_object.writefile(save_fn, allow_overwrite=True)
+
+def merge_edi_files(station_dict, save_path, merge_freq=None,
+                    merge_method='frequency', n_periods=None,
+                    merge_threshold=15, t_min=None, t_max=None,
+                    suffix='_merged', n_processes=None):
+    """
+    merge the edi files of each station of a survey across a process pool.
+
+    Arguments:
+    -----------
+        **station_dict** : dictionary keyed by station with a list of the
+                           edi files to merge for that station
+
+        **save_path** : string
+                        directory to save the merged edi files to, made if
+                        it does not exist.  Existing files are overwritten.
+
+        **merge_freq** : float, list or dict
+                         merge frequencies, see get_merge_index.  Can be a
+                         dictionary keyed by station, stations not in it
+                         get the default. *default* is None
+
+        **merge_method** : [ 'frequency' | 'error' ]
+                           see get_merge_index. *default* is 'frequency'
+
+        **n_periods** : int
+                        number of regular period bins to average the merged
+                        data into, see regularize_edi_object.
+                        *default* is None, which keeps the merged
+                        frequencies
+
+        **merge_threshold**, **t_min**, **t_max** : see
+                        regularize_edi_object, only used if n_periods is
+                        given
+
+        **suffix** : string
+                     appended to the station name for the file name,
+                     *default* is '_merged'
+
+        **n_processes** : int
+                          number of processes, *default* is the number of
+                          cpus.  If 1 the stations are done in this process.
+
+    Returns:
+    ---------
+        **fn_dict** : dictionary keyed by station of the merged edi files
+
+    :Example: ::
+
+        >>> import glob
+        >>> import os
+        >>> import mtpy.core.edimerge as edimerge
+        >>> station_dict = {}
+        >>> for edi_fn in glob.glob(r"/home/survey/*/*.edi"):
+        >>>     station = os.path.basename(edi_fn)[:-4]
+        >>>     station_dict.setdefault(station, []).append(edi_fn)
+        >>> fn_dict = edimerge.merge_edi_files(station_dict,
+        >>> ...                                r"/home/survey/merged",
+        >>> ...                                merge_method='error')
+    """
+
+    if len(station_dict) == 0:
+        return {}
+
+    if not os.path.isdir(save_path):
+        os.makedirs(save_path)
+
+    regular_kwargs = None
+    if n_periods is not None:
+        regular_kwargs = {'n_periods':n_periods,
+                          'merge_threshold':merge_threshold,
+                          't_min':t_min,
+                          't_max':t_max}
+
+    jobs = [(station, list(station_dict[station]),
+             os.path.join(save_path, '{0}{1}.edi'.format(station, suffix)),
+             MTparallel.get_station_value(merge_freq, station), merge_method,
+             regular_kwargs) for station in sorted(station_dict.keys())]
+
+    st = time.time()
+    result_list, n_processes = MTparallel.map_jobs(_merge_station_job, jobs,
+                                                   n_processes=n_processes)
+
+    print 'Merged edi files of {0} stations with {1} processes '.format(
+                                    len(jobs), n_processes)+\
+          'in {0:.2f} s'.format(time.time()-st)
+
+    return dict(result_list)
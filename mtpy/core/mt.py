@@ -21,24 +21,35 @@ import mtpy.utils.format as MTformat
 import mtpy.analysis.pt as MTpt
 import mtpy.analysis.zinvariants as MTinv
 import mtpy.analysis.distortion as MTdistortion
+import mtpy.utils.lazyimport as MTlazy
+import mtpy.utils.parallel as MTparallel
 import os
+import time
 import numpy as np
-import mtpy.imaging.plotresponse as plotresponse
 
-try:
-    import scipy
-    scipy_version = int(scipy.__version__.replace('.', ''))
+# plotting and scipy are only loaded when they are used
+plotresponse = MTlazy.lazy_import('mtpy.imaging.plotresponse')
+spi = MTlazy.lazy_import('scipy.interpolate')
+
+def _check_interp_import():
+    """
+    import scipy.interpolate on first use, returns False if it can not be
+    imported
+    """
     
-    if scipy_version < 140:
+    try:
+        import scipy
+        import scipy.interpolate
+    except ImportError:
+        print('Could not find scipy.interpolate, cannot use method interpolate'+\
+              'check installation you can get scipy from scipy.org.' )
+        return False
+        
+    scipy_version = [int(vv) for vv in scipy.__version__.split('.')[0:2]]
+    if scipy_version < [0, 14]:
         print ('Note: need scipy version 0.14.0 or higher or interpolation '+\
                'might not work.')
-    import scipy.interpolate as spi
-    interp_import = True
-    
-except ImportError:
-    print('Could not find scipy.interpolate, cannot use method interpolate'+\
-          'check installation you can get scipy from scipy.org.' )
-    interp_import = False
+    return True
 
 #==============================================================================
 
@@ -455,6 +466,11 @@ class MT(object):
                       
             *new_Tipper* : mtpy.core.Z.Tipper object
                            a new Tipper object to be written
+
+        **Returns**:
+
+            *new_fn* : string
+                       full path to the file written
         """
         
         if new_Z is not None:
@@ -475,7 +491,7 @@ class MT(object):
         if new_fn is None:
             new_fn = self.fn[:-4]+'_RW'+'.edi'
             
-        self.edi_object.writefile(new_fn)
+        return self.edi_object.writefile(new_fn)
         
         
     #--> check the order of frequencies
@@ -591,8 +607,8 @@ class MT(object):
             >>>                       new_Tipper=new_tipper_object)
             
         """
-        # if the interpolation module has not been loaded return
-        if interp_import is False:
+        # if the interpolation module can not be loaded return
+        if _check_interp_import() is False:
             print('could not interpolate, need to install scipy')            
             return
         
@@ -676,11 +692,135 @@ class MT(object):
         plot_obj = plotresponse.PlotResponse(fn=self.fn, **kwargs)
         
         return plot_obj
+
+#==============================================================================
+# write modified edi files for a whole survey
+#==============================================================================
+def _write_edi_job(job):
+    """
+    read an edi file, apply static shift, rotation and interpolation and 
+    write a new edi file.  Defined at module level so it can be sent to a
+    multiprocessing pool.
+    
+    **job** : tuple (job_index, edi_fn, save_path, suffix, rotation_angle, 
+                     static_shift, new_freq)
+    
+    **Returns** : (job_index, new_fn, write_time)
+    """
+    
+    job_index, edi_fn, save_path, suffix, rotation_angle, static_shift, \
+                                                            new_freq = job
+    st = time.time()
+    
+    mt_obj = MT(edi_fn)
+    station = mt_obj.station
+    
+    ss = MTparallel.get_station_value(static_shift, station)
+    if ss is not None:
+        mt_obj.Z = mt_obj.remove_static_shift(ss_x=ss[0], ss_y=ss[1])
+        
+    angle = MTparallel.get_station_value(rotation_angle, station)
+    if angle is not None:
+        mt_obj.rotation_angle = angle
+        
+    new_Z = None
+    new_Tipper = None
+    if new_freq is not None:
+        new_Z, new_Tipper = mt_obj.interpolate(new_freq)
+        if new_Tipper is None:
+            new_Tipper = MTz.Tipper()
+    
+    new_fn = os.path.join(save_path, 
+                          '{0}{1}.edi'.format(os.path.basename(edi_fn)[:-4],
+                                              suffix))
+    new_fn = mt_obj.write_edi_file(new_fn=new_fn, new_Z=new_Z, 
+                                   new_Tipper=new_Tipper)
+    
+    return job_index, new_fn, time.time()-st
+    
+def write_edi_files(edi_list, save_path, rotation_angle=None, 
+                    static_shift=None, new_freq=None, suffix='', 
+                    n_processes=None):
+    """
+    write modified edi files for a whole survey across a process pool.
+    
+    Each edi file is read into an MT object, the static shift is removed,
+    the data are rotated and interpolated (in that order, only the steps 
+    that are given) and a new edi file is written to save_path.  Stations
+    are independent so they are spread over n_processes workers.
+    
+    **Arguments**:
+        
+        *edi_list* : list
+                     list of full paths to edi files
+                     
+        *save_path* : string
+                      directory to save new edi files to, made if it does
+                      not exist.
+                      
+        *rotation_angle* : float or dict
+                           angle to rotate the data by in degrees clockwise
+                           from north.  Can be a dictionary keyed by station
+                           name, stations not in the dictionary are not 
+                           rotated. *default* is None
+                           
+        *static_shift* : (ss_x, ss_y) or dict
+                         static shift correction factors in resistivity 
+                         scale, see MT.remove_static_shift.  Can be a 
+                         dictionary keyed by station name with values 
+                         (ss_x, ss_y). *default* is None
+                         
+        *new_freq* : np.ndarray
+                     frequencies to interpolate onto, see MT.interpolate.
+                     *default* is None
+                     
+        *suffix* : string
+                   appended to the file name of the new edi file, 
+                   *default* is ''
+                   
+        *n_processes* : int
+                        number of processes, *default* is the number of
+                        cpus.  If 1 the files are written in this process.
+                        
+    **Returns**:
         
+        *new_fn_list* : list
+                        list of new edi files in the same order as edi_list
+                        
+    :Example: ::
+        >>> import mtpy.core.mt as mt
+        >>> import glob
+        >>> edi_list = glob.glob(r"/home/edi_files/*.edi")
+        >>> ss_dict = {'mt01':(1.2, .9), 'mt02':(.8, .8)}
+        >>> new_list = mt.write_edi_files(edi_list, r"/home/edi_files/rot",
+        >>>                               rotation_angle=30,
+        >>>                               static_shift=ss_dict,
+        >>>                               suffix='_rot30')
+    """
+    
+    n_jobs = len(edi_list)
+    if n_jobs == 0:
+        return []
         
+    if not os.path.isdir(save_path):
+        os.makedirs(save_path)
         
-    
+    if new_freq is not None:
+        new_freq = np.array(new_freq)
         
+    jobs = [(ii, edi_fn, save_path, suffix, rotation_angle, static_shift, 
+             new_freq) for ii, edi_fn in enumerate(edi_list)]
+             
+    st = time.time()
+    new_fn_list = [None]*n_jobs
+    result_list, n_processes = MTparallel.map_jobs(_write_edi_job, jobs,
+                                                   n_processes=n_processes)
+            
+    for job_index, new_fn, w_time in result_list:
+        new_fn_list[job_index] = new_fn
         
+    print 'Wrote {0} edi files with {1} processes in {2:.2f} s'.format(
+                                                        n_jobs, n_processes, 
+                                                        time.time()-st)
         
-    
\ No newline at end of file
+    return new_fn_list
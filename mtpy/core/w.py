@@ -29,15 +29,6 @@ import os.path as op
 import math, cmath
 import time, calendar 
 
-import mtpy.core.edi as MTedi 
-reload (MTedi)
-
-import mtpy.utils.format as MTformat
-reload(MTformat)
-
-import mtpy.utils.exceptions as MTexceptions
-reload(MTexceptions)
-
 
 #=================================================================
 
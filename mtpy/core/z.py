@@ -22,7 +22,6 @@ import copy
 import mtpy.utils.calculator as MTcc
 import mtpy.utils.exceptions as MTex
 
-reload(MTcc)
 
 #=================================================================
 
@@ -175,7 +174,7 @@ class Z(object):
 
         if self.z is not None:
             if len(self.z.shape) == 3:
-                if len(lo_freq) is not len(self.z):
+                if len(lo_freq) != len(self.z):
                     print ('length of freq list/array not correct'
                            '({0} instead of {1})'.format(len(lo_freq), 
                                                          len(self.z)))
@@ -1104,40 +1103,32 @@ class Z(object):
         z1 = (self.z[:,0,1] - self.z[:,1,0])/2.
         invariants_dict['z1'] = z1 
 
-        invariants_dict['det'] = self.det[0]
+        # compute the determinant and norm once, not for each frequency
+        det_z = self.det[0]
+        invariants_dict['det'] = det_z
         
-        det_real = np.array([np.linalg.det(i) for i in np.real(self.z)])
-        invariants_dict['det_real'] = det_real
+        invariants_dict['det_real'] = np.linalg.det(np.real(self.z))
         
-        det_imag = np.array([np.linalg.det(i) for i in np.imag(self.z)])
-        invariants_dict['det_imag'] = det_imag
+        invariants_dict['det_imag'] = np.linalg.det(np.imag(self.z))
 
         invariants_dict['trace'] = self.trace[0]
         
         invariants_dict['skew'] = self.skew[0]
         
-        invariants_dict['norm'] = self.norm[0]
+        norm_z = self.norm[0]
+        invariants_dict['norm'] = norm_z
         
-        lambda_plus = np.array([z1[i] + np.sqrt(z1[i] * z1[i] -\
-                                self.det[0][i]) for i in range(len(z1))])
-        invariants_dict['lambda_plus'] = lambda_plus
+        invariants_dict['lambda_plus'] = z1 + np.sqrt(z1 * z1 - det_z)
         
-        lambda_minus = np.array([z1[i] - np.sqrt(z1[i] * z1[i] -\
-                                 self.det[0][i]) for i in range(len(z1))])
-        invariants_dict['lambda_minus'] = lambda_minus
+        invariants_dict['lambda_minus'] = z1 - np.sqrt(z1 * z1 - det_z)
         
-        sigma_plus = np.array([0.5*self.norm[0][i]**2 + \
-                              np.sqrt( 0.25*self.norm[0][i]**4 + \
-                              np.abs(self.det[0][i])**2) 
-                              for i in range(len(self.norm[0]))])
-                              
-        invariants_dict['sigma_plus'] = sigma_plus
+        invariants_dict['sigma_plus'] = 0.5*norm_z**2 + \
+                                        np.sqrt(0.25*norm_z**4 + \
+                                                np.abs(det_z)**2)
         
-        sigma_minus = np.array([0.5*self.norm[0][i]**2 - \
-                               np.sqrt(0.25*self.norm[0][i]**4 + \
-                               np.abs(self.det[0][i])**2) 
-                               for i in range(len(self.norm[0]))])
-        invariants_dict['sigma_minus'] = sigma_minus
+        invariants_dict['sigma_minus'] = 0.5*norm_z**2 - \
+                                         np.sqrt(0.25*norm_z**4 + \
+                                                 np.abs(det_z)**2)
 
         return invariants_dict
         
@@ -1259,7 +1250,7 @@ class Tipper(object):
         No test for consistency!
         """
 
-        if len(lo_freq) is not len(self.tipper):
+        if len(lo_freq) != len(self.tipper):
             print 'length of freq list/array not correct'+\
                   ' (%i instead of %i)'%(len(lo_freq), len(self.tipper))
             return
@@ -1301,7 +1292,7 @@ class Tipper(object):
             pass
 
         #check to see if the new tipper array is the same shape as the old
-        if (self._tipper!=None) and (self._tipper.shape!=tipper_array.shape):
+        if (self._tipper is not None) and (self._tipper.shape!=tipper_array.shape):
             print 'Error - shape of "tipper" array does not match shape of '+\
                   'tipper-array: %s ; %s'%(str(tipper_array.shape),
                                            str(self.tipper.shape))
@@ -1359,7 +1350,7 @@ class Tipper(object):
             pass
 
         
-        if (self.tippererr!=None) and \
+        if (self.tippererr is not None) and \
                             (self._tippererr.shape!=tippererr_array.shape):
             print 'Error - shape of "tippererr" array does not match shape '+\
                   'of tippererr array: %s ; %s'%(str(tippererr_array.shape),
@@ -523,12 +523,12 @@ class Ui_MainWindow(mtplottools.MTArrows, mtplottools.MTEllipse):
         d_arr_max = np.zeros((self.modem_data.period_list.shape[0],
                               len(self.modem_data.mt_dict.keys())))
         print self.modem_data.mt_dict[self.modem_data.mt_dict.keys()[0]].Z.z                      
-        for ii, mt_key in enumerate(sorted(self.modem_data.mt_dict.keys())):
-            mt_obj = self.modem_data.mt_dict[mt_key]
-            d_arr = mtnb.calculate_depth_nb(z_object=mt_obj.Z)
-            
-            d_arr_min[:, ii] = d_arr['depth_min']
-            d_arr_max[:, ii] = d_arr['depth_max']
+        # compute the depths of all stations at once
+        z_list = [self.modem_data.mt_dict[mt_key].Z 
+                  for mt_key in sorted(self.modem_data.mt_dict.keys())]
+        d_arr = mtnb.calculate_depth_nb_survey(z_object_list=z_list)
+        d_arr_min[:, :] = d_arr['depth_min'].T
+        d_arr_max[:, :] = d_arr['depth_max'].T
         
         # average only the non zero terms
         d_avg_min = np.array([d_arr_min[kk, np.nonzero(d_arr_min[kk, :])].mean()
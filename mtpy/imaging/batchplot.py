@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+==================
+BatchPlot
+==================
+
+    * render many figures headless (Agg backend) across a pool of processes
+    * each worker holds a single plot object, so data files are read once per
+      worker and not once per figure
+    * large arrays can be handed to the workers as memory mapped .npy files
+    * output file names are made in the parent process, so they do not
+      depend on which worker rendered the figure
+
+Most plot classes make one figure per station, period or depth in a loop.
+A batch is a list of jobs, each job is a file name to save to, a dictionary
+of attributes to set on the plot object before calling plot() and
+optionally the label of the figure to save if plot() makes more than one.
+
+:Example: ::
+
+    >>> import mtpy.modeling.modem_new as modem
+    >>> import mtpy.imaging.batchplot as batchplot
+    >>> rms_plot = modem.Plot_RMS_Maps(r"/home/ModEM/Inv1/mb_NLCG_030.res",
+    >>> ...                            plot_yn='n')
+    >>> rms_plot.read_residual_fn()
+    >>> job_list = [('/home/ModEM/Inv1/{0:02}_RMS.png'.format(ii),
+    >>> ...          {'period_index':ii}, None) for ii in range(10)]
+    >>> batch = batchplot.BatchPlot(plot_obj=rms_plot, n_processes=4)
+    >>> fn_list = batch.render(job_list)
+"""
+
+#==============================================================================
+
+import os
+import time
+import tempfile
+import shutil
+import multiprocessing
+import numpy as np
+import matplotlib.pyplot as plt
+import mtpy.utils.parallel as MTparallel
+
+#==============================================================================
+# worker state, set once per process by _init_worker
+#==============================================================================
+_worker_dict = {}
+
+def _init_worker(plot_obj, plot_class, mmap_dict, savefig_kwargs):
+    """
+    initialize a worker process, switch to a headless backend and set the
+    shared plot object.  Arrays that were written to .npy files are memory
+    mapped back onto the plot object.
+    """
+
+    plt.switch_backend('Agg')
+    plt.ioff()
+
+    if plot_obj is not None:
+        for attr, npy_fn in mmap_dict.items():
+            setattr(plot_obj, attr, np.load(npy_fn, mmap_mode='r'))
+
+    _worker_dict['plot_obj'] = plot_obj
+    _worker_dict['plot_class'] = plot_class
+    _worker_dict['savefig_kwargs'] = savefig_kwargs
+
+def _render_job(job):
+    """
+    render a single figure in a worker process
+
+    Arguments
+    ------------
+        **job** : tuple (job_index, save_fn, attr_dict, fig_label)
+
+    Returns
+    ------------
+        **job_index**, **save_fn**, **render_time**, **process_id**
+
+    """
+
+    job_index, save_fn, attr_dict, fig_label = job
+    st = time.time()
+
+    plot_obj = _worker_dict['plot_obj']
+    if plot_obj is None:
+        plot_obj = _worker_dict['plot_class'](plot_yn='n', **attr_dict)
+    else:
+        for attr, value in attr_dict.items():
+            setattr(plot_obj, attr, value)
+
+    plot_obj.plot()
+    if fig_label is None:
+        fig = plt.gcf()
+    else:
+        fig = plt.figure(fig_label)
+    fig.savefig(save_fn, **_worker_dict['savefig_kwargs'])
+    plt.close('all')
+
+    return job_index, save_fn, time.time()-st, os.getpid()
+
+
+#==============================================================================
+# batch renderer
+#==============================================================================
+class BatchPlot(object):
+    """
+    render a list of figures headless across a pool of processes.
+
+    Arguments
+    -------------
+        **plot_obj** : plot class instance
+                       instance of a plot class with its data already read
+                       in, it is handed to each worker once.  It should be
+                       made with plot_yn='n'.
+
+        **plot_class** : plot class
+                         if plot_obj is None a new instance is made for each
+                         job with plot_class(plot_yn='n', \*\*attr_dict),
+                         use this when each figure needs its own file, like
+                         an .edi file per station.
+
+    ======================== ==================================================
+    Attributes               Description
+    ======================== ==================================================
+    mmap_attributes          list of attribute names of plot_obj that are
+                             large np.ndarrays.  These are written to .npy
+                             files and memory mapped by each worker instead
+                             of being copied. *default* is []
+    n_processes              number of processes to use, *default* is the
+                             number of cpus
+    render_summary           dictionary of timing information for the last
+                             batch
+    savefig_kwargs           dictionary of key words passed to
+                             matplotlib.figure.savefig. *default* is {}
+    verbose                  [ True | False ] print progress
+    ======================== ==================================================
+
+    ======================== ==================================================
+    Methods                  Description
+    ======================== ==================================================
+    render                   render a list of jobs
+    print_summary            print the timing summary of the last batch
+    ======================== ==================================================
+
+    .. note:: On Windows the pool starts new interpreters, so scripts that
+              use BatchPlot need to be protected by
+              if __name__ == '__main__':
+    """
+
+    def __init__(self, plot_obj=None, plot_class=None, **kwargs):
+
+        if plot_obj is None and plot_class is None:
+            raise ValueError('Need to input either plot_obj or plot_class')
+
+        self.plot_obj = plot_obj
+        self.plot_class = plot_class
+
+        self.n_processes = kwargs.pop('n_processes', None)
+        self.mmap_attributes = kwargs.pop('mmap_attributes', [])
+        self.savefig_kwargs = kwargs.pop('savefig_kwargs', {})
+        self.verbose = kwargs.pop('verbose', True)
+
+        self.render_summary = {}
+
+    def _write_mmap_arrays(self, mmap_path):
+        """
+        write large arrays to .npy files so workers can memory map them
+        """
+
+        mmap_dict = {}
+        if self.plot_obj is None:
+            return mmap_dict
+
+        for attr in self.mmap_attributes:
+            value = getattr(self.plot_obj, attr, None)
+            if not isinstance(value, np.ndarray):
+                continue
+            npy_fn = os.path.join(mmap_path, '{0}.npy'.format(attr))
+            np.save(npy_fn, value)
+            mmap_dict[attr] = npy_fn
+
+        return mmap_dict
+
+    def render(self, job_list):
+        """
+        render all jobs in job_list
+
+        Arguments
+        -------------
+            **job_list** : list of tuples (save_fn, attr_dict, fig_label)
+                           * save_fn --> full path to save the figure to
+                           * attr_dict --> dictionary of attributes to set
+                                           on the plot object before
+                                           plotting
+                           * fig_label --> label of the figure to save, if
+                                           None the current figure is
+                                           saved.
+
+        Returns
+        ------------
+            **fn_list** : list
+                          list of saved files in the same order as job_list
+        """
+
+        n_jobs = len(job_list)
+        if n_jobs == 0:
+            return []
+
+        n_processes = MTparallel.get_n_processes(n_jobs, self.n_processes)
+
+        jobs = [(ii, save_fn, attr_dict, fig_label)
+                for ii, (save_fn, attr_dict, fig_label) in enumerate(job_list)]
+
+        st = time.time()
+        mmap_path = tempfile.mkdtemp(prefix='mtpy_batchplot_')
+
+        # take the big arrays off the plot object while the pool is started
+        # so they are not copied to each worker
+        mmap_dict = self._write_mmap_arrays(mmap_path)
+        saved_arrays = dict([(attr, getattr(self.plot_obj, attr))
+                             for attr in mmap_dict.keys()])
+        for attr in mmap_dict.keys():
+            setattr(self.plot_obj, attr, None)
+
+        fn_list = [None]*n_jobs
+        render_time = np.zeros(n_jobs)
+        pid_list = [None]*n_jobs
+        try:
+            pool = multiprocessing.Pool(processes=n_processes,
+                                        initializer=_init_worker,
+                                        initargs=(self.plot_obj,
+                                                  self.plot_class,
+                                                  mmap_dict,
+                                                  self.savefig_kwargs))
+            try:
+                for count, result in enumerate(pool.imap_unordered(_render_job,
+                                                                   jobs)):
+                    job_index, save_fn, r_time, pid = result
+                    fn_list[job_index] = save_fn
+                    render_time[job_index] = r_time
+                    pid_list[job_index] = pid
+                    if self.verbose:
+                        print '    rendered {0:>5}/{1} --> {2}'.format(count+1,
+                                                                  n_jobs,
+                                                                  save_fn)
+            finally:
+                pool.close()
+                pool.join()
+        finally:
+            for attr, value in saved_arrays.items():
+                setattr(self.plot_obj, attr, value)
+            shutil.rmtree(mmap_path, ignore_errors=True)
+
+        et = time.time()
+        self.render_summary = {'n_figures':n_jobs,
+                               'n_processes':n_processes,
+                               'wall_time':et-st,
+                               'render_time':render_time.sum(),
+                               'mean_time':render_time.mean(),
+                               'max_time':render_time.max(),
+                               'figures_per_process':
+                                   dict([(pid, pid_list.count(pid))
+                                         for pid in set(pid_list)])}
+        if self.verbose:
+            self.print_summary()
+
+        return fn_list
+
+    def print_summary(self):
+        """
+        print timing summary of the last batch
+        """
+
+        if len(self.render_summary) == 0:
+            print 'No figures have been rendered yet'
+            return
+
+        rs = self.render_summary
+        print '-'*50
+        print '    Rendered {0} figures with {1} processes'.format(
+                                                          rs['n_figures'],
+                                                          rs['n_processes'])
+        print '    wall time        = {0:.2f} s'.format(rs['wall_time'])
+        print '    total plot time  = {0:.2f} s'.format(rs['render_time'])
+        print '    mean per figure  = {0:.3f} s'.format(rs['mean_time'])
+        print '    max per figure   = {0:.3f} s'.format(rs['max_time'])
+        print '-'*50
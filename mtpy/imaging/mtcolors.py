@@ -462,6 +462,155 @@ def get_plot_color(colorx, comp, cmap, ckmin=None, ckmax=None, bounds=None):
     else:
         raise NameError('color key '+comp+' not supported')
     
+#==============================================================================
+# colors for whole arrays, used to color collections in one go
+#==============================================================================
+def _get_piecewise_colors(cvar, piece_list):
+    """
+    evaluate a piecewise color map for an array of cvar.  piece_list is a 
+    list of (condition, (r, g, b)) in the order of the if statements of the 
+    single value functions, the first condition that is True is used.  
+    Values that match no condition are white.
+    """
+    
+    rgb_array = np.ones((cvar.shape[0], 3))
+    for condition, rgb in reversed(piece_list):
+        for ii in range(3):
+            rgb_array[condition, ii] = np.broadcast_to(rgb[ii], 
+                                                       cvar.shape)[condition]
+            
+    rgb_array[np.isfinite(rgb_array) == False] = 1.
+    
+    return rgb_array
+    
+def get_colors(cvar, cmap):
+    """
+    gets the colors to plot for an array of values for the given color map,
+    same as get_color for each value.
+    
+    Returns:
+    ----------
+        **rgb_array** : np.ndarray(n, 3) of rgb colors or None if the color 
+                        map is not supported
+    """
+    
+    c = np.atleast_1d(np.asarray(cvar, dtype='float'))
+    ac = np.abs(c)
+    with np.errstate(invalid='ignore'):
+        cneg = (c < 0) & (c > -1)
+        cpos = (c >= 0) & (c < 1)
+        cmin = c <= -1
+        cmax = c >= 1
+        
+        if cmap == 'mt_yl2rd':
+            pieces = [(cmax, (1, 0, 0)), 
+                      (c <= 0, (1, 1, 0)), 
+                      (c == c, (1, 1-ac, .1))]
+            
+        elif cmap == 'mt_wh2bl':
+            pieces = [(cmax, (0, 0, 1)), 
+                      (c <= 0, (1, 1, 1)), 
+                      (c == c, (1-ac, 1-ac, 1))]
+                      
+        elif cmap == 'mt_wh2or':
+            pieces = [(cmax, (1, .5, 0)), 
+                      (c <= 0, (1, 1, 1)), 
+                      (c == c, (1, ac*.5+.5, ac))]
+            
+        elif cmap == 'mt_bl2wh2rd' or cmap == 'mt_seg_bl2wh2rd':
+            pieces = [(cneg, (1+c, 1+c, 1)), 
+                      (cmin, (0, 0, 1)), 
+                      (cpos, (1, 1-c, 1-c)), 
+                      (cmax, (1, 0, 0))]
+                      
+        elif cmap == 'mt_bl2yl2rd':
+            pieces = [(cneg, (1+c, 1+c, -c)), 
+                      (cmin, (0, 0, 1)), 
+                      (cpos, (1, 1-c, .01)), 
+                      (cmax, (1, 0, 0))]
+            
+        elif cmap == 'mt_bl2gr2rd':
+            pieces = [(cneg, (1+c, 1+c/2, 1)), 
+                      (cmin, (0, 0, 1)), 
+                      (cpos, (1, 1-c/2, 1-c)), 
+                      (cmax, (1, 0, 0))]
+            
+        elif cmap == 'mt_rd2gr2bl':
+            pieces = [(cneg, (1, 1+c/2, 1+c)), 
+                      (cmin, (1, 0, 0)), 
+                      (cpos, (1-c, 1-c/2, 1)), 
+                      (cmax, (0, 0, 1))]
+            
+        elif cmap == 'mt_rd2wh2bl':
+            pieces = [(cneg, (1, 1+c/3, 1+c)), 
+                      (cmin, (1, 0, 0)), 
+                      (cpos, (1-c, 1-c/3, 1)), 
+                      (cmax, (0, 0, 1))]
+            
+        elif cmap == 'mt_rd2wh2bl_r':
+            pieces = [((c < 0) & (c > -.5), (1.6*c+1, 1.4*c+1, .5*c+1)),
+                      (cmin, (.2, .3, .5)),
+                      ((c >= 0) & (c < .5), (1, -1.2*c+1, -2*c+1)),
+                      ((c >= .5) & (c < 1), (-c+1.5, -.6*c+.6, 0)),
+                      (cmax, (.5, 0, 0)),
+                      ((c < -.5) & (c > -1), (.2, .3, 1.5+c))]
+        else:
+            print 'Color map: {0} is not supported yet.'.format(cmap)
+            return None
+        
+    return _get_piecewise_colors(c, pieces)
+    
+def get_plot_colors(colorx, comp, cmap, ckmin=None, ckmax=None, bounds=None):
+    """
+    gets the colors for an array of values of the given component, same as
+    get_plot_color for each value but computed for the whole array at once
+    so a collection can be colored in one go.
+    
+    Returns:
+    ----------
+        **rgb_array** : np.ndarray(n, 3) of rgb colors 
+    """
+    
+    colorx = np.atleast_1d(np.asarray(colorx, dtype='float'))
+    
+    if comp == 'phimin' or comp == 'phimax' or comp == 'phidet' or \
+       comp == 'ellipticity' or comp == 'geometric_mean':
+        if ckmin is None or ckmax is None:
+            raise IOError('Need to input min and max values for plotting')
+        
+        cvar = (colorx-ckmin)/(ckmax-ckmin)
+        if cmap == 'mt_bl2wh2rd' or cmap == 'mt_bl2yl2rd' or \
+           cmap == 'mt_bl2gr2rd' or cmap == 'mt_rd2gr2bl' or \
+           cmap == 'mt_rd2wh2bl' or cmap == 'mt_rd2wh2bl_r':
+            cvar = 2*cvar-1
+            
+        return get_colors(cvar, cmap)
+
+    elif comp == 'skew' or comp == 'normalized_skew':
+        cvar = 2*colorx/(ckmax-ckmin) 
+        
+        return get_colors(cvar, cmap)
+        
+    elif comp == 'skew_seg' or comp == 'normalized_skew_seg':
+        if bounds is None:
+            raise IOError('Need to input bounds for segmented colormap')
+        
+        bounds = np.asarray(bounds, dtype='float')
+        bb = np.clip(np.searchsorted(bounds, colorx, side='right')-1, 0, 
+                     bounds.shape[0]-1)
+        cvar = bounds[bb]/bounds.max()
+        
+        with np.errstate(invalid='ignore'):
+            #if the skew is extremely negative make it blue
+            cvar[colorx < bounds[0]] = -1.0
+            #if skew is extremely positive make it red
+            cvar[colorx >= bounds[-1]] = 1.0
+        
+        return get_colors(cvar, cmap)
+        
+    else:
+        raise NameError('color key '+comp+' not supported')
+    
 def cmap_discretize(cmap, N):
     """Return a discrete colormap from the continuous colormap cmap.
       
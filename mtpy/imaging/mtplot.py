@@ -18,6 +18,8 @@ plot_multiple_mt_responses    plots multiple stations at once with options
                               of plotting in single figure, all in one
                               figure as subplots or all in one plot for
                               direct comparison.                              
+save_multiple_mt_responses    renders each station into its own figure file
+                              headless across a pool of processes.
 plot_pt                       plots the phase tensor ellipses and parameters
                               in one plot including strike angle, minimum
                               and maximum phase, skew angle and ellipticity                           
@@ -99,8 +101,8 @@ import mtpy.imaging.plotstrike as plotstrike
 import mtpy.imaging.plotstations as plotstations
 import mtpy.imaging.plotresidualptmaps as plotresidualptmaps
 import mtpy.imaging.plotresidualptps as plotresidualptps
-reload(plotpt)
-reload(plotptmaps)
+import mtpy.imaging.batchplot as batchplot
+import os
 
 #==============================================================================
 
@@ -121,6 +123,48 @@ def plot_multiple_mt_responses(**kwargs):
     
     return plotnresponses.PlotMultipleResponses(**kwargs)
 
+def save_multiple_mt_responses(fn_list, save_path, fig_format='png', 
+                               fig_dpi=300, n_processes=None, **kwargs):
+    """
+    render the MT response of each station into its own figure and save it
+    to save_path/station_response.fig_format.  
+    
+    The figures are rendered headless across a pool of processes with 
+    mtpy.imaging.batchplot.BatchPlot, each worker only reads the .edi files 
+    it plots.  Key words are passed to plotresponse.PlotResponse.
+    
+    Returns a list of saved figures in the same order as fn_list.
+    
+    :Example: ::
+    
+        >>> import mtpy.imaging.mtplot as mtplot
+        >>> fig_list = mtplot.save_multiple_mt_responses(edilst, 
+        >>> ...                                          r"/home/MT/Figures",
+        >>> ...                                          plot_tipper='yr',
+        >>> ...                                          n_processes=4)
+    """
+    
+    if not os.path.exists(save_path):
+        os.mkdir(save_path)
+        
+    job_list = []
+    for fn in fn_list:
+        attr_dict = dict(kwargs)
+        attr_dict['fn'] = fn
+        station = os.path.splitext(os.path.basename(fn))[0]
+        job_list.append((os.path.join(save_path, 
+                                      '{0}_response.{1}'.format(station, 
+                                                                fig_format)),
+                         attr_dict,
+                         None))
+                         
+    batch = batchplot.BatchPlot(plot_class=plotresponse.PlotResponse,
+                                n_processes=n_processes,
+                                savefig_kwargs={'dpi':fig_dpi,
+                                                'format':fig_format})
+                                
+    return batch.render(job_list)
+
 def plot_pt(**kwargs):           
     """
     plots the phase tensor ellipses along with the strike, minimum phase,
@@ -20,7 +20,11 @@ import mtpy.analysis.pt as mtpt
 import mtpy.analysis.zinvariants as mtinv
 import mtpy.utils.exceptions as mtex
 import mtpy.utils.conversions as utm2ll
-import matplotlib.mlab as mlab
+import mtpy.utils.lazyimport as lazyimport
+
+mcollections = lazyimport.lazy_import('matplotlib.collections')
+spatial = lazyimport.lazy_import('scipy.spatial')
+sparse = lazyimport.lazy_import('scipy.sparse')
 
 #==============================================================================
 
@@ -374,7 +378,7 @@ class ResPhase(object):
         
         
         #check to make sure they are the same size
-        if self.res != None or self.phase != None:
+        if self.res is not None or self.phase is not None:
             if self.res.shape != self.phase.shape:
                 raise mtex.MTpyError_Z('res_array and phase_array '+\
                                                'are not the same shape')
@@ -389,7 +393,7 @@ class ResPhase(object):
                                                 'compute z.')
                 self._Z.freq = 1./period
         
-        if self._Z.freq == None:
+        if self._Z.freq is None:
             if period is not None:
                 self._Z.freq = 1./period
             else:
@@ -752,7 +756,7 @@ class MTplot(object):
         #if a z_object is input make it the attribute _Z
         if z_object is not None:
             self._Z = z_object
-            if z_object.freq == None:
+            if z_object.freq is None:
                 raise mtex.MTpyError_Z('Need to set Z.freq to an'+\
                                            ' array that cooresponds to Z.z')
             self.period = 1./z_object.freq
@@ -760,7 +764,7 @@ class MTplot(object):
         #if z_array is input
         elif z is not None:
             #make sure period is input for plotting
-            if self.period == None:
+            if self.period is None:
                 raise mtex.MTpyError_Z('Need to input period array to '+\
                                             'compute Resistivity')
                                
@@ -787,7 +791,7 @@ class MTplot(object):
         
             
         #--> if resistivity and phase are given set the z_array, z_err_array
-        if res_array != None and phase_array != None:
+        if res_array is not None and phase_array is not None:
             if period is None and freq is None:
                 raise mtex.MTpyError_Z('Need to input period array for '+\
                                            'plotting')
@@ -821,7 +825,7 @@ class MTplot(object):
         self._Z = edi1.Z
         
         # tipper and error
-        if edi1.Tipper.tipper == None:
+        if edi1.Tipper.tipper is None:
             self._set_tipper(np.zeros((self._Z.z.shape[0], 1, 2),
                                      dtype='complex'))
             self._set_tippererr(np.zeros((self._Z.z.shape[0], 1, 2)))
@@ -1606,18 +1610,218 @@ def get_station_locations(mt_list, map_scale='latlon', ref_point=(0,0)):
 #==============================================================================
 # grid data onto a map view
 #==============================================================================
+class GridInterpolator(object):
+    """
+    Linear interpolation of scattered points onto a regular grid.
+    
+    The Delaunay triangulation of the points and the barycentric weights of
+    every grid node are computed once and kept as a sparse matrix of shape
+    (number of grid nodes, number of points), so each quantity that is
+    gridded afterwards costs a single sparse matrix-vector product.  Grid
+    nodes outside the convex hull of the points are masked, the same as
+    matplotlib.mlab.griddata(interp='linear').
+    
+    Arguments:
+    -----------
+        **x**: np.ndarray(n)
+               x-coordinates of the points
+               
+        **y**: np.ndarray(n)
+               y-coordinates of the points
+               
+        **xi**: np.ndarray(nx)
+                x-coordinates of the grid, *default* is None, which makes nx
+                evenly spaced values from x.min() to x.max()
+                
+        **yi**: np.ndarray(ny)
+                y-coordinates of the grid, *default* is None, which makes ny
+                evenly spaced values from y.min() to y.max()
+                
+        **nx**: int
+                number of cells in the x-direction if xi is None.
+                *default* is 2 times the number of points
+                
+        **ny**: int
+                number of cells in the y-direction if yi is None.
+                *default* is 2 times the number of points
+                
+    ===================== =====================================================
+    Attributes            Description    
+    ===================== =====================================================
+    xi                    x-coordinates of the grid (nx)
+    yi                    y-coordinates of the grid (ny)
+    xg                    x-coordinates of the grid nodes (ny, nx)
+    yg                    y-coordinates of the grid nodes (ny, nx)
+    weights               sparse interpolation matrix (ny*nx, n)
+    mask                  boolean array (ny, nx), True outside the data
+    ===================== =====================================================
+    
+    :Example: ::
+        
+        >>> import mtpy.imaging.mtplottools as mtpl
+        >>> grid_interp = mtpl.GridInterpolator(x, y, nx=100, ny=100)
+        >>> res_grid = grid_interp.interpolate(res)
+        >>> phase_grid = grid_interp.interpolate(phase)
+    """
+    
+    def __init__(self, x, y, xi=None, yi=None, nx=None, ny=None):
+        self.x = np.asarray(x, dtype=np.float)
+        self.y = np.asarray(y, dtype=np.float)
+        
+        if self.x.shape != self.y.shape:
+            raise mtex.MTpyError_inputarguments('x and y need to be the '
+                                                'same shape')
+        
+        if xi is None:
+            if nx is None:
+                nx = 2*len(self.x)
+            xi = np.linspace(self.x.min(), self.x.max(), num=nx, 
+                             endpoint=True)
+        if yi is None:
+            if ny is None:
+                ny = 2*len(self.y)
+            yi = np.linspace(self.y.min(), self.y.max(), num=ny, 
+                             endpoint=True)
+            
+        self.xi = np.asarray(xi, dtype=np.float)
+        self.yi = np.asarray(yi, dtype=np.float)
+        self.xg, self.yg = np.meshgrid(self.xi, self.yi)
+        
+        self.weights = None
+        self.mask = None
+        
+        self._compute_weights()
+        
+    def _compute_weights(self):
+        """
+        triangulate the points and get the barycentric weights of the grid
+        nodes with respect to the triangle they fall in.
+        """
+        
+        n_points = len(self.x)
+        grid_points = np.c_[self.xg.ravel(), self.yg.ravel()]
+        n_grid = grid_points.shape[0]
+        
+        tri = spatial.Delaunay(np.c_[self.x, self.y])
+        simplex = tri.find_simplex(grid_points)
+        inside = simplex >= 0
+        
+        # affine transform of each triangle gives the first two barycentric
+        # coordinates, the third is what is left over
+        transform = tri.transform[simplex[inside]]
+        bary = np.einsum('ijk,ik->ij', transform[:, :2, :], 
+                         grid_points[inside]-transform[:, 2, :])
+        bary = np.c_[bary, 1-bary.sum(axis=1)]
+        
+        rows = np.repeat(np.nonzero(inside)[0], 3)
+        columns = tri.simplices[simplex[inside]].ravel()
+        self.weights = sparse.csr_matrix((bary.ravel(), (rows, columns)),
+                                         shape=(n_grid, n_points))
+        self.mask = np.invert(inside).reshape(self.xg.shape)
+        
+    def interpolate(self, data_array):
+        """
+        interpolate values at the points onto the grid.
+        
+        Arguments:
+        -----------
+            **data_array**: np.ndarray(n) or np.ndarray(n, m)
+                            values at the points, m quantities can be 
+                            gridded at once.
+                            
+        Returns:
+        ---------
+            **grid_array**: np.ma.MaskedArray(ny, nx) or (ny, nx, m)
+                            values on the grid, masked outside of the 
+                            convex hull of the points
+        """
+        
+        data_array = np.asarray(data_array)
+        if data_array.shape[0] != self.weights.shape[1]:
+            raise mtex.MTpyError_inputarguments('data_array needs to have '
+                                    '{0} values'.format(self.weights.shape[1]))
+                                    
+        grid_array = self.weights.dot(data_array)
+        grid_array = grid_array.reshape(self.xg.shape+data_array.shape[1:])
+        
+        mask = self.mask
+        if data_array.ndim > 1:
+            mask = np.repeat(mask[:, :, np.newaxis], 
+                             np.prod(data_array.shape[1:]), 
+                             axis=2).reshape(grid_array.shape)
+            
+        return np.ma.masked_array(grid_array, mask=mask)
+        
+#--> interpolators are kept by the geometry they were built for
+_grid_cache = {}
+_grid_cache_keys = []
+_grid_cache_size = 16
+
+def get_grid_interpolator(x, y, xi=None, yi=None, nx=None, ny=None):
+    """
+    Get a GridInterpolator for the given points and grid, from the cache
+    if one was already built for the same geometry.
+    
+    A different set of stations, or the same stations at different 
+    locations, is a different geometry and builds a new interpolator, the 
+    oldest interpolators are dropped once there are more than 16.  Use
+    clear_grid_cache to drop all of them.
+    
+    Arguments are the same as GridInterpolator.
+    
+    Returns:
+    ---------
+        **grid_interp**: GridInterpolator
+    """
+    
+    x = np.asarray(x, dtype=np.float)
+    y = np.asarray(y, dtype=np.float)
+    key = (x.tostring(), y.tostring(), 
+           None if xi is None else np.asarray(xi, dtype=np.float).tostring(),
+           None if yi is None else np.asarray(yi, dtype=np.float).tostring(),
+           nx, ny)
+            
+    try:
+        return _grid_cache[key]
+    except KeyError:
+        pass
+        
+    grid_interp = GridInterpolator(x, y, xi=xi, yi=yi, nx=nx, ny=ny)
+    
+    _grid_cache[key] = grid_interp
+    _grid_cache_keys.append(key)
+    while len(_grid_cache_keys) > _grid_cache_size:
+        del _grid_cache[_grid_cache_keys.pop(0)]
+        
+    return grid_interp
+    
+def clear_grid_cache():
+    """
+    drop all cached grid interpolators, for instance after the station 
+    locations have been edited in place.
+    """
+    
+    _grid_cache.clear()
+    del _grid_cache_keys[:]
+    
 def grid_data(data_array, x, y, nx=None, ny=None):
     """
     Project data onto a regular grid for plotting.
     
+    The data are linearly interpolated on a Delaunay triangulation of the
+    points, which is cached so that gridding several quantities on the same
+    points only triangulates once, see get_grid_interpolator.
     
     Arguments:
     -----------
-        **data_array**: np.ndarray (len(x), len(y))
+        **data_array**: np.ndarray(len(x)) or np.ndarray(len(x), m)
                         array of data values to be gridded
                         
         **x**: np.ndarray(len(x))
-               array of values that coorespond  
+               array of x locations of the data values
+               
+        **y**: np.ndarray(len(x))
+               array of y locations of the data values
     
         **nx**: int
                 number of cells in the x-direction.  If none, 2 times the 
@@ -1629,33 +1833,24 @@ def grid_data(data_array, x, y, nx=None, ny=None):
                 
     Returns:
     ---------
-        **grid_array**: np.ndarray(nx, ny)
-                        array of data set on a regular grid
+        **grid_array**: np.ma.MaskedArray(ny, nx)
+                        array of data set on a regular grid, masked outside
+                        of the data
         
-        **xg**: np.ndarray(nx, ny)
+        **xg**: np.ndarray(ny, nx)
                 array of x-grid values
                 
-        **yg**: np.ndarray(nx, ny)
+        **yg**: np.ndarray(ny, nx)
                 array of y-grid values
                 
         
     """
     
-    if nx is None:
-        nx = 2*len(x)
-        
-    if ny is None:
-        ny = 2*len(y)
-     
-    #create evenly spaced intervals to grid over
-    xi = np.linspace(x.min(), x.max(), num=nx, endpoint=True)
-    yi = np.linspace(y.min(), y.max(), num=ny, endpoint=True)
-    
-    xg, yg = np.meshgrid(xi, yi)
+    grid_interp = get_grid_interpolator(x, y, nx=nx, ny=ny)
 
-    grid_array = mlab.griddata(x, y, data_array, xg, yg)        
+    grid_array = grid_interp.interpolate(data_array)
     
-    return grid_array, xg, yg
+    return grid_array, grid_interp.xg, grid_interp.yg
     
     
 
@@ -2172,4 +2367,196 @@ def plot_errorbar(ax, x_array, y_array, y_error=None, x_error=None,
                                   elinewidth=lw,
                                   capsize=e_capsize,
                                   capthick=e_capthick)
-    return errorbar_object
\ No newline at end of file
+    return errorbar_object
+
+#==============================================================================
+# collections of ellipses and arrows
+#==============================================================================
+def get_arrow_vertices(x, y, dx, dy, width=0.001, head_width=None, 
+                       head_length=None):
+    """
+    get the outlines of arrows for arrays of start points and lengths, the 
+    outline is the same as matplotlib.patches.FancyArrow with 
+    length_includes_head=False, the way ax.arrow draws an arrow.
+    
+    Arguments:
+    ------------
+        **x, y** : np.ndarray(n)
+                   start of the arrows
+                   
+        **dx, dy** : np.ndarray(n)
+                     length of the arrows in x and y, not including the head
+                     
+        **width** : float
+                    width of the arrow tail
+                    
+        **head_width** : float
+                         width of the arrow head, *default* is 3*width
+                         
+        **head_length** : float
+                          length of the arrow head, *default* is 
+                          1.5*head_width
+                          
+    Returns:
+    ----------
+        **vertices** : np.ndarray(n, 8, 2)
+                       outline of each arrow
+    """
+    
+    if head_width is None:
+        head_width = 3*width
+    if head_length is None:
+        head_length = 1.5*head_width
+        
+    x, y, dx, dy = [np.atleast_1d(np.asarray(arr, dtype='float'))
+                    for arr in (x, y, dx, dy)]
+    n_arrows = x.shape[0]
+    
+    distance = np.hypot(dx, dy)
+    length = distance+head_length
+    
+    hw, hl, lw = head_width, head_length, width
+    
+    #horizontal arrow pointing at (0, 0), shifted up by the head length
+    coords = np.zeros((n_arrows, 8, 2))
+    coords[:, :, 0] = hl
+    coords[:, 1, :] += [-hl, -hw/2.]
+    coords[:, 2, :] += [-hl, -lw/2.]
+    coords[:, 3, 1] = -lw/2.
+    coords[:, 4, 1] = lw/2.
+    coords[:, 5, :] += [-hl, lw/2.]
+    coords[:, 6, :] += [-hl, hw/2.]
+    coords[:, 3:5, 0] -= length[:, np.newaxis]
+    
+    #rotate into the direction of the arrow
+    cx = np.zeros(n_arrows)
+    sx = np.ones(n_arrows)
+    nonzero = distance != 0
+    cx[nonzero] = dx[nonzero]/distance[nonzero]
+    sx[nonzero] = dy[nonzero]/distance[nonzero]
+    
+    vertices = np.zeros_like(coords)
+    vertices[:, :, 0] = coords[:, :, 0]*cx[:, np.newaxis]-\
+                        coords[:, :, 1]*sx[:, np.newaxis]
+    vertices[:, :, 1] = coords[:, :, 0]*sx[:, np.newaxis]+\
+                        coords[:, :, 1]*cx[:, np.newaxis]
+    vertices[:, :, 0] += (x+dx)[:, np.newaxis]
+    vertices[:, :, 1] += (y+dy)[:, np.newaxis]
+    
+    return vertices
+    
+def plot_arrows(ax, x, y, dx, dy, color='k', lw=1, width=0.001, 
+                head_width=None, head_length=None, edgecolor=None, **kwargs):
+    """
+    plot many arrows as one matplotlib.collections.PolyCollection, looks the
+    same as calling ax.arrow for each arrow but is drawn as a single artist.
+    
+    Arguments:
+    ------------
+        **ax** : matplotlib.axes instance
+        
+        **x, y, dx, dy** : np.ndarray(n)
+                           start and length of the arrows in data units
+                           
+        **color** : color or list of colors for the arrows
+        
+        **lw** : line width of the outline
+        
+        **edgecolor** : color or list of colors of the outline, *default* is
+                        color
+        
+        **width, head_width, head_length** : see get_arrow_vertices
+        
+        other keywords are passed on to PolyCollection
+        
+    Returns:
+    ----------
+        **arrow_collection** : matplotlib.collections.PolyCollection
+                               None if there are no arrows
+    """
+    
+    vertices = get_arrow_vertices(x, y, dx, dy, width=width, 
+                                  head_width=head_width, 
+                                  head_length=head_length)
+                                  
+    #arrows with nan values are not drawn by ax.arrow either
+    finite = np.isfinite(vertices).all(axis=2).all(axis=1)
+    if finite.sum() == 0:
+        return None
+    if finite.all() == False:
+        vertices = vertices[finite]
+        if type(color) is list:
+            color = [cc for cc, ff in zip(color, finite) if ff]
+        if type(edgecolor) is list:
+            edgecolor = [cc for cc, ff in zip(edgecolor, finite) if ff]
+        
+    if edgecolor is None:
+        edgecolor = color
+        
+    arrow_collection = mcollections.PolyCollection(vertices, 
+                                                   facecolors=color,
+                                                   edgecolors=edgecolor,
+                                                   linewidths=lw,
+                                                   **kwargs)
+    #same line joins as a patch
+    arrow_collection.set_joinstyle('miter')
+    arrow_collection.set_capstyle('butt')
+    ax.add_collection(arrow_collection, autolim=False)
+    
+    return arrow_collection
+    
+def plot_ellipses(ax, x, y, width, height, angle, facecolors, **kwargs):
+    """
+    plot many ellipses as one matplotlib.collections.EllipseCollection, 
+    looks the same as adding a matplotlib.patches.Ellipse for each but is 
+    drawn as a single artist.
+    
+    Arguments:
+    ------------
+        **ax** : matplotlib.axes instance
+        
+        **x, y** : np.ndarray(n)
+                   centers of the ellipses in data units
+                   
+        **width, height** : np.ndarray(n)
+                            full lengths of the axes in data units
+                            
+        **angle** : np.ndarray(n)
+                    rotation in degrees counter clockwise
+                    
+        **facecolors** : np.ndarray(n, 3) or list of colors
+        
+        other keywords are passed on to EllipseCollection
+        
+    Returns:
+    ----------
+        **ellipse_collection** : matplotlib.collections.EllipseCollection
+                                 None if there are no ellipses
+    """
+    
+    x, y, width, height, angle = [np.atleast_1d(np.asarray(arr, 
+                                                           dtype='float'))
+                                  for arr in (x, y, width, height, angle)]
+                                  
+    #ellipses with nan values are not drawn as patches either
+    finite = np.isfinite(x) & np.isfinite(y) & np.isfinite(width) & \
+             np.isfinite(height) & np.isfinite(angle)
+    if finite.sum() == 0:
+        return None
+    if finite.all() == False:
+        x, y, width, height, angle = [arr[finite] for arr in 
+                                      (x, y, width, height, angle)]
+        facecolors = np.asarray(facecolors)
+        if facecolors.ndim == 2 and facecolors.shape[0] == finite.shape[0]:
+            facecolors = facecolors[finite]
+        
+    offsets = np.column_stack((x, y))
+    ellipse_collection = mcollections.EllipseCollection(width, height, angle,
+                                                  units='xy', 
+                                                  offsets=offsets,
+                                                  transOffset=ax.transData,
+                                                  facecolors=facecolors,
+                                                  **kwargs)
+    ax.add_collection(ellipse_collection, autolim=False)
+    
+    return ellipse_collection
@@ -11,13 +11,11 @@ import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib.ticker import MultipleLocator
 import matplotlib.colors as colors
-import matplotlib.patches as patches
 import matplotlib.colorbar as mcb
 import matplotlib.gridspec as gridspec
 import mtpy.imaging.mtplottools as mtpl
 import mtpy.imaging.mtcolors as mtcl
 from mtpy.imaging.plotresponse import PlotResponse as plotresponse
-reload(mtpl)
 
 #============================================================================
 
@@ -891,44 +889,41 @@ class PlotMultipleResponses(mtpl.MTArrows, mtpl.MTEllipse):
                     tiplist = []
                     tiplabel = []
                     
-                    for aa in range(nt):
-                        xlenr = txr[aa]*mt.period[aa]
-                        xleni = txi[aa]*mt.period[aa]
+                    #arrows for each period, real and imaginary interleaved
+                    #as (x, y, dx, dy) and plotted as one collection
+                    arrows = np.zeros((nt, 2, 4))
+                    arrows[:, :, 0] = np.log10(mt.period[0:nt])[:, np.newaxis]
+                    arrows[:, 0, 2] = txr*mt.period[0:nt]
+                    arrows[:, 0, 3] = tyr
+                    arrows[:, 1, 2] = txi*mt.period[0:nt]
+                    arrows[:, 1, 3] = tyi
+                    plot_ri = [self._plot_tipper.find('r')>0,
+                               self.plot_tipper.find('i')>0]
+                    arrow_colors = [self.arrow_color_real,
+                                    self.arrow_color_imag]
+                    arrow_colors = [arrow_colors[rr] for rr in range(2)
+                                    if plot_ri[rr]]*nt
+                    arrows = arrows[:, np.array(plot_ri), :].reshape(-1, 4)
+                    mtpl.plot_arrows(axt,
+                                     arrows[:, 0],
+                                     arrows[:, 1],
+                                     arrows[:, 2],
+                                     arrows[:, 3],
+                                     color=arrow_colors,
+                                     lw=self.arrow_lw,
+                                     head_width=self.arrow_head_width,
+                                     head_length=self.arrow_head_length)
                          
-                        #--> plot real arrows
-                        if self._plot_tipper.find('r')>0:
-                            axt.arrow(np.log10(mt.period[aa]),
-                                       0,
-                                       xlenr,
-                                       tyr[aa],
-                                       lw=self.arrow_lw,
-                                       facecolor=self.arrow_color_real,
-                                       edgecolor=self.arrow_color_real,
-                                       head_width=self.arrow_head_width,
-                                       head_length=self.arrow_head_length,
-                                       length_includes_head=False)
-                            
-                            if aa == 0:
-                                line1 = axt.plot(0, 0, self.arrow_color_real)
-                                tiplist.append(line1[0])
-                                tiplabel.append('real')
+                    if nt > 0:
+                        if plot_ri[0]:
+                            line1 = axt.plot(0, 0, self.arrow_color_real)
+                            tiplist.append(line1[0])
+                            tiplabel.append('real')
                                            
-                        #--> plot imaginary arrows
-                        if self.plot_tipper.find('i')>0:               
-                            axt.arrow(np.log10(mt.period[aa]),
-                                       0,
-                                       xleni,
-                                       tyi[aa],
-                                       facecolor=self.arrow_color_imag,
-                                       edgecolor=self.arrow_color_imag,
-                                       lw=self.arrow_lw,
-                                       head_width=self.arrow_head_width,
-                                       head_length=self.arrow_head_length,
-                                       length_includes_head=False)
-                            if aa == 0:              
-                                line2 = axt.plot(0, 0, self.arrow_color_imag)
-                                tiplist.append(line2[0])
-                                tiplabel.append('imag')
+                        if plot_ri[1]:
+                            line2 = axt.plot(0, 0, self.arrow_color_imag)
+                            tiplist.append(line2[0])
+                            tiplabel.append('imag')
                         
                     #make a line at 0 for reference
                     axt.plot(mt.period, [0]*nt, 'k', lw=.5)
@@ -1200,44 +1195,35 @@ class PlotMultipleResponses(mtpl.MTArrows, mtpl.MTEllipse):
                         raise NameError(self.ellipse_colorby+' is not supported')
                  
                     #-------------plot ellipses-----------------------------------
-                    for kk, ff in enumerate(mt.period):
-                        #make sure the ellipses will be visable
-                        eheight = pt.phimin[0][kk]/pt.phimax[0][kk]*\
-                                                             self.ellipse_size
-                        ewidth = pt.phimax[0][kk]/pt.phimax[0][kk]*\
-                                                             self.ellipse_size
-                    
-                        #create an ellipse scaled by phimin and phimax and 
-                        #oriented along the azimuth which is calculated as 
-                        #clockwise but needs to be plotted counter-clockwise
-                        #hence the negative sign.
-                        ellipd = patches.Ellipse((np.log10(ff)*\
-                                                  self.ellipse_spacing,
-                                                  0),
-                                                 width=ewidth,
-                                                 height=eheight,
-                                                 angle=90-pt.azimuth[0][kk])
-                                                 
-                        axpt.add_patch(ellipd)
-                        
-                    
-                        #get ellipse color
-                        if cmap.find('seg') > 0:
-                            ellipd.set_facecolor(mtcl.get_plot_color(
-                                                        colorarray[kk],
+                    #make sure the ellipses will be visable
+                    eheight = pt.phimin[0]/pt.phimax[0]*self.ellipse_size
+                    ewidth = pt.phimax[0]/pt.phimax[0]*self.ellipse_size
+                
+                    #get ellipse colors
+                    if cmap.find('seg') > 0:
+                        ellip_colors = mtcl.get_plot_colors(colorarray,
                                                         self.ellipse_colorby,
                                                         cmap,
                                                         ckmin,
                                                         ckmax,
-                                                        bounds=bounds))
-                        else:
-                            ellipd.set_facecolor(mtcl.get_plot_color(
-                                                        colorarray[kk],
+                                                        bounds=bounds)
+                    else:
+                        ellip_colors = mtcl.get_plot_colors(colorarray,
                                                         self.ellipse_colorby,
                                                         cmap,
                                                         ckmin,
-                                                        ckmax))
-                        
+                                                        ckmax)
+                                                        
+                    #ellipses scaled by phimin and phimax and oriented along
+                    #the azimuth which is calculated as clockwise but needs 
+                    #to be plotted counter-clockwise hence the negative sign.
+                    mtpl.plot_ellipses(axpt, 
+                                       np.log10(mt.period)*self.ellipse_spacing,
+                                       np.zeros(len(mt.period)),
+                                       ewidth,
+                                       eheight,
+                                       90-pt.azimuth[0],
+                                       ellip_colors)
                 
                     #----set axes properties-----------------------------------------------
                     #--> set tick labels and limits
@@ -1833,35 +1819,34 @@ class PlotMultipleResponses(mtpl.MTArrows, mtpl.MTEllipse):
                     
                     nt = len(txr)
                     
-                    for aa in range(nt):
-                        xlenr = txr[aa]*np.log10(mt.period[aa])
-                        xleni = txi[aa]*np.log10(mt.period[aa])
-                         
-                            
-                        #--> plot real arrows
-                        if self._plot_tipper.find('r') > 0:
-                            self.axt.arrow(np.log10(mt.period[aa]),
-                                           0,
-                                           xlenr,
-                                           tyr[aa],
-                                           lw=self.arrow_lw,
-                                           facecolor=ctipr[ii],
-                                           edgecolor=ctipr[ii],
-                                           head_width=self.arrow_head_width,
-                                           head_length=self.arrow_head_length,
-                                           length_includes_head=False)
-                            
-                                           
-                        #--> plot imaginary arrows
-                        if self._plot_tipper.find('i')>0:               
-                            self.axt.arrow(np.log10(mt.period[aa]),
-                                           0,
-                                           xleni,
-                                           tyi[aa],
-                                           lw=self.arrow_lw,
-                                           head_width=self.arrow_head_width,
-                                           head_length=self.arrow_head_length,
-                                           length_includes_head=False)
+                    #arrows for each period, real and imaginary interleaved
+                    #as (x, y, dx, dy) and plotted as one collection, the 
+                    #imaginary arrows have the default patch color
+                    arrows = np.zeros((nt, 2, 4))
+                    arrows[:, :, 0] = np.log10(mt.period[0:nt])[:, np.newaxis]
+                    arrows[:, 0, 2] = txr*np.log10(mt.period[0:nt])
+                    arrows[:, 0, 3] = tyr
+                    arrows[:, 1, 2] = txi*np.log10(mt.period[0:nt])
+                    arrows[:, 1, 3] = tyi
+                    plot_ri = [self._plot_tipper.find('r') > 0,
+                               self._plot_tipper.find('i') > 0]
+                    face_colors = [ctipr[ii], plt.rcParams['patch.facecolor']]
+                    edge_colors = [ctipr[ii], plt.rcParams['patch.edgecolor']]
+                    face_colors = [face_colors[rr] for rr in range(2)
+                                   if plot_ri[rr]]*nt
+                    edge_colors = [edge_colors[rr] for rr in range(2)
+                                   if plot_ri[rr]]*nt
+                    arrows = arrows[:, np.array(plot_ri), :].reshape(-1, 4)
+                    mtpl.plot_arrows(self.axt,
+                                     arrows[:, 0],
+                                     arrows[:, 1],
+                                     arrows[:, 2],
+                                     arrows[:, 3],
+                                     color=face_colors,
+                                     edgecolor=edge_colors,
+                                     lw=self.arrow_lw,
+                                     head_width=self.arrow_head_width,
+                                     head_length=self.arrow_head_length)
                         
                     lt = self.axt.plot(0, 0, lw=1, color=ctipr[ii])
                     tiplist.append(lt[0])
@@ -2005,40 +1990,37 @@ class PlotMultipleResponses(mtpl.MTArrows, mtpl.MTEllipse):
                         raise NameError(self.ellipse_colorby+' is not supported')
                  
                     #-------------plot ellipses-----------------------------------
-                    for kk, ff in enumerate(mt.period):
-                        #make sure the ellipses will be visable
-                        eheight = pt.phimin[0][kk]/pt.phimax[0][kk]*\
-                                                                    self.ellipse_size
-                        ewidth = pt.phimax[0][kk]/pt.phimax[0][kk]*\
-                                                                    self.ellipse_size
-                    
-                        #create an ellipse scaled by phimin and phimax and oriented 
-                        #along the azimuth which is calculated as clockwise but needs 
-                        #to be plotted counter-clockwise hence the negative sign.
-                        ellipd = patches.Ellipse((np.log10(ff)*self.ellipse_spacing,
-                                                  ii*self.ellipse_size*1.5),
-                                                 width=ewidth,
-                                                 height=eheight,
-                                                 angle=90-pt.azimuth[0][kk])
-                                                 
-                        self.axpt.add_patch(ellipd)
-                        
-                    
-                        #get ellipse color
-                        if cmap.find('seg') > 0:
-                            ellipd.set_facecolor(mtcl.get_plot_color(colorarray[kk],
-                                                                 self.ellipse_colorby,
-                                                                 cmap,
-                                                                 ckmin,
-                                                                 ckmax,
-                                                                 bounds=bounds))
-                        else:
-                            ellipd.set_facecolor(mtcl.get_plot_color(colorarray[kk],
-                                                                 self.ellipse_colorby,
-                                                                 cmap,
-                                                                 ckmin,
-                                                                 ckmax))
-                        ellipd.set_edgecolor(cxy[ii])
+                    #make sure the ellipses will be visable
+                    eheight = pt.phimin[0]/pt.phimax[0]*self.ellipse_size
+                    ewidth = pt.phimax[0]/pt.phimax[0]*self.ellipse_size
+                
+                    #get ellipse colors
+                    if cmap.find('seg') > 0:
+                        ellip_colors = mtcl.get_plot_colors(colorarray,
+                                                        self.ellipse_colorby,
+                                                        cmap,
+                                                        ckmin,
+                                                        ckmax,
+                                                        bounds=bounds)
+                    else:
+                        ellip_colors = mtcl.get_plot_colors(colorarray,
+                                                        self.ellipse_colorby,
+                                                        cmap,
+                                                        ckmin,
+                                                        ckmax)
+                
+                    #ellipses scaled by phimin and phimax and oriented along 
+                    #the azimuth which is calculated as clockwise but needs 
+                    #to be plotted counter-clockwise hence the negative sign.
+                    mtpl.plot_ellipses(self.axpt, 
+                                       np.log10(mt.period)*self.ellipse_spacing,
+                                       np.repeat(ii*self.ellipse_size*1.5, 
+                                                 len(mt.period)),
+                                       ewidth,
+                                       eheight,
+                                       90-pt.azimuth[0],
+                                       ellip_colors,
+                                       edgecolors=cxy[ii])
                         
         
             
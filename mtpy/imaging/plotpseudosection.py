@@ -80,6 +80,16 @@ class PlotResPhasePseudoSection(object):
                 tolerance to extract periods relative to plot_period.
                 *default* is 0.1
                 
+        *grid_nx*: int
+                   number of cells in the offset direction for plot_style
+                   'interpolate'. *default* is None, 4 times the number of 
+                   stations
+                   
+        *grid_ny*: int
+                   number of cells in the period direction for plot_style
+                   'interpolate'. *default* is None, 4 times the number of
+                   periods
+                
         *imshow_interp*: [ 'none' | 'nearest' | 'bilinear' | 'bicubic' |
                            'spline16' | 'spline36' | 'hanning' | 'hamming' |
                            'hermite' | 'kaiser' | 'quadric' | 'catrom' |
@@ -126,7 +136,7 @@ class PlotResPhasePseudoSection(object):
                        is not input manually.  If there are same lengths, it
                        picks the first one it finds.
                        
-        *plot_style*: [ 'imshow' | 'pcolormesh' ]
+        *plot_style*: [ 'imshow' | 'pcolormesh' | 'interpolate' ]
                       type of gridding for the plot. 'imshow' plots the data
                       as an image and can be interpolated, though the image
                       is stretched to the station spacing and plot_period, the
@@ -134,6 +144,11 @@ class PlotResPhasePseudoSection(object):
                       a little skewed.  For an accurate location of resistivity
                       values use pcolormesh, which can plot the data on an 
                       irregular grid, but with no interpolation. 
+                      'interpolate' linearly interpolates the data at the 
+                      station offsets onto a regular grid of grid_nx by
+                      grid_ny before plotting as an image.  The interpolation
+                      weights are cached for the station geometry, see 
+                      mtplottools.get_grid_interpolator.
                       *default* is 'imshow'
                       
         *plot_xx*: [ 'y' | 'n' ]
@@ -282,6 +297,8 @@ class PlotResPhasePseudoSection(object):
         self.plot_yy = kwargs.pop('plot_yy', 'n')
         self.plot_style = kwargs.pop('plot_style', 'imshow')
         self.imshow_interp = kwargs.pop('imshow_interp', 'bicubic')
+        self.grid_nx = kwargs.pop('grid_nx', None)
+        self.grid_ny = kwargs.pop('grid_ny', None)
         self.plot_period = kwargs.pop('plot_period', None)
         
         #--> set plot limits
@@ -513,6 +530,49 @@ class PlotResPhasePseudoSection(object):
                     print 'did not find period {0:.6g} (s) for {1}'.format(
                                rper, self.station_list[ii])
         
+    def get_grid_arrays(self, array_list):
+        """
+        interpolate arrays of shape (num_periods, num_stations) from the 
+        station offsets and periods onto a regular grid in offset and 
+        log10(period).  The grid has the same period order as plot_period.
+        
+        The interpolation weights are computed once for the station 
+        geometry and each array is a single sparse matrix product.
+        
+        Arguments:
+        -----------
+            **array_list**: list of np.ndarray(nt, ns)
+                            arrays to grid, from get_rp_arrays
+                            
+        Returns:
+        ---------
+            **grid_list**: list of np.ma.MaskedArray(grid_ny, grid_nx)
+                           arrays on the regular grid
+        """
+        
+        ns = len(self.offset_list)
+        nt = len(self.plot_period)
+        
+        nx = self.grid_nx
+        if nx is None:
+            nx = 4*ns
+        ny = self.grid_ny
+        if ny is None:
+            ny = 4*nt
+            
+        x = np.tile(self.offset_list, nt)
+        y = np.repeat(np.log10(self.plot_period), ns)
+        grid_interp = mtpl.get_grid_interpolator(x, y, nx=nx, ny=ny)
+        
+        data_array = np.array([np.asarray(arr).ravel() for arr in array_list])
+        grid_array = grid_interp.interpolate(data_array.T)
+        
+        #keep the period order of plot_period for the image
+        if self.plot_period[0] > self.plot_period[-1]:
+            grid_array = grid_array[::-1]
+            
+        return [grid_array[:, :, ii] for ii in range(len(array_list))]
+        
     def plot(self):
         
         #--> set subplot spacing
@@ -709,7 +769,15 @@ class PlotResPhasePseudoSection(object):
             plt.show()
         
         #plot data as an image which can have interpolation
-        elif self.plot_style == 'imshow':   
+        elif self.plot_style in ['imshow', 'interpolate']:
+            #images of resistivity and phase for each component
+            image_list = [(tt[1], tt[2]) for tt in plist]
+            if self.plot_style == 'interpolate':
+                grid_list = self.get_grid_arrays([arr for tt in plist 
+                                                  for arr in tt[1:]])
+                image_list = [(grid_list[2*ii], grid_list[2*ii+1]) 
+                              for ii in range(len(plist))]
+                
             #make ticks simulate a log scale in the y direction
             #--> set major and minor ticks with appropriate labels 
             major_yticks = np.arange(np.ceil(np.log10(self.period_limits[0])),
@@ -730,7 +798,7 @@ class PlotResPhasePseudoSection(object):
                 axp = self.fig.add_subplot(gs[1, ii])
 
                 #plot apparent resistivity
-                axr.imshow(tt[1], 
+                axr.imshow(image_list[ii][0], 
                            cmap=self.res_cmap, 
                            vmin=self.res_limits[0], 
                            vmax=self.res_limits[1],
@@ -779,7 +847,7 @@ class PlotResPhasePseudoSection(object):
                     axr.set_ylabel('Period (s)', font_dict)
                 
                 #plot phase
-                axp.imshow(tt[2], 
+                axp.imshow(image_list[ii][1], 
                            cmap=self.phase_cmap, 
                            vmin=self.phase_limits[0],
                            vmax=self.phase_limits[1],
@@ -12,11 +12,9 @@ import numpy as np
 import os
 from matplotlib.ticker import MultipleLocator
 import matplotlib.colors as colors
-import matplotlib.patches as patches
 import matplotlib.colorbar as mcb
 import mtpy.imaging.mtcolors as mtcl
 import mtpy.imaging.mtplottools as mtpl
-reload(mtpl)
 #==============================================================================
 
 class PlotPhaseTensor(mtpl.MTEllipse):
@@ -302,55 +300,48 @@ class PlotPhaseTensor(mtpl.MTEllipse):
         self.ax1 = self.fig.add_subplot(3, 1, 1, aspect='equal')
         self._mt._period = 1./self._mt.freq
         
-        for ii, ff in enumerate(self._mt.period):
-            #make sure the ellipses will be visable
-            if self.pt.phimax[0][ii] != 0:
-              eheight = self.pt.phimin[0][ii]/self.pt.phimax[0][ii]*\
-                                                              self.ellipse_size
+        #make sure the ellipses will be visable
+        phimax = self.pt.phimax[0]
+        nonzero = phimax != 0
+        eheight = np.repeat(0.01*self.ellipse_size, len(phimax))
+        ewidth = np.repeat(0.01*self.ellipse_size, len(phimax))
+        eheight[nonzero] = self.pt.phimin[0][nonzero]/phimax[nonzero]*\
+                                                          self.ellipse_size
+        ewidth[nonzero] = self.ellipse_size
 
-              ewidth =  self.ellipse_size
+        #alternative scaling
+        # eheight = self.pt.phimin[0]/max(np.abs(self.pt.phimax[0]))*\
+        #                                                   self.ellipse_size
+        # ewidth = self.pt.phimax[0]/max(np.abs(self.pt.phimax[0]))*\
+        #                                                   self.ellipse_size
 
-            else:
-              #tiny instead of nothing
-              eheight = 0.01*self.ellipse_size
-              ewidth = 0.01*self.ellipse_size 
-
-            #ewidth = self.pt.phimax[0][ii]/self.pt.phimax[0][ii]*\
-            #                                                  self.ellipse_size
-
-            #alternative scaling
-            # eheight = self.pt.phimin[0][ii]/max(np.abs(self.pt.phimax[0]))*\
-            #                                                   self.ellipse_size
-            # ewidth = self.pt.phimax[0][ii]/max(np.abs(self.pt.phimax[0]))*\
-            #                                                   self.ellipse_size
-
-        
-            #create an ellipse scaled by phimin and phimax and oriented along
-            #the azimuth which is calculated as clockwise but needs to 
-            #be plotted counter-clockwise hence the negative sign.
-            ellipd = patches.Ellipse((np.log10(ff)*self.ellipse_spacing, 0),
-                                     width=ewidth,
-                                     height=eheight,
-                                     angle=90-self.pt.azimuth[0][ii])
-                                     
-            self.ax1.add_patch(ellipd)
-            
-        
-            #get ellipse color
-            if cmap.find('seg') > 0:
-                ellipd.set_facecolor(mtcl.get_plot_color(colorarray[ii],
-                                                         self.ellipse_colorby,
-                                                         cmap,
-                                                         ckmin,
-                                                         ckmax,
-                                                         bounds=bounds))
-            else:
-                ellipd.set_facecolor(mtcl.get_plot_color(colorarray[ii],
-                                                         self.ellipse_colorby,
-                                                         cmap,
-                                                         ckmin,
-                                                         ckmax))
-            
+        #get ellipse colors
+        if cmap.find('seg') > 0:
+            ellip_colors = mtcl.get_plot_colors(colorarray,
+                                                self.ellipse_colorby,
+                                                cmap,
+                                                ckmin,
+                                                ckmax,
+                                                bounds=bounds)
+        else:
+            ellip_colors = mtcl.get_plot_colors(colorarray,
+                                                self.ellipse_colorby,
+                                                cmap,
+                                                ckmin,
+                                                ckmax)
+    
+        #ellipses scaled by phimin and phimax and oriented along the azimuth
+        #which is calculated as clockwise but needs to be plotted 
+        #counter-clockwise hence the negative sign, all in one collection
+        nperiod = len(phimax)
+        mtpl.plot_ellipses(self.ax1, 
+                           np.log10(self._mt.period[0:nperiod])*\
+                                                     self.ellipse_spacing,
+                           np.zeros(nperiod),
+                           ewidth,
+                           eheight,
+                           90-self.pt.azimuth[0],
+                           ellip_colors)
     
         #----set axes properties-----------------------------------------------
         #--> set tick labels and limits
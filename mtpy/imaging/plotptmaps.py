@@ -668,8 +668,13 @@ class PlotPhaseTensorMaps(mtpl.MTArrows, mtpl.MTEllipse):
         elif self.mapscale == 'm' or self.mapscale == 'km':
             self.tickstrfmt = '%.0f'
         
-        #make some empty arrays
-        elliplist=[]
+        #make some empty arrays, ellipses and arrows are collected in lists
+        #of (x, y, width, height, angle, color value) and 
+        #(x, y, dx, dy, 0 for real or 1 for imaginary) and plotted as one 
+        #collection each after the loop
+        ellip_list = []
+        arrow_list = []
+        self.ellipse_collection = None
         latlist = np.zeros(len(self.mt_list))
         lonlist = np.zeros(len(self.mt_list))
         self.plot_xarr = np.zeros(len(self.mt_list))
@@ -807,32 +812,11 @@ class PlotPhaseTensorMaps(mtpl.MTArrows, mtpl.MTEllipse):
                     eheight = phimin*scaling
                     ewidth = phimax*scaling
                 
-                #make an ellipse
-                ellipd=patches.Ellipse((plotx,ploty),
-                                       width=ewidth,
-                                       height=eheight,
-                                       angle=90-eangle)
-                
-                #get ellipse color
-                if cmap.find('seg')>0:
-                    ellipd.set_facecolor(mtcl.get_plot_color(colorarray,
-                                                             self.ellipse_colorby,
-                                                             cmap,
-                                                             ckmin,
-                                                             ckmax,
-                                                             bounds=bounds))
-                else:
-                    ellipd.set_facecolor(mtcl.get_plot_color(colorarray,
-                                                             self.ellipse_colorby,
-                                                             cmap,
-                                                             ckmin,
-                                                             ckmax))
-                
-                #==> add ellipse to the plot
-                elliplist.append(ellipd)
-                self.ax.add_artist(ellipd)
+                #==> keep the ellipse, they are all plotted at once
+                ellip_list.append((plotx, ploty, ewidth, eheight, 
+                                   90-eangle, colorarray))
                         
-                #-----------Plot Induction Arrows---------------------------
+                #-----------Induction Arrows--------------------------------
                 if self.plot_tipper.find('y') == 0:
                     
                     #get tipper
@@ -846,7 +830,7 @@ class PlotPhaseTensorMaps(mtpl.MTArrows, mtpl.MTEllipse):
                     ascale = self.arrow_size
                     adir = self.arrow_direction*np.pi
                     
-                    #plot real tipper
+                    #real tipper
                     if self.plot_tipper == 'yri' or self.plot_tipper == 'yr':
                         if tip.mag_real[jj] <= self.arrow_threshold:
                             txr = tip.mag_real[jj]*ascale*\
@@ -854,20 +838,9 @@ class PlotPhaseTensorMaps(mtpl.MTArrows, mtpl.MTEllipse):
                             tyr=tip.mag_real[jj]*ascale*\
                                 np.cos((tip.ang_real[jj])*np.pi/180+adir)
         
-                            self.ax.arrow(plotx,
-                                          ploty,
-                                          txr,
-                                          tyr,
-                                          lw=self.arrow_lw,
-                                          facecolor=self.arrow_color_real,
-                                          edgecolor=self.arrow_color_real,
-                                          length_includes_head=False,
-                                          head_width=self.arrow_head_width,
-                                          head_length=self.arrow_head_length)
-                        else:
-                            pass
+                            arrow_list.append((plotx, ploty, txr, tyr, 0))
                         
-                    #plot imaginary tipper
+                    #imaginary tipper
                     if self.plot_tipper == 'yri' or self.plot_tipper == 'yi':
                         if tip.mag_imag[jj] <= self.arrow_threshold:
                             txi = tip.mag_imag[jj]*ascale*\
@@ -875,16 +848,7 @@ class PlotPhaseTensorMaps(mtpl.MTArrows, mtpl.MTEllipse):
                             tyi = tip.mag_imag[jj]*ascale*\
                                  np.cos((tip.ang_imag[jj])*np.pi/180+adir)
         
-                            self.ax.arrow(plotx,
-                                          ploty,
-                                          txi,
-                                          tyi,
-                                          lw=self.arrow_lw,
-                                          facecolor=self.arrow_color_imag,
-                                          edgecolor=self.arrow_color_imag,
-                                          length_includes_head=False,
-                                          head_width=self.arrow_head_width,
-                                          head_length=self.arrow_head_length)
+                            arrow_list.append((plotx, ploty, txi, tyi, 1))
                              
                 
                 #------------Plot station name------------------------------
@@ -903,6 +867,46 @@ class PlotPhaseTensorMaps(mtpl.MTArrows, mtpl.MTEllipse):
                 print 'Did not find {0:.5g} Hz for station {1}'.format(
                                                self.plot_freq, mt.station)
                                                
+        #==> plot all ellipses as one collection
+        if len(ellip_list) > 0:
+            ellip_array = np.array(ellip_list)
+            if cmap.find('seg')>0:
+                ellip_colors = mtcl.get_plot_colors(ellip_array[:, 5],
+                                                    self.ellipse_colorby,
+                                                    cmap,
+                                                    ckmin,
+                                                    ckmax,
+                                                    bounds=bounds)
+            else:
+                ellip_colors = mtcl.get_plot_colors(ellip_array[:, 5],
+                                                    self.ellipse_colorby,
+                                                    cmap,
+                                                    ckmin,
+                                                    ckmax)
+            self.ellipse_collection = mtpl.plot_ellipses(self.ax,
+                                                         ellip_array[:, 0],
+                                                         ellip_array[:, 1],
+                                                         ellip_array[:, 2],
+                                                         ellip_array[:, 3],
+                                                         ellip_array[:, 4],
+                                                         ellip_colors)
+                                                         
+        #==> plot real and imaginary induction arrows as one collection
+        if len(arrow_list) > 0:
+            arrow_array = np.array(arrow_list)
+            arrow_colors = [(self.arrow_color_real, 
+                             self.arrow_color_imag)[int(aa)] 
+                            for aa in arrow_array[:, 4]]
+            mtpl.plot_arrows(self.ax, 
+                             arrow_array[:, 0],
+                             arrow_array[:, 1],
+                             arrow_array[:, 2],
+                             arrow_array[:, 3],
+                             color=arrow_colors,
+                             lw=self.arrow_lw,
+                             head_width=self.arrow_head_width,
+                             head_length=self.arrow_head_length)
+
 
         
         #--> set axes properties depending on map scale------------------------
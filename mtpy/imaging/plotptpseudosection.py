@@ -482,6 +482,14 @@ class PlotPhaseTensorPseudoSection(mtpl.MTEllipse, mtpl.MTArrows):
 
         if cmap == 'mt_seg_bl2wh2rd':
             bounds = np.arange(ckmin, ckmax+ckstep, ckstep)
+            
+        #ellipses (x, y, width, height, angle, color value) and arrows 
+        #(x, y, dx, dy, 0 for real or 1 for imaginary) are collected for 
+        #each station and plotted as one collection each
+        ellip_list = []
+        arrow_list = []
+        self.ellipse_collection = None
+        
         #plot phase tensor ellipses
         for ii, mt in enumerate(self.mt_list):
             self.stationlist.append(
@@ -548,7 +556,7 @@ class PlotPhaseTensorPseudoSection(mtpl.MTEllipse, mtpl.MTArrows):
                 colorarray = pt.phimin[0][::-1]
                 
             elif self.ellipse_colorby == 'phidet':
-                colorarray = np.sqrt(abs(pt.det[::-1]))*(180/np.pi)
+                colorarray = np.sqrt(abs(pt.det[0][::-1]))*(180/np.pi)
                 
             elif self.ellipse_colorby == 'skew' or\
                  self.ellipse_colorby == 'skew_seg':
@@ -577,96 +585,108 @@ class PlotPhaseTensorPseudoSection(mtpl.MTEllipse, mtpl.MTArrows):
             minlist.append(min(colorarray))
             maxlist.append(max(colorarray))
 
-            for jj, ff in enumerate(periodlist):
-                
-                #make sure the ellipses will be visable
-                eheight = phimin[jj]/phimax[jj]*es
-                ewidth = phimax[jj]/phimax[jj]*es
+            #--> keep the ellipses of this station, all ellipses are 
+            #    plotted as one collection after the loop
+            #make sure the ellipses will be visable
+            eheight = phimin/phimax*es
+            ewidth = phimax/phimax*es
             
-                #create an ellipse scaled by phimin and phimax and orient
-                #the ellipse so that north is up and east is right
-                #need to add 90 to do so instead of subtracting
-                ellipd = patches.Ellipse((offset*self.xstretch,
-                                          np.log10(ff)*self.ystretch),
-                                            width=ewidth,
-                                            height=eheight,
-                                            angle=azimuth[jj]+90)
-                                            
-                #get ellipse color
-                if cmap.find('seg') > 0:
-                    ellipd.set_facecolor(mtcl.get_plot_color(colorarray[jj],
-                                                             self.ellipse_colorby,
-                                                             cmap,
-                                                             ckmin,
-                                                             ckmax,
-                                                             bounds=bounds))
-                else:
-                    ellipd.set_facecolor(mtcl.get_plot_color(colorarray[jj],
-                                                             self.ellipse_colorby,
-                                                             cmap,
-                                                             ckmin,
-                                                             ckmax))
-                    
-                # == =add the ellipse to the plot == ========
-                self.ax.add_artist(ellipd)
+            #ellipses scaled by phimin and phimax and oriented so that north
+            #is up and east is right, need to add 90 to do so instead of 
+            #subtracting
+            ellip_list.append(np.array([np.repeat(offset*self.xstretch, n),
+                                        np.log10(periodlist)*self.ystretch,
+                                        ewidth,
+                                        eheight,
+                                        azimuth+90,
+                                        colorarray[0:n]]).T)
                 
+            #--------- Add induction arrows if desired --------------------
+            if self.plot_tipper.find('y') == 0:
+                #arrays of (x, y, dx, dy, real/imag) for each period, real 
+                #and imaginary are interleaved to keep the drawing order
+                station_arrows = np.zeros((n, 2, 5))
+                station_arrows[:, :, 0] = offset*self.xstretch
+                station_arrows[:, :, 1] = (np.log10(periodlist)*\
+                                           self.ystretch)[:, np.newaxis]
+                station_arrows[:, 1, 4] = 1
+                plot_find = np.zeros((n, 2), dtype=np.bool)
                 
-                #--------- Add induction arrows if desired --------------------
-                if self.plot_tipper.find('y') == 0:
+                #--> real tipper
+                if self.plot_tipper == 'yri' or self.plot_tipper == 'yr':
+                    txr = tmr*np.sin(tar*np.pi/180+\
+                                     np.pi*self.arrow_direction)*\
+                                     self.arrow_size
+                    tyr = -tmr*np.cos(tar*np.pi/180+\
+                                      np.pi*self.arrow_direction)*\
+                                      self.arrow_size
+                                
+                    maxlength = np.sqrt((txr/self.arrow_size)**2+\
+                                        (tyr/self.arrow_size)**2)
                     
+                    station_arrows[:, 0, 2] = txr
+                    station_arrows[:, 0, 3] = tyr
+                    plot_find[:, 0] = np.invert(maxlength > 
+                                                self.arrow_threshold)
 
-                        
-        
-                    #--> plot real tipper
-                    if self.plot_tipper == 'yri' or self.plot_tipper == 'yr':
-                        txr = tmr[jj]*np.sin(tar[jj]*np.pi/180+\
-                                             np.pi*self.arrow_direction)*\
-                                             self.arrow_size
-                        tyr = -tmr[jj]*np.cos(tar[jj]*np.pi/180+\
-                                             np.pi*self.arrow_direction)*\
-                                             self.arrow_size
-                                    
-                        maxlength = np.sqrt((txr/self.arrow_size)**2+\
-                                            (tyr/self.arrow_size)**2)
-                                            
-                        if maxlength > self.arrow_threshold:
-                            pass
-                        else:
-                            self.ax.arrow(offset*self.xstretch, 
-                                          np.log10(ff)*self.ystretch, 
-                                          txr,
-                                          tyr,
-                                          lw=alw,
-                                          facecolor=self.arrow_color_real,
-                                          edgecolor=self.arrow_color_real,
-                                          length_includes_head=False,
-                                          head_width=awidth,
-                                          head_length=aheight)
-
-                    #--> plot imaginary tipper
-                    if self.plot_tipper == 'yri' or self.plot_tipper == 'yi':
-                        txi = tmi[jj]*np.sin(tai[jj]*np.pi/180+\
-                                             np.pi*self.arrow_direction)*\
-                                             self.arrow_size
-                        tyi = -tmi[jj]*np.cos(tai[jj]*np.pi/180+\
-                                             np.pi*self.arrow_direction)*\
-                                             self.arrow_size
-                        
-                        maxlength = np.sqrt((txi/self.arrow_size)**2+\
-                                            (tyi/self.arrow_size)**2)
-                        if maxlength > self.arrow_threshold:
-                            pass
-                        else:
-                            self.ax.arrow(offset*self.xstretch,
-                                          np.log10(ff)*self.ystretch,
-                                          txi,
-                                          tyi,
-                                          lw=alw,
-                                          facecolor=self.arrow_color_imag,
-                                          edgecolor=self.arrow_color_imag,
-                                          length_includes_head=False,
-                                          head_width=awidth,
-                                          head_length=aheight)
+                #--> imaginary tipper
+                if self.plot_tipper == 'yri' or self.plot_tipper == 'yi':
+                    txi = tmi*np.sin(tai*np.pi/180+\
+                                     np.pi*self.arrow_direction)*\
+                                     self.arrow_size
+                    tyi = -tmi*np.cos(tai*np.pi/180+\
+                                      np.pi*self.arrow_direction)*\
+                                      self.arrow_size
+                    
+                    maxlength = np.sqrt((txi/self.arrow_size)**2+\
+                                        (tyi/self.arrow_size)**2)
+                                        
+                    station_arrows[:, 1, 2] = txi
+                    station_arrows[:, 1, 3] = tyi
+                    plot_find[:, 1] = np.invert(maxlength > 
+                                                self.arrow_threshold)
+                                                
+                arrow_list.append(station_arrows[plot_find])
+        
+        #==> plot all ellipses as one collection
+        if len(ellip_list) > 0:
+            ellip_array = np.vstack(ellip_list)
+            if cmap.find('seg') > 0:
+                ellip_colors = mtcl.get_plot_colors(ellip_array[:, 5],
+                                                    self.ellipse_colorby,
+                                                    cmap,
+                                                    ckmin,
+                                                    ckmax,
+                                                    bounds=bounds)
+            else:
+                ellip_colors = mtcl.get_plot_colors(ellip_array[:, 5],
+                                                    self.ellipse_colorby,
+                                                    cmap,
+                                                    ckmin,
+                                                    ckmax)
+            self.ellipse_collection = mtpl.plot_ellipses(self.ax,
+                                                         ellip_array[:, 0],
+                                                         ellip_array[:, 1],
+                                                         ellip_array[:, 2],
+                                                         ellip_array[:, 3],
+                                                         ellip_array[:, 4],
+                                                         ellip_colors)
+                                                         
+        #==> plot real and imaginary induction arrows as one collection
+        if len(arrow_list) > 0:
+            arrow_array = np.vstack(arrow_list)
+            arrow_colors = [(self.arrow_color_real, 
+                             self.arrow_color_imag)[int(aa)] 
+                            for aa in arrow_array[:, 4]]
+            mtpl.plot_arrows(self.ax, 
+                             arrow_array[:, 0],
+                             arrow_array[:, 1],
+                             arrow_array[:, 2],
+                             arrow_array[:, 3],
+                             color=arrow_colors,
+                             lw=alw,
+                             head_width=awidth,
+                             head_length=aheight)
         
         #--> Set plot parameters 
         self._plot_periodlist = plot_periodlist
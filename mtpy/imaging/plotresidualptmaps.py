@@ -885,58 +885,56 @@ class PlotResidualPTMaps(mtpl.MTEllipse):
         else:
             emax = self.ellipse_scale
         
-        #--> plot        
-        for ii, rpt in enumerate(self.rpt_array):
-            #--> get ellipse properties
-            #if the ellipse size is not physically correct make it a dot
-            if rpt['phimax'][f_index] == 0 and \
-               rpt['phimax'][f_index] == 0: 
-                eheight = .0000001*es
-                ewidth = .0000001*es
-            
-            elif rpt['phimax'][f_index] > 100 or \
-               rpt['phimax'][f_index] > 100: 
-                eheight = .0000001*es
-                ewidth = .0000001*es
-                print 'Bad data at {0}'.format(rpt['station'])
-            
-            else:
-                scaling = es/emax
-                eheight = rpt['phimin'][f_index]*scaling
-                ewidth = rpt['phimax'][f_index]*scaling
+        #--> get ellipse properties for all stations
+        phimin = self.rpt_array['phimin'][:, f_index]
+        phimax = self.rpt_array['phimax'][:, f_index]
+        
+        scaling = es/emax
+        eheight = phimin*scaling
+        ewidth = phimax*scaling
+        
+        #if the ellipse size is not physically correct make it a dot
+        bad_find = np.where(phimax > 100)[0]
+        for bb in bad_find:
+            print 'Bad data at {0}'.format(self.rpt_array['station'][bb])
+        dot_find = np.where((phimax == 0) | (phimax > 100))
+        eheight[dot_find] = .0000001*es
+        ewidth[dot_find] = .0000001*es
+        
+        if self.rot90 == True:
+            eangle = self.rpt_array['azimuth'][:, f_index]-90
+        else:
+            eangle = self.rpt_array['azimuth'][:, f_index]
             
-            #make an ellipse
-            if self.rot90 == True:
-                ellipd = patches.Ellipse((rpt['plotx'],rpt['ploty']),
-                                         width=ewidth,
-                                         height=eheight,
-                                         angle=rpt['azimuth'][f_index]-90)
-            elif self.rot90 == False:
-                ellipd = patches.Ellipse((rpt['plotx'],rpt['ploty']),
-                                         width=ewidth,
-                                         height=eheight,
-                                         angle=rpt['azimuth'][f_index])
-                                   
-            #get ellipse color
-            if cmap.find('seg')>0:
-                ellipd.set_facecolor(mtcl.get_plot_color(rpt[ckey][f_index],
-                                                         ckey,
-                                                         cmap,
-                                                         ckmin,
-                                                         ckmax,
-                                                         bounds=bounds))
-            else:
-                ellipd.set_facecolor(mtcl.get_plot_color(rpt[ckey][f_index],
-                                                         ckey,
-                                                         cmap,
-                                                         ckmin,
-                                                         ckmax))
+        #get ellipse colors
+        if cmap.find('seg')>0:
+            ellip_colors = mtcl.get_plot_colors(
+                                        self.rpt_array[ckey][:, f_index],
+                                        ckey,
+                                        cmap,
+                                        ckmin,
+                                        ckmax,
+                                        bounds=bounds)
+        else:
+            ellip_colors = mtcl.get_plot_colors(
+                                        self.rpt_array[ckey][:, f_index],
+                                        ckey,
+                                        cmap,
+                                        ckmin,
+                                        ckmax)
             
-            #==> add ellipse to the plot
-            self.ax.add_artist(ellipd)
+        #==> add all ellipses to the plot as one collection
+        self.ellipse_collection = mtpl.plot_ellipses(self.ax,
+                                                     self.rpt_array['plotx'],
+                                                     self.rpt_array['ploty'],
+                                                     ewidth,
+                                                     eheight,
+                                                     eangle,
+                                                     ellip_colors)
                     
-            #------------Plot station name------------------------------
-            if self.plot_station_name == True:
+        #------------Plot station name------------------------------
+        if self.plot_station_name == True:
+            for rpt in self.rpt_array:
                 self.ax.text(rpt['plotx'], rpt['ploty']+self.station_pad,
                              rpt['station'],
                              horizontalalignment='center',
@@ -12,6 +12,7 @@ import numpy as np
 import os
 from matplotlib.ticker import MultipleLocator
 import mtpy.imaging.mtplottools as mtpl
+import mtpy.analysis.strike as MTstrike
 
 #==============================================================================
 
@@ -279,151 +280,34 @@ class PlotStrike(object):
         
         bw = self.bin_width
         
-        if self.fold == True:
-            histrange = (-180, 180)
-        elif self.fold == False:
-            histrange = (0, 360)
-            
-        #set empty lists that will hold dictionaries with keys as the period
-        invlist = []
-        ptlist = []
-        tiprlist = []
-        
-        #initialize some parameters
-        nc = len(self.mt_list)
-        nt = 0
-        kk = 0
-        
-        for dd,mt in enumerate(self.mt_list):
-            
-            #--> set the period
-            period = mt.period
-        
-            #get maximum length of periods
-            if len(period)>nt:
-                nt = len(period)
-                
-            #-----------get strike angle from invariants-----------------------
-            zinv = mt.get_Zinvariants()
-            
-            #add 90 degrees because invariants assume 0 is north, but plotting 
-            #assumes that 90 is north and measures clockwise, thus the negative
-            #because the strike angle from invariants is measured 
-            #counter-clockwise
-            
-            zs = 90-zinv.strike
-            
-            #fold so the angle goes from 0 to 180
-            if self.fold == True:
-                #for plotting put the NW angles into the SE quadrant 
-                zs[np.where(zs>90)] -= 180
-                zs[np.where(zs<-90)] += 180
-            
-            #leave as the total unit circle 0 to 360
-            elif self.fold == False:
-                zs[np.where(zs<0)] += 360
-                #zs = 360-zs
-            
-            #make a dictionary of strikes with keys as period
-            mdictinv = dict([(ff,jj) for ff,jj in zip(mt.period,zs)])
-            invlist.append(mdictinv)
-        
-            #------------get strike from phase tensor strike angle---------------
-            pt = mt.get_PhaseTensor()
-            az = 90-pt.azimuth[0]
-            azerr = pt.azimuth[1]
-            
-            #need to add 90 because pt assumes 0 is north and 
-            #negative because measures clockwise.
-            
-            #put an error max on the estimation of strike angle
-            if self.pt_error_floor:
-                az[np.where(azerr>self.pt_error_floor)] = 0.0
-            
-            #fold so the angle goes from 0 to 180
-            if self.fold == True:
-                az[np.where(az>90)] -= 180
-                az[np.where(az<-90)] += 180
-            
-            #leave as the total unit circle 0 to 360
-            elif self.fold == False:
-                az[np.where(az<0)] += 360
-            
-            #make a dictionary of strikes with keys as period
-            mdictpt = dict([(ff,jj) for ff,jj in zip(mt.period,az)])
-            ptlist.append(mdictpt)
-            
-            #-----------get tipper strike------------------------------------
-            tip = mt.get_Tipper()
-            if tip._Tipper.tipper is None:
-                tip._Tipper.tipper = np.zeros((len(mt.period), 1, 2), 
-                                               dtype='complex')
-                tip.compute_components()
-            
-            #needs to be negative because measures clockwise
-            tipr = -tip.ang_real
-            
-            tipr[np.where(tipr == 180.)] = 0.0
-            
-            #fold so the angle goes from 0 to 180
-            if self.fold == True:
-                tipr[np.where(tipr>90)] -= 180
-                tipr[np.where(tipr<-90)] += 180
-            
-            #leave as the total unit circle 0 to 360
-            elif self.fold == False:
-                tipr[np.where(tipr<0)] += 360
-                tipr[np.where(tipr == 360.0)] = 0.0
-            
-            #make a dictionary of strikes with keys as period
-            tiprdict = dict([(ff,jj) for ff,jj in zip(mt.period,tipr)])
-            tiprlist.append(tiprdict)
-
-        #--> get min and max period
-        maxper = np.max([np.max(mm.keys()) for mm in invlist])
-        minper = np.min([np.min(mm.keys()) for mm in ptlist])
-        
-        #make empty arrays to put data into for easy manipulation
-        medinv = np.zeros((nt,nc))
-        medpt = np.zeros((nt,nc))
-        medtipr = np.zeros((nt,nc))
-        
-        #make a list of periods from the longest period list
-        plist = np.logspace(np.log10(minper),np.log10(maxper),num=nt,base=10)
-        pdict = dict([(ii,jj) for jj,ii in enumerate(plist)])
-        
+        #--> get the strike angles of all stations on a common period list
+        self.strike_stats = MTstrike.StrikeStatistics(
+                                    mt_list=self.mt_list,
+                                    fold=self.fold,
+                                    pt_error_floor=self.pt_error_floor,
+                                    period_tolerance=self.period_tolerance)
+        strike_array = self.strike_stats.strike_array
+        plist = self.strike_stats.period
         self._plist = plist
         
-        #put data into arrays
-        for ii,mm in enumerate(invlist):
-            mperiod=mm.keys()
-            for jj,mp in enumerate(mperiod):
-                for kk in pdict.keys():
-                    if mp>kk*(1-self.period_tolerance) and \
-                         mp<kk*(1+self.period_tolerance):
-                        ll = pdict[kk]
-                        medinv[ll,ii] = invlist[ii][mp]
-                        medpt[ll,ii] = ptlist[ii][mp]
-                        medtipr[ll,ii] = tiprlist[ii][mp]
-                    else:
-                        pass
-
-        #make the arrays local variables                    
-        self._medinv = medinv
-        self._medpt = medpt
-        self._medtp = medtipr
-            
+        #make the arrays local variables, 0 where there is no estimate
+        self._medinv = np.nan_to_num(strike_array['inv'])
+        self._medpt = np.nan_to_num(strike_array['pt'])
+        self._medtp = np.nan_to_num(strike_array['tip'])
             
         #-----Plot Histograms of the strike angles-----------------------------
-        if self.plot_range == 'data':
-            brange=np.arange(np.floor(np.log10(minper)),
-                             np.ceil(np.log10(maxper)),1)
-        else:
-            brange=np.arange(np.floor(self.plot_range[0]),
-                             np.ceil(self.plot_range[1]),1)
-                             
+        brange = self.strike_stats.get_decade_list(self.plot_range)
         self._brange = brange
         
+        #period bands of each decade and of all decades together
+        if self.plot_type == 1:
+            band_list = [(10**bb, 10**(bb+1)) for bb in brange]
+        else:
+            band_list = [(10**brange.min(), 10**brange.max())]
+        bin_edges, hist_dict = self.strike_stats.get_histograms(band_list,
+                                                        bin_width=bw)
+        stat_array = self.strike_stats.get_statistics(band_list, 
+                                                      bin_width=bw)
         
         #font dictionary
         fd={'size':self.font_size,'weight':'normal'}
@@ -451,23 +335,13 @@ class PlotStrike(object):
                                                        polar=True)
                     axlist = [self.axhinv, self.axhpt, self.axhtip]
                 
-                #make a list of indicies for each decades    
-                binlist=[]
-                for ii,ff in enumerate(plist):
-                    if ff > 10**bb and ff < 10**(bb+1):
-                        binlist.append(ii)
+                #histograms and statistics for the decade
+                invhist = (hist_dict['inv'][jj-1], bin_edges)
+                pthist = (hist_dict['pt'][jj-1], bin_edges)
+                trhist = (hist_dict['tip'][jj-1], bin_edges)
+                stats = stat_array[jj-1]
                 
-                #extract just the subset for each decade
-                hh = medinv[binlist,:]
-                gg = medpt[binlist,:]
                 if self.plot_tipper == 'y':
-                    tr = medtipr[binlist,:]
-                    
-                    #compute the historgram for the tipper strike
-                    trhist = np.histogram(tr[np.nonzero(tr)].flatten(),
-                                          bins=360/bw,
-                                          range=histrange)
-                    
                     #make a bar graph with each bar being width of bw degrees                               
                     bartr = self.axhtip.bar((trhist[1][:-1])*np.pi/180,
                                             trhist[0],
@@ -479,15 +353,6 @@ class PlotStrike(object):
                         fc=float(trhist[0][cc])/trhist[0].max()*.9
                         bar.set_facecolor((0, 1-fc/2, fc))
                             
-                
-                #estimate the histogram for the decade for invariants and pt
-                invhist = np.histogram(hh[np.nonzero(hh)].flatten(),
-                                       bins=360/bw,
-                                       range=histrange)
-                pthist = np.histogram(gg[np.nonzero(gg)].flatten(),
-                                      bins=360/bw,
-                                      range=histrange)
-                
                 #plot the histograms    
                 self.barinv = self.axhinv.bar((invhist[1][:-1])*np.pi/180,
                                          invhist[0],
@@ -528,15 +393,9 @@ class PlotStrike(object):
                         #from -90 to 270 with -90 being east
                         axh.set_xlim(-90*np.pi/180,270*np.pi/180)
                         
-                        #label the plot with the mode value of strike
-                        #need to subtract 90 again because the histogram is
-                        #for ploting 0 east, 90 north measuring 
-                        #counter-clockwise
-                        invmode = 90-invhist[1][np.where(
-                                           invhist[0] == invhist[0].max())[0][0]]
-                                           
-                        if invmode<0:
-                            invmode += 360
+                        #label the plot with the mode value of strike, the
+                        #statistics are already 0 north measuring clockwise
+                        invmode = stats['inv_mode']
                                            
                         axh.text(np.pi,axh.get_ylim()[1]*self.text_pad,
                                  '{0:.1f}$^o$'.format(invmode),
@@ -546,20 +405,13 @@ class PlotStrike(object):
                                   bbox={'facecolor':(.9,0,.1),'alpha':.25})
                         
                         #print out the statistics of the strike angles 
-                        invmedian = 90-np.median(hh[np.nonzero(hh)])
-                        if invmedian<0:
-                            invmedian += 360
-                        invmean = 90-np.mean(hh[np.nonzero(hh)])
-                        if invmean<0:
-                            invmean += 360
-                            
                         print '-----Period Range {0:.3g} to {1:.3g} (s)-----'.format(10**bb,
                               10**(bb+1))
                              
                         print '   *Z-Invariants:  median={0:.1f} mode={1:.1f} mean={2:.1f}'.format(
-                                invmedian,
+                                stats['inv_median'],
                                 invmode,
-                                invmode) 
+                                stats['inv_mean']) 
                                 
                         #--> set title of subplot
                         axh.set_title(self.title_dict[bb],fontdict=fd,
@@ -575,19 +427,7 @@ class PlotStrike(object):
                         axh.set_xlim(-180*np.pi/180,180*np.pi/180)
                         
                         #label plot with the mode of the strike angle
-                        ptmode = 90-pthist[1][np.where(
-                                             pthist[0] == pthist[0].max())[0][0]]
-                                             
-                        if ptmode<0:
-                            ptmode+=360
-                            
-                        ptmedian = 90-np.median(gg[np.nonzero(gg)])
-                        if ptmedian<0:
-                            ptmedian += 360
-                            
-                        ptmean = 90-np.mean(gg[np.nonzero(gg)])
-                        if ptmean<0:
-                            ptmean += 360
+                        ptmode = stats['pt_mode']
                             
                         axh.text(np.pi,axh.get_ylim()[1]*self.text_pad,
                                  '{0:.1f}$^o$'.format(ptmode),
@@ -599,9 +439,9 @@ class PlotStrike(object):
                         #print out the results for the strike angles
                         
                         print '   *PT Strike:     median={0:.1f} mode={1:.1f} mean={2:.1f}'.format(
-                                ptmedian,
+                                stats['pt_median'],
                                 ptmode,
-                                ptmean)
+                                stats['pt_mean'])
                         
                         if self.plot_tipper!='y':
                             print '\n'
@@ -616,19 +456,7 @@ class PlotStrike(object):
                         axh.set_xlim(-180*np.pi/180,180*np.pi/180)
                         
                         #label plot with mode
-                        tpmode = 90-trhist[1][np.where(
-                                             trhist[0] == trhist[0].max())[0][0]]
-                        
-                        if tpmode<0:
-                            tpmode+=360.
-                            
-                        tpmedian = 90-np.median(tr[np.nonzero(tr)])
-                        if tpmedian <0:
-                            tpmedian += 360
-                            
-                        tpmean = 90-np.mean(tr[np.nonzero(tr)])
-                        if tpmean<0:
-                            tpmean += 360
+                        tpmode = stats['tip_mode']
                         
                         axh.text(np.pi,axh.get_ylim()[1]*self.text_pad,
                                  '{0:.1f}$^o$'.format(tpmode),
@@ -639,9 +467,9 @@ class PlotStrike(object):
                         
                         #print out statistics for strike angle
                         print '   *Tipper Strike: median={0:.1f} mode={1:.1f} mean={2:.1f}'.format(
-                                tpmedian,
+                                stats['tip_median'],
                                 tpmode,
-                                tpmode) 
+                                stats['tip_mean']) 
                         print '\n'
                         if nb>5: 
                             axh.set_title(self.title_dict[bb],fontdict=fd,
@@ -697,21 +525,11 @@ class PlotStrike(object):
                 self.axhtip=self.fig.add_subplot(1,3,3,polar=True)
                 axlist=[self.axhinv, self.axhpt, self.axhtip]
             
-            #make a list of indicies for each decades    
-            binlist=[pdict[ff] for ff in plist 
-                    if ff>10**brange.min() and ff<10**brange.max()]
-            
-            #extract just the subset for each decade
-            hh=medinv[binlist,:]
-            gg=medpt[binlist,:]
-            
-            #estimate the histogram for the decade for invariants and pt
-            invhist=np.histogram(hh[np.nonzero(hh)].flatten(),
-                                 bins=360/bw,
-                                 range=histrange)
-            pthist=np.histogram(gg[np.nonzero(gg)].flatten(),
-                                bins=360/bw,
-                                range=histrange)
+            #histograms and statistics for all decades
+            invhist = (hist_dict['inv'][0], bin_edges)
+            pthist = (hist_dict['pt'][0], bin_edges)
+            trhist = (hist_dict['tip'][0], bin_edges)
+            stats = stat_array[0]
             
             #plot the histograms    
             self.barinv = self.axhinv.bar((invhist[1][:-1])*np.pi/180,
@@ -734,12 +552,6 @@ class PlotStrike(object):
             
             #plot tipper if desired
             if self.plot_tipper == 'y':
-                tr = self._medtp[binlist,:]
-                
-                trhist = np.histogram(tr[np.nonzero(tr)].flatten(),
-                                      bins=360/bw,
-                                      range=histrange)
-                                      
                 self.bartr = self.axhtip.bar((trhist[1][:-1])*np.pi/180,
                                              trhist[0],
                                              width=bw*np.pi/180)
@@ -770,11 +582,7 @@ class PlotStrike(object):
                 if aa == 0:
                     axh.set_ylim(0,invhist[0].max())
                     
-                    invmode = 90-invhist[1][np.where(
-                                           invhist[0] == invhist[0].max())[0][0]]
-                                           
-                    if invmode<0:
-                            invmode+=360
+                    invmode = stats['inv_mode']
                             
                     axh.text(170*np.pi/180,axh.get_ylim()[1]*.65,
                              '{0:.1f}$^o$'.format(invmode),
@@ -784,20 +592,13 @@ class PlotStrike(object):
                               bbox={'facecolor':(.9,0,.1),'alpha':.25})
 
                     #print out the statistics of the strike angles 
-                    invmedian = 90-np.median(hh[np.nonzero(hh)])
-                    if invmedian<0:
-                        invmedian += 360
-                    invmean = 90-np.mean(hh[np.nonzero(hh)])
-                    if invmean<0:
-                        invmean += 360
-                        
                     print '-----Period Range {0:.3g} to {1:.3g} (s)-----'.format(10**brange[0],
                           10**brange[-1])
                          
                     print '   *Z-Invariants:  median={0:.1f} mode={1:.1f} mean={2:.1f}'.format(
-                            invmedian,
+                            stats['inv_median'],
                             invmode,
-                            invmode)
+                            stats['inv_mean'])
                             
                     axh.set_title('Strike (Z)',fontdict=fd,
                                    bbox={'facecolor':(.9,0,.1),'alpha':0.25})
@@ -808,22 +609,7 @@ class PlotStrike(object):
                 elif aa == 1:
                     axh.set_ylim(0,pthist[0].max())
                     
-                    ptmode = 90-pthist[1][np.where(
-                                             pthist[0] == pthist[0].max())[0][0]]
-                                             
-                    if ptmode<0:
-                            ptmode+=360
-                            
-                    if ptmode<0:
-                            ptmode+=360
-                            
-                    ptmedian = 90-np.median(gg[np.nonzero(gg)])
-                    if ptmedian<0:
-                        ptmedian += 360
-                        
-                    ptmean = 90-np.mean(gg[np.nonzero(gg)])
-                    if ptmean<0:
-                        ptmean += 90
+                    ptmode = stats['pt_mode']
                             
                     axh.text(170*np.pi/180,axh.get_ylim()[1]*.65,
                              '{0:.1f}$^o$'.format(ptmode),
@@ -834,9 +620,9 @@ class PlotStrike(object):
                               
                     #print results of strike analysis for pt
                     print '   *PT Strike:     median={0:.1f} mode={1:.1f} mean={2:.1f}'.format(
-                            ptmedian,
+                            stats['pt_median'],
                             ptmode,
-                            ptmean)
+                            stats['pt_mean'])
                     
                     if self.plot_tipper!='y':
                         print '\n'
@@ -848,19 +634,7 @@ class PlotStrike(object):
                 elif aa == 2:
                     axh.set_ylim(0,trhist[0].max())
                     
-                    tpmode = 90-trhist[1][np.where(
-                                             trhist[0] == trhist[0].max())[0][0]]
-                    
-                    if tpmode<0:
-                            tpmode+=360
-                            
-                    tpmedian = 90-np.median(tr[np.nonzero(tr)])
-                    if tpmedian <0:
-                        tpmedian += 360
-                        
-                    tpmean = 90-np.mean(tr[np.nonzero(tr)])
-                    if tpmean<0:
-                        tpmean += 360
+                    tpmode = stats['tip_mode']
                                              
                     axh.text(170*np.pi/180,axh.get_ylim()[1]*.65,
                              '{0:.1f}$^o$'.format(tpmode),
@@ -869,9 +643,9 @@ class PlotStrike(object):
                               fontdict={'size':self.text_size},
                               bbox={'facecolor':(0,.1,.9),'alpha':0.25})
                     print '   *Tipper Stike:  median={0:.1f} mode={1:.1f} mean={2:.1f}\n'.format(
-                            tpmedian,
+                            stats['tip_median'],
                             tpmode,
-                            tpmode)
+                            stats['tip_mean'])
                 
                     axh.set_title('Tipper Strike',fontdict=fd,
                                    bbox={'facecolor':(0,.1,.9),'alpha':0.25})
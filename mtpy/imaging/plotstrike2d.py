@@ -12,7 +12,7 @@ import numpy as np
 import os
 from matplotlib.ticker import MultipleLocator
 import mtpy.imaging.mtplottools as mtpl
-import mtpy.analysis.geometry as MTgy
+import mtpy.analysis.strike as MTstrike
 
 #==============================================================================
 
@@ -280,110 +280,36 @@ class PlotStrike2D(object):
         plt.rcParams['figure.subplot.hspace'] = .4   
         
         bw = self.bin_width
-        histrange = (0, 360)
             
-        #set empty lists that will hold dictionaries with keys as the period
-        ptlist = []
-        tiprlist = []
-        
-        #initialize some parameters
-        nc = len(self.mt_list)
-        nt = 0
-        kk = 0
-        
-        for dd, mt in enumerate(self.mt_list):
-            
-            #--> set the period
-            period = mt.period
-        
-            #get maximum length of periods
-            if len(period)>nt:
-                nt = len(period)
-                
-            #estimate where only the 2D sections are
-            dim_2d = MTgy.dimensionality(z_object=mt._Z, 
-                                         beta_threshold=self.skew_threshold)
-            index_2d = np.where(dim_2d==2)[0]
-            #------------get strike from phase tensor strike angle---------------
-            pt = mt.get_PhaseTensor()
-            az = (90-pt.azimuth[0][index_2d])%360
-            azerr = pt.azimuth[1][index_2d]
-            
-            #need to add 90 because pt assumes 0 is north and 
-            #negative because measures clockwise.
-            
-            #put an error max on the estimation of strike angle
-            if self.pt_error_floor:
-                az[np.where(azerr>self.pt_error_floor)] = 0.0
-
-            
-            #make a dictionary of strikes with keys as period
-            mdictpt = dict([(ff,jj) for ff,jj in zip(mt.period[index_2d],az)])
-            ptlist.append(mdictpt)
-            
-            #-----------get tipper strike------------------------------------
-            tip = mt.get_Tipper()
-            if tip._Tipper.tipper is None:
-                tip._Tipper.tipper = np.zeros((len(mt.period), 1, 2), 
-                                               dtype='complex')
-                tip.compute_components()
-            
-            #needs to be negative because measures clockwise
-            tipr = -tip.ang_real[index_2d]
-            
-            tipr[np.where(tipr == 180.)] = 0.0
-            tipr[np.where(tipr == -180.)] = 0.0
-            
-            #make sure the angle is between 0 and 360
-            tipr = tipr%360
-            
-            
-            #make a dictionary of strikes with keys as period
-            tiprdict = dict([(ff,jj) for ff,jj in zip(mt.period[index_2d],tipr)])
-            tiprlist.append(tiprdict)
-
-        #--> get min and max period
-        maxper = np.max([np.max(mm.keys()) for mm in ptlist])
-        minper = np.min([np.min(mm.keys()) for mm in ptlist])
-        
-        #make empty arrays to put data into for easy manipulation
-        medpt = np.zeros((nt,nc))
-        medtipr = np.zeros((nt,nc))
-        
-        #make a list of periods from the longest period list
-        plist = np.logspace(np.log10(minper),np.log10(maxper),num=nt,base=10)
-        pdict = dict([(ii,jj) for jj,ii in enumerate(plist)])
-        
+        #--> get the strike angles of the 2D parts of all stations on a 
+        #    common period list, angles range from 0 to 360
+        self.strike_stats = MTstrike.StrikeStatistics(
+                                    mt_list=self.mt_list,
+                                    fold=False,
+                                    pt_error_floor=self.pt_error_floor,
+                                    period_tolerance=self.period_tolerance,
+                                    skew_threshold=self.skew_threshold)
+        strike_array = self.strike_stats.strike_array
+        plist = self.strike_stats.period
         self._plist = plist
         
-        #put data into arrays
-        for ii,mm in enumerate(ptlist):
-            mperiod=mm.keys()
-            for jj,mp in enumerate(mperiod):
-                for kk in pdict.keys():
-                    if mp>kk*(1-self.period_tolerance) and \
-                         mp<kk*(1+self.period_tolerance):
-                        ll = pdict[kk]
-                        medpt[ll,ii] = ptlist[ii][mp]
-                        medtipr[ll,ii] = tiprlist[ii][mp]
-                    else:
-                        pass
-
-        #make the arrays local variables                    
-        self._medpt = medpt
-        self._medtp = medtipr
-            
+        #make the arrays local variables, 0 where there is no estimate
+        self._medpt = np.nan_to_num(strike_array['pt'])
+        self._medtp = np.nan_to_num(strike_array['tip'])
             
         #-----Plot Histograms of the strike angles-----------------------------
-        if self.plot_range == 'data':
-            brange=np.arange(np.floor(np.log10(minper)),
-                             np.ceil(np.log10(maxper)),1)
-        else:
-            brange=np.arange(np.floor(self.plot_range[0]),
-                             np.ceil(self.plot_range[1]),1)
-                             
+        brange = self.strike_stats.get_decade_list(self.plot_range)
         self._brange = brange
         
+        #period bands of each decade and of all decades together
+        if self.plot_type == 1:
+            band_list = [(10**bb, 10**(bb+1)) for bb in brange]
+        else:
+            band_list = [(10**brange.min(), 10**brange.max())]
+        bin_edges, hist_dict = self.strike_stats.get_histograms(band_list,
+                                                        bin_width=bw)
+        stat_array = self.strike_stats.get_statistics(band_list, 
+                                                      bin_width=bw)
         
         #font dictionary
         fd={'size':self.font_size,'weight':'normal'}
@@ -409,22 +335,12 @@ class PlotStrike2D(object):
                                                        polar=True)
                     axlist = [self.axhpt, self.axhtip]
                 
-                #make a list of indicies for each decades    
-                binlist=[]
-                for ii,ff in enumerate(plist):
-                    if ff > 10**bb and ff < 10**(bb+1):
-                        binlist.append(ii)
+                #histograms and statistics for the decade
+                pthist = (hist_dict['pt'][jj-1], bin_edges)
+                trhist = (hist_dict['tip'][jj-1], bin_edges)
+                stats = stat_array[jj-1]
                 
-                #extract just the subset for each decade
-                gg = medpt[binlist,:]
                 if self.plot_tipper == 'y':
-                    tr = medtipr[binlist,:]
-                    
-                    #compute the historgram for the tipper strike
-                    trhist = np.histogram(tr[np.nonzero(tr)].flatten(),
-                                          bins=360/bw,
-                                          range=histrange)
-                    
                     #make a bar graph with each bar being width of bw degrees                               
                     bartr = self.axhtip.bar((trhist[1][:-1])*np.pi/180,
                                             trhist[0],
@@ -439,12 +355,6 @@ class PlotStrike2D(object):
                             fc = 1.0
                         bar.set_facecolor((0, 1-fc/2, fc))
                             
-                
-                #estimate the histogram for the decade for invariants and pt
-                pthist = np.histogram(gg[np.nonzero(gg)].flatten(),
-                                      bins=360/bw,
-                                      range=histrange)
-                
                 #plot the histograms    
                 self.barpt = self.axhpt.bar((pthist[1][:-1])*np.pi/180,
                                        pthist[0],
@@ -479,12 +389,7 @@ class PlotStrike2D(object):
                         axh.set_xlim(0,2*np.pi)
                         
                         #label plot with the mode of the strike angle
-                        ptmode = (90-pthist[1][np.where(
-                                  pthist[0] == pthist[0].max())[0][0]])%360
-                            
-                        ptmedian = (90-np.median(gg[np.nonzero(gg)]))%360
-                            
-                        ptmean = (90-np.mean(gg[np.nonzero(gg)]))%360
+                        ptmode = stats['pt_mode']
                             
                         axh.text(np.pi, axh.get_ylim()[1]*self.text_pad,
                                  '{0:.1f}$^o$'.format(ptmode),
@@ -497,9 +402,9 @@ class PlotStrike2D(object):
                         print '-----Period Range {0:.3g} to {1:.3g} (s)-----'.format(10**bb,
                               10**(bb+1))
                         print '   *PT Strike:     median={0:.1f} mode={1:.1f} mean={2:.1f}'.format(
-                                ptmedian,
+                                stats['pt_median'],
                                 ptmode,
-                                ptmean)
+                                stats['pt_mean'])
                         
                         if self.plot_tipper!='y':
                             print '\n'
@@ -517,12 +422,7 @@ class PlotStrike2D(object):
                         axh.set_xlim(0, 2*np.pi)
                         
                         #label plot with mode
-                        tpmode = (90-trhist[1][np.where(
-                                  trhist[0] == trhist[0].max())[0][0]])%360
-                            
-                        tpmedian = (90-np.median(tr[np.nonzero(tr)]))%360
-
-                        tpmean = (90-np.mean(tr[np.nonzero(tr)]))%360
+                        tpmode = stats['tip_mode']
                         
                         axh.text(np.pi,axh.get_ylim()[1]*self.text_pad,
                                  '{0:.1f}$^o$'.format(tpmode),
@@ -533,9 +433,9 @@ class PlotStrike2D(object):
                         
                         #print out statistics for strike angle
                         print '   *Tipper Strike: median={0:.1f} mode={1:.1f} mean={2:.1f}'.format(
-                                tpmedian,
+                                stats['tip_median'],
                                 tpmode,
-                                tpmode) 
+                                stats['tip_mean']) 
                         print '\n'
                         if nb>5: 
                             axh.set_title(self.title_dict[bb],fontdict=fd,
@@ -584,17 +484,10 @@ class PlotStrike2D(object):
                 self.axhtip = self.fig.add_subplot(1, 2, 2, polar=True)
                 axlist=[self.axhpt, self.axhtip]
             
-            #make a list of indicies for each decades    
-            binlist = [pdict[ff] for ff in plist 
-                       if ff > 10**brange.min() and ff < 10**brange.max()]
-            
-            #extract just the subset for each decade
-            gg = medpt[binlist, :]
-            
-            #estimate the histogram for the decade for invariants and pt
-            pthist = np.histogram(gg[np.nonzero(gg)].flatten(),
-                                  bins=360/bw,
-                                  range=histrange)
+            #histograms and statistics for all decades
+            pthist = (hist_dict['pt'][0], bin_edges)
+            trhist = (hist_dict['tip'][0], bin_edges)
+            stats = stat_array[0]
             
             #plot the histograms    
             self.barpt = self.axhpt.bar((pthist[1][:-1])*np.pi/180,
@@ -608,12 +501,6 @@ class PlotStrike2D(object):
             
             #plot tipper if desired
             if self.plot_tipper == 'y':
-                tr = self._medtp[binlist,:]
-                
-                trhist = np.histogram(tr[np.nonzero(tr)].flatten(),
-                                      bins=360/bw,
-                                      range=histrange)
-                                      
                 self.bartr = self.axhtip.bar((trhist[1][:-1])*np.pi/180,
                                              trhist[0],
                                              width=bw*np.pi/180)
@@ -644,12 +531,7 @@ class PlotStrike2D(object):
                 if aa == 0:
                     axh.set_ylim(0,pthist[0].max())
                     
-                    ptmode = (90-pthist[1][np.where(
-                              pthist[0] == pthist[0].max())[0][0]])%360
-
-                    ptmedian = (90-np.median(gg[np.nonzero(gg)]))%360
-
-                    ptmean = (90-np.mean(gg[np.nonzero(gg)]))%360
+                    ptmode = stats['pt_mode']
 
                     axh.text(170*np.pi/180,axh.get_ylim()[1]*.65,
                              '{0:.1f}$^o$'.format(ptmode),
@@ -662,9 +544,9 @@ class PlotStrike2D(object):
                     print '-----Period Range {0:.3g} to {1:.3g} (s)-----'.format(10**brange[0],
                           10**brange[-1])
                     print '   *PT Strike:     median={0:.1f} mode={1:.1f} mean={2:.1f}'.format(
-                            ptmedian,
+                            stats['pt_median'],
                             ptmode,
-                            ptmean)
+                            stats['pt_mean'])
                     
                     if self.plot_tipper!='y':
                         print '\n'
@@ -676,12 +558,7 @@ class PlotStrike2D(object):
                 elif aa == 2:
                     axh.set_ylim(0,trhist[0].max())
                     
-                    tpmode = (90-trhist[1][np.where(
-                              trhist[0] == trhist[0].max())[0][0]])%360
-      
-                    tpmedian = (90-np.median(tr[np.nonzero(tr)]))%360
-
-                    tpmean = (90-np.mean(tr[np.nonzero(tr)]))%360
+                    tpmode = stats['tip_mode']
                                              
                     axh.text(170*np.pi/180,axh.get_ylim()[1]*.65,
                              '{0:.1f}$^o$'.format(tpmode),
@@ -691,9 +568,9 @@ class PlotStrike2D(object):
                               bbox={'facecolor':(0,.1,.9),'alpha':0.25})
                     
                     print '   *Tipper Stike:  median={0:.1f} mode={1:.1f} mean={2:.1f}\n'.format(
-                            tpmedian,
+                            stats['tip_median'],
                             tpmode,
-                            tpmean)
+                            stats['tip_mean'])
                 
                     axh.set_title('Tipper Strike',fontdict=fd,
                                    bbox={'facecolor':(0,.1,.9),'alpha':0.25})
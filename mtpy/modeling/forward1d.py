@@ -0,0 +1,456 @@
+# -*- coding: utf-8 -*-
+"""
+==================
+Forward1D
+==================
+
+    * compute the MT impedance of 1-D layered earth models without running
+      an external code
+    * layers can be isotropic or azimuthally anisotropic, that is each layer
+      has a maximum and minimum horizontal resistivity and a strike angle
+    * many models and many frequencies are computed at once, the recursion
+      only loops over layers, so thousands of models can be screened in a
+      few seconds
+    * impedances are returned in the units of mtpy.core.z.Z, [mV/km]/[nT],
+      or as Z objects
+
+Models are given as arrays of layer resistivity (n_models, n_layers) in
+Ohm-m and layer thickness (n_models, n_layers-1) in meters, the last layer
+is a half space.  Models with fewer layers can be padded with layers of
+zero thickness, these do not change the response.
+
+For an anisotropic layer res_x is the resistivity along the strike
+direction and res_y the resistivity perpendicular to it.  Strike is in
+degrees clockwise from north, the same angle used by mtpy.core.z.Z.rotate,
+so rotating the impedance of an anisotropic half space by its strike gives
+zero diagonal components.
+
+The impedance tensor of an anisotropic layer stack is computed with the
+recursion of Pek and Santos [2002] for the special case of azimuthal
+anisotropy, written with exponentials of negative argument so it is stable
+for thick layers.
+
+    * Pek, J. and F. A. M. Santos, 2002, Magnetotelluric impedances and
+      parametric sensitivities for 1-D anisotropic layered media, Computers
+      & Geosciences, 28, 939-950.
+
+:Example: ::
+
+    >>> import numpy as np
+    >>> import mtpy.modeling.forward1d as forward1d
+    >>> freq = np.logspace(-3, 3, 40)
+    >>> res = 10**np.random.uniform(0, 3, (5000, 4))
+    >>> thick = np.random.uniform(100, 5000, (5000, 3))
+    >>> z_arr = forward1d.compute_z_isotropic(res, thick, freq)
+    >>> #--> or get a list of Z objects
+    >>> f1 = forward1d.Forward1D(resistivity=res, thickness=thick, freq=freq)
+    >>> z_list = f1.get_z_list()
+"""
+
+#==============================================================================
+
+import numpy as np
+import mtpy.core.z as mtz
+
+#==============================================================================
+# magnetic permeability of free space
+mu0 = 4*np.pi*1E-7
+
+# convert an impedance in Ohm to [mV/km]/[nT]
+z_ohm_to_field = 1./(mu0*1E3)
+
+#==============================================================================
+class Forward1DError(Exception):
+    pass
+
+#==============================================================================
+# batched recursions
+#==============================================================================
+def _check_layers(resistivity, thickness):
+    """
+    make resistivity (n_models, n_layers) and thickness
+    (n_models, n_layers-1) arrays
+    """
+
+    resistivity = np.atleast_2d(np.asarray(resistivity, dtype=np.float))
+    if thickness is None:
+        thickness = np.zeros((resistivity.shape[0], 0))
+    thickness = np.atleast_2d(np.asarray(thickness, dtype=np.float))
+    if thickness.shape[1] == 0 and resistivity.shape[1] > 1:
+        raise Forward1DError('Need to input layer thicknesses')
+
+    if thickness.shape[0] == 1 and resistivity.shape[0] > 1:
+        thickness = np.repeat(thickness, resistivity.shape[0], axis=0)
+    if resistivity.shape[0] != thickness.shape[0] or \
+       resistivity.shape[1] != thickness.shape[1]+1:
+        raise Forward1DError('Shape of resistivity {0} does not match '.format(
+                             resistivity.shape)+
+                             'shape of thickness {0}, '.format(thickness.shape)+
+                             'need (n_models, n_layers) and '+
+                             '(n_models, n_layers-1)')
+    if np.any(resistivity <= 0):
+        raise Forward1DError('Resistivity values need to be positive')
+    if np.any(thickness < 0):
+        raise Forward1DError('Layer thicknesses can not be negative')
+
+    return resistivity, thickness
+
+def _get_wave_number(resistivity, omega):
+    """
+    wave number and intrinsic impedance in Ohm for resistivity
+    (n_models, 1) and angular frequency (1, n_freq)
+    """
+
+    k = np.sqrt(1j*omega*mu0/resistivity)
+    zeta = 1j*omega*mu0/k
+
+    return k, zeta
+
+def compute_z_isotropic(resistivity, thickness, freq, units='field'):
+    """
+    compute the impedance of isotropic layered models for all frequencies
+
+    Arguments
+    -------------
+        **resistivity** : np.ndarray(n_models, n_layers)
+                          layer resistivity in Ohm-m, the last layer is a
+                          half space
+
+        **thickness** : np.ndarray(n_models, n_layers-1)
+                        layer thickness in meters
+
+        **freq** : np.ndarray(n_freq)
+                   frequencies in Hz
+
+        **units** : [ 'field' | 'ohm' ]
+                    units of the output impedance, *default* is 'field' for
+                    [mV/km]/[nT] as used by mtpy.core.z.Z
+
+    Returns
+    ------------
+        **z_arr** : np.ndarray(n_models, n_freq), dtype=complex
+                    impedance Zxy, Zyx = -Zxy
+
+    """
+
+    resistivity, thickness = _check_layers(resistivity, thickness)
+    omega = 2*np.pi*np.atleast_1d(np.asarray(freq, dtype=np.float))[None, :]
+
+    k, z_arr = _get_wave_number(resistivity[:, -1:], omega)
+    for ll in range(thickness.shape[1]-1, -1, -1):
+        k, zeta = _get_wave_number(resistivity[:, ll:ll+1], omega)
+        exp_kh = np.exp(-2*k*thickness[:, ll:ll+1])
+        tanh_kh = (1-exp_kh)/(1+exp_kh)
+        z_arr = zeta*(z_arr+zeta*tanh_kh)/(zeta+z_arr*tanh_kh)
+
+    if units == 'field':
+        z_arr *= z_ohm_to_field
+
+    return z_arr
+
+def _rotate_z(z_arr, cos_st, sin_st):
+    """
+    rotate impedance tensors z_arr (..., 2, 2) clockwise by the angle
+    given as cosine and sine, Z' = R Z R^T
+    """
+
+    c2 = cos_st**2
+    s2 = sin_st**2
+    cs = cos_st*sin_st
+    zxx, zxy = z_arr[..., 0, 0], z_arr[..., 0, 1]
+    zyx, zyy = z_arr[..., 1, 0], z_arr[..., 1, 1]
+
+    z_rot = np.zeros_like(z_arr)
+    z_rot[..., 0, 0] = c2*zxx+cs*(zxy+zyx)+s2*zyy
+    z_rot[..., 0, 1] = c2*zxy-cs*(zxx-zyy)-s2*zyx
+    z_rot[..., 1, 0] = c2*zyx-cs*(zxx-zyy)-s2*zxy
+    z_rot[..., 1, 1] = c2*zyy-cs*(zxy+zyx)+s2*zxx
+
+    return z_rot
+
+def compute_z_anisotropic(res_x, res_y, strike, thickness, freq,
+                          units='field'):
+    """
+    compute the impedance tensor of azimuthally anisotropic layered models
+    for all frequencies
+
+    Arguments
+    -------------
+        **res_x** : np.ndarray(n_models, n_layers)
+                    resistivity along strike in Ohm-m
+
+        **res_y** : np.ndarray(n_models, n_layers)
+                    resistivity perpendicular to strike in Ohm-m
+
+        **strike** : np.ndarray(n_models, n_layers)
+                     strike of each layer in degrees clockwise from north
+
+        **thickness** : np.ndarray(n_models, n_layers-1)
+                        layer thickness in meters
+
+        **freq** : np.ndarray(n_freq)
+                   frequencies in Hz
+
+        **units** : [ 'field' | 'ohm' ]
+                    units of the output impedance, *default* is 'field' for
+                    [mV/km]/[nT] as used by mtpy.core.z.Z
+
+    Returns
+    ------------
+        **z_arr** : np.ndarray(n_models, n_freq, 2, 2), dtype=complex
+                    impedance tensor in north-east coordinates
+
+    """
+
+    res_x, thickness = _check_layers(res_x, thickness)
+    res_y, thickness = _check_layers(res_y, thickness)
+    strike = np.atleast_2d(np.asarray(strike, dtype=np.float))
+    if strike.shape[0] == 1 and res_x.shape[0] > 1:
+        strike = np.repeat(strike, res_x.shape[0], axis=0)
+    if res_x.shape != res_y.shape or res_x.shape != strike.shape:
+        raise Forward1DError('res_x, res_y and strike need the same shape '+
+                             '(n_models, n_layers)')
+
+    omega = 2*np.pi*np.atleast_1d(np.asarray(freq, dtype=np.float))[None, :]
+    n_models, n_layers = res_x.shape
+    cos_st = np.cos(np.deg2rad(strike))[:, :, None]
+    sin_st = np.sin(np.deg2rad(strike))[:, :, None]
+
+    # half space in its principal coordinates
+    kx, zeta_x = _get_wave_number(res_x[:, -1:], omega)
+    ky, zeta_y = _get_wave_number(res_y[:, -1:], omega)
+    z_arr = np.zeros((n_models, omega.size, 2, 2), dtype=np.complex)
+    z_arr[:, :, 0, 1] = zeta_x
+    z_arr[:, :, 1, 0] = -zeta_y
+
+    for ll in range(n_layers-2, -1, -1):
+        # rotate the impedance at the bottom of the layer from the
+        # coordinates of the layer below into the coordinates of this layer
+        c_ll = cos_st[:, ll]*cos_st[:, ll+1]+sin_st[:, ll]*sin_st[:, ll+1]
+        s_ll = sin_st[:, ll]*cos_st[:, ll+1]-cos_st[:, ll]*sin_st[:, ll+1]
+        z_arr = _rotate_z(z_arr, c_ll, s_ll)
+
+        kx, zeta_x = _get_wave_number(res_x[:, ll:ll+1], omega)
+        ky, zeta_y = _get_wave_number(res_y[:, ll:ll+1], omega)
+        h_ll = thickness[:, ll:ll+1]
+        exp_x = np.exp(-2*kx*h_ll)
+        exp_y = np.exp(-2*ky*h_ll)
+        tanh_x = (1-exp_x)/(1+exp_x)
+        tanh_y = (1-exp_y)/(1+exp_y)
+
+        zxx, zxy = z_arr[:, :, 0, 0], z_arr[:, :, 0, 1]
+        zyx, zyy = z_arr[:, :, 1, 0], z_arr[:, :, 1, 1]
+        det = (1-tanh_y*zyx/zeta_y)*(1+tanh_x*zxy/zeta_x)+\
+              tanh_x*tanh_y*zxx*zyy/(zeta_x*zeta_y)
+        d_factor = 4*np.exp(-(kx+ky)*h_ll)/((1+exp_x)*(1+exp_y)*det)
+
+        z_top = np.zeros_like(z_arr)
+        z_top[:, :, 0, 0] = zxx*d_factor
+        z_top[:, :, 0, 1] = (zxx*zyy*tanh_y/zeta_y+
+                             (zxy+zeta_x*tanh_x)*(1-tanh_y*zyx/zeta_y))/det
+        z_top[:, :, 1, 0] = ((zyx-zeta_y*tanh_y)*(1+tanh_x*zxy/zeta_x)-
+                             zxx*zyy*tanh_x/zeta_x)/det
+        z_top[:, :, 1, 1] = zyy*d_factor
+        z_arr = z_top
+
+    # rotate from the coordinates of the top layer to north-east
+    z_arr = _rotate_z(z_arr, cos_st[:, 0], -sin_st[:, 0])
+
+    if units == 'field':
+        z_arr *= z_ohm_to_field
+
+    return z_arr
+
+def pad_layers(layer_list):
+    """
+    pad a list of models with different numbers of layers to the same number
+    of layers with layers of zero thickness above the half space, these do
+    not change the response.
+
+    Arguments
+    -------------
+        **layer_list** : list of tuples (resistivity, thickness), or
+                         (res_x, res_y, strike, thickness) for anisotropic
+                         models, for each model
+
+    Returns
+    ------------
+        **resistivity** : np.ndarray(n_models, n_layers) or for anisotropic
+                          models **res_x**, **res_y**, **strike**
+
+        **thickness** : np.ndarray(n_models, n_layers-1)
+
+    """
+
+    n_values = len(layer_list[0])
+    n_layers = max([len(layers[0]) for layers in layer_list])
+    n_models = len(layer_list)
+
+    value_list = [np.zeros((n_models, n_layers)) for ii in range(n_values-1)]
+    thickness = np.zeros((n_models, n_layers-1))
+    for mm, layers in enumerate(layer_list):
+        n_ll = len(layers[0])
+        for value, m_value in zip(value_list, layers[:-1]):
+            m_value = np.asarray(m_value, dtype=np.float)
+            value[mm, :n_ll-1] = m_value[:-1]
+            value[mm, n_ll-1:] = m_value[-1]
+        thickness[mm, :n_ll-1] = layers[-1]
+
+    return tuple(value_list)+(thickness,)
+
+#==============================================================================
+# Forward1D
+#==============================================================================
+class Forward1D(object):
+    """
+    compute the MT response of many 1-D layered models at once.
+
+    Give either resistivity for isotropic models or res_x, res_y and strike
+    for anisotropic models.
+
+    ======================== ==================================================
+    Attributes               Description
+    ======================== ==================================================
+    freq                     np.ndarray(n_freq) of frequencies in Hz
+    res_x                    np.ndarray(n_models, n_layers) of resistivity
+                             along strike in Ohm-m
+    res_y                    np.ndarray(n_models, n_layers) of resistivity
+                             perpendicular to strike in Ohm-m
+    resistivity              np.ndarray(n_models, n_layers) of isotropic
+                             resistivity in Ohm-m
+    strike                   np.ndarray(n_models, n_layers) of strike in
+                             degrees clockwise from north
+    thickness                np.ndarray(n_models, n_layers-1) of layer
+                             thickness in meters, the last layer is a half
+                             space
+    z                        np.ndarray(n_models, n_freq, 2, 2) of impedance
+                             tensors in [mV/km]/[nT], filled by compute_z
+    ======================== ==================================================
+
+    ======================== ==================================================
+    Methods                  Description
+    ======================== ==================================================
+    compute_z                compute impedance tensors of all models
+    get_z_list               get a list of mtpy.core.z.Z objects
+    read_occam1d_model       set layers from an occam1d.Model
+    read_pek1d_model         set layers from a pek1dclasses.Model
+    ======================== ==================================================
+
+    :Example: ::
+
+        >>> import mtpy.modeling.occam1d as occam1d
+        >>> import mtpy.modeling.forward1d as forward1d
+        >>> m1 = occam1d.Model()
+        >>> m1.read_iter_file(r"/home/Occam1D/Inv1_TE/M01TE_15.iter",
+        >>> ...               r"/home/Occam1D/Inv1_TE/Model1D")
+        >>> f1 = forward1d.Forward1D(freq=np.logspace(-3, 3, 40))
+        >>> f1.read_occam1d_model(m1)
+        >>> z_obj = f1.get_z_list()[0]
+    """
+
+    def __init__(self, **kwargs):
+
+        self.freq = kwargs.pop('freq', None)
+        self.resistivity = kwargs.pop('resistivity', None)
+        self.res_x = kwargs.pop('res_x', None)
+        self.res_y = kwargs.pop('res_y', None)
+        self.strike = kwargs.pop('strike', None)
+        self.thickness = kwargs.pop('thickness', None)
+
+        self.z = None
+
+    def compute_z(self):
+        """
+        compute the impedance tensor of all models at all frequencies,
+        fills z with shape (n_models, n_freq, 2, 2)
+        """
+
+        if self.freq is None:
+            raise Forward1DError('Need to input frequencies')
+
+        self.freq = np.atleast_1d(np.asarray(self.freq, dtype=np.float))
+        if self.resistivity is not None:
+            z_xy = compute_z_isotropic(self.resistivity, self.thickness,
+                                       self.freq)
+            self.z = np.zeros(z_xy.shape+(2, 2), dtype=np.complex)
+            self.z[:, :, 0, 1] = z_xy
+            self.z[:, :, 1, 0] = -z_xy
+        elif self.res_x is not None:
+            if self.res_y is None:
+                self.res_y = self.res_x
+            if self.strike is None:
+                self.strike = np.zeros_like(self.res_x)
+            self.z = compute_z_anisotropic(self.res_x, self.res_y,
+                                           self.strike, self.thickness,
+                                           self.freq)
+        else:
+            raise Forward1DError('Need to input resistivity or res_x')
+
+        return self.z
+
+    def get_z_list(self):
+        """
+        get a list of mtpy.core.z.Z objects, one for each model, errors are
+        set to zero
+        """
+
+        if self.z is None:
+            self.compute_z()
+
+        z_err = np.zeros(self.z.shape[1:])
+        return [mtz.Z(z_array=z_arr, zerr_array=z_err.copy(),
+                      freq=self.freq.copy()) for z_arr in self.z]
+
+    def read_occam1d_model(self, occam1d_model, column=1):
+        """
+        set resistivity and thickness from an occam1d.Model, air layers are
+        left out.  Use read_iter_file first to get the inverted values.
+
+        Arguments
+        -------------
+            **occam1d_model** : occam1d.Model instance with model_depth and
+                                model_res filled
+
+            **column** : column of model_res to take free parameters from,
+                         these are log10 values. *default* is 1
+        """
+
+        depth = np.asarray(occam1d_model.model_depth, dtype=np.float)
+        model_res = np.asarray(occam1d_model.model_res, dtype=np.float)
+        ground = depth >= 0
+
+        res = model_res[:, 0].copy()
+        free = res == -1
+        res[free] = 10**model_res[free, column]
+
+        self.resistivity = res[ground][None, :]
+        self.thickness = np.diff(depth[ground])[None, :]
+        self.res_x = None
+        self.z = None
+
+    def read_pek1d_model(self, pek1d_model, model_index=None):
+        """
+        set res_x, res_y, strike and thickness from the models of a
+        pek1dclasses.Model, each layer is two rows of top and bottom depth
+        with columns (index, depth, res_min, res_max, strike)
+
+        Arguments
+        -------------
+            **pek1d_model** : pek1dclasses.Model instance with models read in
+
+            **model_index** : index or list of indices of the models to use,
+                              *default* is None for all models
+        """
+
+        models = np.asarray(pek1d_model.models, dtype=np.float)
+        if models.ndim == 2:
+            models = models[None, :, :]
+        if model_index is not None:
+            models = models[np.atleast_1d(model_index)]
+
+        self.res_x = models[:, ::2, 2]
+        self.res_y = models[:, ::2, 3]
+        self.strike = models[:, ::2, 4]
+        self.thickness = models[:, 1::2, 1][:, :-1]-models[:, ::2, 1][:, :-1]
+        self.resistivity = None
+        self.z = None
@@ -19,30 +19,27 @@ import mtpy.core.mt as mt
 import numpy as np
 import mtpy.utils.latlongutmconversion as utm2ll
 import mtpy.modeling.ws3dinv as ws
-import matplotlib.pyplot as plt
-from matplotlib.ticker import MultipleLocator, FormatStrFormatter
-from matplotlib.patches import Ellipse
-from matplotlib.colors import Normalize
-import matplotlib.colorbar as mcb
-import matplotlib.gridspec as gridspec
 import mtpy.imaging.mtplottools as mtplottools
-import matplotlib.widgets as widgets
-import matplotlib.colors as colors
-import matplotlib.cm as cm
 import mtpy.utils.exceptions as mtex
 import mtpy.analysis.pt as mtpt
-import mtpy.imaging.mtcolors as mtcl
-import scipy.interpolate as spi
-try:
-    from evtk.hl import gridToVTK, pointsToVTK
-except ImportError:
-    print ('If you want to write a vtk file for 3d viewing, you need download '
-           'and install evtk from https://bitbucket.org/pauloh/pyevtk')
-           
-    print ('Note: if you are using Windows you should build evtk first with'
-           'either MinGW or cygwin using the command: \n'
-           '    python setup.py build -compiler=mingw32  or \n'
-           '    python setup.py build -compiler=cygwin')
+import mtpy.utils.lazyimport as lazyimport
+import mtpy.utils.timing as timing
+import mtpy.utils.modelexport as modelexport
+import mtpy.utils.modelcache as modelcache
+
+# plotting and scipy are loaded on first use, so reading and writing files
+# does not need matplotlib
+plt = lazyimport.lazy_import('matplotlib.pyplot')
+mticker = lazyimport.lazy_import('matplotlib.ticker')
+mpatches = lazyimport.lazy_import('matplotlib.patches')
+mcb = lazyimport.lazy_import('matplotlib.colorbar')
+gridspec = lazyimport.lazy_import('matplotlib.gridspec')
+widgets = lazyimport.lazy_import('matplotlib.widgets')
+colors = lazyimport.lazy_import('matplotlib.colors')
+cm = lazyimport.lazy_import('matplotlib.cm')
+mtcl = lazyimport.lazy_import('mtpy.imaging.mtcolors')
+batchplot = lazyimport.lazy_import('mtpy.imaging.batchplot')
+spi = lazyimport.lazy_import('scipy.interpolate')
 
 
 epsg_dict = {28350:['+proj=utm +zone=50 +south +ellps=GRS80 +towgs84=0,0,0,0,0,0,0 +units=m +no_defs',50],
@@ -886,8 +883,148 @@ class Data(object):
         
     station_locations = property(_get_station_locations, 
                                   _set_station_locations,
-                                  doc="""location of stations""") 
-                
+                                  doc="""location of stations""")
+
+    def _get_data_error(self, comp):
+        """
+        compute the error for a given component for all stations and periods
+        at once according to error_type.
+
+        Returns an array of shape (num_stations, num_periods), the sign and
+        units are dealt with in _get_data_lines.
+        """
+
+        z_ii, z_jj = self.comp_index_dict[comp]
+
+        #tipper errors, note the error is taken from tip_err[:, :, 0, 0] for
+        #both tx and ty to stay consistent with previous versions.
+        if comp.find('t') == 0:
+            if 'floor' in self.error_type:
+                t_err = self.data_array['tip_err'][:, :, 0, z_ii]
+                return np.where(t_err > self.error_tipper, t_err,
+                                self.error_tipper)
+            else:
+                return np.zeros(self.data_array['tip'].shape[0:2])+\
+                       self.error_tipper
+
+        zz = self.data_array['z'][:, :, z_ii, z_jj]
+        z_err = self.data_array['z_err'][:, :, z_ii, z_jj]
+        d_zxy = self.data_array['z'][:, :, 0, 1]
+        d_zyx = self.data_array['z'][:, :, 1, 0]
+
+        if self.error_type == 'floor':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rel_err = z_err/abs(zz)
+            rel_err = np.where(rel_err < self.error_floor/100.,
+                               self.error_floor/100., rel_err)
+            abs_err = rel_err*abs(zz)
+        elif self.error_type == 'value':
+            abs_err = abs(zz)*self.error_value/100.
+        elif self.error_type == 'egbert':
+            abs_err = np.sqrt(abs(d_zxy*d_zyx))*self.error_egbert/100.
+        elif self.error_type == 'floor_egbert':
+            e_floor = np.sqrt(abs(d_zxy*d_zyx))*self.error_egbert/100.
+            abs_err = np.where(z_err < e_floor, e_floor, z_err)
+        else:
+            raise ModEMError('error_type {0} not understood, '.format(
+                             self.error_type)+'should be [ floor | value |'
+                             ' egbert | floor_egbert ]')
+
+        return abs_err
+
+    def _get_data_lines(self, inv_mode, compute_error=True):
+        """
+        make the data lines for a given inversion mode.
+
+        All values are collected into arrays of shape
+        (num_stations, num_periods, num_components) and formatted as a batch,
+        lines are in the order station, period, component and only non-zero
+        values are written.
+
+        Returns a list of strings, one for each data line.
+        """
+
+        #period, station, lat, lon, north, east, elev, comp, real, imag, err
+        if self.formatting == '1':
+            fmt_list = ['%-12.5e', '%7s', '% 9.3f', '% 9.3f', '% 12.3f',
+                        '% 12.3f', '% 12.3f', '%4s', '% 14.6e', '% 14.6e',
+                        '% 14.6e']
+        elif self.formatting == '2':
+            fmt_list = ['%-14.6e', '%-10s', '% 14.6f', '% 14.6f', '% 15.3f',
+                        '% 12.3f', '% 10.3f', '%12s', '% 17.6e', '% 17.6e',
+                        '% 14.6e']
+        else:
+            raise ModEMError('formatting {0} not understood, '.format(
+                             self.formatting)+'should be [ 1 | 2 ]')
+        line_fmt = ''.join(fmt_list)+'\n'
+
+        comp_list = self.inv_comp_dict[inv_mode]
+        ns, nf = self.data_array['z'].shape[0:2]
+        nc = len(comp_list)
+
+        value_arr = np.zeros((ns, nf, nc), dtype=np.complex)
+        error_arr = np.zeros((ns, nf, nc), dtype=np.float)
+        for cc, comp in enumerate(comp_list):
+            #index values for component with in the matrix
+            z_ii, z_jj = self.comp_index_dict[comp]
+
+            #get the correct key for data array according to comp
+            if comp.find('z') == 0:
+                c_key = 'z'
+            elif comp.find('t') == 0:
+                c_key = 'tip'
+
+            value_arr[:, :, cc] = self.data_array[c_key][:, :, z_ii, z_jj]
+            if compute_error:
+                error_arr[:, :, cc] = abs(self._get_data_error(comp))
+            else:
+                c_err = self.data_array[c_key+'_err'][:, :, z_ii, z_jj].real
+                if c_key == 'z' and self.units == 'ohm':
+                    c_err = c_err/796.
+                error_arr[:, :, cc] = abs(c_err)
+
+        #only write values that are non-zero and not a dummy value
+        write_arr = (value_arr.real != 0.0) & (value_arr.imag != 0.0) & \
+                    (value_arr.real != 1e32) & (value_arr.imag != 1e32)
+        s_index, f_index, c_index = np.nonzero(write_arr)
+
+        period_arr = np.array(self.period_list, dtype=np.float)[f_index]
+        station_arr = self.data_array['station'][s_index]
+        comp_arr = np.array([comp.upper() for comp in comp_list])[c_index]
+        real_arr = value_arr.real[s_index, f_index, c_index]
+        imag_arr = value_arr.imag[s_index, f_index, c_index]
+        error_arr = error_arr[s_index, f_index, c_index]
+        if self.units == 'ohm':
+            real_arr = real_arr/796.
+            imag_arr = imag_arr/796.
+
+        if compute_error:
+            for zz in np.where(error_arr == 0.0)[0]:
+                print ('error at {0} is 0 for period {1}'.format(
+                        fmt_list[1] % station_arr[zz],
+                        fmt_list[0] % period_arr[zz])+'set to 1e3')
+            if self.units == 'ohm':
+                error_arr[np.where(error_arr == 0.0)] = 1e3/796.
+            else:
+                error_arr[np.where(error_arr == 0.0)] = 1e3
+
+        #make sure that x==north, y==east, z==+down
+        dlines = [line_fmt % d_tuple for d_tuple in
+                  zip(period_arr.tolist(),
+                      station_arr.tolist(),
+                      self.data_array['lat'][s_index].tolist(),
+                      self.data_array['lon'][s_index].tolist(),
+                      self.data_array['rel_north'][s_index].tolist(),
+                      self.data_array['rel_east'][s_index].tolist(),
+                      self.data_array['elev'][s_index].tolist(),
+                      comp_arr.tolist(),
+                      real_arr.tolist(),
+                      imag_arr.tolist(),
+                      error_arr.tolist())]
+
+        return dlines
+
+    @timing.timed('modem.write_data_file')
     def write_data_file(self, save_path=None, fn_basename=None, 
                         rotation_angle=None, compute_error=True, 
                         fill=True):
@@ -972,108 +1109,14 @@ class Data(object):
             dlines.append('> {0} {1}\n'.format(nper,
                                                self.data_array['z'].shape[0]))
                                                
-            for ss in range(self.data_array['z'].shape[0]):
-                for ff in range(self.data_array['z'].shape[1]):
-                    for comp in self.inv_comp_dict[inv_mode]:
-                        #index values for component with in the matrix
-                        z_ii, z_jj = self.comp_index_dict[comp]
-                        
-                        #get the correct key for data array according to comp
-                        if comp.find('z') == 0:
-                            c_key = 'z'
-                        elif comp.find('t') == 0:
-                            c_key = 'tip'
-                        
-                        #get the value for that compenent at that frequency
-                        zz = self.data_array[ss][c_key][ff, z_ii, z_jj]
-                        if zz.real != 0.0 and zz.imag != 0.0 and \
-                            zz.real != 1e32 and zz.imag != 1e32:
-                            if self.formatting == '1':
-                                per = '{0:<12.5e}'.format(self.period_list[ff])
-                                sta = '{0:>7}'.format(self.data_array[ss]['station'])
-                                lat = '{0:> 9.3f}'.format(self.data_array[ss]['lat'])
-                                lon = '{0:> 9.3f}'.format(self.data_array[ss]['lon'])
-                                eas = '{0:> 12.3f}'.format(self.data_array[ss]['rel_east'])
-                                nor = '{0:> 12.3f}'.format(self.data_array[ss]['rel_north'])
-                                ele = '{0:> 12.3f}'.format(self.data_array[ss]['elev'])
-                                com = '{0:>4}'.format(comp.upper())
-                                if self.units == 'ohm':
-                                    rea = '{0:> 14.6e}'.format(zz.real/796.)
-                                    ima = '{0:> 14.6e}'.format(zz.imag/796.)
-                                else:
-                                    rea = '{0:> 14.6e}'.format(zz.real)
-                                    ima = '{0:> 14.6e}'.format(zz.imag)
-                                
-
-                            elif self.formatting == '2':
-                                per = '{0:<14.6e}'.format(self.period_list[ff])
-                                sta = '{0:<10}'.format(self.data_array[ss]['station'])
-                                lat = '{0:> 14.6f}'.format(self.data_array[ss]['lat'])
-                                lon = '{0:> 14.6f}'.format(self.data_array[ss]['lon'])
-                                eas = '{0:> 12.3f}'.format(self.data_array[ss]['rel_east'])
-                                nor = '{0:> 15.3f}'.format(self.data_array[ss]['rel_north'])
-                                ele = '{0:> 10.3f}'.format(self.data_array[ss]['elev'])
-                                com = '{0:>12}'.format(comp.upper())
-                                if self.units == 'ohm':
-                                    rea = '{0:> 17.6e}'.format(zz.real/796.)
-                                    ima = '{0:> 17.6e}'.format(zz.imag/796.)
-                                else:
-                                    rea = '{0:> 17.6e}'.format(zz.real)
-                                    ima = '{0:> 17.6e}'.format(zz.imag)
-                            if compute_error:
-                                #compute relative error
-                                if comp.find('t') == 0:
-                                    if 'floor' in self.error_type:
-                                        abs_err = max(self.error_tipper, 
-                                                      self.data_array[ss]['tip_err'][ff,0,z_ii])
-                                    else:
-                                        abs_err = self.error_tipper
-                                elif comp.find('z') == 0:
-                                    if self.error_type == 'floor':
-                                        rel_err = self.data_array[ss][c_key+'_err'][ff, z_ii, z_jj]/\
-                                                  abs(zz)
-                                        if rel_err < self.error_floor/100.:
-                                            rel_err = self.error_floor/100.
-                                        abs_err = rel_err*abs(zz)
-                                    elif self.error_type == 'value':
-                                        abs_err = abs(zz)*self.error_value/100.
-                                    
-                                    elif self.error_type == 'egbert':
-                                        d_zxy = self.data_array[ss]['z'][ff, 0, 1]
-                                        d_zyx = self.data_array[ss]['z'][ff, 1, 0]
-                                        abs_err = np.sqrt(abs(d_zxy*d_zyx))*\
-                                                  self.error_egbert/100.
-                                    elif self.error_type == 'floor_egbert':
-                                        abs_err = self.data_array[ss][c_key+'_err'][ff, z_ii, z_jj]
-                                        d_zxy = self.data_array[ss]['z'][ff, 0, 1]
-                                        d_zyx = self.data_array[ss]['z'][ff, 1, 0]
-                                        if abs_err < np.sqrt(abs(d_zxy*d_zyx))*self.error_egbert/100.:
-                                            abs_err = np.sqrt(abs(d_zxy*d_zyx))*self.error_egbert/100.
-
-
-                                if abs_err == 0.0:
-                                    abs_err = 1e3
-                                    print ('error at {0} is 0 for period {1}'.format(
-                                            sta, per)+'set to 1e3')
-                                    if self.units == 'ohm':
-                                        abs_err /= 796.
-
-                            else: 
-                                abs_err = self.data_array[ss][c_key+'_err'][ff, z_ii, z_jj].real 
-                                if ((c_key.find('z') >= 0) and (self.units == 'ohm')):
-                                    abs_err /= 796.
-                                    
-                            abs_err = '{0:> 14.6e}'.format(abs(abs_err))
-                            #make sure that x==north, y==east, z==+down                            
-                            dline = ''.join([per, sta, lat, lon, nor, eas, ele, 
-                                             com, rea, ima, abs_err, '\n'])
-                            dlines.append(dline)
+            dlines.extend(self._get_data_lines(inv_mode, compute_error))
         
         
         
         dfid = file(self.data_fn, 'w')
         dfid.writelines(dlines)
         dfid.close()
+        timing.add_written(self.data_fn)
         
         print 'Wrote ModEM data file to {0}'.format(self.data_fn)
         
@@ -1165,6 +1208,7 @@ class Data(object):
         #-->write file
         self.write_data_file()
         
+    @timing.timed('modem.read_data_file')
     def read_data_file(self, data_fn=None):
         """
         read ModEM data file
@@ -1189,12 +1233,11 @@ class Data(object):
         dfid = file(self.data_fn, 'r')
         dlines = dfid.readlines()
         dfid.close()
+        timing.add_read(self.data_fn)
         
         header_list = []
         metadata_list = []
-        data_list = []
-        period_list = []
-        station_list = []
+        data_lines = []
         read_impedance = False
         read_tipper = False
         for dline in dlines:
@@ -1205,7 +1248,7 @@ class Data(object):
                 if dline.lower().find('ohm') > 0:
                     self.units = 'ohm'
                 if dline.lower().find('mv') > 0:
-                    self.units =' [mV/km]/[nT]'
+                    self.units = '[mV/km]/[nT]'
                 if dline.lower().find('vertical') > 0:
                     read_tipper = True
                     read_impedance = False
@@ -1218,22 +1261,8 @@ class Data(object):
                     elif read_tipper is True:
                         self.wave_sign_tipper = dline[dline.find('(')+1]
             else:
-                dline_list = dline.strip().split()
-                if len(dline_list) == 11:
-                    for ii, d_str in enumerate(dline_list):
-                        if ii != 1:
-                            try:
-                                dline_list[ii] = float(d_str.strip())
-                            except ValueError:
-                                pass
-                        # be sure the station name is a string
-                        else:
-                            dline_list[ii] = d_str.strip()
-                    period_list.append(dline_list[0])
-                    station_list.append(dline_list[1])
-                    
-                    data_list.append(dline_list)
-        
+                data_lines.append(dline)
+
         #try to find rotation angle
         h_list = header_list[0].split()
         for hh, h_str in enumerate(h_list):
@@ -1244,110 +1273,116 @@ class Data(object):
                              self._rotation_angle)+'deg clockwise from N')
                 except ValueError:
                     pass
-                
-            
-        self.period_list = np.array(sorted(set(period_list)))
-        station_list = sorted(set(station_list))
-        
-        #make a period dictionary to with key as period and value as index
-        period_dict = dict([(per, ii) for ii, per in enumerate(self.period_list)])
-        
-        #--> need to sort the data into a useful fashion such that each station
-        #    is an mt object
-        
-        data_dict = {}
-        z_dummy = np.zeros((len(self.period_list), 2, 2), dtype='complex')
-        t_dummy = np.zeros((len(self.period_list), 1, 2), dtype='complex')
-        
+
+        #--> read all the data in one go, each data line has 11 columns
+        #    period, station, lat, lon, north, east, elev, comp, real, imag,
+        #    error
+        d_str_list = [dline.split() for dline in data_lines]
+        d_str_arr = np.array([d_str for d_str in d_str_list
+                              if len(d_str) == 11], dtype=np.str_)
+        if d_str_arr.shape[0] == 0:
+            raise ModEMError('Did not find any data in {0}'.format(
+                             self.data_fn))
+        try:
+            d_arr = d_str_arr[:, [0, 2, 3, 4, 5, 6, 8, 9, 10]].astype(np.float)
+        except ValueError:
+            raise ModEMError('Could not convert data in {0} to numbers'.format(
+                             self.data_fn))
+
+        station_arr = d_str_arr[:, 1]
+        comp_arr = d_str_arr[:, 7]
+
+        #sorted unique periods and stations and the index of each data line
+        #into those
+        self.period_list, p_index = np.unique(d_arr[:, 0],
+                                              return_inverse=True)
+        station_list, first_index, s_index = np.unique(station_arr,
+                                                       return_index=True,
+                                                       return_inverse=True)
+
+        ns = station_list.shape[0]
+        nf = self.period_list.shape[0]
+
         index_dict = {'zxx': (0, 0), 'zxy':(0, 1), 'zyx':(1, 0), 'zyy':(1, 1),
-                      'tx':(0, 0), 'ty':(0, 1)} 
-        
-        #dictionary for true false if station data (lat, lon, elev, etc) 
-        #has been filled already so we don't rewrite it each time              
-        tf_dict = {}
-        for station in station_list:
-            data_dict[station] = mt.MT()
-            data_dict[station].Z = mtz.Z(z_array=z_dummy.copy(), 
-                                        zerr_array=z_dummy.copy().real, 
-                                        freq=1./self.period_list)
-            data_dict[station].Tipper = mtz.Tipper(tipper_array=t_dummy.copy(), 
-                                                   tippererr_array=t_dummy.copy().real, 
-                                                   freq=1./self.period_list)
-            #make sure that the station data starts out with false to fill
-            #the data later
-            tf_dict[station] = False
-            
-        #fill in the data for each station                                      
-        for dd in data_list:
-            #get the period index from the data line
-            p_index = period_dict[dd[0]]
-            #get the component index from the data line
-            ii, jj = index_dict[dd[7].lower()]
-            
-            #if the station data has not been filled yet, fill it
-            if tf_dict[dd[1]] == False:
-                data_dict[dd[1]].lat = dd[2]
-                data_dict[dd[1]].lon = dd[3]
-                data_dict[dd[1]].grid_north = dd[4]
-                data_dict[dd[1]].grid_east = dd[5]
-                data_dict[dd[1]].grid_elev = dd[6]
-                data_dict[dd[1]].station = dd[1]
-                tf_dict[dd[1]] = True
-            #fill in the impedance tensor with appropriate values
-            if dd[7].find('Z') == 0:
-                z_err = dd[10]
-                if self.wave_sign_impedance == '+':
-                    z_value = dd[8]+1j*dd[9]
-                elif self.wave_sign_impedance == '-':
-                    z_value = dd[8]-1j*dd[9]
-                    
-                if self.units == 'ohm':
-                    z_value *= 796.
-                    z_err *= 796.
-                    
-                data_dict[dd[1]].Z.z[p_index, ii, jj] = z_value
-                data_dict[dd[1]].Z.zerr[p_index, ii, jj] = z_err
-            #fill in tipper with appropriate values
-            elif dd[7].find('T') == 0:
-                if self.wave_sign_tipper == '+':
-                    data_dict[dd[1]].Tipper.tipper[p_index, ii, jj] = dd[8]+1j*dd[9]
-                elif self.wave_sign_tipper == '-':
-                    data_dict[dd[1]].Tipper.tipper[p_index, ii, jj] = dd[8]-1j*dd[9]
-                data_dict[dd[1]].Tipper.tippererr[p_index, ii, jj] = dd[10]
-       
-        #make mt_dict an attribute for easier manipulation later
-        self.mt_dict = data_dict
+                      'tx':(0, 0), 'ty':(0, 1)}
+        ii_arr = np.zeros(comp_arr.shape[0], dtype=np.int)
+        jj_arr = np.zeros(comp_arr.shape[0], dtype=np.int)
+        for comp in set(comp_arr.tolist()):
+            c_index = np.where(comp_arr == comp)[0]
+            ii_arr[c_index], jj_arr[c_index] = index_dict[comp.lower()]
+
+        #fill in the impedance tensor and tipper with appropriate values
+        z_arr = np.zeros((ns, nf, 2, 2), dtype='complex')
+        z_err_arr = np.zeros((ns, nf, 2, 2), dtype='float')
+        t_arr = np.zeros((ns, nf, 1, 2), dtype='complex')
+        t_err_arr = np.zeros((ns, nf, 1, 2), dtype='float')
+
+        z_index = np.array([comp.find('Z') == 0 for comp in comp_arr])
+        t_index = np.array([comp.find('T') == 0 for comp in comp_arr])
+
+        if self.wave_sign_impedance == '-':
+            z_value = d_arr[z_index, 6]-1j*d_arr[z_index, 7]
+        else:
+            z_value = d_arr[z_index, 6]+1j*d_arr[z_index, 7]
+        z_err = d_arr[z_index, 8]
+        if self.units == 'ohm':
+            z_value *= 796.
+            z_err *= 796.
+        z_arr[s_index[z_index], p_index[z_index],
+              ii_arr[z_index], jj_arr[z_index]] = z_value
+        z_err_arr[s_index[z_index], p_index[z_index],
+                  ii_arr[z_index], jj_arr[z_index]] = z_err
+
+        if self.wave_sign_tipper == '-':
+            t_value = d_arr[t_index, 6]-1j*d_arr[t_index, 7]
+        else:
+            t_value = d_arr[t_index, 6]+1j*d_arr[t_index, 7]
+        t_arr[s_index[t_index], p_index[t_index],
+              ii_arr[t_index], jj_arr[t_index]] = t_value
+        t_err_arr[s_index[t_index], p_index[t_index],
+                  ii_arr[t_index], jj_arr[t_index]] = d_arr[t_index, 8]
+
+        #--> need to sort the data into a useful fashion such that each station
+        #    is an mt object, station information is taken from the first
+        #    line of each station.  Z and Tipper are full when they are set
+        #    so the invariants and phase tensor are computed then.
+        self.mt_dict = {}
+        for ss, station in enumerate(station_list.tolist()):
+            mt_obj = mt.MT()
+            mt_obj.Z = mtz.Z(z_array=z_arr[ss],
+                             zerr_array=z_err_arr[ss],
+                             freq=1./self.period_list)
+            mt_obj.Tipper = mtz.Tipper(tipper_array=t_arr[ss],
+                                       tippererr_array=t_err_arr[ss],
+                                       freq=1./self.period_list)
+            mt_obj.lat = d_arr[first_index[ss], 1]
+            mt_obj.lon = d_arr[first_index[ss], 2]
+            mt_obj.grid_north = d_arr[first_index[ss], 3]
+            mt_obj.grid_east = d_arr[first_index[ss], 4]
+            mt_obj.grid_elev = d_arr[first_index[ss], 5]
+            mt_obj.station = station
+
+            self.mt_dict[station] = mt_obj
 
-        ns = len(self.mt_dict.keys())
-        nf = len(self.period_list)
         self._set_dtype((nf, 2, 2), (nf, 1, 2))
         self.data_array = np.zeros(ns, dtype=self._dtype)
-        
-        #Be sure to caclulate invariants and phase tensor for each station
-        for ii, s_key in enumerate(sorted(self.mt_dict.keys())):
-            mt_obj = self.mt_dict[s_key]
-            
-            self.mt_dict[s_key].zinv.compute_invariants()
-            self.mt_dict[s_key].pt.set_z_object(mt_obj.Z)
-            self.mt_dict[s_key].Tipper._compute_amp_phase()
-            self.mt_dict[s_key].Tipper._compute_mag_direction()
-                                   
-        
-            self.data_array[ii]['station'] = mt_obj.station
-            self.data_array[ii]['lat'] = mt_obj.lat
-            self.data_array[ii]['lon'] = mt_obj.lon
-            self.data_array[ii]['east'] = mt_obj.east
-            self.data_array[ii]['north'] = mt_obj.north
-            self.data_array[ii]['elev'] = mt_obj.grid_elev
-            self.data_array[ii]['rel_east'] = mt_obj.grid_east
-            self.data_array[ii]['rel_north'] = mt_obj.grid_north
-            
-            self.data_array[ii]['z'][:] = mt_obj.Z.z
-            self.data_array[ii]['z_err'][:] = mt_obj.Z.zerr
-            
-            self.data_array[ii]['tip'][:] = mt_obj.Tipper.tipper
-            self.data_array[ii]['tip_err'][:] = mt_obj.Tipper.tippererr
-            
+
+        self.data_array['station'] = station_list
+        self.data_array['lat'] = d_arr[first_index, 1]
+        self.data_array['lon'] = d_arr[first_index, 2]
+        self.data_array['east'] = [self.mt_dict[station].east
+                                   for station in station_list]
+        self.data_array['north'] = [self.mt_dict[station].north
+                                    for station in station_list]
+        self.data_array['elev'] = d_arr[first_index, 5]
+        self.data_array['rel_east'] = d_arr[first_index, 4]
+        self.data_array['rel_north'] = d_arr[first_index, 3]
+
+        self.data_array['z'][:] = z_arr
+        self.data_array['z_err'][:] = z_err_arr
+        self.data_array['tip'][:] = t_arr
+        self.data_array['tip_err'][:] = t_err_arr
+    
     def write_vtk_station_file(self, vtk_save_path=None, 
                                vtk_fn_basename='ModEM_stations'):
         """
@@ -1365,19 +1400,440 @@ class Data(object):
                                   on the extension .vtu
         """
         
-        if vtk_save_path is not None:
+        if vtk_save_path is None:
             vtk_fn = os.path.join(self.save_path, vtk_fn_basename)
         else:
             vtk_fn = os.path.join(vtk_save_path, vtk_fn_basename)
             
-        pointsToVTK(vtk_fn, 
-                 self.station_locations['rel_north'], 
-                 self.station_locations['rel_east'],
-                 -self.station_locations['elev'],
-                 pointData={'elevation':self.station_locations['elev']})
+        vtk_fn = modelexport.write_vtk_points(vtk_fn, 
+                        self.station_locations['rel_north'], 
+                        self.station_locations['rel_east'],
+                        -self.station_locations['elev'],
+                        point_data={'elevation':self.station_locations['elev']})
                  
         print 'Wrote file to {0}'.format(vtk_fn)
+        
+        return vtk_fn
+            
+        
+#==============================================================================
+# residuals
+#==============================================================================
+class Residual(object):
+    """
+    compute the residuals between a ModEM data file and a model response for
+    all stations, periods and components at once.
+    
+    The normalized residual is (data-response)/error, where real and 
+    imaginary parts are counted as separate data points as in ModEM, so the 
+    RMS is sqrt(sum(normalized residual**2)/number of data points).  Only 
+    values that would be written to a data file are used, that is non-zero 
+    values with an error larger than 0.
+    
+    Arguments
+    ------------
+        **data_obj** : modem_new.Data instance with the data
+        
+        **resp_obj** : modem_new.Data instance with the response
+    
+    ====================== ====================================================
+    Attributes/Key Words   Description    
+    ====================== ====================================================
+    comp_list              list of components [zxx, zxy, zyx, zyy, tx, ty]
+    data_fn                full path to data file, read if data_obj is None
+    data_obj               modem_new.Data instance of the data
+    normalized_residual    np.ndarray(num_stations, num_periods, 6, 
+                           dtype=complex) (data-response)/error, 0 where 
+                           there is no data
+    period_list            periods of the data
+    resp_fn                full path to response file, read if resp_obj is 
+                           None
+    resp_obj               modem_new.Data instance of the response
+    residual_obj           modem_new.Data instance holding data-response with
+                           the data errors, this is written as residual file
+    residual_pt_array      np.ndarray(num_periods, num_stations) structured
+                           array of the residual phase tensor with keys
+                           phimin, phimax, azimuth, skew, geometric_mean, 
+                           0 where the phase tensor can not be computed
+    rms                    overall RMS
+    rms_component          np.ndarray(6) RMS of each component
+    rms_period             np.ndarray(num_periods) structured array with
+                           keys period, rms and rms_zxx ... rms_ty 
+    rms_station            np.ndarray(num_stations) structured array with
+                           keys station, rel_east, rel_north, rms and 
+                           rms_zxx ... rms_ty
+    station_list           station names in the order of data_obj.data_array
+    valid                  np.ndarray(num_stations, num_periods, 6, 
+                           dtype=bool) True where there is data
+    ====================== ====================================================
+    
+    ====================== ====================================================
+    Methods                Description    
+    ====================== ====================================================
+    compute_residual       compute residuals, RMS and residual phase tensor
+    read_files             read data_fn and resp_fn
+    write_residual_file    write residuals as a ModEM data file
+    write_rms_table        write RMS by station or by period to a csv file
+    ====================== ====================================================
+    
+    :Example: ::
+    
+        >>> import mtpy.modeling.modem_new as modem
+        >>> res = modem.Residual(data_fn=r"/home/modem/Inv1/ModEM_Data.dat",
+        >>> ...                  resp_fn=r"/home/modem/Inv1/Inv1_NLCG_030.dat")
+        >>> print res.rms
+        >>> res.write_residual_file()
+        >>> res.write_rms_table(r"/home/modem/Inv1/rms_station.csv")
+    """
+    
+    def __init__(self, data_obj=None, resp_obj=None, **kwargs):
+        self.data_obj = data_obj
+        self.resp_obj = resp_obj
+        self.data_fn = kwargs.pop('data_fn', None)
+        self.resp_fn = kwargs.pop('resp_fn', None)
+        
+        self.comp_list = ['zxx', 'zxy', 'zyx', 'zyy', 'tx', 'ty']
+        self.station_list = None
+        self.period_list = None
+        self.normalized_residual = None
+        self.valid = None
+        self.residual_obj = None
+        
+        self.rms = None
+        self.rms_component = None
+        self.rms_station = None
+        self.rms_period = None
+        self.residual_pt_array = None
+        
+        if self.data_obj is None and self.data_fn is not None:
+            self.read_files()
+        if self.data_obj is not None and self.resp_obj is not None:
+            self.compute_residual()
+            
+    def read_files(self):
+        """
+        read data_fn and resp_fn into Data objects
+        """
+        
+        self.data_obj = Data()
+        self.data_obj.read_data_file(self.data_fn)
+        
+        if self.resp_fn is not None:
+            self.resp_obj = Data()
+            self.resp_obj.read_data_file(self.resp_fn)
+            
+    def _get_value_arrays(self, data_array):
+        """
+        stack z and tipper of a data array into (ns, nf, 6)
+        """
+        
+        value_arr = np.zeros(data_array['z'].shape[0:2]+(6,), 
+                             dtype=np.complex)
+        value_arr[:, :, 0:4] = data_array['z'].reshape(
+                                            data_array['z'].shape[0:2]+(4,))
+        value_arr[:, :, 4:6] = data_array['tip'][:, :, 0, :]
+        
+        return value_arr
+        
+    def _get_response_array(self):
+        """
+        response data array in the order of the stations of the data
+        """
+        
+        if len(self.resp_obj.period_list) != len(self.period_list) or \
+           not np.allclose(self.resp_obj.period_list, self.period_list):
+            raise ModEMError('Periods of the data and response do not match')
+            
+        resp_index = dict([(station, ii) for ii, station in 
+                           enumerate(self.resp_obj.data_array['station'])])
+        try:
+            index = [resp_index[station] for station in self.station_list]
+        except KeyError as error:
+            raise ModEMError('Could not find station {0} '.format(error)+
+                             'in the response')
+                             
+        return self.resp_obj.data_array[index]
+        
+    @timing.timed('modem.compute_residual')
+    def compute_residual(self):
+        """
+        compute normalized residuals, RMS and residual phase tensor
+        """
+        
+        if self.data_obj is None or self.resp_obj is None:
+            raise ModEMError('Need data and response to compute residuals')
+            
+        self.station_list = self.data_obj.data_array['station']
+        self.period_list = np.array(self.data_obj.period_list, dtype=np.float)
+        resp_array = self._get_response_array()
+        
+        data_value = self._get_value_arrays(self.data_obj.data_array)
+        resp_value = self._get_value_arrays(resp_array)
+        data_err = np.zeros(data_value.shape)
+        data_err[:, :, 0:4] = self.data_obj.data_array['z_err'].real.reshape(
+                                                    data_value.shape[0:2]+(4,))
+        data_err[:, :, 4:6] = self.data_obj.data_array['tip_err'][:, :, 0, :].real
+        
+        #only use values that are written to a data file
+        self.valid = (data_value.real != 0.0) & (data_value.imag != 0.0) & \
+                     (data_value.real != 1e32) & (data_value.imag != 1e32) & \
+                     (data_err > 0)
+                     
+        residual = np.where(self.valid, data_value-resp_value, 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.normalized_residual = np.where(self.valid, residual/data_err, 
+                                                0)
+            
+        #--> make a data object of the residuals
+        self.residual_obj = Data()
+        for attr in ['units', 'wave_sign_impedance', 'wave_sign_tipper', 
+                     'formatting', 'center_position', '_rotation_angle']:
+            setattr(self.residual_obj, attr, getattr(self.data_obj, attr))
+        self.residual_obj.period_list = self.period_list.copy()
+        self.residual_obj._set_dtype(self.data_obj._z_shape, 
+                                     self.data_obj._t_shape)
+        self.residual_obj.data_array = self.data_obj.data_array.copy()
+        ns, nf = residual.shape[0:2]
+        self.residual_obj.data_array['z'][:] = residual[:, :, 0:4].reshape(
+                                                                 ns, nf, 2, 2)
+        self.residual_obj.data_array['tip'][:] = residual[:, :, 4:6].reshape(
+                                                                 ns, nf, 1, 2)
+        
+        self._compute_rms()
+        self._compute_residual_pt(resp_array)
+        
+    def _get_rms(self, axis):
+        """
+        rms of the normalized residuals summing over axis
+        """
+        
+        sum_squares = (self.normalized_residual.real**2+
+                       self.normalized_residual.imag**2).sum(axis=axis)
+        num_data = 2*self.valid.sum(axis=axis)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(num_data > 0, np.sqrt(sum_squares/num_data), 0)
+            
+    def _compute_rms(self):
+        """
+        compute RMS overall, by component, by station and by period
+        """
+        
+        rms_keys = ['rms_{0}'.format(comp) for comp in self.comp_list]
+        
+        self.rms = float(self._get_rms((0, 1, 2)))
+        self.rms_component = self._get_rms((0, 1))
+        
+        self.rms_station = np.zeros(len(self.station_list), 
+                                    dtype=[('station', '|S10'),
+                                           ('rel_east', np.float),
+                                           ('rel_north', np.float),
+                                           ('rms', np.float)]+
+                                          [(key, np.float) for key in rms_keys])
+        self.rms_station['station'] = self.station_list
+        self.rms_station['rel_east'] = self.data_obj.data_array['rel_east']
+        self.rms_station['rel_north'] = self.data_obj.data_array['rel_north']
+        self.rms_station['rms'] = self._get_rms((1, 2))
+        rms_sc = self._get_rms(1)
+        
+        self.rms_period = np.zeros(len(self.period_list), 
+                                   dtype=[('period', np.float),
+                                          ('rms', np.float)]+
+                                         [(key, np.float) for key in rms_keys])
+        self.rms_period['period'] = self.period_list
+        self.rms_period['rms'] = self._get_rms((0, 2))
+        rms_pc = self._get_rms(0)
+        
+        for cc, key in enumerate(rms_keys):
+            self.rms_station[key] = rms_sc[:, cc]
+            self.rms_period[key] = rms_pc[:, cc]
+            
+    def _compute_residual_pt(self, resp_array):
+        """
+        compute the residual phase tensor 1-inv(pt_data)*pt_response for
+        all stations and periods.
+        """
+        
+        data_pt = mtpt.z2pt_array(self.data_obj.data_array['z'])[0]
+        resp_pt = mtpt.z2pt_array(resp_array['z'])[0]
+        
+        det_data = data_pt[..., 0, 0]*data_pt[..., 1, 1]-\
+                   data_pt[..., 0, 1]*data_pt[..., 1, 0]
+        det_resp = resp_pt[..., 0, 0]*resp_pt[..., 1, 1]-\
+                   resp_pt[..., 0, 1]*resp_pt[..., 1, 0]
+        good = (det_data != 0) & (det_resp != 0)
+        
+        rpt = np.zeros(data_pt.shape)
+        rpt[good] = np.identity(2)-np.einsum('...ij,...jk->...ik', 
+                                             np.linalg.inv(data_pt[good]),
+                                             resp_pt[good])
+        
+        ns, nf = rpt.shape[0:2]
+        rpt_obj = mtpt.PhaseTensor(pt_array=rpt.reshape(ns*nf, 2, 2),
+                                   freq=np.tile(1./self.period_list, ns))
+        
+        self.residual_pt_array = np.zeros((nf, ns), 
+                                          dtype=[('phimin', np.float),
+                                                 ('phimax', np.float),
+                                                 ('skew', np.float),
+                                                 ('azimuth', np.float),
+                                                 ('geometric_mean', np.float)])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for key, value in [('phimin', rpt_obj.phimin[0]),
+                               ('phimax', rpt_obj.phimax[0]),
+                               ('skew', rpt_obj.beta[0]),
+                               ('azimuth', rpt_obj.azimuth[0])]:
+                value = np.where(good.reshape(ns*nf), value, 0)
+                self.residual_pt_array[key] = value.reshape(ns, nf).T
+            self.residual_pt_array['geometric_mean'] = np.sqrt(abs(
+                                            self.residual_pt_array['phimin']*
+                                            self.residual_pt_array['phimax']))
+                                            
+    def write_residual_file(self, save_path=None, fn_basename=None):
+        """
+        write the residuals (data-response) with the data errors as a ModEM 
+        data file, which can be read by Plot_RMS_Maps.
+        
+        Arguments
+        -------------
+            **save_path** : string
+                            directory to save file to. *default* is the
+                            directory of the data file
+                            
+            **fn_basename** : string
+                              basename of the file. *default* is the 
+                              response file name with extension .res
+                              
+        Returns
+        -------------
+            **residual_fn** : string
+                              full path to residual file
+        """
+        
+        if self.residual_obj is None:
+            self.compute_residual()
+            
+        if save_path is None:
+            save_path = self.data_obj.save_path
+        if fn_basename is None:
+            fn_basename = '{0}.res'.format(os.path.splitext(
+                                        self.resp_obj.fn_basename)[0])
+                                        
+        self.residual_obj.write_data_file(save_path=save_path, 
+                                          fn_basename=fn_basename,
+                                          compute_error=False,
+                                          fill=False)
+                                          
+        return self.residual_obj.data_fn
+        
+    def write_rms_table(self, csv_fn, table='station'):
+        """
+        write the RMS to a comma separated file
+        
+        Arguments
+        -------------
+            **csv_fn** : string
+                         full path to file to write to
+                         
+            **table** : [ 'station' | 'period' ]
+                        write RMS for each station or each period
+                        
+        Returns
+        -------------
+            **csv_fn** : string
+                         full path to file
+        """
+        
+        if table == 'station':
+            rms_array = self.rms_station
+        elif table == 'period':
+            rms_array = self.rms_period
+        else:
+            raise ModEMError('table {0} not understood, '.format(table)+
+                             'should be [ station | period ]')
+                             
+        names = rms_array.dtype.names
+        lines = [','.join(names)+'\n']
+        for row in rms_array:
+            values = []
+            for name, value in zip(names, row):
+                if name == 'station':
+                    values.append('{0}'.format(value))
+                elif name == 'period':
+                    values.append('{0:.6e}'.format(value))
+                else:
+                    values.append('{0:.3f}'.format(value))
+            lines.append(','.join(values)+'\n')
             
+        with open(csv_fn, 'w') as fid:
+            fid.writelines(lines)
+        timing.add_written(csv_fn)
+        
+        return csv_fn
+        
+def get_rms_iterations(data_fn, resp_fn_list, csv_fn=None):
+    """
+    RMS of a list of response files, for instance of every iteration of an
+    inversion, against the same data file.  The data file is only read once.
+    
+    Arguments
+    -------------
+        **data_fn** : string
+                      full path to data file
+                      
+        **resp_fn_list** : list
+                           list of full paths to response files
+                           
+        **csv_fn** : string
+                     full path to a csv file to write the table to
+                     *default* is None, no file is written
+                     
+    Returns
+    -------------
+        **rms_array** : np.ndarray(len(resp_fn_list)) structured array with
+                        keys resp_fn, rms and rms_zxx ... rms_ty
+                        
+    :Example: ::
+    
+        >>> import glob
+        >>> import mtpy.modeling.modem_new as modem
+        >>> resp_fn_list = sorted(glob.glob(r"/home/modem/Inv1/*NLCG_*.dat"))
+        >>> rms_array = modem.get_rms_iterations(
+        >>> ...                        r"/home/modem/Inv1/ModEM_Data.dat",
+        >>> ...                        resp_fn_list)
+    """
+    
+    data_obj = Data()
+    data_obj.read_data_file(data_fn)
+    
+    res_obj = Residual(data_obj=data_obj)
+    rms_keys = ['rms_{0}'.format(comp) for comp in res_obj.comp_list]
+    rms_array = np.zeros(len(resp_fn_list), 
+                         dtype=[('resp_fn', '|S{0}'.format(
+                                    max([len(fn) for fn in resp_fn_list]+[1]))),
+                                ('rms', np.float)]+
+                               [(key, np.float) for key in rms_keys])
+    
+    for ii, resp_fn in enumerate(resp_fn_list):
+        res_obj.resp_obj = Data()
+        res_obj.resp_obj.read_data_file(resp_fn)
+        res_obj.compute_residual()
+        rms_array[ii]['resp_fn'] = resp_fn
+        rms_array[ii]['rms'] = res_obj.rms
+        for key, rms in zip(rms_keys, res_obj.rms_component):
+            rms_array[ii][key] = rms
+            
+    if csv_fn is not None:
+        lines = [','.join(rms_array.dtype.names)+'\n']
+        lines.extend(['{0},'.format(row['resp_fn'])+
+                      ','.join(['{0:.3f}'.format(row[key]) 
+                                for key in ['rms']+rms_keys])+'\n' 
+                      for row in rms_array])
+        with open(csv_fn, 'w') as fid:
+            fid.writelines(lines)
+        timing.add_written(csv_fn)
+        
+    return rms_array
+    
         
 #==============================================================================
 # mesh class
@@ -1459,6 +1915,10 @@ class Model(object):
     station_fn           full path to station file
     station_locations    location of stations
     title                title in initial file
+    use_npy_cache        [ True | False ] if True read_model_file keeps a
+                         binary copy of the model next to model_fn as
+                         model_fn.npy, which is read instead of model_fn
+                         while model_fn is unchanged. *default* is False
     z1_layer             first layer thickness
     z_bottom             absolute bottom of the model *default* is 300,000 
     z_target_depth       Depth of deepest target, *default* is 50,000
@@ -1563,6 +2023,7 @@ class Model(object):
         
         self.title = 'Model File written by MTpy.modeling.modem'
         self.res_scale = kwargs.pop('res_scale', 'loge')
+        self.use_npy_cache = kwargs.pop('use_npy_cache', False)
         
 #    def get_station_locations(self):
 #        """
@@ -1894,18 +2355,15 @@ class Model(object):
         
         # convert topography to local grid coordinates
         topo = self.sea_level - self.surface_dict['topography']
-        # assign values
-        for j in range(len(self.res_model)):
-            for i in range(len(self.res_model[j])):
-                # assign all sites above the topography to air
-                ii1 = np.where(gcz <= topo[j,i])
-                if len(ii1) > 0:
-                    self.covariance_mask[j,i,ii1[0]] = 0.
-                # assign sea water to covariance and model res arrays
-                ii = np.where(np.all([gcz > self.sea_level,gcz <= topo[j,i]],axis=0))
-                if len(ii) > 0:
-                    self.covariance_mask[j,i,ii[0]] = 9.        
-                    self.res_model[j,i,ii[0]] = sea_resistivity
+        # compare cell centres with the topography of each column, 
+        # shape is (n_north, n_east, n_z)
+        above_topo = gcz[None, None, :] <= topo[:, :, None]
+        # assign all sites above the topography to air
+        self.covariance_mask[above_topo] = 0.
+        # assign sea water to covariance and model res arrays
+        sea_cells = above_topo & (gcz > self.sea_level)[None, None, :]
+        self.covariance_mask[sea_cells] = 9.
+        self.res_model[sea_cells] = sea_resistivity
 
         self.covariance_mask = self.covariance_mask[::-1]       
         self.project_stations_on_topography()
@@ -2040,14 +2498,14 @@ class Model(object):
         else:
             topo = self.sea_level + np.zeros_like(surfacedata)
 
-        # assign resistivity value
-        for j in range(len(self.res_model)):
-            for i in range(len(self.res_model[j])):
-                if where == 'above':
-                    ii = np.where((gcz <= surfacedata[j,i])&(gcz > topo[j,i]))[0]
-                else:
-                    ii = np.where(gcz > surfacedata[j,i])[0]
-                self.res_model[j,i,ii] = resistivity_value
+        # assign resistivity value, comparing cell centres with the surface
+        # of each column, shape is (n_north, n_east, n_z)
+        if where == 'above':
+            res_cells = (gcz[None, None, :] <= surfacedata[:, :, None]) & \
+                        (gcz[None, None, :] > topo[:, :, None])
+        else:
+            res_cells = gcz[None, None, :] > surfacedata[:, :, None]
+        self.res_model[res_cells] = resistivity_value
 
 
     def project_stations_on_topography(self,air_resistivity=1e17):
@@ -2255,6 +2713,21 @@ class Model(object):
         plt.show()
         
     
+    def _format_values(self, values, fmt):
+        """
+        format an array of values as a block of text, each row of values is
+        written as a line.  A 1-D array is written as a single line without
+        the end of line.
+        """
+
+        values = np.atleast_1d(values)
+        if values.ndim == 1:
+            return (fmt*values.shape[0]) % tuple(values.tolist())
+
+        line_fmt = fmt*values.shape[1]+'\n'
+        return (line_fmt*values.shape[0]) % tuple(values.ravel().tolist())
+
+    @timing.timed('modem.write_model_file')
     def write_model_file(self, **kwargs):
         """
         will write an initial file for ModEM.  
@@ -2369,20 +2842,15 @@ class Model(object):
                                               self.res_scale.upper()))
     
         #write S --> N node block
-        for ii, nnode in enumerate(self.nodes_north):
-            ifid.write('{0:>12.3f}'.format(abs(nnode)))
-
+        ifid.write(self._format_values(abs(self.nodes_north), '%12.3f'))
         ifid.write('\n')
         
         #write W --> E node block        
-        for jj, enode in enumerate(self.nodes_east):
-            ifid.write('{0:>12.3f}'.format(abs(enode)))
+        ifid.write(self._format_values(abs(self.nodes_east), '%12.3f'))
         ifid.write('\n')
 
-    
         #write top --> bottom node block
-        for kk, zz in enumerate(self.nodes_z):
-            ifid.write('{0:>12.3f}'.format(abs(zz)))
+        ifid.write(self._format_values(abs(self.nodes_z), '%12.3f'))
         ifid.write('\n')
     
         #write the resistivity in log e format
@@ -2394,13 +2862,12 @@ class Model(object):
         elif self.res_scale.lower() == 'linear':
             write_res_model = self.res_model[::-1, :, :]
             
-        #write out the layers from resmodel
+        #write out the layers from resmodel, each line is N --> S for an
+        #east value
         for zz in range(self.nodes_z.shape[0]):
             ifid.write('\n')
-            for ee in range(self.nodes_east.shape[0]):
-                for nn in range(self.nodes_north.shape[0]):
-                    ifid.write('{0:>13.5E}'.format(write_res_model[nn, ee, zz]))
-                ifid.write('\n')
+            ifid.write(self._format_values(write_res_model[:, :, zz].T,
+                                           '%13.5E'))
                 
                 
         if self.grid_center is None:
@@ -2418,10 +2885,12 @@ class Model(object):
         else:
             ifid.write('{0:>9.3f}\n'.format(self.mesh_rotation_angle))
         ifid.close()
+        timing.add_written(self.model_fn)
         
         print 'Wrote file to: {0}'.format(self.model_fn)
         
         
+    @timing.timed('modem.read_model_file')
     def read_model_file(self, model_fn=None):
         """
         read an initial file and return the pertinent information including
@@ -2479,87 +2948,50 @@ class Model(object):
         
         self.save_path = os.path.dirname(self.model_fn)
         
-        ifid = file(self.model_fn, 'r')    
-        ilines = ifid.readlines()
-        ifid.close()
-        
-        self.title = ilines[0].strip()
-    
-        #get size of dimensions, remembering that x is N-S, y is E-W, z is + down    
-        nsize = ilines[1].strip().split()
-        n_north = int(nsize[0])
-        n_east = int(nsize[1])
-        n_z = int(nsize[2])
-        log_yn = nsize[4]
-    
-        #get nodes
-        self.nodes_north = np.array([np.float(nn)
-                                     for nn in ilines[2].strip().split()])
-        self.nodes_east = np.array([np.float(nn)
-                                     for nn in ilines[3].strip().split()])
-        self.nodes_z = np.array([np.float(nn)
-                                     for nn in ilines[4].strip().split()])
-
-        self.res_model = np.zeros((n_north, n_east, n_z))
-        
-        #get model
-        count_z = 0
-        line_index= 6 
-        count_e = 0
-        while count_z < n_z:
-            iline = ilines[line_index].strip().split()
-            #blank lines spit the depth blocks, use those as a marker to 
-            #set the layer number and start a new block
-            if len(iline) == 0:
-                count_z += 1
-                count_e = 0
-                line_index += 1
-            # 3D grid model files don't have a space at the end
-            # additional condition to account for this.
-            elif (len(iline) == 3)&(count_z == n_z - 1):
-                count_z += 1
-                count_e = 0
-                line_index += 1                
-            #each line in the block is a line of N-->S values for an east value
-            else:
-                north_line = np.array([float(nres) for nres in 
-                                     ilines[line_index].strip().split()])
-                                     
-                # Need to be sure that the resistivity array matches
-                # with the grids, such that the first index is the 
-                # furthest south 
-                self.res_model[:, count_e, count_z] = north_line[::-1]
+        cache_dict = None
+        if self.use_npy_cache:
+            cache_dict = modelcache.read_model_cache(self.model_fn)
 
-                count_e += 1
-                line_index += 1
-                
-        #--> get grid center and rotation angle
-        if len(ilines) > line_index:
-            for iline in ilines[line_index:]:
-                ilist = iline.strip().split()
-                #grid center
-                if len(ilist) == 3:
-                    self.grid_center = np.array(ilist, dtype=np.float)
-                #rotation angle
-                elif len(ilist) == 1:
-                    self.rotation_angle = np.float(ilist[0])
-                else:
-                    pass
+        if cache_dict is not None:
+            for key, value in cache_dict.items():
+                setattr(self, key, value)
+        else:
+            # the file is parsed in mtpy.utils.modelexport, which also
+            # puts the resistivity into linear Ohm-m with the first index
+            # the furthest south
+            try:
+                model_dict = modelexport.read_model_file(self.model_fn)
+            except mtex.MTpyError_file_handling as error:
+                raise ModEMError(str(error))
+            timing.add_read(self.model_fn)
+
+            self.title = model_dict['title']
+            self.nodes_north = model_dict['nodes_north']
+            self.nodes_east = model_dict['nodes_east']
+            self.nodes_z = model_dict['nodes_z']
+            self.res_model = model_dict['res_model']
+
+            #--> get grid center and rotation angle
+            cache_dict = {}
+            if model_dict['origin'] is not None:
+                self.grid_center = model_dict['origin']
+                cache_dict['grid_center'] = self.grid_center
+            if model_dict['rotation_angle'] is not None:
+                self.rotation_angle = model_dict['rotation_angle']
+                cache_dict['rotation_angle'] = self.rotation_angle
+
+            if self.use_npy_cache:
+                cache_dict.update({'title':self.title,
+                                   'nodes_north':self.nodes_north,
+                                   'nodes_east':self.nodes_east,
+                                   'nodes_z':self.nodes_z,
+                                   'res_model':self.res_model})
+                modelcache.write_model_cache(self.model_fn, cache_dict)
         
-        #--> make sure the resistivity units are in linear Ohm-m            
-        if log_yn.lower() == 'loge':
-            self.res_model = np.e**self.res_model
-        elif log_yn.lower() == 'log' or log_yn.lower() == 'log10':
-            self.res_model = 10**self.res_model
-            
         #put the grids into coordinates relative to the center of the grid
-        self.grid_north = np.array([self.nodes_north[0:ii].sum() 
-                                   for ii in range(n_north+1)])
-        self.grid_east = np.array([self.nodes_east[0:ii].sum() 
-                                   for ii in range(n_east+1)])
-                                
-        self.grid_z = np.array([self.nodes_z[:ii].sum() 
-                                for ii in range(n_z+1)])
+        self.grid_north = modelexport.get_cell_edges(self.nodes_north)
+        self.grid_east = modelexport.get_cell_edges(self.nodes_east)
+        self.grid_z = modelexport.get_cell_edges(self.nodes_z)
         
         # center the grids
         if self.grid_center is not None:
@@ -2590,7 +3022,8 @@ class Model(object):
         
             
     def write_vtk_file(self, vtk_save_path=None,
-                       vtk_fn_basename='ModEM_model_res'):
+                       vtk_fn_basename='ModEM_model_res', 
+                       point_file_format=None):
         """
         write a vtk file to view in Paraview or other
         
@@ -2603,24 +3036,47 @@ class Model(object):
                                   filename basename of vtk file
                                   *default* is ModEM_model_res, evtk will add
                                   on the extension .vtr
+            **point_file_format** : [ None | 'csv' | 'npy' ]
+                                    also write the resistivity at the cell
+                                    centers as columns of north, east, z, 
+                                    resistivity to vtk_fn_basename.csv or 
+                                    .npy. *default* is None
+                                    
+        Returns:
+        ----------
+            **vtk_fn** : string
+                         full path to vtk file
         """
         
-        if vtk_save_path is not None:
+        if vtk_save_path is None:
             vtk_fn = os.path.join(self.save_path, vtk_fn_basename)
         else:
             vtk_fn = os.path.join(vtk_save_path, vtk_fn_basename)
             
-        # grids need to be n+1 
-        vtk_east = np.append(self.grid_east, 1.5*self.grid_east[-1])
-        vtk_north = np.append(self.grid_north, 1.5*self.grid_north[-1])
-        vtk_z = np.append(self.grid_z, 1.5*self.grid_z[-1])
-        gridToVTK(vtk_fn, 
-                 vtk_north, 
-                 vtk_east,
-                 vtk_z,
-                 pointData={'resistivity':self.res_model}) 
+        # the grids are the n+1 cell edges
+        vtk_fn = modelexport.write_vtk_grid(vtk_fn, 
+                                            self.grid_north, 
+                                            self.grid_east,
+                                            self.grid_z,
+                                            cell_data={'resistivity':
+                                                       self.res_model}) 
         
         print 'Wrote file to {0}'.format(vtk_fn)
+        
+        if point_file_format is not None:
+            point_fn = modelexport.write_point_file(os.path.splitext(vtk_fn)[0],
+                                                    self.grid_north[0:-1]+
+                                                    self.nodes_north/2.,
+                                                    self.grid_east[0:-1]+
+                                                    self.nodes_east/2.,
+                                                    self.grid_z[0:-1]+
+                                                    self.nodes_z/2.,
+                                                    self.res_model,
+                                                    file_format=
+                                                    point_file_format)
+            print 'Wrote file to {0}'.format(point_fn)
+        
+        return vtk_fn
 
 
 
@@ -3009,15 +3465,16 @@ class Covariance(object):
         clines.append('\n')
         clines.append('\n')
         #--> mask array
+        # the mask only has a few different values, so format those once 
+        # and look up the string for each cell
+        mask_values, mask_index = np.unique(self.mask_arr, return_inverse=True)
+        mask_str = np.array(['{0:^3.0f}'.format(m_value) 
+                             for m_value in mask_values], dtype=np.object)
+        mask_str = mask_str[mask_index].reshape(self.mask_arr.shape)
         for zz in range(self.mask_arr.shape[2]):
             clines.append(' {0:<8.0f}{0:<8.0f}\n'.format(zz+1))
-
-            
-            for nn in range(self.mask_arr.shape[0]):    
-                cline = ''
-                for ee in range(self.mask_arr.shape[1]):
-                    cline += '{0:^3.0f}'.format(self.mask_arr[nn, ee, zz])
-                clines.append(cline+'\n')
+            clines.extend([''.join(m_line)+'\n' 
+                           for m_line in mask_str[:, :, zz].tolist()])
         
         cfid = file(self.cov_fn, 'w')
         cfid.writelines(clines)
@@ -3243,6 +3700,25 @@ def interpolate_elevation(elev_east, elev_north, elevation, model_east,
                           
     return interp_elev   
 
+def _get_slice_mask(start, stop, n_z):
+    """
+    make a boolean mask of shape stop.shape+(n_z,) that is True where
+    [start:stop] would index an array of length n_z, following the python
+    rules for negative and out of range slice indices.  start and stop can be
+    integers or arrays of integers.
+    """
+    
+    def _get_index(index):
+        index = np.asarray(index)
+        index = np.where(index < 0, index+n_z, index)
+        return np.clip(index, 0, n_z)
+
+    start = _get_index(start)
+    stop = _get_index(stop)
+    z_index = np.arange(n_z)
+    
+    return (z_index >= start[..., None]) & (z_index < stop[..., None])
+    
 def make_elevation_model(interp_elev, model_nodes_z, elevation_cell=30, 
                          pad=3, res_air=1e12, fill_res=100, res_sea=0.3):
     """
@@ -3332,18 +3808,23 @@ def make_elevation_model(interp_elev, model_nodes_z, elevation_cell=30,
          
     # fill in elevation model with air values.  Remeber Z is positive down, so
     # the top of the model is the highest point and index 0 is highest 
-    # elevation                
-    for nn in range(interp_elev.shape[0]):
-        for ee in range(interp_elev.shape[1]):
-            # need to test for ocean
-            if interp_elev[nn, ee] < 0:
-                # fill in from bottom to sea level, then rest with air
-                elevation_model[nn, ee, 0:sea_level_index] = res_air
-                dz = sea_level_index+abs(int((interp_elev[nn, ee])/elevation_cell))+1
-                elevation_model[nn, ee, sea_level_index:dz] = res_sea
-            else:
-                dz = int((elev_max-interp_elev[nn, ee])/elevation_cell)
-                elevation_model[nn, ee, 0:dz] = res_air
+    # elevation.  The number of air (and sea) cells is computed for every
+    # column at once, then compared with the vertical index.
+    n_z = elevation_model.shape[2]
+    ocean = interp_elev < 0
+    
+    # land --> fill in air down to the surface
+    dz_land = ((elev_max-interp_elev)/elevation_cell).astype(np.int)
+    air_cells = _get_slice_mask(0, dz_land, n_z) & ~ocean[:, :, None]
+    
+    # ocean --> fill in from bottom to sea level, then rest with air
+    dz_sea = sea_level_index+abs((interp_elev/elevation_cell).astype(np.int))+1
+    air_cells |= _get_slice_mask(0, sea_level_index, n_z) & ocean[:, :, None]
+    sea_cells = _get_slice_mask(sea_level_index, dz_sea, n_z) & \
+                ocean[:, :, None]
+
+    elevation_model[air_cells] = res_air
+    elevation_model[sea_cells] = res_sea
     
     # make new z nodes array    
     new_nodes_z = np.append(np.repeat(elevation_cell, num_elev_cells), 
@@ -3774,8 +4255,8 @@ class ModelManipulator(Model):
             self.ax1.set_ylim(ymin=self.grid_north.min()/self.dscale,
                               ymax=self.grid_north.max()/self.dscale)
             
-        #self.ax1.xaxis.set_minor_locator(MultipleLocator(100*1./dscale))
-        #self.ax1.yaxis.set_minor_locator(MultipleLocator(100*1./dscale))
+        #self.ax1.xaxis.set_minor_locator(mticker.MultipleLocator(100*1./dscale))
+        #self.ax1.yaxis.set_minor_locator(mticker.MultipleLocator(100*1./dscale))
         
         self.ax1.set_ylabel('Northing ('+self.map_scale+')',
                             fontdict=self.fdict)
@@ -4176,6 +4657,8 @@ class PlotResponse(object):
     resp_object              WSResponse object for resp_fn, or list of 
                              WSResponse objects if resp_fn is a list of
                              response files
+    residual_object          list of Residual objects, one for each response,
+                             used for the rms of each station
     station_fn               full path to station file written by WSStation
     subplot_bottom           space between axes and bottom of figure
     subplot_hspace           space between subplots in vertical direction
@@ -4192,6 +4675,7 @@ class PlotResponse(object):
         
         self.data_object = None
         self.resp_object = []
+        self.residual_object = []
         
         self.color_mode = kwargs.pop('color_mode', 'color')
         
@@ -4260,24 +4744,26 @@ class PlotResponse(object):
         self.ylabel_pad = kwargs.pop('ylabel_pad', 1.25)
         
         self.fig_list = []
+        self._read_fn = None
         
         if self.plot_yn == 'y':
             self.plot()
-    
-    def plot(self):
+            
+    def read_files(self):
         """
-        plot
+        read in data and response files, files are only read again if 
+        data_fn or resp_fn changed since the last read.
         """
         
+        if self._read_fn == (self.data_fn, self.resp_fn):
+            return
+            
         self.data_object = Data()
         self.data_object.read_data_file(self.data_fn)
-                                        
-        #get shape of impedance tensors
-        ns = len(self.data_object.mt_dict.keys())
     
         #read in response files
+        self.resp_object = []
         if self.resp_fn != None:
-            self.resp_object = []
             if type(self.resp_fn) is not list:
                 resp_obj = Data()
                 resp_obj.read_data_file(self.resp_fn)
@@ -4287,6 +4773,26 @@ class PlotResponse(object):
                     resp_obj = Data()
                     resp_obj.read_data_file(rfile)
                     self.resp_object.append(resp_obj)
+                    
+        #residuals and rms of each response
+        self.residual_object = [Residual(data_obj=self.data_object, 
+                                         resp_obj=resp_obj)
+                                for resp_obj in self.resp_object]
+                    
+        if type(self.resp_fn) is list:
+            self._read_fn = (self.data_fn, list(self.resp_fn))
+        else:
+            self._read_fn = (self.data_fn, self.resp_fn)
+    
+    def plot(self):
+        """
+        plot
+        """
+        
+        self.read_files()
+                                        
+        #get shape of impedance tensors
+        ns = len(self.data_object.mt_dict.keys())
 
         #get number of response files
         nr = len(self.resp_object)
@@ -4675,10 +5181,10 @@ class PlotResponse(object):
 #                             ax.yaxis.get_ticklocs()[0])
 #                    ylim = ax.get_ylim()
 #                    ax.set_ylim(ylim[0]-.25*dy, ylim[1]+1.25*dy)
-#                    ax.yaxis.set_major_locator(MultipleLocator(dy))
+#                    ax.yaxis.set_major_locator(mticker.MultipleLocator(dy))
                     
                     if len(ax_list) == 4:
-#                        ax.yaxis.set_major_formatter(FormatStrFormatter('%.0f'))
+#                        ax.yaxis.set_major_formatter(mticker.FormatStrFormatter('%.0f'))
                         if self.plot_z == True:
                             ax.set_yscale('log', nonposy='clip')
                             ylim = ax.get_ylim()
@@ -4693,7 +5199,7 @@ class PlotResponse(object):
                             ax.set_yticklabels(ylabels)
                     if len(ax_list) == 6:
                         if aa < 4:
-#                            ax.yaxis.set_major_formatter(FormatStrFormatter('%.0f'))
+#                            ax.yaxis.set_major_formatter(mticker.FormatStrFormatter('%.0f'))
                             if self.plot_z == True:
                                 ax.set_yscale('log', nonposy='clip')
                                 ylim = ax.get_ylim()
@@ -4707,7 +5213,7 @@ class PlotResponse(object):
                                          [' ']
                                 ax.set_yticklabels(ylabels)
                     if len(ax_list) == 8:
-#                        ax.yaxis.set_major_formatter(FormatStrFormatter('%.0f'))
+#                        ax.yaxis.set_major_formatter(mticker.FormatStrFormatter('%.0f'))
                         if self.plot_z == True:
                                 ax.set_yscale('log', nonposy='clip')
                                 ylim = ax.get_ylim()
@@ -4726,7 +5232,7 @@ class PlotResponse(object):
                             ylabels[0] = ''
                             ax.set_yticklabels(ylabels)
                         if aa < 8:
-#                            ax.yaxis.set_major_formatter(FormatStrFormatter('%.0f'))
+#                            ax.yaxis.set_major_formatter(mticker.FormatStrFormatter('%.0f'))
                             if self.plot_z == True:
                                ax.set_yscale('log', nonposy='clip')
                                ylim = ax.get_ylim()
@@ -5136,7 +5642,7 @@ class PlotResponse(object):
                                 ax.set_ylabel('Im[Z (mV/km nT)]',
                                               fontdict=fontdict)
                         if aa <= 2:
-                            ax.yaxis.set_major_formatter(FormatStrFormatter('%.0f'))
+                            ax.yaxis.set_major_formatter(mticker.FormatStrFormatter('%.0f'))
                             if self.plot_z == True:
                                 ax.set_yscale('log')
 #                        else:
@@ -5157,21 +5663,20 @@ class PlotResponse(object):
                         cyx = tuple(3*[1-.5/(rr+1)]) 
                     
                     resp_z_obj = self.resp_object[rr].mt_dict[station].Z
-                    resp_z_err = np.nan_to_num((z_obj.z-resp_z_obj.z)/z_obj.zerr)
-    
                     resp_t_obj = self.resp_object[rr].mt_dict[station].Tipper
-                    resp_t_err = np.nan_to_num((t_obj.tipper-resp_t_obj.tipper)/
-                                                t_obj.tippererr)
                     
                     rrp = mtplottools.ResPhase(resp_z_obj)
     
-                    rms = resp_z_err.std()
-                    rms_xx = resp_z_err[:, 0, 0].std()
-                    rms_xy = resp_z_err[:, 0, 1].std()
-                    rms_yx = resp_z_err[:, 1, 0].std()
-                    rms_yy = resp_z_err[:, 1, 1].std()
-                    rms_tx = resp_t_err[:, 0, 0].std()
-                    rms_ty = resp_t_err[:, 0, 1].std()
+                    res_obj = self.residual_object[rr]
+                    rms_station = res_obj.rms_station[
+                                    res_obj.rms_station['station'] == station][0]
+                    rms = rms_station['rms']
+                    rms_xx = rms_station['rms_zxx']
+                    rms_xy = rms_station['rms_zxy']
+                    rms_yx = rms_station['rms_zyx']
+                    rms_yy = rms_station['rms_zyy']
+                    rms_tx = rms_station['rms_tx']
+                    rms_ty = rms_station['rms_ty']
                     print ' --- response {0} ---'.format(rr)
                     print '  RMS = {:.2f}'.format(rms)
                     print '      RMS_xx = {:.2f}'.format(rms_xx)
@@ -5743,6 +6248,74 @@ class PlotResponse(object):
         self.fig_fn = save_fn
         print 'Saved figure to: '+self.fig_fn
         
+    def save_figures(self, save_path=None, fig_format='png', fig_dpi=None,
+                     n_processes=None):
+        """
+        plot each station in plot_type and save it to save_path as 
+        station_response.fig_format.  The figures are rendered headless 
+        across a pool of processes with mtpy.imaging.batchplot.BatchPlot, 
+        data and response files are read once and shared with the workers.
+        
+        Arguments
+        -------------
+            **save_path** : string
+                            directory to save figures to, *default* is the 
+                            directory of data_fn
+                            
+            **fig_format** : [ pdf | eps | jpg | png | svg ]
+                             file type of saved figures
+                             
+            **fig_dpi** : int
+                          resolution of saved figures, *default* is fig_dpi
+                          
+            **n_processes** : int
+                              number of processes to render with
+                              *default* is the number of cpus
+                              
+        Returns
+        ------------
+            **fn_list** : list
+                          list of saved figures in station order
+                          
+        :Example: ::
+        
+            >>> import mtpy.modeling.modem_new as modem
+            >>> mrp = modem.PlotResponse(data_fn=r"/home/MT/ModEM/Data.dat",
+            >>> ...                      resp_fn=r"/home/MT/ModEM/resp.dat",
+            >>> ...                      plot_yn='n')
+            >>> fn_list = mrp.save_figures(r"/home/MT/ModEM/Figures")
+        """
+        
+        self.read_files()
+        
+        if save_path is None:
+            save_path = os.path.dirname(self.data_fn)
+        if not os.path.exists(save_path):
+            os.mkdir(save_path)
+        if fig_dpi is None:
+            fig_dpi = self.fig_dpi
+            
+        if self.plot_type == '1':
+            station_list = sorted(self.data_object.mt_dict.keys())
+        elif type(self.plot_type) is list:
+            station_list = self.plot_type
+        else:
+            station_list = [self.plot_type]
+            
+        job_list = [(os.path.join(save_path, 
+                                  '{0}_response.{1}'.format(station, 
+                                                            fig_format)),
+                     {'plot_type':[station]},
+                     station) for station in station_list]
+                     
+        batch = batchplot.BatchPlot(plot_obj=self, 
+                                    n_processes=n_processes,
+                                    savefig_kwargs={'dpi':fig_dpi,
+                                                    'format':fig_format,
+                                                    'bbox_inches':'tight'})
+        
+        return batch.render(job_list)
+        
     def update_plot(self):
         """
         update any parameters that where changed using the built-in draw from
@@ -6044,6 +6617,10 @@ class PlotPTMaps(mtplottools.MTEllipse):
                                                     ('east', np.float),
                                                     ('north', np.float),
                                                     ('geometric_mean', np.float)])
+            res_obj = Residual(data_obj=self.data_obj, 
+                               resp_obj=self.resp_obj)
+            res_index = dict([(station, ss) for ss, station in 
+                              enumerate(res_obj.station_list)])
                                                 
         for ii, key in enumerate(self.data_obj.mt_dict.keys()):
             east = self.data_obj.mt_dict[key].grid_east/self.dscale
@@ -6057,20 +6634,12 @@ class PlotPTMaps(mtplottools.MTEllipse):
             data_pt_arr[:, ii]['skew'] = dpt.beta[0]
             if self.resp_fn is not None:
                 mpt = self.resp_obj.mt_dict[key].pt
-                try:
-                    rpt = mtpt.ResidualPhaseTensor(pt_object1=dpt, 
-                                                   pt_object2=mpt)
-                    rpt = rpt.residual_pt
-                    res_pt_arr[:, ii]['east'] = east
-                    res_pt_arr[:, ii]['north'] = north
-                    res_pt_arr[:, ii]['phimin'] = rpt.phimin[0]
-                    res_pt_arr[:, ii]['phimax'] = rpt.phimax[0]
-                    res_pt_arr[:, ii]['azimuth'] = rpt.azimuth[0]
-                    res_pt_arr[:, ii]['skew'] = rpt.beta[0]
-                    res_pt_arr[:, ii]['geometric_mean'] = np.sqrt(abs(rpt.phimin[0]*\
-                                                                  rpt.phimax[0]))
-                except mtex.MTpyError_PT:
-                    print key, dpt.pt.shape, mpt.pt.shape
+                rpt = res_obj.residual_pt_array[:, res_index[key]]
+                res_pt_arr[:, ii]['east'] = east
+                res_pt_arr[:, ii]['north'] = north
+                for r_key in ['phimin', 'phimax', 'azimuth', 'skew', 
+                              'geometric_mean']:
+                    res_pt_arr[:, ii][r_key] = rpt[r_key]
                 
                 model_pt_arr[:, ii]['east'] = east
                 model_pt_arr[:, ii]['north'] = north
@@ -6206,7 +6775,7 @@ class PlotPTMaps(mtplottools.MTEllipse):
                           self.pt_data_arr[data_ii]['phimax'].max()*\
                           self.ellipse_size
                           
-                ellipse = Ellipse((pt['east'],
+                ellipse = mpatches.Ellipse((pt['east'],
                                    pt['north']),
                                    width=ewidth,
                                    height=eheight,
@@ -6242,7 +6811,7 @@ class PlotPTMaps(mtplottools.MTEllipse):
                               self.pt_resp_arr[data_ii]['phimax'].max()*\
                               self.ellipse_size
                               
-                    ellipsem = Ellipse((mpt['east'],
+                    ellipsem = mpatches.Ellipse((mpt['east'],
                                        mpt['north']),
                                        width=ewidth,
                                        height=eheight,
@@ -6273,7 +6842,7 @@ class PlotPTMaps(mtplottools.MTEllipse):
                               self.pt_resid_arr[data_ii]['phimax'].max()*\
                               self.ellipse_size
                               
-                    ellipser = Ellipse((rpt['east'],
+                    ellipser = mpatches.Ellipse((rpt['east'],
                                        rpt['north']),
                                        width=ewidth,
                                        height=eheight,
@@ -6316,7 +6885,7 @@ class PlotPTMaps(mtplottools.MTEllipse):
             cbaxd = fig.add_axes(cb_location)
             cbd = mcb.ColorbarBase(cbaxd, 
                                    cmap=mtcl.cmapdict[self.ellipse_cmap],
-                                   norm=Normalize(vmin=ckmin,
+                                   norm=colors.Normalize(vmin=ckmin,
                                                   vmax=ckmax),
                                    orientation='horizontal')
             cbd.ax.xaxis.set_label_position('top')
@@ -6351,7 +6920,7 @@ class PlotPTMaps(mtplottools.MTEllipse):
                     if aa == 0:
                         cb = mcb.ColorbarBase(cbax, 
                                               cmap=mtcl.cmapdict[self.ellipse_cmap],
-                                              norm=Normalize(vmin=ckmin,
+                                              norm=colors.Normalize(vmin=ckmin,
                                                              vmax=ckmax),
                                                orientation='horizontal')
                         cb.ax.xaxis.set_label_position('top')
@@ -6369,7 +6938,7 @@ class PlotPTMaps(mtplottools.MTEllipse):
                     else:
                         cb = mcb.ColorbarBase(cbax, 
                                               cmap=mtcl.cmapdict[self.residual_cmap],
-                                               norm=Normalize(vmin=rcmin,
+                                               norm=colors.Normalize(vmin=rcmin,
                                                               vmax=rcmax),
                                                orientation='horizontal')
                         cb.ax.xaxis.set_label_position('top')
@@ -6396,7 +6965,7 @@ class PlotPTMaps(mtplottools.MTEllipse):
                     cbax = fig.add_axes(cb_position)
                     cb = mcb.ColorbarBase(cbax, 
                                           cmap=self.res_cmap,
-                                          norm=Normalize(vmin=self.res_limits[0],
+                                          norm=colors.Normalize(vmin=self.res_limits[0],
                                                          vmax=self.res_limits[1]),
                                           orientation='horizontal')
                     cb.ax.xaxis.set_label_position('top')
@@ -6598,6 +7167,8 @@ class PlotDepthSlice(object):
     subplot_right           distance between axes and right of figure window
     subplot_top             distance between axes and top of figure window
     title                   titiel of plot *default* is depth of slice
+    use_npy_cache           [ True | False ] read the model through a binary
+                            cache, see Model. *default* is False
     xminorticks             location of xminorticks
     yminorticks             location of yminorticks
     ======================= ===================================================
@@ -6606,6 +7177,7 @@ class PlotDepthSlice(object):
     def __init__(self, model_fn=None, data_fn=None, **kwargs):
         self.model_fn = model_fn
         self.data_fn = data_fn
+        self.use_npy_cache = kwargs.pop('use_npy_cache', False)
 
         self.save_path = kwargs.pop('save_path', None)
         if self.model_fn is not None and self.save_path is None:
@@ -6670,18 +7242,26 @@ class PlotDepthSlice(object):
         self.station_north = None
         self.station_names = None
         
+        self._read_fn = None
+        
         self.plot_yn = kwargs.pop('plot_yn', 'y')
         if self.plot_yn == 'y':
             self.plot()
             
     def read_files(self):
         """
-        read in the files to get appropriate information
+        read in the files to get appropriate information, files are only 
+        read again if model_fn, data_fn or map_scale changed since the last
+        read.
         """
-               #--> read in model file
+        
+        if self._read_fn == (self.model_fn, self.data_fn, self.dscale):
+            return
+            
+        #--> read in model file
         if self.model_fn is not None:
             if os.path.isfile(self.model_fn) == True:
-                md_model = Model()
+                md_model = Model(use_npy_cache=self.use_npy_cache)
                 md_model.read_model_file(self.model_fn)
                 self.res_model = md_model.res_model
                 self.grid_east = md_model.grid_east/self.dscale
@@ -6704,6 +7284,8 @@ class PlotDepthSlice(object):
                 self.station_names = md_data.station_locations['station']
             else:
                 print 'Could not find data file {0}'.format(self.data_fn)
+                
+        self._read_fn = (self.model_fn, self.data_fn, self.dscale)
         
     def plot(self):
         """
@@ -6784,8 +7366,8 @@ class PlotDepthSlice(object):
             #set axis properties
             ax1.set_xlim(xlimits)
             ax1.set_ylim(ylimits)
-            ax1.xaxis.set_minor_locator(MultipleLocator(self.xminorticks/self.dscale))
-            ax1.yaxis.set_minor_locator(MultipleLocator(self.yminorticks/self.dscale))
+            ax1.xaxis.set_minor_locator(mticker.MultipleLocator(self.xminorticks/self.dscale))
+            ax1.yaxis.set_minor_locator(mticker.MultipleLocator(self.yminorticks/self.dscale))
             ax1.set_ylabel('Northing ('+self.map_scale+')',fontdict=fdict)
             ax1.set_xlabel('Easting ('+self.map_scale+')',fontdict=fdict)
             ax1.set_title('Depth = {0}'.format(depth), fontdict=fdict)
@@ -6833,7 +7415,7 @@ class PlotDepthSlice(object):
             
             cb = mcb.ColorbarBase(ax2,
                                   cmap=self.cmap,
-                                  norm=Normalize(vmin=self.climits[0],
+                                  norm=colors.Normalize(vmin=self.climits[0],
                                                  vmax=self.climits[1]),
                                   orientation=self.cb_orientation)
                                 
@@ -6869,6 +7451,65 @@ class PlotDepthSlice(object):
             else:
                 pass
             
+    def save_figures(self, save_path=None, n_processes=None):
+        """
+        save all depth slices in depth_index to save_path as 
+        Depth_index_depth.png.  The figures are rendered headless across a
+        pool of processes with mtpy.imaging.batchplot.BatchPlot, the model 
+        is read once and memory mapped by the workers.
+        
+        Arguments
+        -------------
+            **save_path** : string
+                            directory to save figures to, *default* is 
+                            save_path
+                            
+            **n_processes** : int
+                              number of processes to render with
+                              *default* is the number of cpus
+                              
+        Returns
+        ------------
+            **fn_list** : list
+                          list of saved figures in order of depth
+                          
+        :Example: ::
+        
+            >>> import mtpy.modeling.modem_new as modem
+            >>> pds = modem.PlotDepthSlice(model_fn=r"/home/MT/ModEM/m.rho",
+            >>> ...                        data_fn=r"/home/MT/ModEM/d.dat",
+            >>> ...                        plot_yn='n')
+            >>> fn_list = pds.save_figures(r"/home/MT/ModEM/DepthSlices")
+        """
+        
+        self.read_files()
+        
+        if save_path is not None:
+            self.save_path = save_path
+        if not os.path.exists(self.save_path):
+            os.mkdir(self.save_path)
+            
+        if self.depth_index == None:
+            zrange = range(self.grid_z.shape[0])
+        elif type(self.depth_index) is int:
+            zrange = [self.depth_index]
+        else:
+            zrange = self.depth_index
+            
+        job_list = [(os.path.join(self.save_path, 
+                                  "Depth_{}_{:.4f}.png".format(ii, 
+                                                               self.grid_z[ii])),
+                     {'depth_index':int(ii), 'save_plots':'n'},
+                     None) for ii in zrange]
+                     
+        batch = batchplot.BatchPlot(plot_obj=self, 
+                                    n_processes=n_processes,
+                                    mmap_attributes=['res_model'],
+                                    savefig_kwargs={'dpi':self.fig_dpi,
+                                                    'bbox_inches':'tight'})
+                                                    
+        return batch.render(job_list)
+            
     def redraw_plot(self):
         """
         redraw plot if parameters were changed
@@ -7028,6 +7669,8 @@ class PlotSlices(object):
     subplot_top             distance between axes and top of figure window
     subplot_wspace          distance between subplots in horizontal direction
     title                   title of plot 
+    use_npy_cache           [ True | False ] read the model through a binary
+                            cache, see Model. *default* is False
     z_limits                (min, max) limits in vertical direction,
     ======================= ===================================================
     
@@ -7036,6 +7679,7 @@ class PlotSlices(object):
     def __init__(self, model_fn, data_fn=None, **kwargs):
         self.model_fn = model_fn
         self.data_fn = data_fn
+        self.use_npy_cache = kwargs.pop('use_npy_cache', False)
         
         self.fig_num = kwargs.pop('fig_num', 1)
         self.fig_size = kwargs.pop('fig_size', [6, 6])
@@ -7107,7 +7751,7 @@ class PlotSlices(object):
         #--> read in model file
         if self.model_fn is not None:
             if os.path.isfile(self.model_fn) == True:
-                md_model = Model()
+                md_model = Model(use_npy_cache=self.use_npy_cache)
                 md_model.read_model_file(self.model_fn)
                 self.res_model = md_model.res_model
                 self.grid_east = md_model.grid_east/self.dscale
@@ -7226,7 +7870,7 @@ class PlotSlices(object):
         cbx = mcb.make_axes(self.ax_map, fraction=.15, shrink=.75, pad = .15)
         cb = mcb.ColorbarBase(cbx[0],
                               cmap=self.cmap,
-                              norm=Normalize(vmin=self.climits[0],
+                              norm=colors.Normalize(vmin=self.climits[0],
                                              vmax=self.climits[1]))
 
    
@@ -7870,10 +8514,10 @@ class Plot_RMS_Maps(object):
             ax.set_ylim(self.residual.data_array['lat'].min()-self.pad_y, 
                         self.residual.data_array['lat'].max()+self.pad_y)
             
-            ax.xaxis.set_major_locator(MultipleLocator(self.tick_locator))
-            ax.yaxis.set_major_locator(MultipleLocator(self.tick_locator))
-            ax.xaxis.set_major_formatter(FormatStrFormatter('%2.2f'))
-            ax.yaxis.set_major_formatter(FormatStrFormatter('%2.2f'))
+            ax.xaxis.set_major_locator(mticker.MultipleLocator(self.tick_locator))
+            ax.yaxis.set_major_locator(mticker.MultipleLocator(self.tick_locator))
+            ax.xaxis.set_major_formatter(mticker.FormatStrFormatter('%2.2f'))
+            ax.yaxis.set_major_formatter(mticker.FormatStrFormatter('%2.2f'))
             
         
         
@@ -7920,16 +8564,44 @@ class Plot_RMS_Maps(object):
         if fig_close == True:
             plt.close('all')
             
-    def plot_loop(self, fig_format='png'):
+    def plot_loop(self, fig_format='png', n_processes=None):
         """
         loop over all periods and save figures accordingly
+        
+        The figures are rendered headless across a pool of processes with
+        mtpy.imaging.batchplot.BatchPlot, the residual file is read once and
+        shared with the workers.
+        
+        Arguments
+        -------------
+            **fig_format** : string
+                             format to save figures as *default* is png
+            
+            **n_processes** : int
+                              number of processes to render with
+                              *default* is the number of cpus
+                              
+        Returns
+        ------------
+            **fn_list** : list
+                          list of saved figures in order of period
         """
         self.read_residual_fn()
         
+        job_list = []
         for f_index in range(self.residual.period_list.shape[0]):
-            self.period_index = f_index
-            self.plot()
-            self.save_figure(fig_format=fig_format)
+            save_fn_basename = '{0:02}_RMS_{1:.5g}_s.{2}'.format(f_index,
+                                    self.residual.period_list[f_index],
+                                    fig_format)
+            job_list.append((os.path.join(self.save_path, save_fn_basename),
+                             {'period_index':f_index}, 
+                             None))
+                             
+        batch = batchplot.BatchPlot(plot_obj=self, 
+                                    n_processes=n_processes,
+                                    savefig_kwargs={'dpi':self.fig_dpi})
+                                    
+        return batch.render(job_list)
             
 
 
@@ -57,10 +57,6 @@ import mtpy.analysis.geometry as MTgy
 import mtpy.utils.exceptions as MTex
 import scipy.interpolate as si
 
-reload(MTcv)
-reload(MTcf)
-reload(MTedi)
-reload(MTex)
 
 #==============================================================================
 
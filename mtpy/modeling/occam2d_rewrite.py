@@ -49,22 +49,15 @@ import matplotlib.gridspec as gridspec
 import matplotlib.pyplot as plt
 import scipy.interpolate as spi
 
-import mtpy.core.edi as MTedi
 import mtpy.core.mt as mt
 import mtpy.modeling.winglinktools as MTwl
-import mtpy.utils.conversions as MTcv
 import mtpy.utils.filehandling as MTfh
-import mtpy.utils.configfile as MTcf
 import mtpy.analysis.geometry as MTgy
-import mtpy.utils.exceptions as MTex
 import scipy.interpolate as si
 from mtpy.imaging.mtplottools import plot_errorbar
+import mtpy.imaging.batchplot as batchplot
 
 
-reload(MTcv)
-reload(MTcf)
-reload(MTedi)
-reload(MTex)
 
 #==============================================================================
 
@@ -1522,30 +1515,37 @@ class Regularization(Mesh):
         columns = list(model_cols)
         widths = list(model_widths)
         for zz, thickness in enumerate(model_thickness):
-            #index for model column blocks from first_row, start at 1 because
-            # 0 is for padding cells            
-            block_index = 1
             num_rows = 1
             if zz == 0:
                 num_rows += 1
             if zz == len(model_thickness)-1:
                 num_rows = self.num_z_pad_cells
-            while block_index+1 < num_cols-1:
-                #check to see if horizontally merged mesh cells are not larger
-                #than the thickness times trigger
-                if thickness < self.trigger*(widths[block_index]+\
-                                             widths[block_index+1]):
-                    block_index += 1
-                    continue
-                #merge 2 neighboring cells to avoid vertical exaggerations                    
-                else:
-                    widths[block_index] += widths[block_index+1]
-                    columns[block_index] += columns[block_index+1]
-                    #remove one of the merged cells                        
-                    widths.pop(block_index+1)
-                    columns.pop(block_index+1)
-                    
-                    num_cols -= 1
+                
+            #merge neighboring blocks in one pass from left to right, a block
+            #keeps growing as long as it is narrower than the thickness over 
+            #trigger, the padding blocks on either side are never merged
+            if num_cols > 3:
+                new_widths = [widths[0]]
+                new_columns = [columns[0]]
+                c_width = widths[1]
+                c_column = columns[1]
+                for w_next, c_next in zip(widths[2:-1], columns[2:-1]):
+                    #check to see if horizontally merged mesh cells are not 
+                    #larger than the thickness times trigger
+                    if thickness < self.trigger*(c_width+w_next):
+                        new_widths.append(c_width)
+                        new_columns.append(c_column)
+                        c_width = w_next
+                        c_column = c_next
+                    #merge 2 neighboring cells to avoid vertical exaggerations                    
+                    else:
+                        c_width += w_next
+                        c_column += c_next
+                new_widths.extend([c_width, widths[-1]])
+                new_columns.extend([c_column, columns[-1]])
+                widths = new_widths
+                columns = new_columns
+                num_cols = len(columns)
             self.num_param += num_cols
 
             self.model_columns.append(list(columns))
@@ -1581,28 +1581,25 @@ class Regularization(Mesh):
         
         self.num_free_param = 0
 
+        #count the fixed triangular elements in every rectangle of the mesh
+        #at once with a summed area table, a model block is free if it
+        #does not contain any fixed triangular elements.
+        n_fixed = (self.mesh_values != '?').sum(axis=2)
+        n0, n1 = n_fixed.shape
+        fixed_table = np.zeros((n0+1, n1+1), dtype=np.int)
+        fixed_table[1:, 1:] = n_fixed.cumsum(axis=0).cumsum(axis=1)
+
         row_count = 0
-        #loop over columns and rows of regularization grid
+        #loop over rows of regularization grid
         for col, row in zip(self.model_columns, self.model_rows):
             rr = row[0]
-            col_count = 0
-            for ii, cc in enumerate(col):
-                #make a model block from the index values of the regularization
-                #grid
-                model_block = self.mesh_values[row_count:row_count+rr, 
-                                              col_count:col_count+cc, :]
-                     
-                #find all the free triangular blocks within that model block                         
-                find_free = np.where(model_block=='?')
-                try:
-                    #test to see if the number of free parameters is equal 
-                    #to the number of triangular elements with in the model 
-                    #block, if there is the model block is assumed to be free.
-                    if find_free[0].size == model_block.size:
-                        self.num_free_param  += 1
-                except IndexError:
-                    pass
-                col_count += cc
+            col_edges = np.append(0, np.cumsum(col))
+            r0, r1 = min(row_count, n0), min(row_count+rr, n0)
+            c0 = np.clip(col_edges[:-1], 0, n1)
+            c1 = np.clip(col_edges[1:], 0, n1)
+            num_fixed = fixed_table[r1, c1]-fixed_table[r0, c1]-\
+                        fixed_table[r1, c0]+fixed_table[r0, c0]
+            self.num_free_param += int((num_fixed == 0).sum())
             row_count += rr 
         
     def write_regularization_file(self, reg_fn=None, reg_basename=None, 
@@ -2382,107 +2379,113 @@ class Data(Profile):
                      for station, offset in zip(self.station_list, 
                                                 self.station_locations)]
 
-        #loop over mt object in edi_list and use a counter starting at 1 
-        #because that is what occam starts at.
+        #--> stack the values of all stations at the inversion frequencies
+        #    into arrays (num_stations, num_freq), frequencies that a station
+        #    does not have stay 0
+        ns = len(self.edi_list)
+        nf = self.freq.shape[0]
+        has_freq = np.zeros((ns, nf), dtype=np.bool)
+        rho_te = np.zeros((ns, nf))
+        rho_tm = np.zeros((ns, nf))
+        rho_te_err = np.zeros((ns, nf))
+        rho_tm_err = np.zeros((ns, nf))
+        phi_te = np.zeros((ns, nf))
+        phi_tm = np.zeros((ns, nf))
+        has_tipper = np.zeros(ns, dtype=np.bool)
+        tip = np.zeros((ns, nf), dtype=np.complex)
+        tip_err = np.zeros((ns, nf))
         for s_index, edi in enumerate(self.edi_list):
+            #find the index of each inversion frequency in the station
+            #frequencies, only exact matches are used
+            station_freqs = np.asarray(edi.Z.freq)
+            order = np.argsort(station_freqs, kind='mergesort')
+            sorted_freqs = station_freqs[order]
+            f_pos = np.clip(np.searchsorted(sorted_freqs, self.freq), 0, 
+                            sorted_freqs.shape[0]-1)
+            match = sorted_freqs[f_pos] == self.freq
+            f_index = order[f_pos[match]]
+            has_freq[s_index] = match
+
             rho = edi.Z.resistivity
             phi = edi.Z.phase
-            rho_err = edi.Z.resistivity_err
-            station_freqs = edi.Z.freq
-            tipper = edi.Tipper.tipper
-            tipper_err = edi.Tipper.tippererr
+            rho_te[s_index, match] = rho[f_index, 0, 1]
+            rho_tm[s_index, match] = rho[f_index, 1, 0]
+            if self.res_te_err is None or self.res_tm_err is None:
+                rho_err = edi.Z.resistivity_err
+                rho_te_err[s_index, match] = rho_err[f_index, 0, 1]
+                rho_tm_err[s_index, match] = rho_err[f_index, 1, 0]
+            phi_te[s_index, match] = phi[f_index, 0, 1]
+            phi_tm[s_index, match] = phi[f_index, 1, 0]
+            
+            if edi.Tipper.tipper is not None:
+                has_tipper[s_index] = True
+                tip[s_index, match] = edi.Tipper.tipper[f_index, 0, 1]
+                if self.tipper_err is None:
+                    tip_err[s_index, match] = \
+                                        edi.Tipper.tippererr[f_index, 0, 1]
             
             self.data[s_index]['station'] = edi.station
             self.data[s_index]['offset'] = edi.offset
-
-            for freq_num, frequency in enumerate(self.freq):
-                #skip, if the listed frequency is not available for the station
-                if not (frequency in station_freqs):
-                    continue
-
-                #find the respective frequency index for the station     
-                f_index = np.abs(station_freqs-frequency).argmin()
-
-                #--> get te resistivity
-                self.data[s_index]['te_res'][0, freq_num] = rho[f_index, 0, 1]
-                #compute error                
-                if rho[f_index, 0, 1] != 0.0:
-                    #--> get error from data
-                    if self.res_te_err is None:
-                        self.data[s_index]['te_res'][1, freq_num] = \
-                            np.abs(rho_err[f_index, 0, 1]/rho[f_index, 0, 1])
-                    #--> set generic error floor
-                    else:
-                        self.data[s_index]['te_res'][1, freq_num] = \
-                                                        self.res_te_err/100.
-                            
-                #--> get tm resistivity
-                self.data[s_index]['tm_res'][0, freq_num] =  rho[f_index, 1, 0]
-                #compute error
-                if rho[f_index, 1, 0] != 0.0:
-                    #--> get error from data
-                    if self.res_tm_err is None:
-                        self.data[s_index]['tm_res'][1, freq_num] = \
-                        np.abs(rho_err[f_index, 1, 0]/rho[f_index, 1, 0])
-                    #--> set generic error floor
-                    else:
-                        self.data[s_index]['tm_res'][1, freq_num] = \
-                            self.res_tm_err/100.
-                            
-                #--> get te phase
-                phase_te = phi[f_index, 0, 1]
-                #be sure the phase is in the first quadrant
-                if phase_te > 180:
-                    phase_te -= 180
-                self.data[s_index]['te_phase'][0, freq_num] =  phase_te
-                #compute error
-                #if phi[f_index, 0, 1] != 0.0:
-                #--> get error from data
-                if self.phase_te_err is None:
-                    self.data[s_index]['te_phase'][1, freq_num] = \
-                    np.degrees(np.arcsin(.5*
-                               self.data[s_index]['te_res'][0, freq_num]))
-                #--> set generic error floor
-                else:
-                    self.data[s_index]['te_phase'][1, freq_num] = \
-                        (self.phase_te_err/100.)*57./2.
-                            
-                #--> get tm phase and be sure its in the first quadrant
-                phase_tm = phi[f_index, 1, 0]%180
+            
+        #--> compute the errors for all stations at once
+        with np.errstate(divide='ignore', invalid='ignore'):
+            #--> resistivity, errors only where the resistivity is not 0
+            if self.res_te_err is None:
+                te_res_err = np.abs(rho_te_err/rho_te)
+            else:
+                te_res_err = np.repeat(self.res_te_err/100., rho_te.size)
+                te_res_err = te_res_err.reshape(rho_te.shape)
+            te_res_err = np.where(has_freq & (rho_te != 0.0), te_res_err, 0)
                 
-                self.data[s_index]['tm_phase'][0, freq_num] =  phase_tm
-                #compute error
-                #if phi[f_index, 1, 0] != 0.0:
-                #--> get error from data
-                if self.phase_tm_err is None:
-                    self.data[s_index]['tm_phase'][1, freq_num] = \
-                    np.degrees(np.arcsin(.5*
-                               self.data[s_index]['tm_res'][0, freq_num]))
-                #--> set generic error floor
-                else:
-                    self.data[s_index]['tm_phase'][1, freq_num] = \
-                        (self.phase_tm_err/100.)*57./2.
-               
-
-                                
-                #--> get Tipper
-                if tipper is not None:
-                    self.data[s_index]['re_tip'][0, freq_num] = \
-                                                    tipper[f_index, 0, 1].real
-                    self.data[s_index]['im_tip'][0, freq_num] = \
-                                                    tipper[f_index, 0, 1].imag
-                                                    
-                    #get error
-                    if self.tipper_err is not None:
-                        self.data[s_index]['re_tip'][1, freq_num] = \
-                                                        self.tipper_err/100.
-                        self.data[s_index]['im_tip'][1, freq_num] = \
-                                                        self.tipper_err/100.
-                    else:
-                        self.data[s_index]['re_tip'][1, freq_num] = \
-                           tipper[f_index, 0, 1].real/tipper_err[f_index, 0, 1]
-                        self.data[s_index]['im_tip'][1, freq_num] = \
-                           tipper[f_index, 0, 1].imag/tipper_err[f_index, 0, 1]
+            if self.res_tm_err is None:
+                tm_res_err = np.abs(rho_tm_err/rho_tm)
+            else:
+                tm_res_err = np.repeat(self.res_tm_err/100., rho_tm.size)
+                tm_res_err = tm_res_err.reshape(rho_tm.shape)
+            tm_res_err = np.where(has_freq & (rho_tm != 0.0), tm_res_err, 0)
+                
+            #--> be sure the phase is in the first quadrant
+            phi_te = np.where(phi_te > 180, phi_te-180, phi_te)
+            phi_tm = phi_tm%180
+            if self.phase_te_err is None:
+                te_phase_err = np.degrees(np.arcsin(.5*rho_te))
+            else:
+                te_phase_err = np.repeat((self.phase_te_err/100.)*57./2., 
+                                         rho_te.size).reshape(rho_te.shape)
+            te_phase_err = np.where(has_freq, te_phase_err, 0)
+            if self.phase_tm_err is None:
+                tm_phase_err = np.degrees(np.arcsin(.5*rho_tm))
+            else:
+                tm_phase_err = np.repeat((self.phase_tm_err/100.)*57./2., 
+                                         rho_tm.size).reshape(rho_tm.shape)
+            tm_phase_err = np.where(has_freq, tm_phase_err, 0)
+                
+            #--> tipper
+            if self.tipper_err is not None:
+                re_tip_err = np.repeat(self.tipper_err/100., 
+                                       tip.size).reshape(tip.shape)
+                im_tip_err = re_tip_err
+            else:
+                re_tip_err = tip.real/tip_err
+                im_tip_err = tip.imag/tip_err
+            tip_mask = has_freq & has_tipper[:, np.newaxis]
+            re_tip_err = np.where(tip_mask, re_tip_err, 0)
+            im_tip_err = np.where(tip_mask, im_tip_err, 0)
+            
+        for s_index in range(ns):
+            sdict = self.data[s_index]
+            sdict['te_res'][0] = rho_te[s_index]
+            sdict['te_res'][1] = te_res_err[s_index]
+            sdict['tm_res'][0] = rho_tm[s_index]
+            sdict['tm_res'][1] = tm_res_err[s_index]
+            sdict['te_phase'][0] = phi_te[s_index]
+            sdict['te_phase'][1] = te_phase_err[s_index]
+            sdict['tm_phase'][0] = phi_tm[s_index]
+            sdict['tm_phase'][1] = tm_phase_err[s_index]
+            sdict['re_tip'][0] = tip[s_index].real
+            sdict['re_tip'][1] = re_tip_err[s_index]
+            sdict['im_tip'][0] = tip[s_index].imag
+            sdict['im_tip'][1] = im_tip_err[s_index]
                            
     def _get_data_list(self):
         """
@@ -2490,97 +2493,44 @@ class Data(Profile):
         
         """
 
-        self.data_list = []
-        for ss, sdict in enumerate(self.data, 1):
-            for ff in range(self.freq.shape[0]):
-                for mmode in self.mode_dict[self.model_mode]:
-                    #log(te_res)
-                    if mmode == 1:
-                        if sdict['te_res'][0, ff] != 0.0:
-                            dvalue = np.log10(sdict['te_res'][0, ff])
-                            derror = sdict['te_res'][1, ff]/np.log(10)
-                            dstr = '{0:.4f}'.format(dvalue)
-                            derrstr = '{0:.4f}'.format(derror)
-                            line = self._data_string.format(ss, ff+1, mmode, 
-                                                            dstr, derrstr)
-                            self.data_list.append(line)
-                    
-                    #te_res
-                    if mmode == 9:
-                        if sdict['te_res'][0, ff] != 0.0:
-                            dvalue = sdict['te_res'][0, ff]
-                            derror = sdict['te_res'][1, ff]
-                            dstr = '{0:.4f}'.format(dvalue)
-                            derrstr = '{0:.4f}'.format(derror)
-                            line = self._data_string.format(ss, ff+1, mmode, 
-                                                            dstr, derrstr)
-                            self.data_list.append(line)
-                    
-                    #te_phase
-                    if mmode == 2:
-                        if sdict['te_phase'][0, ff] != 0.0:
-                            dvalue = sdict['te_phase'][0, ff]
-                            derror = sdict['te_phase'][1, ff]
-                            dstr = '{0:.4f}'.format(dvalue)
-                            derrstr = '{0:.4f}'.format(derror)
-                            line = self._data_string.format(ss, ff+1, mmode, 
-                                                            dstr, derrstr)
-                            self.data_list.append(line)
-                   
-                   #log(tm_res)
-                    if mmode == 5:
-                        if sdict['tm_res'][0, ff] != 0.0:
-                            dvalue = np.log10(sdict['tm_res'][0, ff])
-                            derror = sdict['tm_res'][1, ff]/np.log(10)
-                            dstr = '{0:.4f}'.format(dvalue)
-                            derrstr = '{0:.4f}'.format(derror)
-                            line = self._data_string.format(ss, ff+1, mmode, 
-                                                            dstr, derrstr)
-                            self.data_list.append(line)
-                    
-                    #tm_res
-                    if mmode == 10:
-                        if sdict['tm_res'][0, ff] != 0.0:
-                            dvalue = sdict['tm_res'][0, ff]
-                            derror = sdict['tm_res'][1, ff]
-                            dstr = '{0:.4f}'.format(dvalue)
-                            derrstr = '{0:.4f}'.format(derror)
-                            line = self._data_string.format(ss, ff+1, mmode, 
-                                                            dstr, derrstr)
-                            self.data_list.append(line)
-                    
-                    #tm_phase
-                    if mmode == 6:
-                        if sdict['tm_phase'][0, ff] != 0.0:
-                            dvalue = sdict['tm_phase'][0, ff]
-                            derror = sdict['tm_phase'][1, ff]
-                            dstr = '{0:.4f}'.format(dvalue)
-                            derrstr = '{0:.4f}'.format(derror)
-                            line = self._data_string.format(ss, ff+1, mmode, 
-                                                            dstr, derrstr)
-                            self.data_list.append(line)
-                    
-                    #Re_tip
-                    if mmode == 3:
-                        if sdict['re_tip'][0, ff] != 0.0:
-                            dvalue = sdict['re_tip'][0, ff]
-                            derror = sdict['re_tip'][1, ff]
-                            dstr = '{0:.4f}'.format(dvalue)
-                            derrstr = '{0:.4f}'.format(derror)
-                            line = self._data_string.format(ss, ff+1, mmode, 
-                                                            dstr, derrstr)
-                            self.data_list.append(line)
-                    
-                    #Im_tip
-                    if mmode == 4:
-                        if sdict['im_tip'][0, ff] != 0.0:
-                            dvalue = sdict['im_tip'][0, ff]
-                            derror = sdict['im_tip'][1, ff]
-                            dstr = '{0:.4f}'.format(dvalue)
-                            derrstr = '{0:.4f}'.format(derror)
-                            line = self._data_string.format(ss, ff+1, mmode, 
-                                                            dstr, derrstr)
-                            self.data_list.append(line)
+        #key in data, and if the log10 is taken for each occam data type
+        mode_key_dict = {1:('te_res', True), 9:('te_res', False), 
+                         2:('te_phase', False), 5:('tm_res', True), 
+                         10:('tm_res', False), 6:('tm_phase', False),
+                         3:('re_tip', False), 4:('im_tip', False)}
+        mode_list = self.mode_dict[self.model_mode]
+        
+        #--> make arrays (num_stations, num_freq, num_modes) of all values 
+        #    and errors, lines are written in the order station, frequency,
+        #    mode and only for non-zero values
+        ns = len(self.data)
+        nf = self.freq.shape[0]
+        nm = len(mode_list)
+        value_arr = np.zeros((ns, nf, nm))
+        error_arr = np.zeros((ns, nf, nm))
+        for mm, mmode in enumerate(mode_list):
+            key, log_mode = mode_key_dict[mmode]
+            for ss, sdict in enumerate(self.data):
+                value_arr[ss, :, mm] = sdict[key][0, 0:nf]
+                error_arr[ss, :, mm] = sdict[key][1, 0:nf]
+                
+        s_index, f_index, m_index = np.nonzero(value_arr != 0.0)
+        value_arr = value_arr[s_index, f_index, m_index]
+        error_arr = error_arr[s_index, f_index, m_index]
+        log_arr = np.array([mode_key_dict[mmode][1] 
+                            for mmode in mode_list])[m_index]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            value_arr[log_arr] = np.log10(value_arr[log_arr])
+            error_arr[log_arr] = error_arr[log_arr]/np.log(10)
+            
+        mode_arr = np.array(mode_list)[m_index]
+        self.data_list = [self._data_string.format(ss, ff, mmode, 
+                                                   '%.4f' % dvalue, 
+                                                   '%.4f' % derror)
+                          for ss, ff, mmode, dvalue, derror in 
+                          zip((s_index+1).tolist(), (f_index+1).tolist(), 
+                              mode_arr.tolist(), value_arr.tolist(), 
+                              error_arr.tolist())]
                     
                 
 
@@ -3117,32 +3067,25 @@ class Model(Startup):
         #read in the model and set the regularization block values to map onto
         #the FE mesh so that the model can be plotted as an image or regular 
         #mesh.
+        nx = self.res_model.shape[1]
+        row_edges = np.append(0, np.cumsum(r1.model_rows[:, 0]))
         mm = 0
         for ii in range(len(r1.model_rows)):
-            #get the number of layers to combine
-            #this index will be the first index in the vertical direction
-            ny1 = r1.model_rows[:ii, 0].sum()
-            #the second index  in the vertical direction
-            ny2 = ny1+r1.model_rows[ii][0]
-            #make the list of amalgamated columns an array for ease
-            lc = np.array(r1.model_columns[ii])
-            #loop over the number of amalgamated blocks
-            for jj in range(len(r1.model_columns[ii])):
-                #get first in index in the horizontal direction
-                nx1 = lc[:jj].sum()
-                #get second index in horizontal direction
-                nx2 = nx1+lc[jj]
-                #put the apporpriate resistivity value into all the amalgamated 
-                #model blocks of the regularization grid into the forward model
-                #grid
-                self.res_model[ny1:ny2, nx1:nx2] = self.model_values[mm]
-                mm += 1
+            #index of the model value for each mesh column of this layer of
+            #amalgamated blocks
+            lc = np.array(r1.model_columns[ii], dtype=np.int)
+            block_index = np.repeat(np.arange(mm, mm+lc.shape[0]), lc)[:nx]
+            #put the apporpriate resistivity value into all the amalgamated 
+            #model blocks of the regularization grid into the forward model
+            #grid
+            self.res_model[row_edges[ii]:row_edges[ii+1], 
+                           :block_index.shape[0]] = \
+                                            self.model_values[block_index]
+            mm += lc.shape[0]
         
         #make some arrays for plotting the model
-        self.plot_x = np.array([r1.x_nodes[:ii+1].sum() 
-                                for ii in range(len(r1.x_nodes))])
-        self.plot_z = np.array([r1.z_nodes[:ii+1].sum() 
-                                for ii in range(len(r1.z_nodes))])
+        self.plot_x = np.cumsum(r1.x_nodes)
+        self.plot_z = np.cumsum(r1.z_nodes)
         
         #center the grid onto the station coordinates
         x0 = bndgoff-self.plot_x[r1.model_columns[0][0]]
@@ -3356,19 +3299,46 @@ class PlotResponse():
         
         
         self.fig_list = []
-        
+        self.data_obj = None
+        self.resp_obj_list = []
+        self._read_fn = None
+
         if self.plot_yn == 'y':
             self.plot()
-        
+
+    def read_files(self):
+        """
+        read in the data and response files, files are only read again if
+        data_fn or resp_fn changed since the last read.
+        """
+
+        if self._read_fn == (self.data_fn, self.resp_fn):
+            return
+
+        self.data_obj = Data()
+        self.data_obj.read_data_file(self.data_fn)
+
+        self.resp_obj_list = []
+        if self.resp_fn is not None:
+            for rfn in self.resp_fn:
+                resp_obj = Response()
+                resp_obj.read_response_file(rfn)
+                self.resp_obj_list.append(resp_obj)
+
+        if self.resp_fn is None:
+            self._read_fn = (self.data_fn, None)
+        else:
+            self._read_fn = (self.data_fn, list(self.resp_fn))
+
     def plot(self):
         """
         plot the data and model response, if given, in individual plots.
-         
+
         """
-        
-        data_obj = Data()
-        data_obj.read_data_file(self.data_fn)
-        
+
+        self.read_files()
+        data_obj = self.data_obj
+
         rp_list = data_obj.data
         nr = len(rp_list)
         
@@ -3654,10 +3624,7 @@ class PlotResponse():
             #------------------- plot model response --------------------------
             if self.resp_fn is not None:
                 num_resp = len(self.resp_fn)
-                for rr, rfn in enumerate(self.resp_fn):
-                    resp_obj = Response()
-                    resp_obj.read_response_file(rfn)
-                    
+                for rr, resp_obj in enumerate(self.resp_obj_list):
                     rp = resp_obj.resp
                     # create colors for different responses
                     if self.color_mode == 'color':   
@@ -4088,23 +4055,37 @@ class PlotResponse():
         plt.close('all')
         self.plot()
         
-    def save_figures(self, save_path, fig_fmt='pdf', fig_dpi=None, 
-                     close_fig='y'):
+    def save_figures(self, save_path, fig_fmt='pdf', fig_dpi=None,
+                     close_fig='y', n_processes=None):
         """
         save all the figure that are in self.fig_list
-        
+
+        If nothing has been plotted yet (plot_yn='n') or n_processes is
+        given, the stations in plot_type are rendered headless across a pool
+        of processes with mtpy.imaging.batchplot.BatchPlot instead, data
+        and response files are read once and shared with the workers.
+
         :Example: ::
-            
+
             >>> # change the color and marker of the xy components
             >>> import mtpy.modeling.occam2d as occam2d
             >>> ocd = occam2d.Occam2DData(r"/home/occam2d/Data.dat")
             >>> p1 = ocd.plot2DResponses()
             >>> p1.save_figures(r"/home/occam2d/Figures", fig_fmt='jpg')
+            >>> # render all stations without opening figures
+            >>> p2 = occam2d.PlotResponse(data_fn, resp_fn, plot_yn='n')
+            >>> p2.save_figures(r"/home/occam2d/Figures", fig_fmt='png',
+            >>> ...             n_processes=4)
         """
-        
+
         if not os.path.exists(save_path):
             os.mkdir(save_path)
-            
+
+        if n_processes is not None or len(self.fig_list) == 0:
+            return self._render_figures(save_path, fig_fmt=fig_fmt,
+                                        fig_dpi=fig_dpi,
+                                        n_processes=n_processes)
+
         for fdict in self.fig_list:
             svfn = '{0}_resp.{1}'.format(fdict['station'], fig_fmt)
             fdict['fig'].savefig(os.path.join(save_path, svfn), 
@@ -4112,9 +4093,39 @@ class PlotResponse():
             if close_fig == 'y':
                 plt.close(fdict['fig'])
             
-            print "saved figure to {0}".format(os.path.join(save_path, svfn)) 
+            print "saved figure to {0}".format(os.path.join(save_path, svfn))
+
+    def _render_figures(self, save_path, fig_fmt='pdf', fig_dpi=None,
+                        n_processes=None):
+        """
+        render each station in plot_type headless across a pool of
+        processes and save to save_path/station_resp.fig_fmt
+        """
+
+        self.read_files()
+        if fig_dpi is None:
+            fig_dpi = self.fig_dpi
+
+        station_list = [rp['station'] for rp in self.data_obj.data]
+        if self.plot_type != '1':
+            if type(self.plot_type) is not list:
+                self.plot_type = [self.plot_type]
+            station_list = [station for station in station_list
+                            if len([pstation for pstation in self.plot_type
+                                    if station.find(pstation) >= 0]) > 0]
+
+        job_list = [(os.path.join(save_path,
+                                  '{0}_resp.{1}'.format(station, fig_fmt)),
+                     {'plot_type':[station]},
+                     station) for station in station_list]
+
+        batch = batchplot.BatchPlot(plot_obj=self,
+                                    n_processes=n_processes,
+                                    savefig_kwargs={'dpi':fig_dpi})
+
+        return batch.render(job_list)
+
 
-        
 #==============================================================================
 # plot model 
 #==============================================================================
@@ -70,36 +70,31 @@ Created on Sun Aug 25 18:41:15 2013
 import os
 import numpy as np
 
-import matplotlib.pyplot as plt
-from matplotlib.ticker import MultipleLocator
-from matplotlib.patches import Ellipse
-from matplotlib.colors import Normalize
-import matplotlib.colorbar as mcb
-import matplotlib.gridspec as gridspec
 import mtpy.core.z as mtz
 import mtpy.core.edi as mtedi
 import mtpy.core.mt as mt
 import mtpy.imaging.mtplottools as mtplottools
-import matplotlib.widgets as widgets
-import matplotlib.colors as colors
-import matplotlib.cm as cm
-import mtpy.modeling.winglink as wl
 import mtpy.utils.exceptions as mtex
 import mtpy.analysis.pt as mtpt
-import mtpy.imaging.mtcolors as mtcl
+import mtpy.utils.lazyimport as lazyimport
+import mtpy.utils.modelexport as modelexport
+import mtpy.utils.modelcache as modelcache
 
 import mtpy.utils.latlongutmconversion as ll2utm
 
-try:
-    from evtk.hl import gridToVTK, pointsToVTK
-except ImportError:
-    print ('If you want to write a vtk file for 3d viewing, you need download '
-           'and install evtk from https://bitbucket.org/pauloh/pyevtk')
-           
-    print ('Note: if you are using Windows you should build evtk first with'
-           'either MinGW or cygwin using the command: \n'
-           '    python setup.py build -compiler=mingw32  or \n'
-           '    python setup.py build -compiler=cygwin')
+# plotting is loaded on first use, so reading and writing files does not
+# need matplotlib
+plt = lazyimport.lazy_import('matplotlib.pyplot')
+mticker = lazyimport.lazy_import('matplotlib.ticker')
+mpatches = lazyimport.lazy_import('matplotlib.patches')
+mcb = lazyimport.lazy_import('matplotlib.colorbar')
+gridspec = lazyimport.lazy_import('matplotlib.gridspec')
+widgets = lazyimport.lazy_import('matplotlib.widgets')
+colors = lazyimport.lazy_import('matplotlib.colors')
+cm = lazyimport.lazy_import('matplotlib.cm')
+mtcl = lazyimport.lazy_import('mtpy.imaging.mtcolors')
+wl = lazyimport.lazy_import('mtpy.modeling.winglink')
+
 
 #==============================================================================
 
@@ -837,12 +832,14 @@ class WSStation(object):
         """
         if os.path.isdir(save_path) == True:
             save_fn = os.path.join(save_path, vtk_basename)
+        else:
+            save_fn = save_path
             
         if self.elev is None:
             self.elev = np.zeros_like(self.north)
             
-        pointsToVTK(save_fn, self.north, self.east, self.elev, 
-                    data={'value':np.ones_like(self.north)})     
+        save_fn = modelexport.write_vtk_points(save_fn, self.north, self.east, 
+                                               self.elev)
                   
         return save_fn
         
@@ -1559,7 +1556,7 @@ class WSMesh(object):
         else:
             pass
         
-        if self.res_model == None:
+        if self.res_model is None:
             ifid.close()
         else:
             if nr > 0:
@@ -1581,18 +1578,16 @@ class WSMesh(object):
             #need to add on the bottom layers
             layers.append((l1, self.nodes_z.shape[0]-1))
             
-            #write out the layers from resmodel
+            #write out the layers from resmodel, each line is W --> E for
+            #a north value
+            if nr > 0:
+                line_fmt = '%3.0f'*self.nodes_east.shape[0]+'\n'
+            else:
+                line_fmt = '%8.1f'*self.nodes_east.shape[0]+'\n'
             for ll in layers:
                 ifid.write('{0} {1}\n'.format(ll[0]+1, ll[1]+1))
-                for nn in range(self.nodes_north.shape[0]):
-                    for ee in range(self.nodes_east.shape[0]):
-                        if nr > 0:
-                            ifid.write('{0:>3.0f}'.format(
-                                          write_res_model[nn, ee, ll[0]]))
-                        else:
-                            ifid.write('{0:>8.1f}'.format(
-                                          write_res_model[nn, ee, ll[0]]))
-                    ifid.write('\n')
+                ifid.write((line_fmt*self.nodes_north.shape[0]) %
+                           tuple(write_res_model[:, :, ll[0]].ravel().tolist()))
             ifid.close()
         
         print 'Wrote file to: {0}'.format(self.initial_fn)
@@ -1772,6 +1767,10 @@ class WSModel(object):
     nodes_z                 relative distance between nodes in east direction 
     res_model               starting resistivity model
     rms                     root mean squared error of data and model
+    use_npy_cache           [ True | False ] if True keep a binary copy of
+                            the model as model_fn.npy, which is read instead
+                            of model_fn while model_fn is unchanged.
+                            *default* is False
     ======================= ===================================================
     
     
@@ -1785,8 +1784,9 @@ class WSModel(object):
         
     """
     
-    def __init__(self, model_fn=None):
+    def __init__(self, model_fn=None, **kwargs):
         self.model_fn = model_fn
+        self.use_npy_cache = kwargs.pop('use_npy_cache', False)
         self.iteration_number = None
         self.rms = None
         self.lagrange = None
@@ -1808,12 +1808,24 @@ class WSModel(object):
         read in a model file as x-north, y-east, z-positive down
         """            
         
-        mfid = file(self.model_fn, 'r')
-        mlines = mfid.readlines()
-        mfid.close()
+        if self.use_npy_cache:
+            cache_dict = modelcache.read_model_cache(self.model_fn)
+            if cache_dict is not None:
+                for key, value in cache_dict.items():
+                    setattr(self, key, value)
+                self.iteration_number = int(self.iteration_number)
+                return
+        
+        # the file is parsed in mtpy.utils.modelexport, which also puts the
+        # resistivity values into an array with the first index the
+        # southern most point
+        try:
+            model_dict = modelexport.read_model_file(self.model_fn)
+        except mtex.MTpyError_file_handling as error:
+            raise WSInputError(str(error))
     
         #get info at the beggining of file
-        info = mlines[0].strip().split()
+        info = model_dict['title'].split()
         self.iteration_number = int(info[2])
         self.rms = float(info[5])
         try:
@@ -1821,41 +1833,12 @@ class WSModel(object):
         except IndexError:
             print 'Did not get Lagrange Multiplier'
         
-        #get lengths of things
-        n_north, n_east, n_z, n_res = np.array(mlines[1].strip().split(),
-                                               dtype=np.int)
-        
-        #make empty arrays to put stuff into
-        self.nodes_north = np.zeros(n_north)
-        self.nodes_east = np.zeros(n_east)
-        self.nodes_z = np.zeros(n_z)
-        self.res_model = np.zeros((n_north, n_east, n_z))
-        
-        #get the grid line locations
-        line_index = 2       #line number in file
-        count_n = 0  #number of north nodes found
-        while count_n < n_north:
-            mline = mlines[line_index].strip().split()
-            for north_node in mline:
-                self.nodes_north[count_n] = float(north_node)
-                count_n += 1
-            line_index += 1
-        
-        count_e = 0  #number of east nodes found
-        while count_e < n_east:
-            mline = mlines[line_index].strip().split()
-            for east_node in mline:
-                self.nodes_east[count_e] = float(east_node)
-                count_e += 1
-            line_index += 1
-        
-        count_z = 0  #number of vertical nodes
-        while count_z < n_z:
-            mline = mlines[line_index].strip().split()
-            for z_node in mline:
-                self.nodes_z[count_z] = float(z_node)
-                count_z += 1
-            line_index += 1
+        self.nodes_north = model_dict['nodes_north']
+        self.nodes_east = model_dict['nodes_east']
+        self.nodes_z = model_dict['nodes_z']
+        n_north = self.nodes_north.shape[0]
+        n_east = self.nodes_east.shape[0]
+        n_z = self.nodes_z.shape[0]
             
         #put the grids into coordinates relative to the center of the grid
         self.grid_north = self.nodes_north.copy()
@@ -1878,30 +1861,72 @@ class WSModel(object):
                                 
         self.grid_z = np.array([self.nodes_z[:ii+1].sum() for ii in range(n_z)])
     
-        #--> get resistivity values
-        #need to read in the north backwards so that the first index is 
-        #southern most point
-        for kk in range(n_z):
-            for jj in range(n_east):
-                for ii in range(n_north):
-                    self.res_model[(n_north-1)-ii, jj, kk] = \
-                                             float(mlines[line_index].strip())
-                    line_index += 1
+        self.res_model = model_dict['res_model']
+        
+        if self.use_npy_cache:
+            modelcache.write_model_cache(self.model_fn,
+                                    dict([(key, getattr(self, key)) for key in
+                                          ['iteration_number', 'rms',
+                                           'lagrange', 'nodes_north',
+                                           'nodes_east', 'nodes_z',
+                                           'grid_north', 'grid_east',
+                                           'grid_z', 'res_model']]))
                     
-    def write_vtk_file(self, save_fn):
+    def write_vtk_file(self, save_fn, point_file_format=None):
         """
+        write the resistivity model as a vtk rectilinear grid with the 
+        resistivity in the cells.
         
+        Arguments:
+        -----------
+            **save_fn** : string
+                          full path to save file to, evtk adds the 
+                          extension.  If a directory the file is saved
+                          as save_fn/VTKResistivity_Model.vtr
+                          
+            **point_file_format** : [ None | 'csv' | 'npy' ]
+                                    also write the resistivity at the cell
+                                    centers as columns of north, east, z, 
+                                    resistivity to a .csv or .npy file with
+                                    the same name. *default* is None
+                                    
+        Returns:
+        ---------
+            **save_fn** : string
+                          full path to vtk file
         """
         if os.path.isdir(save_fn) == True:
             save_fn = os.path.join(save_fn, 'VTKResistivity_Model')
-        
-        save_fn = gridToVTK(save_fn, 
-                            self.grid_north, 
-                            self.grid_east, 
-                            self.grid_z, 
-                            cellData={'resistivity':self.res_model})
+            
+        # grid_north and grid_east are the southern and western cell edges,
+        # the vtk grid needs all n+1 edges
+        vtk_north = modelexport.get_cell_edges(self.nodes_north, 
+                                               self.grid_north[0])
+        vtk_east = modelexport.get_cell_edges(self.nodes_east, 
+                                              self.grid_east[0])
+        vtk_z = modelexport.get_cell_edges(self.nodes_z)
+        
+        vtk_fn = modelexport.write_vtk_grid(save_fn, 
+                                            vtk_north, 
+                                            vtk_east, 
+                                            vtk_z, 
+                                            cell_data={'resistivity':
+                                                       self.res_model})
                             
-        print 'Wrote vtk file to {0}'.format(save_fn)
+        print 'Wrote vtk file to {0}'.format(vtk_fn)
+        
+        if point_file_format is not None:
+            point_fn = modelexport.write_point_file(save_fn, 
+                              modelexport.get_cell_centers(self.nodes_north, 
+                                                           self.grid_north[0]),
+                              modelexport.get_cell_centers(self.nodes_east, 
+                                                           self.grid_east[0]),
+                              modelexport.get_cell_centers(self.nodes_z),
+                              self.res_model, 
+                              file_format=point_file_format)
+            print 'Wrote file to {0}'.format(point_fn)
+            
+        return vtk_fn
         
 
 #==============================================================================
@@ -2245,8 +2270,8 @@ class WSModelManipulator(object):
             self.ax1.set_ylim(ymin=self.grid_north.min()/self.dscale,
                               ymax=self.grid_north.max()/self.dscale)
             
-        #self.ax1.xaxis.set_minor_locator(MultipleLocator(100*1./dscale))
-        #self.ax1.yaxis.set_minor_locator(MultipleLocator(100*1./dscale))
+        #self.ax1.xaxis.set_minor_locator(mticker.MultipleLocator(100*1./dscale))
+        #self.ax1.yaxis.set_minor_locator(mticker.MultipleLocator(100*1./dscale))
         
         self.ax1.set_ylabel('Northing ('+self.map_scale+')',
                             fontdict=self.fdict)
@@ -4363,8 +4388,8 @@ class PlotDepthSlice(object):
             #set axis properties
             ax1.set_xlim(xlimits)
             ax1.set_ylim(ylimits)
-            ax1.xaxis.set_minor_locator(MultipleLocator(self.xminorticks/self.dscale))
-            ax1.yaxis.set_minor_locator(MultipleLocator(self.yminorticks/self.dscale))
+            ax1.xaxis.set_minor_locator(mticker.MultipleLocator(self.xminorticks/self.dscale))
+            ax1.yaxis.set_minor_locator(mticker.MultipleLocator(self.yminorticks/self.dscale))
             ax1.set_ylabel('Northing ('+self.map_scale+')',fontdict=fdict)
             ax1.set_xlabel('Easting ('+self.map_scale+')',fontdict=fdict)
             ax1.set_title('Depth = {0}'.format(depth), fontdict=fdict)
@@ -4412,7 +4437,7 @@ class PlotDepthSlice(object):
             
             cb = mcb.ColorbarBase(ax2,
                                   cmap=self.cmap,
-                                  norm=Normalize(vmin=self.climits[0],
+                                  norm=colors.Normalize(vmin=self.climits[0],
                                                  vmax=self.climits[1]),
                                   orientation=self.cb_orientation)
                                 
@@ -4908,7 +4933,7 @@ class PlotPTMaps(mtplottools.MTEllipse):
                 eheight = pt.phimin[0][jj]/pt.phimax[0].max()*self.ellipse_size
                 ewidth = pt.phimax[0][jj]/pt.phimax[0].max()*self.ellipse_size
                 
-                ellipse = Ellipse((self.station_east[jj],
+                ellipse = mpatches.Ellipse((self.station_east[jj],
                                    self.station_north[jj]),
                                    width=ewidth,
                                    height=eheight,
@@ -4937,7 +4962,7 @@ class PlotPTMaps(mtplottools.MTEllipse):
                     ewidth = mpt.phimax[0][jj]/mpt.phimax[0].max()*\
                               self.ellipse_size
                 
-                    ellipsem = Ellipse((self.station_east[jj],
+                    ellipsem = mpatches.Ellipse((self.station_east[jj],
                                        self.station_north[jj]),
                                        width=ewidth,
                                        height=eheight,
@@ -4965,7 +4990,7 @@ class PlotPTMaps(mtplottools.MTEllipse):
                     ewidth = rpt.phimax[0][jj]/rpt.phimax[0].max()*\
                                 self.ellipse_size
                 
-                    ellipser = Ellipse((self.station_east[jj],
+                    ellipser = mpatches.Ellipse((self.station_east[jj],
                                        self.station_north[jj]),
                                        width=ewidth,
                                        height=eheight,
@@ -5006,7 +5031,7 @@ class PlotPTMaps(mtplottools.MTEllipse):
             cbaxd = fig.add_axes(cb_location)
             cbd = mcb.ColorbarBase(cbaxd, 
                                    cmap=mtcl.cmapdict[self.ellipse_cmap],
-                                   norm=Normalize(vmin=ckmin,
+                                   norm=colors.Normalize(vmin=ckmin,
                                                   vmax=ckmax),
                                    orientation='horizontal')
             cbd.ax.xaxis.set_label_position('top')
@@ -5041,7 +5066,7 @@ class PlotPTMaps(mtplottools.MTEllipse):
                     if aa == 0:
                         cb = mcb.ColorbarBase(cbax, 
                                               cmap=mtcl.cmapdict[self.ellipse_cmap],
-                                              norm=Normalize(vmin=ckmin,
+                                              norm=colors.Normalize(vmin=ckmin,
                                                              vmax=ckmax),
                                                orientation='horizontal')
                         cb.ax.xaxis.set_label_position('top')
@@ -5059,7 +5084,7 @@ class PlotPTMaps(mtplottools.MTEllipse):
                     else:
                         cb = mcb.ColorbarBase(cbax, 
                                               cmap=mtcl.cmapdict[self.residual_cmap],
-                                               norm=Normalize(vmin=rcmin,
+                                               norm=colors.Normalize(vmin=rcmin,
                                                               vmax=rcmax),
                                                orientation='horizontal')
                         cb.ax.xaxis.set_label_position('top')
@@ -5088,7 +5113,7 @@ class PlotPTMaps(mtplottools.MTEllipse):
                     cbax = fig.add_axes(cb_position)
                     cb = mcb.ColorbarBase(cbax, 
                                           cmap=self.res_cmap,
-                                          norm=Normalize(vmin=self.res_limits[0],
+                                          norm=colors.Normalize(vmin=self.res_limits[0],
                                                          vmax=self.res_limits[1]),
                                           orientation='horizontal')
                     cb.ax.xaxis.set_label_position('top')
@@ -5599,7 +5624,7 @@ class PlotSlices(object):
         cbx = mcb.make_axes(self.ax_map, fraction=.15, shrink=.75, pad = .1)
         cb = mcb.ColorbarBase(cbx[0],
                               cmap=self.cmap,
-                              norm=Normalize(vmin=self.climits[0],
+                              norm=colors.Normalize(vmin=self.climits[0],
                                              vmax=self.climits[1]))
 
    
@@ -6170,8 +6195,9 @@ def write_vtk_res_model(res_model, grid_north, grid_east, grid_z, save_fn):
     if os.path.isdir(save_fn) == True:
         save_fn = os.path.join(save_fn, 'VTKResistivity_Model')
         
-    save_fn = gridToVTK(save_fn, grid_north, grid_east, grid_z, 
-                        cellData={'resistivity':res_model})
+    save_fn = modelexport.write_vtk_grid(save_fn, grid_north, grid_east, 
+                                         grid_z, 
+                                         cell_data={'resistivity':res_model})
               
     return save_fn
     
@@ -6191,8 +6217,8 @@ def write_vtk_stations(station_north, station_east, save_fn, station_z=None):
     if station_z is None:
         station_z = np.zeros_like(station_north)
         
-    pointsToVTK(save_fn, station_north, station_east, station_z, 
-              cellData={'value':np.ones_like(station_north)})     
+    save_fn = modelexport.write_vtk_points(save_fn, station_north, 
+                                           station_east, station_z)
               
     return save_fn
     
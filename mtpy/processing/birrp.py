@@ -38,6 +38,8 @@ import mtpy.utils.filehandling as MTfh
 import mtpy.utils.configfile as MTcf
 import mtpy.utils.misc as MTmc
 import mtpy.utils.interpolation as MTip
+import mtpy.utils.timing as timing
+import mtpy.core.edi as MTedi
 
 #=================================================================
 #for time stamp differences:
@@ -722,6 +724,7 @@ def get_optimal_window_bisection(length, sampling_rate):
 
 
 
+@timing.timed('birrp.write_script_file')
 def write_script_file(processing_dict, save_path=None):
     """
     writeScriptfile(processingdict will write a script file for BIRRP using 
@@ -1536,9 +1539,11 @@ def write_script_file(processing_dict, save_path=None):
         birrp_dict['thetaf'] = thetaf
 
     print 'Wrote BIRRP script file: {0}.script'.format(ofil)
+    timing.add_written(scriptfile)
     
     return scriptfile,birrp_dict
 
+@timing.timed('birrp.run')
 def run(birrp_exe, script_file):
     """
     run a birrp script file
@@ -1611,6 +1616,7 @@ def setup_arguments():
     pass
 
 
+@timing.timed('birrp.convert2edi')
 def convert2edi(stationname, in_dir, survey_configfile, birrp_configfile, 
                 out_dir = None):
     """
@@ -1739,10 +1745,12 @@ def convert2edi(stationname, in_dir, survey_configfile, birrp_configfile,
     F_out.write('>END\n')
 
     F_out.close()
+    timing.add_written(out_fn)
 
     return out_fn
 
     
+@timing.timed('birrp.convert2edi_incl_instrument_correction')
 def convert2edi_incl_instrument_correction(stationname, in_dir, 
                                         survey_configfile, birrp_configfile, 
                                         instr_response_file, out_dir = None, instr_type='lemi'):
@@ -1915,83 +1923,66 @@ def convert2edi_incl_instrument_correction(stationname, in_dir,
     F_out.write('>END\n')
 
     F_out.close()
+    timing.add_written(out_fn)
 
     return out_fn
 
 
 
 def _set_edi_data(lo_periods, Z_array, tipper_array):
-    
+    """
+    set the data sections (ZROT, FREQ, Z, TIPPER) of the edi string, the 
+    values are written in blocks by mtpy.core.edi.format_value_block
+    """
 
-    periods = lo_periods
+    periods = np.array(lo_periods, dtype='float')
+    n_periods = len(periods)
 
-    datastring = ''
+    datastring = []
     
-    datastring += '>ZROT // %i\n'%(len(periods))
-    for i,period in enumerate(periods):
-        freq = 1./period
-        datastring += '\t%E'%(0.)
-        if (i+1)%5 == 0 and (i != len(periods) - 1) and i > 0:
-            datastring += '\n'
-
-    datastring += '\n'
+    datastring.append('>ZROT // %i\n'%(n_periods))
+    datastring.append(MTedi.format_value_block(np.zeros(n_periods)))
+    datastring.append('\n')
 
+    datastring.append('>FREQ // %i\n'%(n_periods))
+    datastring.append(MTedi.format_value_block(1./periods))
+    datastring.append('\n')
 
-    #datastring += '>!****FREQUENCIES****!\n'
-    datastring += '>FREQ // %i\n'%(len(periods))
-    for i,period in enumerate(periods):
-        freq = 1./period
-        datastring += '\t%E'%(freq)
-        if (i+1)%5 == 0 and (i != len(periods) - 1) and i > 0:
-            datastring += '\n'
-
-    datastring += '\n'
-
-    #datastring += '>!****IMPEDANCES****!\n'
     compstrings = ['ZXX','ZXY','ZYX','ZYY']
     Z_entries = ['R','I','.VAR']
     
     for Z_comp in range(4):
         for entry in range(3):
-            datastring += '>%s%s ROT=ZROT // %i\n'%(compstrings[Z_comp], Z_entries[entry], len(periods))
-            for i,period in enumerate(periods):
-                data = Z_array[i,entry,Z_comp]
-                #EDI files carries variances, not standard deviations:
-                if entry == 2:
-                    data = data**2
-                datastring += '\t%E'%(data)
-                if (i+1)%5 == 0 and (i != len(periods) - 1) and i > 0:
-                    datastring += '\n'
-                
-            datastring += '\n'
-
-        
-        
-    #datastring += '\n'
-    #datastring += '>!****TIPPER****!\n'
+            datastring.append('>%s%s ROT=ZROT // %i\n'%(compstrings[Z_comp], 
+                                                       Z_entries[entry], 
+                                                       n_periods))
+            data = np.array([Z_array[i,entry,Z_comp] 
+                             for i in range(n_periods)], dtype='float')
+            #EDI files carries variances, not standard deviations:
+            if entry == 2:
+                data = data**2
+            datastring.append(MTedi.format_value_block(data))
+            datastring.append('\n')
 
     compstrings = ['TX','TY']
     T_entries = ['R.EXP','I.EXP','VAR.EXP']
     
     for T_comp in range(2):
         for entry in range(3):
-            datastring += '>%s%s ROT=ZROT // %i\n'%(compstrings[T_comp], T_entries[entry], len(periods))
-            for i,period in enumerate(periods):
-                if tipper_array != None :
-                    data = tipper_array[i,entry,T_comp]
-                else:
-                    data = 0.
-                datastring += '\t%E'%(data)
-                if (i+1)%5 == 0 and (i != len(periods) - 1) and i > 0:
-                    datastring += '\n'
-                
-
-            datastring += '\n'
-
+            datastring.append('>%s%s ROT=ZROT // %i\n'%(compstrings[T_comp], 
+                                                       T_entries[entry], 
+                                                       n_periods))
+            if tipper_array is not None:
+                data = [tipper_array[i,entry,T_comp] 
+                        for i in range(n_periods)]
+            else:
+                data = np.zeros(n_periods)
+            datastring.append(MTedi.format_value_block(data))
+            datastring.append('\n')
 
-    datastring += '\n'
+    datastring.append('\n')
 
-    return datastring.expandtabs(4)
+    return ''.join(datastring)
 
 
 def _set_edi_info(station_config_dict,birrp_config_dict,sorting_dict):
@@ -2449,6 +2440,7 @@ def _check_j_file_content( periods_array, Z_array, tipper_array):
 
     
 
+@timing.timed('birrp.convert2coh')
 def convert2coh(stationname, birrp_output_directory):
     """
         Convert BIRRP output coherence files into just one *.coh file.
@@ -2583,5 +2575,6 @@ def convert2coh(stationname, birrp_output_directory):
                    
         #F_out.write(('%f \t %f \t %f \t %f \t %f \t %f \t %f \t %f \n'%(period[ff], freq[ff], c1, zc1, c2, zc2, c3, zc3)).expandtabs(4))
     F_out.close()
+    timing.add_written(out_fn)
 
     return out_fn
@@ -6,7 +6,33 @@ Functions for the analysis of time series data coherence.
 
 Output can be visualised with the help of mtpy/imaging/plotcoherence.py
 
+The channels of a station (ex, ey, hx, hy, hz and remote reference rhx, rhy)
+are cut into overlapping windows, all windows are Fourier transformed in one
+batch and the auto- and cross-spectra are averaged in frequency bands,
+evenly spaced in log frequency.  From the band averaged spectra of each
+window come
 
+    * ordinary coherence between two channels, e.g. coh_ex_hy
+    * multiple coherence of a channel with the magnetic channels hx, hy,
+      e.g. mcoh_ex, which is the fraction of the power of ex that a transfer
+      function can explain
+    * spectral power of each channel, power_ex
+
+and together with the quality measures of mtpy/processing/quality.py these
+are put into a table with one row per window and band.  gate_windows uses
+the table to select the windows that go into transfer function estimation.
+
+Long recordings can be streamed through iter_coherence_tables in chunks,
+and compute_station_tables reads MTpy TS files for many stations across a
+process pool:
+
+    >>> import mtpy.processing.coherence as MTcoh
+    >>> station_dict = {'mt01':[r"/home/mt/mt01/mt01_ex.ts",
+    >>> ...                     r"/home/mt/mt01/mt01_ey.ts",
+    >>> ...                     r"/home/mt/mt01/mt01_hx.ts",
+    >>> ...                     r"/home/mt/mt01/mt01_hy.ts"]}
+    >>> table_dict = MTcoh.compute_station_tables(station_dict, 4096)
+    >>> use = MTcoh.gate_windows(table_dict['mt01'], min_coherence=.8)
 
 @UofA, 2013
 (LK)
@@ -17,13 +43,644 @@ Output can be visualised with the help of mtpy/imaging/plotcoherence.py
 
 
 import numpy as np
-import re
-import sys, os
-import os.path as op
 
-import copy
+import mtpy.processing.quality as MTq
+import mtpy.utils.filehandling as MTfh
+import  mtpy.utils.exceptions as MTex
+import mtpy.utils.parallel as MTparallel
 
+#=================================================================
 
-import  mtpy.utils.exceptions as MTex
+#channels the transfer functions are estimated from
+lo_input_channels = ['hx', 'hy']
 
 #=================================================================
+
+def get_frequency_bands(sampling_rate, window_length, bands_per_decade=4,
+                        min_lines=5):
+    """
+    frequency bands evenly spaced in log frequency between the first
+    frequency line above 0 and the Nyquist frequency, each with at least
+    min_lines frequency lines.  Narrow bands at low frequency are widened
+    until they have enough lines.
+
+    Arguments:
+    -----------
+        **sampling_rate** : float
+                            sampling rate in samples per second
+
+        **window_length** : int
+                            number of samples in a window
+
+        **bands_per_decade** : int
+                               number of bands per decade of frequency.
+                               *default* is 4
+
+        **min_lines** : int
+                        minimum number of frequency lines in a band.
+                        *default* is 5
+
+    Returns:
+    ---------
+        **band_array** : np.ndarray(n_bands, 2)
+                         first and one past the last frequency line of each
+                         band
+
+        **freq** : np.ndarray(n_bands)
+                   geometric center frequency of each band
+    """
+
+    n_lines = int(window_length)//2
+    if n_lines < min_lines:
+        raise MTex.MTpyError_inputarguments('window_length {0} is too '.format(
+                                            window_length)+
+                                            'short for {0} lines'.format(
+                                            min_lines))
+
+    n_decades = np.log10(n_lines)
+    n_bands = max(int(np.ceil(n_decades*bands_per_decade)), 1)
+    edges = np.unique(np.round(np.logspace(0, n_decades, n_bands+1)).astype(
+                      np.int))
+
+    band_list = []
+    start = 1
+    for stop in edges[1:]:
+        if stop-start >= min_lines:
+            band_list.append((start, stop))
+            start = stop
+    if len(band_list) == 0:
+        band_list.append((1, n_lines+1))
+    elif start < n_lines+1:
+        # the left over lines at the top go into the last band
+        band_list[-1] = (band_list[-1][0], n_lines+1)
+
+    band_array = np.array(band_list, dtype=np.int)
+    df = float(sampling_rate)/window_length
+    freq = df*np.sqrt(band_array[:, 0]*(band_array[:, 1]-1))
+
+    return band_array, freq
+
+def get_spectra(window_array, detrend='linear'):
+    """
+    Fourier transform all windows in one batch after detrending and
+    applying a Hanning taper.  Samples that are not finite are set to 0.
+
+    Arguments:
+    -----------
+        **window_array** : np.ndarray(n_windows, n_channels, window_length)
+                           windowed time series, see
+                           mtpy.processing.quality.get_window_array
+
+        **detrend** : [ 'linear' | 'mean' | None ]
+                      remove a least squares line or the mean of each
+                      window.  *default* is 'linear'
+
+    Returns:
+    ---------
+        **spectra** : np.ndarray(n_windows, n_channels, window_length//2+1)
+                      complex spectra of each window and channel
+    """
+
+    window_array = np.asarray(window_array, dtype=np.float)
+    window_array = np.where(np.isfinite(window_array), window_array, 0)
+    window_length = window_array.shape[-1]
+
+    if detrend in ['linear', 'mean']:
+        window_array = window_array-window_array.mean(axis=-1)[..., np.newaxis]
+    if detrend == 'linear':
+        t_arr = np.arange(window_length)-(window_length-1)/2.
+        slope = np.dot(window_array, t_arr)/np.dot(t_arr, t_arr)
+        window_array = window_array-slope[..., np.newaxis]*t_arr
+
+    return np.fft.rfft(window_array*np.hanning(window_length), axis=-1)
+
+def get_band_cross_spectra(spectra, band_array, sampling_rate=1.,
+                           window_length=None):
+    """
+    average the auto- and cross-spectra of each window over frequency bands.
+
+    Arguments:
+    -----------
+        **spectra** : np.ndarray(n_windows, n_channels, n_freq)
+                      spectra from get_spectra
+
+        **band_array** : np.ndarray(n_bands, 2)
+                         frequency lines of the bands from
+                         get_frequency_bands
+
+        **sampling_rate** : float
+                            sampling rate in samples per second, used to
+                            scale the spectra to power spectral density.
+                            *default* is 1
+
+        **window_length** : int
+                            number of samples in each window, used to
+                            scale the spectra to power spectral density.
+                            *default* is None, which assumes an even
+                            window of 2*(n_freq-1) samples
+
+    Returns:
+    ---------
+        **cross_array** : np.ndarray(n_windows, n_bands, n_channels,
+                                     n_channels)
+                          band averaged spectral density matrix, element
+                          [:, :, i, j] is the average of X_i X_j^*
+    """
+
+    n_windows, n_channels, n_freq = spectra.shape
+    #rfft gives the same number of lines for windows of 2*(n_freq-1) and
+    #2*(n_freq-1)+1 samples, so the spectra alone do not give the length
+    if window_length is None:
+        window_length = 2*(n_freq-1)
+    #one sided power spectral density of a Hanning tapered window
+    scale = 2./(sampling_rate*(np.hanning(window_length)**2).sum())
+
+    cross_array = np.zeros((n_windows, len(band_array), n_channels,
+                            n_channels), dtype=np.complex)
+    for bb, (start, stop) in enumerate(band_array):
+        band_spectra = spectra[:, :, start:stop]
+        cross_array[:, bb] = np.einsum('wil,wjl->wij', band_spectra,
+                                       band_spectra.conj())*\
+                                       (scale/(stop-start))
+
+    return cross_array
+
+def get_ordinary_coherence(cross_array, ii, jj):
+    """
+    squared ordinary coherence between channels ii and jj.
+
+    Arguments:
+    -----------
+        **cross_array** : np.ndarray(..., n_channels, n_channels)
+                          band averaged spectral density matrix from
+                          get_band_cross_spectra
+
+        **ii**, **jj** : int
+                         index of the channels
+
+    Returns:
+    ---------
+        **coherence** : np.ndarray(...)
+                        |S_ij|^2/(S_ii S_jj), between 0 and 1
+    """
+
+    power = cross_array[..., ii, ii].real*cross_array[..., jj, jj].real
+    with np.errstate(invalid='ignore', divide='ignore'):
+        coherence = np.abs(cross_array[..., ii, jj])**2/power
+
+    return np.where(power > 0, coherence, 0.)
+
+def get_multiple_coherence(cross_array, output, inputs):
+    """
+    squared multiple coherence of channel output with the channels inputs,
+    the fraction of the power of output that a linear transfer function
+    from inputs can predict.
+
+    Arguments:
+    -----------
+        **cross_array** : np.ndarray(..., n_channels, n_channels)
+                          band averaged spectral density matrix from
+                          get_band_cross_spectra
+
+        **output** : int
+                     index of the output channel
+
+        **inputs** : list of int
+                     index of the input channels
+
+    Returns:
+    ---------
+        **coherence** : np.ndarray(...)
+                        S_oi S_ii^-1 S_io/S_oo, between 0 and 1
+    """
+
+    inputs = list(inputs)
+    shape = cross_array.shape[:-2]
+    n_channels = cross_array.shape[-1]
+    cross_array = cross_array.reshape((-1, n_channels, n_channels))
+
+    power = cross_array[:, output, output].real
+    input_array = cross_array[:, inputs, :][:, :, inputs]
+    input_output = cross_array[:, inputs, output]
+
+    #windows with a dead or duplicated input channel get 0
+    scale = np.prod(np.abs(np.diagonal(input_array, axis1=1, axis2=2)),
+                    axis=1)
+    valid = (np.abs(np.linalg.det(input_array)) > 1e-12*scale) & (power > 0)
+
+    coherence = np.zeros(cross_array.shape[0])
+    if valid.any():
+        transfer = np.linalg.solve(input_array[valid],
+                                   input_output[valid][:, :, np.newaxis])
+        coherence[valid] = (input_output[valid].conj()*
+                            transfer[:, :, 0]).sum(axis=1).real/power[valid]
+
+    return np.clip(coherence, 0, 1).reshape(shape)
+
+def get_coherence_pairs(channel_list):
+    """
+    default coherences to compute for the channels of a station.
+
+    Arguments:
+    -----------
+        **channel_list** : list of channel names, remote reference channels
+                           start with r, like rhx.
+
+    Returns:
+    ---------
+        **pair_list** : list of (channel, channel) for ordinary coherence,
+                        ex-hy, ey-hx and with remote reference hx-rhx,
+                        hy-rhy, ex-rhy, ey-rhx
+
+        **multiple_list** : list of channels for multiple coherence with
+                            hx, hy: ex, ey and hz
+    """
+
+    pair_list = [pair for pair in [('ex', 'hy'), ('ey', 'hx'),
+                                   ('hx', 'rhx'), ('hy', 'rhy'),
+                                   ('ex', 'rhy'), ('ey', 'rhx')]
+                 if pair[0] in channel_list and pair[1] in channel_list]
+
+    multiple_list = []
+    if all([ch in channel_list for ch in lo_input_channels]):
+        multiple_list = [ch for ch in ['ex', 'ey', 'hz'] if ch in channel_list]
+
+    return pair_list, multiple_list
+
+def _get_table_dtype(channel_list, pair_list, multiple_list):
+    """
+    data type of a coherence table.
+    """
+
+    dtype = [('window', np.int), ('t_start', np.float),
+             ('frequency', np.float), ('n_lines', np.int)]
+    dtype += [('coh_{0}_{1}'.format(*pair), np.float) for pair in pair_list]
+    dtype += [('mcoh_{0}'.format(ch), np.float) for ch in multiple_list]
+    for key in ['power', 'rms', 'clipped', 'gap']:
+        dtype += [('{0}_{1}'.format(key, ch), np.float)
+                  for ch in channel_list]
+
+    return np.dtype(dtype)
+
+def iter_coherence_tables(chunk_iter, channel_list, sampling_rate,
+                          window_length, step=None, t_min=0.,
+                          bands_per_decade=4, min_lines=5, detrend='linear',
+                          clip_level=None, flat_length=10, pair_list=None,
+                          multiple_list=None):
+    """
+    stream time series through the coherence and quality analysis,
+    yielding a table for the windows that are complete in each chunk.
+    Samples at the end of a chunk are kept for the windows that overlap into
+    the next chunk, so the tables are the same as for the whole recording.
+
+    Arguments:
+    -----------
+        **chunk_iter** : iterable of np.ndarray(n_channels, n_samples)
+                         consecutive chunks of the time series of each
+                         channel
+
+        **channel_list** : list of channel names in the order of the rows
+                           of the chunks, like ['ex', 'ey', 'hx', 'hy'].
+                           Remote reference channels start with r.
+
+        **sampling_rate** : float
+                            sampling rate in samples per second
+
+        **window_length** : int
+                            number of samples in a window
+
+        **step** : int
+                   number of samples between the start of windows.
+                   *default* is None, which is window_length/2
+
+        **t_min** : float
+                    time of the first sample in seconds. *default* is 0
+
+        **bands_per_decade**, **min_lines** : see get_frequency_bands
+
+        **detrend** : see get_spectra
+
+        **clip_level**, **flat_length** : see
+                      mtpy.processing.quality.get_window_quality
+
+        **pair_list**, **multiple_list** : coherences to compute, see
+                                           get_coherence_pairs. *default*
+                                           is None, for the default pairs
+
+    Returns:
+    ---------
+        generator of np.ndarray structured arrays, one row for each window
+        and band with fields
+
+        ================= ==================================================
+        Field             Description
+        ================= ==================================================
+        window            index of window
+        t_start           time of first sample of window (s)
+        frequency         center frequency of band (Hz)
+        n_lines           number of frequency lines in band
+        coh_{ch1}_{ch2}   squared ordinary coherence
+        mcoh_{ch}         squared multiple coherence of ch with hx, hy
+        power_{ch}        power spectral density in band (unit**2/Hz)
+        rms_{ch}          rms of window
+        clipped_{ch}      fraction of clipped samples of window
+        gap_{ch}          fraction of missing or flat samples of window
+        ================= ==================================================
+    """
+
+    channel_list = [ch.lower() for ch in channel_list]
+    n_channels = len(channel_list)
+    window_length = int(window_length)
+    if step is None:
+        step = window_length//2
+    step = int(step)
+
+    default_pairs, default_multiples = get_coherence_pairs(channel_list)
+    if pair_list is None:
+        pair_list = default_pairs
+    if multiple_list is None:
+        multiple_list = default_multiples
+    input_index = [channel_list.index(ch) for ch in lo_input_channels
+                   if ch in channel_list]
+
+    band_array, freq = get_frequency_bands(sampling_rate, window_length,
+                                           bands_per_decade=bands_per_decade,
+                                           min_lines=min_lines)
+    n_bands = len(band_array)
+    dtype = _get_table_dtype(channel_list, pair_list, multiple_list)
+
+    buffer_array = np.zeros((n_channels, 0))
+    n_windows_done = 0
+    for chunk in chunk_iter:
+        chunk = np.atleast_2d(np.asarray(chunk, dtype=np.float))
+        if chunk.shape[0] != n_channels:
+            raise MTex.MTpyError_ts_data('chunk has {0} channels, '.format(
+                                         chunk.shape[0])+
+                                         'expected {0}'.format(n_channels))
+        buffer_array = np.hstack((buffer_array, chunk))
+
+        window_array = MTq.get_window_array(buffer_array, window_length, step)
+        n_windows = window_array.shape[0]
+        if n_windows == 0:
+            continue
+
+        spectra = get_spectra(window_array, detrend=detrend)
+        cross_array = get_band_cross_spectra(spectra, band_array,
+                                             sampling_rate,
+                                             window_length=window_length)
+        quality_dict = MTq.get_window_quality(window_array,
+                                              clip_level=clip_level,
+                                              flat_length=flat_length)
+
+        table = np.zeros((n_windows, n_bands), dtype=dtype)
+        window_index = n_windows_done+np.arange(n_windows)
+        table['window'] = window_index[:, np.newaxis]
+        table['t_start'] = (t_min+window_index*step/float(sampling_rate))[:,
+                                                                 np.newaxis]
+        table['frequency'] = freq
+        table['n_lines'] = band_array[:, 1]-band_array[:, 0]
+
+        for ch1, ch2 in pair_list:
+            table['coh_{0}_{1}'.format(ch1, ch2)] = get_ordinary_coherence(
+                                                 cross_array,
+                                                 channel_list.index(ch1),
+                                                 channel_list.index(ch2))
+        for ch in multiple_list:
+            table['mcoh_{0}'.format(ch)] = get_multiple_coherence(
+                                                 cross_array,
+                                                 channel_list.index(ch),
+                                                 input_index)
+        for cc, ch in enumerate(channel_list):
+            table['power_{0}'.format(ch)] = cross_array[:, :, cc, cc].real
+            for key in ['rms', 'clipped', 'gap']:
+                table['{0}_{1}'.format(key, ch)] = \
+                                    quality_dict[key][:, cc][:, np.newaxis]
+
+        #keep the samples needed by the next window
+        buffer_array = buffer_array[:, n_windows*step:]
+        n_windows_done += n_windows
+
+        yield table.ravel()
+
+def get_coherence_table(data_array, channel_list, sampling_rate,
+                        window_length, chunk_length=2**18, **kwargs):
+    """
+    coherence and quality table of time series held in memory.  The time
+    series are analysed in chunks of chunk_length samples to keep the 
+    memory used by the spectra down.
+
+    Arguments:
+    -----------
+        **data_array** : np.ndarray(n_channels, n_samples)
+                         time series of each channel, for instance the data
+                         of MTpy TS files
+
+        **chunk_length** : int
+                           number of samples analysed at a time.
+                           *default* is 2**18
+
+        **channel_list**, **sampling_rate**, **window_length** and other
+        keywords : see iter_coherence_tables
+
+    Returns:
+    ---------
+        **table** : np.ndarray structured array with one row per window and
+                    band, see iter_coherence_tables
+
+    :Example: ::
+
+        >>> import numpy as np
+        >>> import mtpy.processing.coherence as MTcoh
+        >>> import mtpy.utils.filehandling as MTfh
+        >>> data_array = np.array([MTfh.read_ts_file(ts_fn)[-1]
+        >>> ...                    for ts_fn in ts_list])
+        >>> table = MTcoh.get_coherence_table(data_array,
+        >>> ...                                ['ex', 'ey', 'hx', 'hy'],
+        >>> ...                                256., 4096)
+        >>> table[table['frequency'] < 1]['coh_ex_hy'].mean()
+    """
+
+    data_array = np.atleast_2d(data_array)
+    chunk_length = max(int(chunk_length), int(window_length))
+    chunk_iter = (data_array[:, ii:ii+chunk_length]
+                  for ii in range(0, data_array.shape[1], chunk_length))
+    table_list = list(iter_coherence_tables(chunk_iter, channel_list,
+                                            sampling_rate, window_length,
+                                            **kwargs))
+    if len(table_list) == 0:
+        channel_list = [ch.lower() for ch in channel_list]
+        pair_list, multiple_list = get_coherence_pairs(channel_list)
+        return np.zeros(0, dtype=_get_table_dtype(channel_list,
+                                        kwargs.get('pair_list', pair_list),
+                                        kwargs.get('multiple_list',
+                                                   multiple_list)))
+
+    return np.concatenate(table_list)
+
+def gate_windows(table, min_coherence=0.5, coherence_keys=None,
+                 max_clipped=0., max_gap=0.):
+    """
+    select the windows and bands that are good enough for transfer function
+    estimation.
+
+    Arguments:
+    -----------
+        **table** : np.ndarray from get_coherence_table
+
+        **min_coherence** : float
+                            minimum squared coherence. *default* is 0.5
+
+        **coherence_keys** : list of table fields the coherence limit
+                             applies to. *default* is None, which uses the
+                             multiple coherences (mcoh_*) if there are any
+                             and else all ordinary coherences (coh_*)
+
+        **max_clipped** : float
+                          maximum fraction of clipped samples in any
+                          channel.  *default* is 0
+
+        **max_gap** : float
+                      maximum fraction of missing or flat samples in any
+                      channel.  *default* is 0
+
+    Returns:
+    ---------
+        **use** : np.ndarray(len(table), dtype=bool)
+                  True for rows that pass all limits
+    """
+
+    names = table.dtype.names
+    if coherence_keys is None:
+        coherence_keys = [name for name in names if name.startswith('mcoh_')]
+        if len(coherence_keys) == 0:
+            coherence_keys = [name for name in names
+                              if name.startswith('coh_')]
+
+    use = np.ones(len(table), dtype=np.bool)
+    for key in coherence_keys:
+        use &= table[key] >= min_coherence
+    for name in names:
+        if name.startswith('clipped_'):
+            use &= table[name] <= max_clipped
+        elif name.startswith('gap_'):
+            use &= table[name] <= max_gap
+
+    return use
+
+def write_coherence_table(table, save_fn):
+    """
+    write a coherence table to a comma separated file with a header line of
+    the field names.
+
+    Arguments:
+    -----------
+        **table** : np.ndarray from get_coherence_table
+
+        **save_fn** : string
+                      full path to save file to
+
+    Returns:
+    ---------
+        **save_fn** : string
+    """
+
+    fmt = ['%d' if table.dtype[name].kind == 'i' else '%.6e'
+           for name in table.dtype.names]
+    np.savetxt(save_fn, table, fmt=fmt, delimiter=',',
+               header=','.join(table.dtype.names), comments='')
+
+    return save_fn
+
+def _station_table_job(job):
+    """
+    stream the TS files of a station through iter_coherence_tables.
+    Defined at module level so it can be sent to a multiprocessing pool.
+
+    **job** : tuple (station, lo_ts_files, lo_remote_files, window_length,
+                     chunk_length, kwargs)
+
+    **Returns** : (station, table)
+    """
+
+    station, lo_ts_files, lo_remote_files, window_length, chunk_length, \
+                                                              kwargs = job
+
+    channel_list = []
+    sampling_rate = None
+    t_min = None
+    for ii, ts_fn in enumerate(lo_ts_files+lo_remote_files):
+        header = MTfh.read_ts_header(ts_fn)
+        channel = header['channel'].lower()
+        if ii >= len(lo_ts_files):
+            channel = 'r'+channel
+        channel_list.append(channel)
+
+        if sampling_rate is None:
+            sampling_rate = float(header['samplingrate'])
+            t_min = float(header['t_min'])
+        elif float(header['samplingrate']) != sampling_rate:
+            raise MTex.MTpyError_ts_data('{0} has a different '.format(ts_fn)+
+                                         'sampling rate than '
+                                         '{0}'.format(lo_ts_files[0]))
+
+    chunk_iter = MTfh.read_ts_file_chunks(lo_ts_files+lo_remote_files,
+                                          chunk_length)
+    table_list = list(iter_coherence_tables(chunk_iter, channel_list,
+                                            sampling_rate, window_length,
+                                            t_min=t_min, **kwargs))
+    if len(table_list) == 0:
+        return station, None
+
+    return station, np.concatenate(table_list)
+
+def compute_station_tables(station_dict, window_length, remote_dict=None,
+                           chunk_length=2**20, n_processes=None, **kwargs):
+    """
+    coherence and quality tables for many stations, read from MTpy TS files
+    in chunks of chunk_length samples and spread over a process pool.
+
+    Arguments:
+    -----------
+        **station_dict** : dictionary keyed by station with a list of the
+                           TS files of the channels of that station, all
+                           starting at the same time with the same sampling
+                           rate.  Channel names come from the file headers.
+
+        **window_length** : int
+                            number of samples in a window
+
+        **remote_dict** : dictionary keyed by station with a list of the
+                          TS files of the remote reference channels, their
+                          names get an r in front, like rhx.
+                          *default* is None
+
+        **chunk_length** : int
+                           number of samples read from each file at a time.
+                           *default* is 2**20
+
+        **n_processes** : int
+                          number of processes, *default* is the number of
+                          cpus.  If 1 the stations are done in this process.
+
+        other keywords are passed to iter_coherence_tables
+
+    Returns:
+    ---------
+        **table_dict** : dictionary keyed by station of tables, see
+                         iter_coherence_tables.  None for stations that are
+                         too short for a single window.
+    """
+
+    if remote_dict is None:
+        remote_dict = {}
+
+    jobs = [(station, list(station_dict[station]),
+             list(remote_dict.get(station, [])), window_length, chunk_length,
+             kwargs) for station in sorted(station_dict.keys())]
+    if len(jobs) == 0:
+        return {}
+
+    result_list, n_processes = MTparallel.map_jobs(_station_table_job, jobs,
+                                                   n_processes=n_processes)
+
+    return dict(result_list)
@@ -6,6 +6,18 @@ Functions for the analysis of time series data quality.
 
 Output can be visualised with the help of mtpy/imaging/plotquality.py
 
+The time series are cut into windows (see get_window_array) and each window
+of each channel gets quality measures, computed for all windows at once:
+
+    * rms -- root mean square of the valid samples
+    * clipped -- fraction of samples stuck at the largest or smallest value
+      of the window, or beyond clip_level if it is given
+    * gap -- fraction of samples that are not finite or part of a flat run of
+      at least flat_length equal samples, as left by data loggers when
+      they drop data
+
+The spectral power of each window is computed together with the coherences
+in mtpy/processing/coherence.py.
 
 
 @UofA, 2013
@@ -17,12 +29,148 @@ Output can be visualised with the help of mtpy/imaging/plotquality.py
 
 
 import numpy as np
-import re
-import sys, os
-import os.path as op
-
-import copy
-
 
 import  mtpy.utils.exceptions as MTex
 #=================================================================
+
+def get_window_array(data_array, window_length, step=None):
+    """
+    cut time series into windows without copying the data.
+
+    Arguments:
+    -----------
+        **data_array** : np.ndarray(n_samples) or (n_channels, n_samples)
+                         time series, one row per channel
+
+        **window_length** : int
+                            number of samples in a window
+
+        **step** : int
+                   number of samples between the start of windows.
+                   *default* is None, which is window_length/2
+
+    Returns:
+    ---------
+        **window_array** : np.ndarray(n_windows, n_channels, window_length)
+                           read only view of data_array
+    """
+
+    data_array = np.atleast_2d(np.ascontiguousarray(data_array))
+    window_length = int(window_length)
+    if step is None:
+        step = window_length//2
+    step = int(step)
+    if window_length < 1 or step < 1:
+        raise MTex.MTpyError_inputarguments('window_length and step need '
+                                            'to be positive')
+
+    n_channels, n_samples = data_array.shape
+    n_windows = max(0, (n_samples-window_length)//step+1)
+    ch_stride, sample_stride = data_array.strides
+
+    window_array = np.lib.stride_tricks.as_strided(data_array,
+                                shape=(n_windows, n_channels, window_length),
+                                strides=(step*sample_stride, ch_stride,
+                                         sample_stride))
+    window_array.flags.writeable = False
+
+    return window_array
+
+def _get_flat_samples(window_array, flat_length):
+    """
+    boolean array marking samples in runs of at least flat_length equal
+    samples along the last axis.
+    """
+
+    shape = window_array.shape
+    flat_array = np.zeros(shape, dtype=np.bool)
+    if flat_length < 2 or shape[-1] < flat_length:
+        return flat_array
+
+    # count equal neighbours in a moving window of flat_length-1 pairs
+    equal = (np.diff(window_array, axis=-1) == 0).astype(np.int32)
+    count = np.cumsum(equal, axis=-1)
+    count = np.concatenate((np.zeros(shape[:-1]+(1,), dtype=np.int32), count),
+                           axis=-1)
+    n_pairs = flat_length-1
+    run_start = (count[..., n_pairs:]-count[..., :-n_pairs]) == n_pairs
+
+    # mark all samples covered by a run starting at each position
+    for ii in range(flat_length):
+        flat_array[..., ii:ii+run_start.shape[-1]] |= run_start
+
+    return flat_array
+
+def get_window_quality(window_array, clip_level=None, flat_length=10):
+    """
+    quality measures for each window and channel.
+
+    Arguments:
+    -----------
+        **window_array** : np.ndarray(n_windows, n_channels, window_length)
+                           windowed time series, see get_window_array
+
+        **clip_level** : float or np.ndarray(n_channels)
+                         absolute value at which a channel clips.
+                         *default* is None, where samples that repeat the
+                         largest or smallest value of the window count as
+                         clipped
+
+        **flat_length** : int
+                          number of equal samples in a row to count as a
+                          gap. *default* is 10
+
+    Returns:
+    ---------
+        **quality_dict** : dictionary of np.ndarray(n_windows, n_channels)
+                           with keys
+
+                           ======== ===================================
+                           Key      Description
+                           ======== ===================================
+                           rms      rms of the finite samples
+                           clipped  fraction of clipped samples
+                           gap      fraction of missing or flat samples
+                           ======== ===================================
+
+    :Example: ::
+
+        >>> import mtpy.processing.quality as MTq
+        >>> import mtpy.utils.filehandling as MTfh
+        >>> ts_tuple = MTfh.read_ts_file(r"/home/mt/mt01_ex.ts")
+        >>> window_array = MTq.get_window_array(ts_tuple[-1], 4096)
+        >>> quality_dict = MTq.get_window_quality(window_array)
+        >>> bad_windows = quality_dict['gap'][:, 0] > 0
+    """
+
+    window_array = np.asarray(window_array, dtype=np.float)
+    window_length = window_array.shape[-1]
+    finite = np.isfinite(window_array)
+
+    n_finite = finite.sum(axis=-1)
+    finite_array = np.where(finite, window_array, 0)
+    rms = np.sqrt((finite_array**2).sum(axis=-1)/np.maximum(n_finite, 1))
+
+    if clip_level is None:
+        # saturated samples repeat the extreme value of the window
+        w_max = np.where(finite, window_array, -np.inf).max(axis=-1)
+        w_min = np.where(finite, window_array, np.inf).min(axis=-1)
+        extreme = (finite_array == w_max[..., np.newaxis]) | \
+                  (finite_array == w_min[..., np.newaxis])
+        extreme &= finite
+        repeat = np.zeros_like(extreme)
+        repeat[..., 1:] = extreme[..., 1:] & extreme[..., :-1] & \
+                          (np.diff(finite_array, axis=-1) == 0)
+        repeat[..., :-1] |= repeat[..., 1:]
+        clipped = repeat
+    else:
+        clip_level = np.asarray(clip_level, dtype=np.float)
+        if clip_level.ndim == 1:
+            clip_level = clip_level[:, np.newaxis]
+        clipped = finite & (np.abs(finite_array) >= clip_level)
+
+    gap = np.invert(finite) | _get_flat_samples(finite_array, flat_length)
+
+    return {'rms':rms,
+            'clipped':clipped.sum(axis=-1)/float(window_length),
+            'gap':gap.sum(axis=-1)/float(window_length)}
@@ -813,47 +813,43 @@ class Trace(object):
         tpeaks = []
         apeaks = []
         tzeros = []
-        tzero = self.tmin
-        
-        for itrig_pos in itrig_positions:
-            ibeg = itrig_pos
-            iend = min(len(self.ydata), itrig_pos + tsearch/self.deltat)
-            ipeak = num.argmax(y[ibeg:iend])
-            tpeak = self.tmin + (ipeak+ibeg)*self.deltat
-            apeak = y[ibeg+ipeak]
 
-            if tpeak < tzero:
-                continue
+        if itrig_positions.size == 0:
+            if deadtime:
+                return tpeaks, apeaks, tzeros
+            else:
+                return tpeaks, apeaks
 
+        nsearch = max(int(tsearch/self.deltat), 1)
+        ipeaks = _window_argmax(y, nsearch, itrig_positions)
+        # the window maxima can not move backwards, so tpeaks is sorted
+        tpeaks_all = self.tmin + ipeaks*self.deltat
+        if deadtime:
+            logy = _log_ignore(y)
+
+        tzero = self.tmin
+        k = 0
+        while True:
+            # next trigger with its peak not before the end of the last one
+            k = max(k, num.searchsorted(tpeaks_all, tzero, side='left'))
+            if k >= itrig_positions.size:
+                break
+
+            ibeg = itrig_positions[k]
             if deadtime:
-                ibeg = itrig_pos
-                iblock = 0
-                nblock = nblock_duration_detection
-                totalsum = 0. 
-                while True:
-                    if ibeg+iblock*nblock >= len(y):
-                        tzero = self.tmin + (len(y)-1)* self.deltat
-                        break
-
-                    logy = num.log(y[ibeg+iblock*nblock:ibeg+(iblock+1)*nblock])
-                    logy[0] += totalsum
-                    ysum = num.cumsum(logy)
-                    totalsum = ysum[-1]
-                    below = num.where(ysum <= 0., 1, 0)
-                    deriv = num.zeros(ysum.size, dtype=num.int8)
-                    deriv[1:] = below[1:]-below[:-1]
-                    izero_positions = num.nonzero(deriv>0)[0] + iblock*nblock
-                    if len(izero_positions) > 0:
-                        tzero = self.tmin + (ibeg + izero_positions[0])*self.deltat
-                        break
-                    iblock += 1
+                izero = _first_log_zero(logy, ibeg, nblock_duration_detection)
+                if izero is None:
+                    tzero = self.tmin + (len(y)-1)* self.deltat
+                else:
+                    tzero = self.tmin + izero*self.deltat
             else:
                 tzero = ibeg*self.deltat + self.tmin + tsearch
 
-            tpeaks.append(tpeak)
-            apeaks.append(apeak)
+            tpeaks.append(tpeaks_all[k])
+            apeaks.append(y[ipeaks[k]])
             tzeros.append(tzero)
-        
+            k += 1
+
         if deadtime:
             return tpeaks, apeaks, tzeros
         else:
@@ -1157,6 +1153,78 @@ def minmaxtime(traces, key=None):
     
     return ranges
     
+def _degapper_plan(traces, maxgap=5, deoverlap='use_second', maxlap=None):
+    
+    '''Plan how degapper() joins traces, without touching any samples.
+
+    Traces are sorted by their full_id attribute, so traces of the same
+    network, station, location and channel follow each other in time. Each
+    trace is then compared to the end of the chain it could be joined to,
+    keeping only the chain length in samples, its tmax and mtime.
+
+    :returns: list of ``(trace, joins, nsamples, nbuffer, tmax, mtime)`` for
+              each output trace, where *joins* is a list of 
+              ``(trace, idist, nbefore)`` tuples of the traces joined to it, 
+              *idist* being the distance in samples from the last sample of 
+              the chain and *nbefore* the chain length before the join. 
+              *nsamples* is the final length, *nbuffer* the largest length 
+              the chain has while joining.
+    '''
+
+    traces = sorted(traces, key=lambda tr: tr.full_id)
+    if not traces: return []
+
+    virtual = traces[0].ydata is None
+    for tr in traces:
+        assert (tr.ydata is None) == virtual, 'traces given to degapper() must either all have data or have no data.'
+
+    plan = []
+    for b in traces:
+        nb = b.data_len()
+        if plan:
+            a, joins, na, nbuf, a_tmax, a_mtime = plan[-1]
+            if (a.nslc_id == b.nslc_id and a.deltat == b.deltat and 
+                na >= 1 and nb >= 1 and 
+                (virtual or a.ydata.dtype == b.ydata.dtype)):
+
+                dist = (b.tmin-(a.tmin+(na-1)*a.deltat))/a.deltat
+                idist = int(round(dist))
+                if abs(dist - idist) > 0.05 and idist <= maxgap:
+                    pass #logger.warn('Cannot degap traces with displaced sampling (%s,%s,%s,%s)' % a.nslc_id)
+                else:
+                    join = False
+                    if 1 < idist <= maxgap:
+                        join, nnew = True, na + idist-1 + nb
+                    elif idist == 1:
+                        join, nnew = True, na + nb
+                    elif idist <= 0 and (maxlap is None or -maxlap < idist):
+                        if b.tmax <= a_tmax:
+                            # make short second trace vanish
+                            continue
+
+                        n = -idist+1
+                        if deoverlap == 'use_second':
+                            join, nnew = True, max(na-n, 0) + nb
+                        elif deoverlap in ('use_first', 'crossfade_cos'):
+                            join, nnew = True, na + max(nb-n, 0)
+                        else:
+                            assert False, 'unknown deoverlap method'
+
+                    if join:
+                        if virtual:
+                            # as Trace.data_len() of a trace without data
+                            nnew = int(round((b.tmax-a.tmin)/a.deltat)) + 1
+                        joins.append((b, idist, na))
+                        if a_mtime and b.mtime:
+                            a_mtime = max(a_mtime, b.mtime)
+                        plan[-1] = (a, joins, nnew, max(nbuf, nnew), b.tmax, a_mtime)
+                        continue
+
+        if nb >= 1:
+            plan.append((b, [], nb, nb, b.tmax, b.mtime))
+
+    return plan
+
 def degapper(traces, maxgap=5, fillmethod='interpolate', deoverlap='use_second', maxlap=None):
     
     '''Try to connect traces and remove gaps.
@@ -1164,8 +1232,13 @@ def degapper(traces, maxgap=5, fillmethod='interpolate', deoverlap='use_second',
     This method will combine adjacent traces, which match in their network, 
     station, location and channel attributes. Overlapping parts are handled
     according to the `deoverlap` argument.
+
+    All joins are planned first from the start and end times of the traces,
+    then the samples of each output trace are copied once into an array of
+    the final length. Traces without data (virtual traces) are joined by 
+    their time spans only.
     
-    :param traces:      input traces, must be sorted by their full_id attribute.
+    :param traces:      input traces, they are sorted by their full_id attribute.
     :param maxgap:      maximum number of samples to interpolate.
     :param fillmethod:  what to put into the gaps: 'interpolate' or 'zeros'.
     :param deoverlap:   how to handle overlaps: 'use_second' to use data from 
@@ -1173,85 +1246,247 @@ def degapper(traces, maxgap=5, fillmethod='interpolate', deoverlap='use_second',
                         trace, 'crossfade_cos' to crossfade with cosine taper 
     :param maxlap:      maximum number of samples of overlap which are removed
       
-    :returns:           list of traces
+    :returns:           list of traces, the first trace of each joined chain
+                        is modified in place
     '''
 
-    in_traces = traces 
     out_traces = []
-    if not in_traces: return out_traces
-    out_traces.append(in_traces.pop(0))
-    while in_traces:
-        
-        a = out_traces[-1]
-        b = in_traces.pop(0)
-        
-        avirt, bvirt = a.ydata is None, b.ydata is None
-        assert avirt == bvirt, 'traces given to degapper() must either all have data or have no data.'
-        virtual = avirt and bvirt
-
-        if (a.nslc_id == b.nslc_id and a.deltat == b.deltat and 
-            a.data_len() >= 1 and b.data_len() >= 1 and 
-            (virtual or a.ydata.dtype == b.ydata.dtype)):
-            
-            dist = (b.tmin-(a.tmin+(a.data_len()-1)*a.deltat))/a.deltat
-            idist = int(round(dist))
-            if abs(dist - idist) > 0.05 and idist <= maxgap:
-                pass #logger.warn('Cannot degap traces with displaced sampling (%s,%s,%s,%s)' % a.nslc_id)
-            else:
-                if 1 < idist <= maxgap:
-                    if not virtual:
+    for a, joins, nsamples, nbuffer, tmax, mtime in _degapper_plan(traces, maxgap=maxgap, deoverlap=deoverlap, maxlap=maxlap):
+        if joins:
+            if a.ydata is not None:
+                ydata = num.empty(nbuffer, dtype=a.ydata.dtype)
+                ydata[:a.ydata.size] = a.ydata
+                for b, idist, na in joins:
+                    nb = b.ydata.size
+                    if idist > 1:
                         if fillmethod == 'interpolate':
-                            filler = a.ydata[-1] + (((1.+num.arange(idist-1,dtype=num.float))/idist)*(b.ydata[0]-a.ydata[-1])).astype(a.ydata.dtype)
+                            ydata[na:na+idist-1] = ydata[na-1] + (((1.+num.arange(idist-1,dtype=num.float))/idist)*(b.ydata[0]-ydata[na-1])).astype(ydata.dtype)
                         elif fillmethod == 'zeros':
-                            filler = num.zeros(idist-1,dtype=a.ydist.dtype)
-                        a.ydata = num.concatenate((a.ydata,filler,b.ydata))
-                    a.tmax = b.tmax
-                    if a.mtime and b.mtime:
-                        a.mtime = max(a.mtime, b.mtime)
-                    continue
+                            ydata[na:na+idist-1] = 0
+                        else:
+                            assert False, 'unknown fillmethod'
+                        ydata[na+idist-1:na+idist-1+nb] = b.ydata
+
+                    elif idist == 1:
+                        ydata[na:na+nb] = b.ydata
 
-                elif idist == 1:
-                    if not virtual:
-                        a.ydata = num.concatenate((a.ydata,b.ydata))
-                    a.tmax = b.tmax
-                    if a.mtime and b.mtime:
-                        a.mtime = max(a.mtime, b.mtime)
-                    continue
-                    
-                elif idist <= 0 and (maxlap is None or -maxlap < idist):
-                    if b.tmax > a.tmax:
-                        if not virtual:
-                            na = a.ydata.size
-                            n = -idist+1
-                            if deoverlap == 'use_second':
-                                a.ydata = num.concatenate((a.ydata[:-n], b.ydata))
-                            elif deoverlap in ('use_first', 'crossfade_cos'):
-                                a.ydata = num.concatenate((a.ydata, b.ydata[n:]))
-                            else:
-                                assert False, 'unknown deoverlap method'
-
-                            if deoverlap == 'crossfade_cos':
-                                n = -idist+1
-                                taper = 0.5-0.5*num.cos((1.+num.arange(n))/(1.+n)*num.pi)
-                                a.ydata[na-n:na] *= 1.-taper
-                                a.ydata[na-n:na] += b.ydata[:n] * taper
-
-                        a.tmax = b.tmax
-                        if a.mtime and b.mtime:
-                            a.mtime = max(a.mtime, b.mtime)
-                        continue
                     else:
-                        # make short second trace vanish
-                        continue
-                    
-        if b.data_len() >= 1:
-            out_traces.append(b)
+                        n = -idist+1
+                        if deoverlap == 'use_second':
+                            ydata[max(na-n, 0):max(na-n, 0)+nb] = b.ydata
+                        else:
+                            ydata[na:na+max(nb-n, 0)] = b.ydata[n:]
+
+                        if deoverlap == 'crossfade_cos':
+                            taper = 0.5-0.5*num.cos((1.+num.arange(n))/(1.+n)*num.pi)
+                            ydata[na-n:na] *= 1.-taper
+                            ydata[na-n:na] += b.ydata[:n] * taper
+
+                if nbuffer > nsamples:
+                    ydata = ydata[:nsamples].copy()
+                a.ydata = ydata
+
+            a.tmax = tmax
+            a.mtime = mtime
+
+        out_traces.append(a)
             
     for tr in out_traces:
         tr._update_ids()
     
     return out_traces
 
+def _nyquist_check(frequency, deltat, intro, warn=True, raise_exception=False):
+    if frequency >= 0.5/deltat:
+        message = '%s (%g Hz) is equal to or higher than nyquist frequency (%g Hz).' \
+                % (intro, frequency, 0.5/deltat)
+        if warn:
+            logger.warn(message)
+        if raise_exception:
+            raise AboveNyquist(message)
+
+def _filter_stages(steps, deltat, nyquist_warn=True, nyquist_exception=False):
+
+    '''Turn filter steps into a list of ``(b, a, ndecimate, noffset)`` stages.
+
+    A ``downsample_to`` step becomes one stage per decimation factor of
+    :py:func:`util.decitab`.
+
+    :returns: list of stages and the sampling interval after the last stage
+    '''
+
+    stages = []
+    for step in steps:
+        kind = step[0]
+        if kind in ('lowpass', 'highpass'):
+            order, corner = step[1:]
+            _nyquist_check(corner, deltat, 'Corner frequency of %s' % kind, nyquist_warn, nyquist_exception)
+            (b,a) = _get_cached_filter_coefs(order, [corner*2.0*deltat], btype=kind[:-4])
+            if len(a) != order+1 or len(b) != order+1:
+                logger.warn('Erroneous filter coefficients returned by scipy.signal.butter(). You may need to downsample the signal before filtering.')
+            stages.append((b, a, 1, 0))
+
+        elif kind == 'bandpass':
+            order, corner_hp, corner_lp = step[1:]
+            _nyquist_check(corner_hp, deltat, 'Lower corner frequency of bandpass', nyquist_warn, nyquist_exception)
+            _nyquist_check(corner_lp, deltat, 'Higher corner frequency of bandpass', nyquist_warn, nyquist_exception)
+            (b,a) = _get_cached_filter_coefs(order, [corner*2.0*deltat for corner in (corner_hp, corner_lp)], btype='band')
+            stages.append((b, a, 1, 0))
+
+        elif kind in ('downsample', 'downsample_to'):
+            if kind == 'downsample':
+                deci_seq = [step[1]]
+            else:
+                ratio = step[1]/deltat
+                rratio = round(ratio)
+                if abs(rratio - ratio)/ratio > 0.0001:
+                    raise util.UnavailableDecimation('ratio = %g' % ratio)
+                deci_seq = util.decitab(int(rratio))
+
+            for ndecimate in deci_seq:
+                if ndecimate != 1:
+                    b, n = _get_cached_decimation_coefs(ndecimate)
+                    stages.append((b, num.array([1.]), ndecimate, n/2))
+                    deltat = reuse(deltat*ndecimate)
+
+        else:
+            assert False, 'unknown filter step %s' % kind
+
+    return stages, deltat
+
+def filter_traces(traces, steps, initials=None, demean=True, snap=False, nyquist_warn=True, nyquist_exception=False):
+
+    '''Filter and decimate traces with the same sampling rate all at once.
+
+    The samples of all traces are put into one 2D float64 array, the mean is
+    removed once and every filter runs along the sample axis for all traces
+    in one call. The filters are those of :py:meth:`Trace.lowpass`,
+    :py:meth:`Trace.highpass`, :py:meth:`Trace.bandpass`,
+    :py:meth:`Trace.downsample` and :py:meth:`Trace.downsample_to`.
+
+    :param traces:  input traces, all with the same sampling rate and number
+                    of samples; they are not changed
+    :param steps:   list of filter steps, each one of
+                    ``('lowpass', order, corner)``,
+                    ``('highpass', order, corner)``,
+                    ``('bandpass', order, corner_hp, corner_lp)``,
+                    ``('downsample', ndecimate)`` or
+                    ``('downsample_to', deltat)``
+    :param initials: ``None``, ``True``, or the final filter states returned
+                    by the call on the preceding chunk of the same traces
+    :param demean:  whether to demean the signals before filtering.
+    :param snap:    as in :py:meth:`Trace.downsample`
+    :param nyquist_warn: warn when a corner frequency is above nyquist
+    :param nyquist_exception: raise :py:exc:`AboveNyquist` in that case
+
+    :returns: ``(out_traces, finals)``, new traces in the order of *traces*
+              and the final filter states to be given as *initials* for the
+              next chunk, or ``None`` if *initials* is ``None``
+
+    Example::
+
+        steps = [('highpass', 4, 0.001), ('downsample_to', 1.)]
+        finals = True
+        for chunk in chunks:
+            filtered, finals = filter_traces(chunk, steps, initials=finals)
+    '''
+
+    if not traces:
+        return [], None
+
+    deltat = traces[0].deltat
+    nsamples = traces[0].ydata.size
+    for tr in traces:
+        assert_same_sampling_rate(traces[0], tr)
+        assert tr.ydata.size == nsamples, 'traces given to filter_traces() must have the same number of samples.'
+
+    stages, new_deltat = _filter_stages(steps, deltat, nyquist_warn, nyquist_exception)
+    if initials is not None and initials is not True:
+        assert len(initials) == len(stages), 'initials do not match the filter steps.'
+
+    data = num.empty((len(traces), nsamples), dtype=num.float64)
+    for i, tr in enumerate(traces):
+        data[i] = tr.ydata
+    if demean:
+        data -= num.mean(data, axis=1)[:,num.newaxis]
+
+    tmins = [tr.tmin for tr in traces]
+    finals = []
+    for i, (b, a, ndecimate, noffset) in enumerate(stages):
+        if ndecimate != 1 and snap:
+            newdeltat = deltat*ndecimate
+            for j, tmin in enumerate(tmins):
+                ilag = (math.ceil(tmin / newdeltat) * newdeltat - tmin)/deltat
+                if ilag > 0 and ilag < data.shape[1]:
+                    tmins[j] = tmin + ilag*deltat
+
+        if initials is None:
+            data = signal.lfilter(b, a, data, axis=1)
+        else:
+            if initials is True:
+                zi = num.zeros((len(traces), max(len(a),len(b))-1), dtype=num.float)
+            else:
+                zi = initials[i]
+            data, zf = signal.lfilter(b, a, data, axis=1, zi=zi)
+            finals.append(zf)
+
+        if ndecimate != 1:
+            data = data[:,noffset::ndecimate].copy()
+            deltat = reuse(deltat*ndecimate)
+
+    out_traces = []
+    for i, tr in enumerate(traces):
+        tr_new = tr.copy(data=False)
+        tr_new.ydata = data[i]
+        tr_new.deltat = new_deltat
+        tr_new.tmin = tmins[i]
+        tr_new.tmax = tr_new.tmin + (data.shape[1]-1)*new_deltat
+        tr_new._update_ids()
+        out_traces.append(tr_new)
+
+    if initials is None:
+        return out_traces, None
+
+    return out_traces, finals
+
+def sta_lta_peaks(traces, tshort, tlong, threshold, tsearch, quad=True, scalingmethod=1, deadtime=False, nblock_duration_detection=100):
+
+    '''Detect peaks in the centered STA/LTA of many traces.
+
+    Runs :py:meth:`Trace.sta_lta_centered` on a copy of every trace and
+    :py:meth:`Trace.peaks` on the result, e.g. to screen long records for
+    spikes and cultural noise before processing. Traces which are shorter
+    than *tlong* give no peaks.
+
+    :param traces: input traces, they are not changed
+    :param tshort,tlong,quad,scalingmethod: as in
+        :py:meth:`Trace.sta_lta_centered`
+    :param threshold,tsearch,deadtime,nblock_duration_detection: as in
+        :py:meth:`Trace.peaks`
+
+    :returns: list with the output of :py:meth:`Trace.peaks`, ``(tpeaks,
+        apeaks)`` or ``(tpeaks, apeaks, tzeros)``, for each trace
+    '''
+
+    results = []
+    for tr in traces:
+        tr_sta_lta = tr.copy(data=False)
+        tr_sta_lta.ydata = tr.ydata
+        try:
+            tr_sta_lta.sta_lta_centered(tshort, tlong, quad=quad, scalingmethod=scalingmethod)
+        except TraceTooShort, e:
+            logger.warn('sta_lta_peaks: skipping %s: %s' % ('.'.join(tr.nslc_id), e))
+            if deadtime:
+                results.append(([], [], []))
+            else:
+                results.append(([], []))
+            continue
+
+        results.append(tr_sta_lta.peaks(threshold, tsearch, deadtime=deadtime,
+                                         nblock_duration_detection=nblock_duration_detection))
+
+    return results
+
 def rotate(traces, azimuth, in_channels, out_channels):
     '''2D rotation of traces.
     
@@ -1876,6 +2111,15 @@ def _get_cached_filter_coefs(order, corners, btype):
             cached_coefficients[ck] = signal.butter(order, corners, btype=btype)
 
     return cached_coefficients[ck]
+
+cached_decimation_coefficients = {}
+def _get_cached_decimation_coefs(ndecimate, n=30):
+    # same FIR anti-aliasing filter as util.decimate(ftype='fir')
+    ck = (ndecimate, n)
+    if ck not in cached_decimation_coefficients:
+        cached_decimation_coefficients[ck] = signal.firwin(n+1, 1./ndecimate, window='hamming')
+
+    return cached_decimation_coefficients[ck], n
     
     
 class _globals:
@@ -1998,6 +2242,66 @@ def yulewalker(x, order):
     
     return num.dot(num.linalg.inv(a),-d)
 
+def _window_argmax(x, n, ipos):
+    '''Index of the first maximum of x[i:i+n] for every i in ipos.
+
+    Windows reaching over the end of x are cut. The maxima of windows of
+    2, 4, 8, ... samples are built from the previous ones, every window of
+    n samples is then covered by two overlapping windows.
+    '''
+    n = int(n)
+    val = num.empty(x.size+n-1, dtype=num.float64)
+    val[:x.size] = x
+    val[x.size:] = -num.inf
+    arg = num.arange(val.size)
+    w = 1
+    while 2*w <= n:
+        take_right = val[w:] > val[:-w]
+        arg = num.where(take_right, arg[w:], arg[:-w])
+        val = num.maximum(val[w:], val[:-w])
+        w *= 2
+
+    ileft = num.asarray(ipos)
+    iright = ileft + n - w
+    return num.where(val[iright] > val[ileft], arg[iright], arg[ileft])
+
+def _log_ignore(x):
+    olderr = num.seterr(divide='ignore', invalid='ignore')
+    try:
+        return num.log(x)
+    finally:
+        num.seterr(**olderr)
+
+def _first_log_zero(logx, ibeg, nblock):
+    '''Index where the sum of logx from ibeg on falls to zero or below.
+
+    Crossings at multiples of nblock after ibeg are not counted, as in the
+    block by block search of the deadtime detection in Trace.peaks. Returns
+    None if the sum does not cross zero before the end of logx.
+    '''
+    istart = ibeg
+    nchunk = nblock
+    totalsum = 0.
+    while istart < logx.size:
+        iend = min(logx.size, istart + nchunk)
+        ysum = logx[istart:iend].copy()
+        ysum[0] += totalsum
+        ysum = num.cumsum(ysum)
+        prev_above = num.empty(ysum.size, dtype=num.bool)
+        prev_above[0] = istart > ibeg and totalsum > 0.
+        prev_above[1:] = ysum[:-1] > 0.
+        crossing = num.logical_and(ysum <= 0., prev_above)
+        crossing[(nblock - (istart-ibeg) % nblock) % nblock::nblock] = False
+        izero_positions = num.nonzero(crossing)[0]
+        if len(izero_positions) > 0:
+            return istart + izero_positions[0]
+
+        totalsum = ysum[-1]
+        istart = iend
+        nchunk *= 2
+
+    return None
+
 def moving_avg(x,n):
     n = int(n)
     cx = x.cumsum()
@@ -0,0 +1,198 @@
+import unittest
+import os
+import numpy as np
+import mtpy.test.fixtures as fixtures
+import mtpy.analysis.distortion as distortion
+import mtpy.analysis.niblettbostick as nb
+import mtpy.analysis.strike as strike
+import mtpy.analysis.zinvariants as zinv
+import mtpy.core.z as mtz
+import mtpy.modeling.forward1d as forward1d
+
+#==============================================================================
+# Niblett-Bostick
+#==============================================================================
+class TestNiblettBostick(fixtures.TempDirTestCase):
+
+    def setUp(self):
+        super(TestNiblettBostick, self).setUp()
+
+        np.random.seed(0)
+        self.periods = np.logspace(-3, 3, 30)
+        z_shape = (20, 30, 2, 2)
+        self.z_array = np.random.randn(*z_shape)+1j*np.random.randn(*z_shape)
+        self.z_array[:, :, 0, 1] += 3*(1+1j)
+        self.z_array[:, :, 1, 0] -= 2*(1+1j)
+
+    def test_survey(self):
+        # batched stations have to give the same as one station at a time
+        nb_array = nb.calculate_depth_nb_survey(z_array=self.z_array,
+                                                periods=self.periods)
+        self.assertEqual(nb_array.shape, (20, 30))
+        for ss in range(0, 20, 5):
+            d_arr = nb.calculate_depth_nb(z_array=self.z_array[ss],
+                                          periods=self.periods)
+            for key in d_arr.dtype.names:
+                self.assertTrue(np.allclose(d_arr[key], nb_array[ss][key]))
+
+    def test_half_space(self):
+        f1 = forward1d.Forward1D(resistivity=np.zeros((9, 1))+100.,
+                                 freq=1./self.periods)
+        nb_array = nb.calculate_depth_nb_survey(z_object_list=f1.get_z_list())
+        self.assertTrue(np.all(nb_array['dimensionality'] == 1))
+        self.assertTrue(np.allclose(nb_array['rho_min'], 100.))
+        self.assertTrue(np.allclose(nb_array['rho_max'], 100.))
+
+        depth_list = np.logspace(3, 4, 5)
+        rho_min, rho_max = nb.get_depth_slices(nb_array, depth_list)
+        self.assertTrue(np.allclose(rho_min, 100.))
+
+        east, north = np.meshgrid(np.arange(3)*1000., np.arange(3)*1000.)
+        fn_list, rho_grid = nb.write_depth_slices(nb_array, depth_list,
+                                                  east.ravel(), north.ravel(),
+                                                  save_path=self.save_path,
+                                                  cell_size=500.)
+        self.assertEqual(len(fn_list), 5)
+        self.assertEqual(rho_grid.shape, (5, 5, 5, 2))
+        self.assertTrue(np.allclose(rho_grid, 100.))
+        self.assertEqual(np.loadtxt(fn_list[0]).shape, (25, 4))
+
+
+#==============================================================================
+# Weaver invariants
+#==============================================================================
+class TestZinvariants(fixtures.QuietTestCase):
+
+    def setUp(self):
+        super(TestZinvariants, self).setUp()
+
+        # 2-D tensor with strike along x
+        self.freq = np.logspace(-2, 2, 5)
+        self.z_array = np.zeros((5, 2, 2), dtype='complex')
+        self.z_array[:, 0, 1] = 10*(1+1j)
+        self.z_array[:, 1, 0] = -3*(1+2j)
+
+    def test_strike(self):
+        z_obj = mtz.Z(self.z_array.copy(), abs(self.z_array)*.1+.01,
+                      self.freq)
+        z_inv = zinv.Zinvariants(z_object=z_obj, rot_z=30)
+        self.assertTrue(np.allclose(z_inv.strike, -30))
+        self.assertTrue(np.allclose(z_inv.inv7, 0))
+
+    def test_survey(self):
+        # stacked stations have to give the same as one station at a time
+        np.random.seed(0)
+        z_shape = (4, 5, 2, 2)
+        z_arr = np.random.randn(*z_shape)+1j*np.random.randn(*z_shape)
+        z_arr[3, 2] = 0
+        inv_array = zinv.compute_invariants(z_arr)
+        self.assertEqual(inv_array.shape, (4, 5))
+        for ss in range(3):
+            z_inv = zinv.Zinvariants(z_array=z_arr[ss], freq=self.freq)
+            for key in zinv.invariant_names:
+                self.assertTrue(np.allclose(inv_array[ss][key],
+                                            getattr(z_inv, key),
+                                            equal_nan=True))
+        self.assertTrue(np.all(np.isnan(inv_array[3, 2].tolist())))
+        self.assertTrue(np.all(np.isfinite(inv_array[3, 3].tolist())))
+
+
+#==============================================================================
+# strike statistics
+#==============================================================================
+class TestStrike(fixtures.TempDirTestCase):
+
+    def setUp(self):
+        super(TestStrike, self).setUp()
+
+        # 2-D stations with strike along x and induction arrows along x
+        self.period = np.logspace(-2, 2, 9)
+        self.z_array = np.zeros((4, 9, 2, 2), dtype='complex')
+        self.z_array[:, :, 0, 1] = 10*(1+1j)
+        self.z_array[:, :, 1, 0] = -3*(1+2j)
+        self.tipper_array = np.zeros((4, 9, 1, 2), dtype='complex')
+        self.tipper_array[:, :, 0, 0] = .2+.1j
+        self.tipper_array[3] = 0
+
+    def test_strike(self):
+        strike_obj = strike.StrikeStatistics(z_array=self.z_array,
+                                             tipper_array=self.tipper_array,
+                                             period=self.period)
+        s_array = strike_obj.strike_array
+        self.assertEqual(s_array.shape, (9, 4))
+        self.assertTrue(np.allclose(s_array['inv'], 90))
+        self.assertTrue(np.allclose(s_array['pt'], 90))
+        self.assertTrue(np.allclose(s_array['tip'][:, 0:3], 0))
+        self.assertTrue(np.all(np.isnan(s_array['tip'][:, 3])))
+
+        band_list = [(10**bb, 10**(bb+1))
+                     for bb in strike_obj.get_decade_list()]
+        self.assertEqual(len(band_list), 4)
+        bin_edges, hist_dict = strike_obj.get_histograms(band_list)
+        self.assertEqual(hist_dict['pt'].shape, (4, 72))
+        self.assertTrue(np.all(hist_dict['pt'].sum(axis=1) == 4))
+        self.assertTrue(np.all(hist_dict['tip'].sum(axis=1) == 3))
+
+        stat_array = strike_obj.get_statistics(band_list)
+        self.assertTrue(np.allclose(stat_array['inv_median'], 0))
+        self.assertTrue(np.allclose(stat_array['pt_mode'], 0))
+        self.assertTrue(np.allclose(stat_array['tip_mean'], 90))
+        self.assertTrue(np.all(stat_array['tip_count'] == 3))
+
+        csv_fn = strike_obj.write_strike_table(os.path.join(self.save_path,
+                                                            'strike.csv'))
+        with open(csv_fn) as fid:
+            lines = fid.readlines()
+        self.assertEqual(len(lines), 37)
+        self.assertEqual(lines[-1].strip().split(',')[2:], ['0.00', '0.00',
+                                                            ''])
+
+    def test_match_periods(self):
+        period_list = np.logspace(-2, 2, 9)
+        period = np.array([.0101, .0317, 1.2, 99.])
+        index, list_index = strike.match_periods(period, period_list)
+        self.assertEqual(index.tolist(), [0, 1, 3])
+        self.assertEqual(list_index.tolist(), [0, 1, 8])
+
+
+#==============================================================================
+# distortion
+#==============================================================================
+class TestDistortion(fixtures.QuietTestCase):
+
+    def setUp(self):
+        super(TestDistortion, self).setUp()
+
+        # 1-D stations distorted by a tensor with det(D) = 1
+        self.dis = np.array([[1.25, .5], [.5, 1.]])
+        self.z0 = np.zeros((3, 10, 2, 2), dtype='complex')
+        self.z0[:, :, 0, 1] = np.linspace(1, 5, 10)*(1+1j)
+        self.z0[:, :, 1, 0] = -self.z0[:, :, 0, 1]
+        self.z_array = np.einsum('ij,sfjk->sfik', self.dis, self.z0)
+        self.z_err = np.abs(self.z_array)*.05+.01
+        # last station has fewer frequencies
+        self.z_array[2, 7:] = np.nan
+
+    def test_find_distortion_survey(self):
+        dis, diserr = distortion.find_distortion_survey(self.z_array,
+                                                        self.z_err)
+        self.assertEqual(dis.shape, (3, 2, 2))
+        self.assertTrue(np.allclose(dis, self.dis))
+        self.assertTrue(np.all(diserr > 0))
+
+        z_obj = mtz.Z(z_array=self.z_array[0], zerr_array=self.z_err[0],
+                      freq=np.logspace(-2, 2, 10))
+        dis_0, diserr_0 = distortion.find_distortion(z_obj)
+        self.assertTrue(np.allclose(dis_0, dis[0]))
+        self.assertTrue(np.allclose(diserr_0, diserr[0]))
+
+    def test_remove_distortion_survey(self):
+        dis, zd, zd_err = distortion.remove_distortion_survey(self.z_array,
+                                                              self.z_err)
+        self.assertTrue(np.allclose(zd[0:2], self.z0[0:2]))
+        self.assertTrue(np.allclose(zd[2, 0:7], self.z0[2, 0:7]))
+        self.assertTrue(np.all(zd_err[0:2] > 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+"""
+Import time benchmark
+
+    * times the cold start of mtpy modules, each import is done in a new
+      interpreter so nothing is cached in sys.modules
+    * reports which of the heavy optional packages (matplotlib, scipy,
+      pyproj, gdal) each import pulled in
+
+Batch workers and command line tools start many short lived processes, so
+the time it takes to import the core, analysis and modeling modules is paid
+for every file.  Plotting, scipy and pyproj should only be loaded when they
+are used, see mtpy.utils.lazyimport.
+
+:Example: ::
+
+    python benchmark_imports.py
+    python benchmark_imports.py -n 10 mtpy.core.mt mtpy.modeling.modem_new
+
+"""
+
+#==============================================================================
+
+import os
+import sys
+import subprocess
+import numpy as np
+
+#==============================================================================
+# modules to time by default
+module_list = ['mtpy.core.z',
+               'mtpy.core.edi',
+               'mtpy.core.mt',
+               'mtpy.analysis.pt',
+               'mtpy.analysis.geometry',
+               'mtpy.analysis.niblettbostick',
+               'mtpy.modeling.forward1d',
+               'mtpy.modeling.ws3dinv',
+               'mtpy.modeling.modem_new']
+
+# packages that should not be loaded by importing core modules
+heavy_list = ['matplotlib', 'scipy', 'pyproj', 'osgeo']
+
+_timer_code = """
+import sys, time
+st = time.time()
+import {0}
+et = time.time()
+print repr((et-st, [hh for hh in {1} if hh in sys.modules]))
+"""
+
+#==============================================================================
+def time_import(module_name, n_repeat=5):
+    """
+    time importing module_name in a new interpreter n_repeat times
+
+    Arguments
+    -------------
+        **module_name** : full name of the module to import
+
+        **n_repeat** : number of times to import, *default* is 5
+
+    Returns
+    ------------
+        **import_dict** : dictionary with keys
+                          * module --> module name
+                          * median --> median import time in s
+                          * min --> minimum import time in s
+                          * max --> maximum import time in s
+                          * loaded --> list of heavy packages that were
+                                       imported with the module
+    """
+
+    code = _timer_code.format(module_name, heavy_list)
+    env = dict(os.environ)
+    package_path = os.path.dirname(os.path.dirname(os.path.dirname(
+                                   os.path.abspath(__file__))))
+    env['PYTHONPATH'] = os.pathsep.join([package_path,
+                                         env.get('PYTHONPATH', '')])
+
+    time_list = []
+    loaded = []
+    for ii in range(n_repeat):
+        proc = subprocess.Popen([sys.executable, '-c', code], env=env,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+        stdout, stderr = proc.communicate()
+        if proc.returncode != 0:
+            raise ImportError('Could not import {0}:\n{1}'.format(module_name,
+                                                                  stderr))
+        # the module might print on import, the timing is the last line
+        import_time, loaded = eval(stdout.strip().split('\n')[-1])
+        time_list.append(import_time)
+
+    return {'module':module_name,
+            'median':np.median(time_list),
+            'min':np.min(time_list),
+            'max':np.max(time_list),
+            'loaded':loaded}
+
+def benchmark_imports(module_names=None, n_repeat=5):
+    """
+    time the cold start import of each module in module_names
+
+    Returns a list of dictionaries from time_import
+    """
+
+    if module_names is None:
+        module_names = module_list
+
+    return [time_import(module_name, n_repeat=n_repeat)
+            for module_name in module_names]
+
+def print_benchmark(import_list):
+    """
+    print a table of import times
+    """
+
+    print '-'*78
+    print '{0:<32}{1:>10}{2:>10}{3:>10}   {4}'.format('module', 'median',
+                                                     'min', 'max', 'loaded')
+    print '-'*78
+    for import_dict in import_list:
+        print '{0:<32}{1:>9.3f}s{2:>9.3f}s{3:>9.3f}s   {4}'.format(
+                                        import_dict['module'],
+                                        import_dict['median'],
+                                        import_dict['min'],
+                                        import_dict['max'],
+                                        ', '.join(import_dict['loaded']))
+    print '-'*78
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='time cold start imports '+
+                                     'of mtpy modules')
+    parser.add_argument('modules', nargs='*', default=None,
+                        help='modules to import, default is core, analysis '+
+                             'and modeling modules')
+    parser.add_argument('-n', '--n_repeat', type=int, default=5,
+                        help='number of imports per module')
+    args = parser.parse_args()
+
+    module_names = args.modules
+    if len(module_names) == 0:
+        module_names = None
+    print_benchmark(benchmark_imports(module_names, n_repeat=args.n_repeat))
+
+if __name__ == '__main__':
+    main()
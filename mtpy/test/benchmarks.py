@@ -0,0 +1,1034 @@
+#!/usr/bin/env python
+"""
+Benchmarks for the core MT hot paths
+
+    * every case makes its own synthetic input, no data files are needed
+    * each case is run at a small, medium and large size
+    * wall time (min, median, max over the repeats) and peak memory above
+      the resident size before the run are recorded
+    * results are saved as json together with the commit, python and numpy
+      versions so runs can be compared later
+    * compare flags cases that got slower or use more memory than a
+      threshold and exits with 1 so it can be used in a build
+
+=================== ===========================================================
+Case                Times
+=================== ===========================================================
+edi_read            mtpy.core.edi.Edi.readfile, n frequencies
+edi_write           mtpy.core.edi.Edi.writefile, n frequencies
+edi_merge           mtpy.core.edimerge.merge_edi_files, n stations with an
+                    AMT, broadband and long period edi file, one process
+z_res_phase         mtpy.core.z.Z resistivity and phase, n frequencies
+z_rotate            mtpy.core.z.Z.rotate, n frequencies
+z_invariants        mtpy.core.z.Z.invariants, n frequencies
+zinvariants         mtpy.analysis.zinvariants.Zinvariants, n frequencies
+pt_z2pt             mtpy.analysis.pt.z2pt for each of n frequencies
+pt_phase_tensor     mtpy.analysis.pt.PhaseTensor from a Z object
+mt_interpolate      mtpy.core.mt.MT.interpolate, n frequencies
+modem_write_data    modem_new.Data.write_data_file, n stations x 30 periods
+modem_read_data     modem_new.Data.read_data_file, n stations x 30 periods
+modem_data_lines    modem_new.Data._get_data_lines for each inversion mode,
+                    n stations x 40 periods
+modem_read_model    modem_new.Model.read_model_file, n x n x n cells
+model_export        mtpy.utils.modelexport, read a ModEM model of n x n x n
+                    cells and write the cell centres as points to .npy
+z3d_read            mtpy.usgs.zen.Zen3D.read_z3d, n seconds at 256 Hz
+ts_read             mtpy.utils.filehandling.read_ts_file, n samples
+tf_stft             mtpy.processing.tf.stft, n samples
+degapper            mtpy.processing.trace.degapper, n 10 minute chunks at
+                    1 Hz with 2 sample gaps
+filter_traces       mtpy.processing.trace.filter_traces, highpass, lowpass and
+                    downsample from 100 to 1 Hz of n channels of 2**16 samples
+trace_peaks         mtpy.processing.trace.Trace.peaks with and without deadtime
+                    on n samples of log-normal noise at 100 Hz
+period_bins         mtpy.utils.merge_periods regular_periods and
+                    merge_periods of n periods, get_common_periods of n/50
+                    stations with 50 periods each
+coherence_table     mtpy.processing.coherence.get_coherence_table, 5 channels
+                    of n samples at 256 Hz in windows of 4096
+grid_data           mtpy.imaging.mtplottools.grid_data, 8 quantities at n
+                    scattered points onto a 200 x 200 grid
+plot_pt_map         mtpy.imaging.plotptmaps, n stations with tipper, draw
+                    and save as png
+plot_pt_pseudosection  mtpy.imaging.plotptpseudosection, n stations x 40 
+                    periods with tipper, draw and save as png
+=================== ===========================================================
+
+Cases that can not be imported on this machine (Zen3D needs win32api,
+trace needs pyrocko) are recorded as skipped.
+
+Peak memory is sampled from /proc/self/statm in a background thread, where
+that is not available the increase in ru_maxrss is used, which only shows
+memory above the previous peak of the process.
+
+:Example: ::
+
+    python benchmarks.py list
+    python benchmarks.py run -o before.json
+    python benchmarks.py run -o after.json -s small medium large
+    python benchmarks.py run -o edi.json -c edi_read edi_write -n 10
+    python benchmarks.py compare before.json after.json -t 0.2
+
+"""
+
+#==============================================================================
+
+import os
+import sys
+import gc
+import time
+import json
+import shutil
+import platform
+import tempfile
+import subprocess
+import numpy as np
+import mtpy.utils.timing as timing
+
+#==============================================================================
+size_names = ['small', 'medium', 'large']
+
+_mb = 1024.**2
+
+#==============================================================================
+# synthetic data
+#==============================================================================
+def make_z_array(n_freq, seed=0, freq_range=(3, -3)):
+    """
+    make a random impedance tensor with a dominant off diagonal and a tipper
+
+    Returns
+    ------------
+        **freq** : np.ndarray(n_freq), decreasing from 10**freq_range[0] to
+                   10**freq_range[1] Hz, *default* 1000 to 0.001 Hz
+
+        **z_array** : np.ndarray(n_freq, 2, 2, dtype=complex)
+
+        **z_err** : np.ndarray(n_freq, 2, 2)
+
+        **tipper_array** : np.ndarray(n_freq, 1, 2, dtype=complex)
+
+        **tipper_err** : np.ndarray(n_freq, 1, 2)
+    """
+
+    np.random.seed(seed)
+    freq = np.logspace(freq_range[0], freq_range[1], n_freq)
+    z_array = np.random.randn(n_freq, 2, 2)+1j*np.random.randn(n_freq, 2, 2)
+    z_array[:, 0, 1] += 10*(1+1j)
+    z_array[:, 1, 0] -= 10*(1+1j)
+    z_err = abs(z_array)*np.random.uniform(.01, .1, (n_freq, 2, 2))
+    tipper_array = .2*(np.random.randn(n_freq, 1, 2)+
+                       1j*np.random.randn(n_freq, 1, 2))
+    tipper_err = np.random.uniform(.01, .05, (n_freq, 1, 2))
+
+    return freq, z_array, z_err, tipper_array, tipper_err
+
+def write_edi_file(edi_fn, n_freq, seed=0, freq_range=(3, -3)):
+    """
+    write an .edi file with n_freq random frequencies, see make_z_array
+    """
+
+    freq, z_array, z_err, t_array, t_err = make_z_array(n_freq, seed=seed,
+                                                        freq_range=freq_range)
+
+    def block(key, values):
+        lines = ['>{0} // {1}\n'.format(key, n_freq)]
+        for ii in range(0, n_freq, 6):
+            lines.append(''.join(['{0:>16.7E}'.format(value)
+                                  for value in values[ii:ii+6]])+'\n')
+        return lines
+
+    elines = ['>HEAD\n',
+              '   DATAID="SYN01"\n',
+              '   ACQBY="mtpy benchmark"\n',
+              '   LAT=-30.205755\n',
+              '   LONG=139.68754\n',
+              '   ELEV=45\n',
+              '\n',
+              '>INFO   MAX LINES=1000\n',
+              '   synthetic data\n',
+              '\n',
+              '>=DEFINEMEAS\n',
+              '   MAXCHAN=5\n',
+              '   MAXRUN=999\n',
+              '   MAXMEAS=99999\n',
+              '   UNITS=M\n',
+              '   REFTYPE=CART\n',
+              '   REFLAT=-30.205755\n',
+              '   REFLONG=139.68754\n',
+              '   REFELEV=45\n',
+              '\n',
+              '>HMEAS ID=1001.001 CHTYPE=HX X=0 Y=0 AZM=0\n',
+              '>HMEAS ID=1002.001 CHTYPE=HY X=0 Y=0 AZM=90\n',
+              '>HMEAS ID=1003.001 CHTYPE=HZ X=0 Y=0 AZM=0\n',
+              '>EMEAS ID=1004.001 CHTYPE=EX X=0 Y=0 X2=50 Y2=0\n',
+              '>EMEAS ID=1005.001 CHTYPE=EY X=0 Y=0 X2=0 Y2=50\n',
+              '\n',
+              '>=MTSECT\n',
+              '   SECTID=SYN01\n',
+              '   NFREQ={0}\n'.format(n_freq),
+              '   HX=1001.001\n',
+              '   HY=1002.001\n',
+              '   HZ=1003.001\n',
+              '   EX=1004.001\n',
+              '   EY=1005.001\n',
+              '\n',
+              '>!****FREQUENCIES****!\n']
+    elines += block('FREQ   NFREQ={0}   ORDER=DEC  '.format(n_freq), freq)
+    elines.append('>!****IMPEDANCES****!\n')
+    for ii, c1 in enumerate('XY'):
+        for jj, c2 in enumerate('XY'):
+            comp = 'Z{0}{1}'.format(c1, c2)
+            elines += block(comp+'R', z_array[:, ii, jj].real)
+            elines += block(comp+'I', z_array[:, ii, jj].imag)
+            elines += block(comp+'.VAR', z_err[:, ii, jj]**2)
+    elines.append('>!****TIPPER****!\n')
+    for jj, comp in enumerate(['TX', 'TY']):
+        elines += block(comp+'R', t_array[:, 0, jj].real)
+        elines += block(comp+'I', t_array[:, 0, jj].imag)
+        elines += block(comp+'.VAR', t_err[:, 0, jj]**2)
+    elines.append('>END\n')
+
+    with open(edi_fn, 'w') as fid:
+        fid.writelines(elines)
+
+    return edi_fn
+
+def write_z3d_file(z3d_fn, n_seconds, ad_rate=256, seed=0, component='EX',
+                   station=1):
+    """
+    write a Zen .Z3D file with a 512 byte header, 512 byte schedule, one
+    metadata record and n_seconds of int32 data, each second starts with a
+    64 byte gps stamp.  The first 3 seconds are skipped by read_z3d.
+    """
+
+    np.random.seed(seed)
+    gps_dtype = np.dtype([('flag0', np.int32),
+                          ('flag1', np.int32),
+                          ('time', np.int32),
+                          ('lat', np.float64),
+                          ('lon', np.float64),
+                          ('num_sat', np.int32),
+                          ('gps_sens', np.int32),
+                          ('temperature', np.float32),
+                          ('voltage', np.float32),
+                          ('num_fpga', np.int32),
+                          ('num_adc', np.int32),
+                          ('pps_count', np.int32),
+                          ('dac_tune', np.int32),
+                          ('block_len', np.int32)])
+    n_stamp = gps_dtype.itemsize/4
+
+    header = '\n'.join(['GPS Brd339 Logfile',
+                        'Version = 3086',
+                        'Main.hex Buildnum = 4990',
+                        'ChannelSerial = 0xD474777C',
+                        'Fpga Buildnum = 1125',
+                        'Box Serial = 0x0000010000A1E2D3',
+                        'Box number = 24',
+                        'Channel = 1',
+                        'A/D Gain = 1',
+                        'A/D Rate = {0}'.format(ad_rate),
+                        'Period = 4294967295',
+                        'Duty = 32767',
+                        'LOG Terminal = N',
+                        'Tx.Freq = 0',
+                        'Tx.Duty = 0',
+                        'Lat = -0.52717',
+                        'Long = 2.43791',
+                        'Alt = 45.0',
+                        'NumSats = 9',
+                        'GpsWeek = 1845',
+                        'AttenChannelsMask = 0x80',
+                        ''])
+    schedule = '\n'.join(['\n\nSchedule.Date = 2015-05-22',
+                          'Schedule.Time = 08:00:00',
+                          'Schedule.Sync = Y',
+                          'Schedule.NewFile = Y',
+                          'Schedule.S/R = {0}'.format(ad_rate),
+                          'Schedule.Gain = 1',
+                          'Schedule.Log = Y',
+                          ''])
+    metadata = '\n'.join(['\n\n\nGPS Brd339 Metadata Record',
+                          '|CH.CMP={0}|CH.NUMBER=1|CH.LENGTH=50|'.format(
+                                                                 component)+\
+                          'CH.AZIMUTH=0|LINE.NAME=synthetic|'+\
+                          'RX.XYZ0={0}:0:0|'.format(station),
+                          ''])
+
+    # one row per second, gps stamp then ad_rate samples
+    data = np.random.randint(1, 2**20, size=(n_seconds, n_stamp+ad_rate))
+    data = data.astype(np.int32)
+    stamps = np.zeros(n_seconds, dtype=gps_dtype)
+    stamps['flag0'] = 2147483647
+    stamps['flag1'] = -2147483648
+    # gps time is in 1/1024 s from the start of the gps week
+    stamps['time'] = (5*86400+8*3600+np.arange(n_seconds))*1024
+    stamps['num_sat'] = 9
+    stamps['block_len'] = ad_rate
+    data[:, :n_stamp] = stamps.view(np.int32).reshape(n_seconds, n_stamp)
+
+    with open(z3d_fn, 'wb') as fid:
+        fid.write(header.ljust(512, '\x00'))
+        fid.write(schedule.ljust(512, '\x00'))
+        fid.write(metadata.ljust(512, '\x00'))
+        fid.write(data.tostring())
+
+    return z3d_fn
+
+def write_ts_file(ts_fn, n_samples, seed=0):
+    """
+    write an mtpy time series file with n_samples
+    """
+
+    np.random.seed(seed)
+    ts_lines = ['# SYN01 ex 256.0 0.0 {0} mV -30.2058 139.6875 45.0\n'.format(
+                n_samples)]
+    ts_lines += ['{0:.8e}\n'.format(value)
+                 for value in np.random.randn(n_samples)]
+    with open(ts_fn, 'w') as fid:
+        fid.writelines(ts_lines)
+
+    return ts_fn
+
+#==============================================================================
+# cases, each setup makes the input for size n and returns the function to
+# time, it is called with no arguments
+#==============================================================================
+def _setup_edi_read(n, save_path):
+    import mtpy.core.edi as MTedi
+
+    edi_fn = write_edi_file(os.path.join(save_path, 'SYN01.edi'), n)
+
+    return lambda: MTedi.Edi(edi_fn)
+
+def _setup_edi_write(n, save_path):
+    import mtpy.core.edi as MTedi
+
+    edi_obj = MTedi.Edi(write_edi_file(os.path.join(save_path, 'SYN01.edi'),
+                                       n))
+    new_fn = os.path.join(save_path, 'SYN01_write.edi')
+
+    return lambda: edi_obj.writefile(new_fn, allow_overwrite=True)
+
+def _setup_edi_merge(n, save_path):
+    import mtpy.core.edimerge as edimerge
+
+    station_dict = {}
+    for ii in range(n):
+        station = 'mt{0:03}'.format(ii)
+        station_dict[station] = [write_edi_file(os.path.join(save_path,
+                                                '{0}_{1}.edi'.format(station,
+                                                                     band)),
+                                                n_freq, seed=ii,
+                                                freq_range=freq_range)
+                                 for band, n_freq, freq_range in
+                                 [('amt', 40, (4.5, 1)),
+                                  ('bb', 60, (3, -2)),
+                                  ('lp', 40, (0, -4))]]
+    merge_path = os.path.join(save_path, 'merged')
+
+    return lambda: edimerge.merge_edi_files(station_dict, merge_path,
+                                            merge_method='error',
+                                            n_processes=1)
+
+def _get_z_object(n):
+    import mtpy.core.z as MTz
+
+    freq, z_array, z_err = make_z_array(n)[0:3]
+
+    return MTz.Z(z_array=z_array, zerr_array=z_err, freq=freq)
+
+def _setup_z_res_phase(n, save_path):
+    z_obj = _get_z_object(n)
+
+    return z_obj._compute_res_phase
+
+def _setup_z_rotate(n, save_path):
+    z_obj = _get_z_object(n)
+
+    return lambda: z_obj.rotate(30.)
+
+def _setup_z_invariants(n, save_path):
+    z_obj = _get_z_object(n)
+
+    return lambda: z_obj.invariants
+
+def _setup_zinvariants(n, save_path):
+    import mtpy.analysis.zinvariants as MTinv
+
+    z_obj = _get_z_object(n)
+
+    return lambda: MTinv.Zinvariants(z_object=z_obj)
+
+def _setup_pt_z2pt(n, save_path):
+    import mtpy.analysis.pt as MTpt
+
+    freq, z_array, z_err = make_z_array(n)[0:3]
+
+    # z2pt only propagates errors for a single 2x2 tensor
+    return lambda: [MTpt.z2pt(z_array[ii], zerr_array=z_err[ii])
+                    for ii in range(n)]
+
+def _setup_pt_phase_tensor(n, save_path):
+    import mtpy.analysis.pt as MTpt
+
+    z_obj = _get_z_object(n)
+
+    return lambda: MTpt.PhaseTensor(z_object=z_obj)
+
+def _setup_mt_interpolate(n, save_path):
+    import mtpy.core.mt as mt
+    import mtpy.core.z as MTz
+
+    freq, z_array, z_err, t_array, t_err = make_z_array(n)
+    mt_obj = mt.MT(z_object=MTz.Z(z_array=z_array, zerr_array=z_err,
+                                  freq=freq),
+                   tipper_object=MTz.Tipper(tipper_array=t_array,
+                                            tippererr_array=t_err,
+                                            freq=freq))
+    new_freq = np.logspace(2.9, -2.9, n/2)
+
+    return lambda: mt_obj.interpolate(new_freq)
+
+def _get_modem_data(n, save_path):
+    import mtpy.test.modeling as test_modeling
+
+    m_data = test_modeling.make_modem_data(n, 30)
+    m_data.write_data_file(save_path=save_path, fill=False,
+                           compute_error=False)
+
+    return m_data
+
+def _setup_modem_write_data(n, save_path):
+    m_data = _get_modem_data(n, save_path)
+
+    return lambda: m_data.write_data_file(save_path=save_path, fill=False,
+                                          compute_error=False)
+
+def _setup_modem_read_data(n, save_path):
+    import mtpy.modeling.modem_new as modem
+
+    data_fn = _get_modem_data(n, save_path).data_fn
+
+    return lambda: modem.Data().read_data_file(data_fn)
+
+def _setup_modem_data_lines(n, save_path):
+    import mtpy.test.modeling as test_modeling
+
+    m_data = test_modeling.make_modem_data(n, 40)
+
+    def format_lines():
+        for inv_mode in m_data.inv_mode_dict[m_data.inv_mode]:
+            m_data._get_data_lines(inv_mode)
+
+    return format_lines
+
+def _setup_modem_read_model(n, save_path):
+    import mtpy.modeling.modem_new as modem
+
+    np.random.seed(0)
+    m_model = modem.Model()
+    m_model.nodes_north = np.random.uniform(100, 1000, n)
+    m_model.nodes_east = np.random.uniform(100, 1000, n)
+    m_model.nodes_z = np.random.uniform(10, 1000, n)
+    m_model.res_model = 10**np.random.uniform(-1, 4, (n, n, n))
+    m_model.write_model_file(save_path=save_path)
+    model_fn = m_model.model_fn
+
+    return lambda: modem.Model().read_model_file(model_fn)
+
+def _setup_model_export(n, save_path):
+    import mtpy.modeling.modem_new as modem
+    import mtpy.utils.modelexport as modelexport
+
+    np.random.seed(0)
+    m_model = modem.Model()
+    m_model.nodes_north = np.random.uniform(100, 1000, n)
+    m_model.nodes_east = np.random.uniform(100, 1000, n)
+    m_model.nodes_z = np.random.uniform(10, 1000, n)
+    m_model.res_model = 10**np.random.uniform(-1, 4, (n, n, n))
+    m_model.write_model_file(save_path=save_path)
+    model_fn = m_model.model_fn
+    point_fn = os.path.join(save_path, 'model_points')
+
+    def export_model():
+        # evtk is not always installed, so time everything up to it
+        model_dict = modelexport.read_model_file(model_fn)
+        modelexport.write_point_file(point_fn,
+                    modelexport.get_cell_centers(model_dict['nodes_north']),
+                    modelexport.get_cell_centers(model_dict['nodes_east']),
+                    modelexport.get_cell_centers(model_dict['nodes_z']),
+                    model_dict['res_model'], file_format='npy')
+
+    return export_model
+
+def _setup_z3d_read(n, save_path):
+    import mtpy.usgs.zen as zen
+
+    z3d_fn = write_z3d_file(os.path.join(save_path,
+                                         'syn01_20150522_080000_256_EX.Z3D'),
+                            n)
+
+    return lambda: zen.Zen3D(z3d_fn).read_z3d()
+
+def _setup_ts_read(n, save_path):
+    import mtpy.utils.filehandling as MTfh
+
+    ts_fn = write_ts_file(os.path.join(save_path, 'SYN01.ex'), n)
+
+    return lambda: MTfh.read_ts_file(ts_fn)
+
+def _setup_tf_stft(n, save_path):
+    import mtpy.processing.tf as tf
+
+    np.random.seed(0)
+    t_arr = np.arange(n)/256.
+    fx = np.sin(2*np.pi*8*t_arr)+np.random.randn(n)
+
+    return lambda: tf.stft(fx, nh=2**8, tstep=2**7, ng=1, df=256.,
+                           nfbins=2**10)
+
+def _setup_degapper(n, save_path):
+    import mtpy.processing.trace as trace
+
+    np.random.seed(0)
+    y_list = [np.random.randn(600) for ii in range(n)]
+
+    def degap():
+        # degapper changes the first trace, so make new ones each time
+        trace_list = [trace.Trace(station='mt01', channel='ex',
+                                  tmin=ii*602., deltat=1., ydata=y_list[ii])
+                      for ii in range(n)]
+        trace.degapper(trace_list)
+
+    return degap
+
+def _setup_filter_traces(n, save_path):
+    import mtpy.processing.trace as trace
+
+    np.random.seed(0)
+    trace_list = [trace.Trace(station='mt01', channel='ch{0:03}'.format(ii),
+                              deltat=.01, ydata=np.random.randn(2**16))
+                  for ii in range(n)]
+    steps = [('highpass', 4, .01), ('lowpass', 4, 20.),
+             ('downsample_to', 1.)]
+
+    return lambda: trace.filter_traces(trace_list, steps)
+
+def _setup_trace_peaks(n, save_path):
+    import mtpy.processing.trace as trace
+
+    np.random.seed(0)
+    tr = trace.Trace(station='mt01', channel='ex', deltat=.01,
+                     ydata=np.exp(.7*np.random.randn(n)))
+
+    def peaks():
+        tr.peaks(1.5, .5)
+        tr.peaks(1.5, .5, deadtime=True)
+
+    return peaks
+
+def _setup_period_bins(n, save_path):
+    import mtpy.utils.merge_periods as merge_periods
+
+    np.random.seed(0)
+    periods = 10**np.random.uniform(-4, 4, n)
+    period_dict = dict([('mt{0:04}'.format(ii), periods[ii*50:(ii+1)*50])
+                        for ii in range(n//50)])
+
+    def bin_periods():
+        merge_periods.regular_periods(periods, 15, no_periods=40)
+        merge_periods.merge_periods(periods, 5)
+        merge_periods.get_common_periods(period_dict, no_periods=40)
+
+    return bin_periods
+
+def _setup_coherence_table(n, save_path):
+    import mtpy.processing.coherence as coherence
+
+    np.random.seed(0)
+    data_array = np.random.randn(5, n)
+    channel_list = ['ex', 'ey', 'hx', 'hy', 'hz']
+
+    return lambda: coherence.get_coherence_table(data_array, channel_list,
+                                                 256., 4096)
+
+def _setup_grid_data(n, save_path):
+    import mtpy.imaging.mtplottools as mtpl
+
+    np.random.seed(0)
+    x = np.random.rand(n)
+    y = np.random.rand(n)
+    data_array = np.random.rand(n, 8)
+
+    def grid_components():
+        # triangulate once, then grid resistivity and phase of 4 components
+        mtpl.clear_grid_cache()
+        for ii in range(8):
+            mtpl.grid_data(data_array[:, ii], x, y, nx=200, ny=200)
+
+    return grid_components
+
+def _get_mtplot_list(n_station, n_freq):
+    import mtpy.core.z as MTz
+    import mtpy.imaging.mtplottools as mtpl
+
+    mt_list = []
+    for ss in range(n_station):
+        freq, z_array, z_err, tipper, tipper_err = make_z_array(n_freq,
+                                                                seed=ss)
+        # setting the tipper through the property computes the arrows
+        tipper_obj = MTz.Tipper(freq=freq)
+        tipper_obj.tipper = tipper
+        tipper_obj.tippererr = tipper_err
+        mt_list.append(mtpl.MTplot(z_object=MTz.Z(z_array=z_array,
+                                                  zerr_array=z_err,
+                                                  freq=freq),
+                                   tipper_object=tipper_obj,
+                                   station='SYN{0:04}'.format(ss),
+                                   lat=-30.+.01*(ss//50),
+                                   lon=139.+.01*(ss%50),
+                                   freq=freq))
+
+    return mt_list
+
+def _setup_plot_pt_map(n, save_path):
+    import matplotlib.pyplot as plt
+    import mtpy.imaging.plotptmaps as plotptmaps
+
+    plt.switch_backend('agg')
+    mt_list = _get_mtplot_list(n, 25)
+    fig_fn = os.path.join(save_path, 'pt_map.png')
+
+    def plot_map():
+        ptm = plotptmaps.PlotPhaseTensorMaps(mt_object_list=mt_list,
+                                             plot_freq=1.,
+                                             plot_tipper='yri',
+                                             plot_yn='n')
+        ptm.plot()
+        ptm.fig.savefig(fig_fn, dpi=100)
+        plt.close(ptm.fig)
+
+    return plot_map
+
+def _setup_plot_pt_pseudosection(n, save_path):
+    import matplotlib.pyplot as plt
+    import mtpy.imaging.plotptpseudosection as plotptpseudosection
+
+    plt.switch_backend('agg')
+    mt_list = _get_mtplot_list(n, 40)
+    fig_fn = os.path.join(save_path, 'pt_pseudosection.png')
+
+    def plot_pseudosection():
+        ptps = plotptpseudosection.PlotPhaseTensorPseudoSection(
+                                                     mt_object_list=mt_list,
+                                                     plot_tipper='yri',
+                                                     plot_yn='n')
+        ptps.plot()
+        ptps.fig.savefig(fig_fn, dpi=100)
+        plt.close(ptps.fig)
+
+    return plot_pseudosection
+
+# name, setup function, n for small/medium/large, description
+case_list = [
+    ('edi_read', _setup_edi_read, (50, 500, 5000), 'Edi.readfile'),
+    ('edi_write', _setup_edi_write, (50, 500, 5000), 'Edi.writefile'),
+    ('edi_merge', _setup_edi_merge, (5, 20, 100),
+     'edimerge.merge_edi_files 3 files'),
+    ('z_res_phase', _setup_z_res_phase, (100, 1000, 10000),
+     'Z resistivity and phase'),
+    ('z_rotate', _setup_z_rotate, (100, 1000, 10000), 'Z.rotate'),
+    ('z_invariants', _setup_z_invariants, (20, 100, 1000),
+     'Z.invariants'),
+    ('zinvariants', _setup_zinvariants, (100, 1000, 10000),
+     'Zinvariants'),
+    ('pt_z2pt', _setup_pt_z2pt, (100, 1000, 10000), 'pt.z2pt'),
+    ('pt_phase_tensor', _setup_pt_phase_tensor, (100, 1000, 10000),
+     'PhaseTensor from Z'),
+    ('mt_interpolate', _setup_mt_interpolate, (50, 500, 5000),
+     'MT.interpolate'),
+    ('modem_write_data', _setup_modem_write_data, (20, 100, 400),
+     'ModEM Data.write_data_file'),
+    ('modem_read_data', _setup_modem_read_data, (20, 100, 400),
+     'ModEM Data.read_data_file'),
+    ('modem_data_lines', _setup_modem_data_lines, (100, 1000, 4000),
+     'ModEM Data._get_data_lines'),
+    ('modem_read_model', _setup_modem_read_model, (20, 40, 80),
+     'ModEM Model.read_model_file'),
+    ('model_export', _setup_model_export, (20, 60, 150),
+     'modelexport read and npy export'),
+    ('z3d_read', _setup_z3d_read, (60, 600, 3600), 'Zen3D.read_z3d'),
+    ('ts_read', _setup_ts_read, (10000, 100000, 1000000),
+     'filehandling.read_ts_file'),
+    ('tf_stft', _setup_tf_stft, (2**12, 2**15, 2**18), 'tf.stft'),
+    ('degapper', _setup_degapper, (144, 1008, 4032),
+     'trace.degapper 10 minute chunks'),
+    ('filter_traces', _setup_filter_traces, (4, 32, 128),
+     'trace.filter_traces channels of 2**16 samples'),
+    ('trace_peaks', _setup_trace_peaks, (10**5, 10**6, 10**7),
+     'trace.Trace.peaks deadtime'),
+    ('period_bins', _setup_period_bins, (1000, 10000, 100000),
+     'merge_periods binning and clustering'),
+    ('coherence_table', _setup_coherence_table, (2**16, 2**20, 2**23),
+     'coherence.get_coherence_table'),
+    ('grid_data', _setup_grid_data, (100, 1000, 10000),
+     'mtplottools.grid_data 8 quantities'),
+    ('plot_pt_map', _setup_plot_pt_map, (100, 500, 2000),
+     'PlotPhaseTensorMaps plot and save'),
+    ('plot_pt_pseudosection', _setup_plot_pt_pseudosection, (20, 100, 1000),
+     'PlotPhaseTensorPseudoSection plot and save')]
+
+#==============================================================================
+# measuring
+#==============================================================================
+def _get_max_rss():
+    import resource
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on mac, kilobytes everywhere else
+    if sys.platform == 'darwin':
+        return max_rss
+    return max_rss*1024
+
+class _Quiet(object):
+    """
+    send anything printed to devnull, the readers print a lot
+    """
+
+    def __enter__(self):
+        self._stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+
+    def __exit__(self, *args):
+        sys.stdout.close()
+        sys.stdout = self._stdout
+
+def measure(func, n_repeat=5, warm_up=True):
+    """
+    call func n_repeat times, if warm_up is True func is called once before
+    that so modules that are imported on first use are not timed
+
+    Returns
+    ------------
+        **time_list** : list of wall times in seconds for each call
+
+        **peak_mb** : largest increase in memory during a call in MB
+    """
+
+    if warm_up:
+        func()
+
+    time_list = []
+    peak = 0
+    for ii in range(n_repeat):
+        gc.collect()
+        sampler = None
+        start_rss = timing.get_rss()
+        if start_rss is not None:
+            sampler = timing.MemorySampler()
+            sampler.start()
+        else:
+            start_rss = _get_max_rss()
+
+        st = time.time()
+        func()
+        time_list.append(time.time()-st)
+
+        if sampler is not None:
+            peak = max(peak, sampler.stop()-start_rss)
+        else:
+            peak = max(peak, _get_max_rss()-start_rss)
+
+    return time_list, peak/_mb
+
+def run_case(name, size='small', n_repeat=5):
+    """
+    set up and time one case at one size
+
+    Returns
+    ------------
+        **result** : dictionary with keys
+                     * case --> name of the case
+                     * size --> small, medium or large
+                     * n --> size of the input
+                     * description --> what is timed
+                     * time_min, time_median, time_max --> seconds
+                     * peak_mb --> peak memory above the start in MB
+                     * skipped --> None or why the case could not run
+    """
+
+    case_dict = dict([(case[0], case) for case in case_list])
+    if name not in case_dict:
+        raise KeyError('Unknown case {0}, use one of {1}'.format(name,
+                       ', '.join([case[0] for case in case_list])))
+    name, setup, n_list, description = case_dict[name]
+    n = n_list[size_names.index(size)]
+
+    result = {'case':name, 'size':size, 'n':n, 'description':description,
+              'time_min':None, 'time_median':None, 'time_max':None,
+              'peak_mb':None, 'skipped':None}
+
+    # time the code without the stage registry, even if MTPY_TIMING is set
+    timing_enabled = timing.registry.enabled
+    timing.disable()
+    save_path = tempfile.mkdtemp(prefix='mtpy_benchmark_')
+    try:
+        with _Quiet():
+            try:
+                func = setup(n, save_path)
+            except ImportError as error:
+                result['skipped'] = str(error)
+                return result
+            time_list, peak_mb = measure(func, n_repeat=n_repeat)
+    finally:
+        shutil.rmtree(save_path, ignore_errors=True)
+        timing.registry.enabled = timing_enabled
+
+    result['time_min'] = float(np.min(time_list))
+    result['time_median'] = float(np.median(time_list))
+    result['time_max'] = float(np.max(time_list))
+    result['peak_mb'] = float(peak_mb)
+
+    return result
+
+def get_run_info():
+    """
+    commit, date, python, numpy and platform for the results file
+    """
+
+    package_path = os.path.dirname(os.path.dirname(os.path.dirname(
+                                   os.path.abspath(__file__))))
+    try:
+        proc = subprocess.Popen(['git', 'rev-parse', 'HEAD'],
+                                cwd=package_path, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+        commit = proc.communicate()[0].strip() or None
+    except OSError:
+        commit = None
+
+    return {'commit':commit,
+            'date':time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python':platform.python_version(),
+            'numpy':np.__version__,
+            'platform':platform.platform(),
+            'machine':platform.machine()}
+
+def run_benchmarks(case_names=None, sizes=None, n_repeat=5, verbose=True):
+    """
+    run each case in case_names at each size in sizes
+
+    Arguments
+    -------------
+        **case_names** : list of case names, *default* is all cases
+
+        **sizes** : list of sizes from size_names, *default* is
+                    ['small', 'medium']
+
+        **n_repeat** : number of timed calls per case and size
+
+        **verbose** : [ True | False ] print each result as it finishes
+
+    Returns
+    ------------
+        **results** : dictionary with keys
+                      * info --> from get_run_info
+                      * results --> list of dictionaries from run_case
+    """
+
+    if case_names is None:
+        case_names = [case[0] for case in case_list]
+    if sizes is None:
+        sizes = ['small', 'medium']
+    for size in sizes:
+        if size not in size_names:
+            raise ValueError('Unknown size {0}, use one of {1}'.format(size,
+                             ', '.join(size_names)))
+
+    info = get_run_info()
+    info['n_repeat'] = n_repeat
+    results = {'info':info, 'results':[]}
+    if verbose:
+        print_header()
+    for name in case_names:
+        for size in sizes:
+            result = run_case(name, size=size, n_repeat=n_repeat)
+            results['results'].append(result)
+            if verbose:
+                print_result(result)
+    if verbose:
+        print '-'*78
+
+    return results
+
+#==============================================================================
+# results
+#==============================================================================
+def write_results(results, json_fn):
+    """
+    write results from run_benchmarks to a json file
+    """
+
+    with open(json_fn, 'w') as fid:
+        json.dump(results, fid, indent=1, sort_keys=True)
+
+    return json_fn
+
+def read_results(json_fn):
+    """
+    read results written by write_results
+    """
+
+    with open(json_fn, 'r') as fid:
+        return json.load(fid)
+
+def print_header():
+    print '-'*78
+    print '{0:<18}{1:<8}{2:>9}{3:>11}{4:>11}{5:>11}{6:>10}'.format('case',
+                     'size', 'n', 'min', 'median', 'max', 'peak')
+    print '-'*78
+
+def print_result(result):
+    if result['skipped'] is not None:
+        print '{0:<18}{1:<8}{2:>9}   skipped: {3}'.format(result['case'],
+                                                          result['size'],
+                                                          result['n'],
+                                                          result['skipped'])
+        return
+    print '{0:<18}{1:<8}{2:>9}{3:>10.4f}s{4:>10.4f}s{5:>10.4f}s{6:>7.1f} MB'.format(
+                result['case'], result['size'], result['n'],
+                result['time_min'], result['time_median'],
+                result['time_max'], result['peak_mb'])
+
+def compare_results(old_results, new_results, threshold=.2, min_time=.005,
+                    min_memory=1.0):
+    """
+    compare two sets of results case by case
+
+    Arguments
+    -------------
+        **old_results** : results dictionary or json file name
+
+        **new_results** : results dictionary or json file name
+
+        **threshold** : relative change that is flagged, *default* is .2,
+                        so 20 % slower or 20 % more memory is a regression
+
+        **min_time** : differences in time_min smaller than this many
+                       seconds are ignored as noise, *default* is .005
+
+        **min_memory** : differences in peak memory smaller than this many
+                         MB are ignored, *default* is 1.0
+
+    Returns
+    ------------
+        **compare_list** : list of dictionaries, one for each case and size
+                           in both results, with keys case, size, time_old,
+                           time_new, time_ratio, peak_old, peak_new,
+                           time_regression, memory_regression
+    """
+
+    if not isinstance(old_results, dict):
+        old_results = read_results(old_results)
+    if not isinstance(new_results, dict):
+        new_results = read_results(new_results)
+
+    old_dict = dict([((rr['case'], rr['size']), rr)
+                     for rr in old_results['results']
+                     if rr['skipped'] is None])
+
+    compare_list = []
+    for new in new_results['results']:
+        key = (new['case'], new['size'])
+        if new['skipped'] is not None or key not in old_dict:
+            continue
+        old = old_dict[key]
+
+        t_old, t_new = old['time_min'], new['time_min']
+        m_old, m_new = old['peak_mb'], new['peak_mb']
+        compare_list.append({'case':new['case'], 'size':new['size'],
+                             'time_old':t_old, 'time_new':t_new,
+                             'time_ratio':t_new/max(t_old, 1e-9),
+                             'peak_old':m_old, 'peak_new':m_new,
+                             'time_regression':(t_new > t_old*(1+threshold)
+                                                and t_new-t_old > min_time),
+                             'memory_regression':(m_new > m_old*(1+threshold)
+                                                  and m_new-m_old > min_memory)})
+
+    return compare_list
+
+def print_comparison(compare_list):
+    """
+    print a table of compare_results, regressions are marked with <--
+    """
+
+    print '-'*78
+    print '{0:<18}{1:<8}{2:>10}{3:>10}{4:>8}{5:>10}{6:>10}'.format('case',
+                     'size', 'old', 'new', 'ratio', 'old MB', 'new MB')
+    print '-'*78
+    for cc in compare_list:
+        flag = ''
+        if cc['time_regression']:
+            flag += ' <-- time'
+        if cc['memory_regression']:
+            flag += ' <-- memory'
+        print '{0:<18}{1:<8}{2:>9.4f}s{3:>9.4f}s{4:>8.2f}{5:>10.1f}{6:>10.1f}{7}'.format(
+                cc['case'], cc['size'], cc['time_old'], cc['time_new'],
+                cc['time_ratio'], cc['peak_old'], cc['peak_new'], flag)
+    print '-'*78
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='benchmark core mtpy '+
+                                     'readers, writers and transforms')
+    subparsers = parser.add_subparsers(dest='command')
+
+    subparsers.add_parser('list', help='list the cases and their sizes')
+
+    run_parser = subparsers.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('-o', '--output', default=None,
+                            help='json file to save the results to')
+    run_parser.add_argument('-c', '--cases', nargs='+', default=None,
+                            help='cases to run, default is all')
+    run_parser.add_argument('-s', '--sizes', nargs='+', default=None,
+                            choices=size_names,
+                            help='sizes to run, default is small medium')
+    run_parser.add_argument('-n', '--n_repeat', type=int, default=5,
+                            help='number of timed calls per case')
+
+    compare_parser = subparsers.add_parser('compare',
+                                           help='compare two results files')
+    compare_parser.add_argument('old', help='json file of the reference run')
+    compare_parser.add_argument('new', help='json file of the new run')
+    compare_parser.add_argument('-t', '--threshold', type=float, default=.2,
+                                help='relative change flagged as regression')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for name, setup, n_list, description in case_list:
+            print '{0:<18}{1:<30}n = {2}'.format(name, description,
+                                  ', '.join([str(nn) for nn in n_list]))
+
+    elif args.command == 'run':
+        results = run_benchmarks(case_names=args.cases, sizes=args.sizes,
+                                 n_repeat=args.n_repeat)
+        if args.output is not None:
+            write_results(results, args.output)
+            print 'Wrote results to {0}'.format(args.output)
+
+    elif args.command == 'compare':
+        compare_list = compare_results(args.old, args.new,
+                                       threshold=args.threshold)
+        print_comparison(compare_list)
+        n_bad = len([cc for cc in compare_list
+                     if cc['time_regression'] or cc['memory_regression']])
+        if n_bad > 0:
+            print '{0} regressions above {1:.0%}'.format(n_bad,
+                                                         args.threshold)
+            sys.exit(1)
+        print 'No regressions above {0:.0%}'.format(args.threshold)
+
+if __name__ == '__main__':
+    main()
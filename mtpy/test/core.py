@@ -0,0 +1,292 @@
+import unittest
+import os
+import numpy as np
+import mtpy.test.fixtures as fixtures
+import mtpy.test.benchmark_imports as benchmark_imports
+import mtpy.test.benchmarks as benchmarks
+
+#==============================================================================
+# import time
+#==============================================================================
+class TestLazyImports(unittest.TestCase):
+
+    def test_no_plotting_on_import(self):
+        # reading files should not need matplotlib, scipy or pyproj
+        for module_name in ['mtpy.core.mt', 'mtpy.analysis.niblettbostick',
+                            'mtpy.modeling.modem_new']:
+            import_dict = benchmark_imports.time_import(module_name,
+                                                        n_repeat=1)
+            self.assertEqual(import_dict['loaded'], [])
+
+    def test_lazy_module(self):
+        import mtpy.utils.lazyimport as lazyimport
+        lazy_json = lazyimport.LazyModule('json')
+        self.assertEqual(lazy_json.dumps([1]), '[1]')
+        self.assertTrue('loads' in lazy_json.__dict__)
+        self.assertRaises(AttributeError, getattr, lazy_json, 'no_attribute')
+
+#==============================================================================
+# benchmarks
+#==============================================================================
+class TestBenchmarks(fixtures.TempDirTestCase):
+
+    def test_edi_many_frequencies(self):
+        # more than 256 frequencies used to fail the length checks
+        import mtpy.core.edi as MTedi
+        edi_fn = benchmarks.write_edi_file(os.path.join(self.save_path,
+                                                        'SYN01.edi'), 300)
+        edi_obj = MTedi.Edi(edi_fn)
+        freq, z_array = benchmarks.make_z_array(300)[0:2]
+        self.assertEqual(edi_obj.Z.z.shape, (300, 2, 2))
+        self.assertTrue(np.allclose(edi_obj.Z.z, z_array, rtol=1e-6))
+        self.assertEqual(len(edi_obj.zrot), 300)
+
+    def test_run_compare(self):
+        results = benchmarks.run_benchmarks(case_names=['z_res_phase',
+                                                        'edi_write'],
+                                            sizes=['small'], n_repeat=1,
+                                            verbose=False)
+        self.assertEqual(len(results['results']), 2)
+        for result in results['results']:
+            self.assertTrue(result['time_min'] > 0)
+
+        json_fn = benchmarks.write_results(results,
+                                           os.path.join(self.save_path,
+                                                        'old.json'))
+        slow = benchmarks.read_results(json_fn)
+        slow['results'][0]['time_min'] *= 2
+        slow['results'][0]['time_min'] += 1
+        compare_list = benchmarks.compare_results(json_fn, slow)
+        self.assertEqual([cc['time_regression'] for cc in compare_list],
+                         [True, False])
+        self.assertFalse(any([cc['memory_regression']
+                              for cc in compare_list]))
+
+
+#==============================================================================
+# edi writer
+#==============================================================================
+class TestEdiWriter(fixtures.TempDirTestCase):
+
+    def test_format_value_block(self):
+        import mtpy.core.edi as MTedi
+        for n_values in [0, 1, 5, 7, 10, 23]:
+            values = np.random.randn(n_values)*10.**np.random.randint(-8, 8,
+                                                                   n_values)
+            # value by value as the edi files have always been written
+            block = ''
+            for ii, value in enumerate(values):
+                block += '\t%E'%(value)
+                if (ii+1)%5 == 0 and ii != n_values-1:
+                    block += '\n'
+            self.assertEqual(MTedi.format_value_block(values),
+                             block.expandtabs(4))
+
+    def test_write_edi_files(self):
+        import mtpy.core.mt as mt
+        edi_list = [benchmarks.write_edi_file(os.path.join(self.save_path,
+                                                       'SYN{0:02}.edi'.format(ii)),
+                                              40)
+                    for ii in range(3)]
+        rot_path = os.path.join(self.save_path, 'rot')
+        new_list = mt.write_edi_files(edi_list, rot_path, rotation_angle=30,
+                                      suffix='_rot', n_processes=1)
+        self.assertEqual(len(new_list), 3)
+        mt_obj = mt.MT(edi_list[1])
+        mt_obj.rotation_angle = 30
+        new_mt_obj = mt.MT(new_list[1])
+        self.assertTrue(new_list[1].endswith('SYN01_rot.edi'))
+        self.assertTrue(np.allclose(new_mt_obj.Z.z, mt_obj.Z.z, rtol=1e-5))
+
+    def test_merge_edi_files(self):
+        import mtpy.core.edi as MTedi
+        import mtpy.core.edimerge as edimerge
+        fn_list = [benchmarks.write_edi_file(os.path.join(self.save_path,
+                                                          '{0}.edi'.format(band)),
+                                             n_freq, seed=ii,
+                                             freq_range=freq_range)
+                   for ii, (band, n_freq, freq_range) in enumerate(
+                                    [('bb', 60, (3, -1)), ('lp', 40, (0, -4)),
+                                     ('amt', 30, (4.5, 2))])]
+
+        # two files by merge frequency as combine_edifiles
+        edi_obj = MTedi.combine_edifiles(fn_list[0], fn_list[1],
+                                         out_fn=os.path.join(self.save_path,
+                                                             'old.edi'))[0]
+        new_edi_obj = edimerge.merge_edi_objects([MTedi.Edi(fn)
+                                                  for fn in fn_list[0:2]])
+        self.assertTrue(np.allclose(new_edi_obj.freq, edi_obj.freq))
+        self.assertTrue(np.allclose(new_edi_obj.Z.z, edi_obj.Z.z))
+        self.assertTrue(np.allclose(new_edi_obj.Tipper.tipper,
+                                    edi_obj.Tipper.tipper))
+
+        # the lower error file is used in the overlap
+        freq_list = [np.logspace(2, 0, 9), np.logspace(1, -1, 9)]
+        err_list = [np.linspace(.01, .2, 9), np.repeat(.14, 9)]
+        merge_index, merge_freq, file_index = edimerge.get_merge_index(
+                                        freq_list, lo_rel_err=err_list,
+                                        merge_method='error')
+        self.assertEqual(file_index.tolist(), [0, 1])
+        self.assertTrue(1 < merge_freq[0] < 10)
+        freq = np.concatenate(freq_list)[merge_index]
+        self.assertTrue(np.all(np.diff(freq) < 0))
+        source = (merge_index >= 9)
+        self.assertTrue(np.all(source[freq <= merge_freq[0]]))
+        self.assertFalse(np.any(source[freq > merge_freq[0]]))
+
+        fn_dict = edimerge.merge_edi_files({'mt01':fn_list,
+                                            'mt02':fn_list[1::-1]},
+                                           os.path.join(self.save_path,
+                                                        'merged'),
+                                           merge_method='error',
+                                           n_processes=1)
+        edi_obj = MTedi.Edi(fn_dict['mt01'])
+        self.assertTrue(fn_dict['mt01'].endswith('mt01_merged.edi'))
+        self.assertTrue(np.all(np.diff(edi_obj.freq) < 0))
+        self.assertTrue(edi_obj.freq.max() > 3e4 and
+                        edi_obj.freq.min() < 2e-4)
+        self.assertEqual(int(edi_obj.mtsect['nfreq']), edi_obj.n_freq())
+
+
+#==============================================================================
+# ellipse and arrow collections
+#==============================================================================
+class TestPlotCollections(unittest.TestCase):
+
+    def test_get_plot_colors(self):
+        import mtpy.imaging.mtcolors as mtcl
+        colorx = np.random.uniform(-10, 100, 50)
+        bounds = np.arange(0, 90, 10)
+        for cmap in ['mt_yl2rd', 'mt_rd2gr2bl', 'mt_seg_bl2wh2rd']:
+            colors = mtcl.get_plot_colors(colorx, 'phimin', cmap, 0, 90,
+                                          bounds)
+            for cx, color in zip(colorx, colors):
+                self.assertTrue(np.allclose(color,
+                                            mtcl.get_plot_color(cx, 'phimin',
+                                                                cmap, 0, 90,
+                                                                bounds)))
+
+    def test_get_arrow_vertices(self):
+        import matplotlib.patches as patches
+        import mtpy.imaging.mtplottools as mtpl
+        vertices = mtpl.get_arrow_vertices([1, 2], [3, 4], [.5, -.2],
+                                           [.1, .3], width=.01,
+                                           head_width=.03, head_length=.05)
+        for ii, (x, y, dx, dy) in enumerate([(1, 3, .5, .1),
+                                             (2, 4, -.2, .3)]):
+            arrow = patches.FancyArrow(x, y, dx, dy, width=.01,
+                                       head_width=.03, head_length=.05)
+            self.assertTrue(np.allclose(vertices[ii], arrow.get_xy()))
+
+#==============================================================================
+# gridding
+#==============================================================================
+class TestGridInterpolator(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(0)
+        self.x = np.random.rand(50)
+        self.y = np.random.rand(50)
+        self.data_array = np.sin(4*self.x)+self.y**2
+
+    def test_grid_data(self):
+        import matplotlib.mlab as mlab
+        import mtpy.imaging.mtplottools as mtpl
+        grid_array, xg, yg = mtpl.grid_data(self.data_array, self.x, self.y,
+                                            nx=30, ny=20)
+        self.assertEqual(grid_array.shape, (20, 30))
+        mlab_array = mlab.griddata(self.x, self.y, self.data_array, xg, yg,
+                                   interp='linear')
+        self.assertTrue(np.all(grid_array.mask ==
+                               np.ma.getmaskarray(mlab_array)))
+        self.assertTrue(np.ma.allclose(grid_array, mlab_array))
+
+    def test_cache(self):
+        import mtpy.imaging.mtplottools as mtpl
+        mtpl.clear_grid_cache()
+        grid_interp = mtpl.get_grid_interpolator(self.x, self.y, nx=30, ny=20)
+        self.assertTrue(grid_interp is mtpl.get_grid_interpolator(self.x,
+                                                                 self.y,
+                                                                 nx=30, ny=20))
+        # moving a station makes a new interpolator
+        self.x[0] += .01
+        self.assertFalse(grid_interp is mtpl.get_grid_interpolator(self.x,
+                                                                  self.y,
+                                                                  nx=30,
+                                                                  ny=20))
+        mtpl.clear_grid_cache()
+        self.assertEqual(len(mtpl._grid_cache), 0)
+
+        grid_array = grid_interp.interpolate(np.c_[self.data_array,
+                                                   2*self.data_array])
+        self.assertEqual(grid_array.shape, (20, 30, 2))
+        self.assertTrue(np.ma.allclose(grid_array[:, :, 1],
+                                       2*grid_array[:, :, 0]))
+
+#==============================================================================
+# batch figure rendering
+#==============================================================================
+class LinePlot(object):
+    """
+    small plot class for BatchPlot, it has to be importable by the workers
+    """
+
+    def __init__(self, plot_yn='n', **kwargs):
+        self.data_array = kwargs.pop('data_array', None)
+        self.index = kwargs.pop('index', 0)
+
+    def plot(self):
+        import matplotlib.pyplot as plt
+        fig = plt.figure('line', figsize=[2, 2], dpi=50)
+        ax = fig.add_subplot(1, 1, 1)
+        ax.plot(self.data_array[self.index])
+        ax.set_ylim(-3, 3)
+
+
+class TestBatchPlot(fixtures.TempDirTestCase):
+
+    def setUp(self):
+        super(TestBatchPlot, self).setUp()
+        np.random.seed(0)
+        self.data_array = np.random.randn(4, 20)
+
+    def get_job_list(self, dir_name, attr_dict=None):
+        os.mkdir(os.path.join(self.save_path, dir_name))
+        if attr_dict is None:
+            attr_dict = {}
+        return [(os.path.join(self.save_path, dir_name,
+                              '{0:02}.png'.format(ii)),
+                 dict(attr_dict, index=ii), 'line')
+                for ii in range(4)]
+
+    def test_render(self):
+        import matplotlib.image as mpimg
+        import mtpy.imaging.batchplot as batchplot
+
+        # the data array goes to the workers as a memory mapped file
+        line_plot = LinePlot(data_array=self.data_array)
+        image_dict = {}
+        for n_processes in [1, 2]:
+            job_list = self.get_job_list(str(n_processes))
+            batch = batchplot.BatchPlot(plot_obj=line_plot,
+                                        n_processes=n_processes,
+                                        mmap_attributes=['data_array'])
+            fn_list = batch.render(job_list)
+            self.assertEqual(fn_list, [job[0] for job in job_list])
+            self.assertTrue(line_plot.data_array is self.data_array)
+            self.assertEqual(batch.render_summary['n_figures'], 4)
+            image_dict[n_processes] = [mpimg.imread(fn) for fn in fn_list]
+
+        for image_1, image_2 in zip(image_dict[1], image_dict[2]):
+            self.assertTrue(np.all(image_1 == image_2))
+        self.assertFalse(np.all(image_dict[1][0] == image_dict[1][1]))
+
+        # a new plot object for each job gives the same figures
+        job_list = self.get_job_list('class', {'data_array':self.data_array})
+        batch = batchplot.BatchPlot(plot_class=LinePlot, n_processes=2)
+        for fn, image in zip(batch.render(job_list), image_dict[1]):
+            self.assertTrue(np.all(mpimg.imread(fn) == image))
+
+
+if __name__ == '__main__':
+    unittest.main()
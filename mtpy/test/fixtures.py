@@ -0,0 +1,52 @@
+"""
+mtpy/test/fixtures.py
+
+Set up shared by the mtpy unit tests.
+
+The readers and writers print a lot, so tests send stdout to devnull.
+Cleanups are used instead of tearDown, so stdout is restored and the
+devnull handle closed even when setUp of a test case fails half way.
+
+:Example: ::
+
+    >>> import mtpy.test.fixtures as fixtures
+    >>> class TestWriter(fixtures.TempDirTestCase):
+    >>>     def setUp(self):
+    >>>         super(TestWriter, self).setUp()
+    >>>         ...
+    >>>     def test_write(self):
+    >>>         fn = os.path.join(self.save_path, 'test.edi')
+
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+#==============================================================================
+class QuietTestCase(unittest.TestCase):
+    """
+    test case that throws away anything printed to stdout
+    """
+
+    def setUp(self):
+        devnull = open(os.devnull, 'w')
+        stdout = sys.stdout
+        sys.stdout = devnull
+        # cleanups run last in first out, restore stdout before closing
+        self.addCleanup(devnull.close)
+        self.addCleanup(setattr, sys, 'stdout', stdout)
+
+
+class TempDirTestCase(QuietTestCase):
+    """
+    quiet test case with a temporary directory in save_path that is
+    removed after each test
+    """
+
+    def setUp(self):
+        super(TempDirTestCase, self).setUp()
+        self.save_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.save_path, ignore_errors=True)
@@ -0,0 +1,410 @@
+import unittest
+import os
+import numpy as np
+import mtpy.test.fixtures as fixtures
+import mtpy.modeling.modem_new as modem
+import mtpy.modeling.forward1d as forward1d
+import mtpy.modeling.occam2d_rewrite as occam2d
+
+#==============================================================================
+# ModEM data file
+#==============================================================================
+def make_modem_data(n_stations, n_periods, seed=0):
+    """
+    make a modem.Data object filled with random data so data files can be
+    written without .edi files
+    """
+
+    np.random.seed(seed)
+    m_data = modem.Data()
+    m_data.period_list = np.logspace(-3, 3, n_periods)
+    m_data._set_dtype((n_periods, 2, 2), (n_periods, 1, 2))
+    m_data.data_array = np.zeros(n_stations, dtype=m_data._dtype)
+
+    m_data.data_array['station'] = ['MT{0:03}'.format(ii)
+                                    for ii in range(n_stations)]
+    m_data.data_array['lat'] = np.random.uniform(-40, -30, n_stations)
+    m_data.data_array['lon'] = np.random.uniform(130, 140, n_stations)
+    m_data.data_array['elev'] = np.random.uniform(0, 2000, n_stations)
+    m_data.data_array['rel_east'] = np.random.uniform(-1e4, 1e4, n_stations)
+    m_data.data_array['rel_north'] = np.random.uniform(-1e4, 1e4, n_stations)
+
+    z_shape = (n_stations, n_periods, 2, 2)
+    z_arr = np.random.randn(*z_shape)+1j*np.random.randn(*z_shape)
+    z_arr[np.random.rand(*z_shape) < .1] = 0
+    m_data.data_array['z'] = z_arr
+    m_data.data_array['z_err'] = abs(z_arr)*np.random.uniform(.01, .2, z_shape)
+
+    t_shape = (n_stations, n_periods, 1, 2)
+    t_arr = .2*(np.random.randn(*t_shape)+1j*np.random.randn(*t_shape))
+    t_arr[np.random.rand(*t_shape) < .1] = 0
+    m_data.data_array['tip'] = t_arr
+    m_data.data_array['tip_err'] = np.random.uniform(.01, .1, t_shape)
+
+    return m_data
+
+def write_reference_lines(m_data, inv_mode):
+    """
+    write data lines one value at a time, the way data files were written
+    before write_data_file was vectorized.  Errors are written as is.
+    """
+
+    if m_data.formatting == '1':
+        fmt_list = ['{0:<12.5e}', '{0:>7}', '{0:> 9.3f}', '{0:> 9.3f}',
+                    '{0:> 12.3f}', '{0:> 12.3f}', '{0:> 12.3f}', '{0:>4}',
+                    '{0:> 14.6e}', '{0:> 14.6e}', '{0:> 14.6e}']
+    else:
+        fmt_list = ['{0:<14.6e}', '{0:<10}', '{0:> 14.6f}', '{0:> 14.6f}',
+                    '{0:> 15.3f}', '{0:> 12.3f}', '{0:> 10.3f}', '{0:>12}',
+                    '{0:> 17.6e}', '{0:> 17.6e}', '{0:> 14.6e}']
+
+    dlines = []
+    d_arr = m_data.data_array
+    for ss in range(d_arr.shape[0]):
+        for ff in range(d_arr['z'].shape[1]):
+            for comp in m_data.inv_comp_dict[inv_mode]:
+                z_ii, z_jj = m_data.comp_index_dict[comp]
+                c_key = 'z' if comp.find('z') == 0 else 'tip'
+                zz = d_arr[ss][c_key][ff, z_ii, z_jj]
+                if zz.real == 0.0 or zz.imag == 0.0:
+                    continue
+                err = abs(d_arr[ss][c_key+'_err'][ff, z_ii, z_jj].real)
+                value_list = [m_data.period_list[ff], d_arr[ss]['station'],
+                              d_arr[ss]['lat'], d_arr[ss]['lon'],
+                              d_arr[ss]['rel_north'], d_arr[ss]['rel_east'],
+                              d_arr[ss]['elev'], comp.upper(), zz.real,
+                              zz.imag, err]
+                dlines.append(''.join([fmt.format(value) for fmt, value in
+                                       zip(fmt_list, value_list)])+'\n')
+    return dlines
+
+class TestModEMData(fixtures.TempDirTestCase):
+
+    def test_write_format(self):
+        # batched formatting has to give the same lines as formatting each
+        # value on its own
+        for formatting in ['1', '2']:
+            m_data = make_modem_data(5, 8)
+            m_data.formatting = formatting
+            for inv_mode in ['Full_Impedance', 'Full_Vertical_Components']:
+                self.assertEqual(m_data._get_data_lines(inv_mode,
+                                                        compute_error=False),
+                                 write_reference_lines(m_data, inv_mode))
+
+    def test_read_write(self):
+        m_data = make_modem_data(5, 8)
+        m_data.write_data_file(save_path=self.save_path, fill=False,
+                               compute_error=False)
+
+        m_read = modem.Data()
+        m_read.read_data_file(m_data.data_fn)
+
+        self.assertTrue(np.allclose(m_read.period_list, m_data.period_list,
+                                    rtol=1e-5))
+        self.assertEqual(sorted(m_read.mt_dict.keys()),
+                         m_data.data_array['station'].tolist())
+        for key in ['lat', 'lon', 'elev', 'rel_east', 'rel_north']:
+            self.assertTrue(np.allclose(m_read.data_array[key],
+                                        m_data.data_array[key], atol=1e-3))
+        for key in ['z', 'tip']:
+            self.assertTrue(np.allclose(m_read.data_array[key],
+                                        m_data.data_array[key], rtol=1e-5))
+        self.assertTrue(np.allclose(m_read.mt_dict['MT000'].Z.z,
+                                    m_data.data_array['z'][0], rtol=1e-5))
+
+        # writing what was read has to give the same file
+        m_read.write_data_file(fn_basename='ModEM_Data_rewrite.dat',
+                               fill=False, compute_error=False)
+        self.assertEqual(file(m_data.data_fn).readlines()[2:],
+                         file(m_read.data_fn).readlines()[2:])
+
+
+#==============================================================================
+# ModEM residuals
+#==============================================================================
+class TestModEMResidual(fixtures.TempDirTestCase):
+
+    def setUp(self):
+        super(TestModEMResidual, self).setUp()
+
+        self.m_data = make_modem_data(6, 8)
+        self.m_resp = make_modem_data(6, 8)
+        self.m_resp.data_array['z'] *= 1.1
+        self.m_resp.data_array['tip'] += .01
+
+    def test_residual(self):
+        res = modem.Residual(data_obj=self.m_data, resp_obj=self.m_resp)
+
+        # compare with looping over each value
+        sum_squares = 0
+        num_data = 0
+        for d_arr, r_arr in zip(self.m_data.data_array,
+                                self.m_resp.data_array):
+            for key in ['z', 'tip']:
+                for index in np.ndindex(d_arr[key].shape):
+                    value = d_arr[key][index]
+                    if value.real == 0 or value.imag == 0:
+                        continue
+                    n_res = (value-r_arr[key][index])/\
+                            d_arr[key+'_err'][index].real
+                    sum_squares += n_res.real**2+n_res.imag**2
+                    num_data += 2
+        self.assertAlmostEqual(res.rms, np.sqrt(sum_squares/num_data))
+        self.assertEqual(res.rms_station.shape, (6, ))
+        self.assertEqual(res.rms_period.shape, (8, ))
+        self.assertEqual(res.residual_pt_array.shape, (8, 6))
+
+        # residual file can be read back in
+        res.resp_obj.fn_basename = 'ModEM_Resp.dat'
+        res_fn = res.write_residual_file(save_path=self.save_path)
+        self.assertEqual(os.path.basename(res_fn), 'ModEM_Resp.res')
+        m_read = modem.Data()
+        m_read.read_data_file(res_fn)
+        self.assertTrue(np.allclose(m_read.data_array['z'],
+                                    res.residual_obj.data_array['z'],
+                                    rtol=1e-5))
+
+        csv_fn = res.write_rms_table(os.path.join(self.save_path, 'rms.csv'))
+        self.assertEqual(len(file(csv_fn).readlines()), 7)
+
+    def test_rms_iterations(self):
+        self.m_data.write_data_file(save_path=self.save_path, fill=False,
+                                    compute_error=False)
+        resp_fn_list = []
+        for ii in range(3):
+            self.m_resp.data_array['z'] = self.m_data.data_array['z']*\
+                                          (1+.1/(ii+1))
+            self.m_resp.write_data_file(save_path=self.save_path,
+                                        fn_basename='resp_{0}.dat'.format(ii),
+                                        fill=False, compute_error=False)
+            resp_fn_list.append(self.m_resp.data_fn)
+        rms_array = modem.get_rms_iterations(self.m_data.data_fn,
+                                             resp_fn_list)
+        self.assertTrue(np.all(np.diff(rms_array['rms']) < 0))
+
+
+#==============================================================================
+# Occam2D
+#==============================================================================
+class TestOccam2D(fixtures.TempDirTestCase):
+
+    def test_regularization_model(self):
+        np.random.seed(0)
+        station_locations = np.sort(np.random.uniform(0, 2e4, 30))
+        reg = occam2d.Regularization(station_locations)
+        n_x = sum(reg.model_columns[0])
+        for col, row in zip(reg.model_columns, reg.model_rows):
+            self.assertEqual(sum(col), n_x)
+            self.assertEqual(len(col), row[1])
+        self.assertEqual(reg.num_param,
+                         sum([row[1] for row in reg.model_rows]))
+        self.assertEqual(reg.num_free_param, reg.num_param)
+
+        # fixed mesh cells make model blocks fixed
+        reg.mesh_values[:, 0:2, :] = '0'
+        reg.get_num_free_params()
+        self.assertTrue(0 < reg.num_free_param < reg.num_param)
+
+        # model values are the index of the regularization block
+        reg.save_path = self.save_path
+        reg.write_mesh_file(save_path=self.save_path)
+        reg.write_regularization_file()
+        iter_fn = os.path.join(self.save_path, 'test.iter')
+        with open(iter_fn, 'w') as fid:
+            fid.write('Model File:         {0}\n'.format(reg.reg_basename))
+            fid.write('Data File:          none.dat\n')
+            fid.write('Param Count:        {0}\n'.format(reg.num_param))
+            fid.writelines(['{0}\n'.format(ii)
+                            for ii in range(reg.num_param)])
+        model = occam2d.Model(iter_fn=iter_fn)
+        model.build_model()
+        res_model = np.flipud(model.res_model)
+        self.assertEqual(res_model.shape, (reg.z_nodes.shape[0],
+                                           reg.x_nodes.shape[0]))
+        self.assertTrue(np.all(res_model[0:2, 0] == 0))
+        self.assertTrue(np.all(res_model[0:2, n_x-1] ==
+                               reg.model_rows[0][1]-1))
+        self.assertEqual(res_model[-1, n_x-1], reg.num_param-1)
+        self.assertTrue(np.all(np.diff(res_model[:, 0:n_x], axis=1) >= 0))
+
+    def test_data_list(self):
+        ocd = occam2d.Data()
+        ocd.freq = np.array([10., 1.])
+        asize = (2, 2)
+        ocd.data = [dict([(key, np.zeros(asize)) for key in
+                          ['te_res', 'tm_res', 'te_phase', 'tm_phase',
+                           're_tip', 'im_tip']])]
+        ocd.data[0]['te_res'][:, 0] = [100., .1]
+        ocd.data[0]['te_phase'][:, 1] = [45., 1.4]
+        ocd.data[0]['re_tip'][:, 1] = [.1, .05]
+        ocd.model_mode = '2'
+        ocd._get_data_list()
+        self.assertEqual([line.split() for line in ocd.data_list],
+                         [['1', '1', '1', '2.0000', '0.0434'],
+                          ['1', '2', '2', '45.0000', '1.4000'],
+                          ['1', '2', '3', '0.1000', '0.0500']])
+
+
+#==============================================================================
+# ModEM model file
+#==============================================================================
+class TestModEMModel(fixtures.TempDirTestCase):
+
+    def setUp(self):
+        super(TestModEMModel, self).setUp()
+
+        np.random.seed(0)
+        self.m_model = modem.Model()
+        self.m_model.nodes_north = np.random.uniform(100, 1000, 12)
+        self.m_model.nodes_east = np.random.uniform(100, 1000, 9)
+        self.m_model.nodes_z = np.random.uniform(10, 1000, 7)
+        self.m_model.res_model = 10**np.random.uniform(-1, 4, (12, 9, 7))
+        self.m_model.write_model_file(save_path=self.save_path)
+
+    def test_read_write(self):
+        m_read = modem.Model()
+        m_read.read_model_file(self.m_model.model_fn)
+
+        self.assertEqual(m_read.res_model.shape, (12, 9, 7))
+        self.assertTrue(np.allclose(m_read.res_model,
+                                    self.m_model.res_model, rtol=1e-4))
+        self.assertTrue(np.allclose(m_read.nodes_east,
+                                    self.m_model.nodes_east, atol=1e-3))
+        self.assertTrue(np.allclose(m_read.grid_center,
+                                    self.m_model.grid_center))
+
+        # first line in the file for an east value is the furthest north
+        mlines = file(self.m_model.model_fn).readlines()
+        self.assertAlmostEqual(float(mlines[6].split()[0]),
+                               np.log(self.m_model.res_model[-1, 0, 0]),
+                               places=4)
+
+    def test_npy_cache(self):
+        m_read = modem.Model(use_npy_cache=True)
+        m_read.read_model_file(self.m_model.model_fn)
+        self.assertTrue(os.path.isfile(self.m_model.model_fn+'.npy'))
+
+        m_cache = modem.Model(use_npy_cache=True)
+        m_cache.read_model_file(self.m_model.model_fn)
+        self.assertTrue(isinstance(m_cache.res_model, np.memmap))
+        self.assertTrue(np.array_equal(m_cache.res_model, m_read.res_model))
+        self.assertTrue(np.array_equal(m_cache.grid_z, m_read.grid_z))
+        self.assertEqual(m_cache.title, m_read.title)
+
+        # a changed model file is read again
+        self.m_model.res_model[:] = 10.
+        self.m_model.write_model_file(save_path=self.save_path)
+        mtime = os.path.getmtime(self.m_model.model_fn)
+        os.utime(self.m_model.model_fn, (mtime+10, mtime+10))
+        m_cache.read_model_file(self.m_model.model_fn)
+        self.assertTrue(np.allclose(m_cache.res_model, 10.))
+
+    def test_model_export(self):
+        import mtpy.utils.modelexport as modelexport
+        model_dict = modelexport.read_model_file(self.m_model.model_fn)
+        m_read = modem.Model()
+        m_read.read_model_file(self.m_model.model_fn)
+        self.assertTrue(np.allclose(model_dict['res_model'], m_read.res_model))
+        self.assertTrue(np.allclose(model_dict['origin'], m_read.grid_center))
+
+        centers = modelexport.get_cell_centers(model_dict['nodes_z'])
+        self.assertTrue(np.allclose(centers,
+                                    [m_read.nodes_z[0:ii].sum()+
+                                     m_read.nodes_z[ii]/2. for ii in range(7)]))
+
+        north = modelexport.get_cell_centers(model_dict['nodes_north'])
+        east = modelexport.get_cell_centers(model_dict['nodes_east'])
+        csv_fn = modelexport.write_point_file(os.path.join(self.save_path,
+                                                           'model_points'),
+                                              north, east, centers,
+                                              model_dict['res_model'])
+        point_array = np.loadtxt(csv_fn, delimiter=',', skiprows=1)
+        self.assertEqual(point_array.shape, (12*9*7, 4))
+        # north changes fastest, then east, then down
+        self.assertTrue(np.allclose(point_array[12*9*2+12*3+4],
+                                    [north[4], east[3], centers[2],
+                                     model_dict['res_model'][4, 3, 2]],
+                                    rtol=1e-6))
+
+    def test_topography(self):
+        m_topo = modem.Model()
+        m_topo.grid_z = np.arange(11)*100.
+        m_topo.nodes_z = np.diff(m_topo.grid_z)
+        m_topo.res_model = np.zeros((2, 3, 10))+100.
+        m_topo.sea_level = 300.
+        # land at 250 m, sea floor at -250 m, sea level
+        m_topo.surface_dict = {'topography':np.array([[250., -250., 0.],
+                                                      [250., -250., 0.]])}
+        m_topo.project_stations_on_topography = lambda: None
+        m_topo.add_topography()
+
+        # cell centres are at 50, 150, 250 ... m depth
+        mask = m_topo.covariance_mask[::-1]
+        self.assertEqual(mask[0, 0].tolist(), [0]*1+[1]*9)
+        self.assertEqual(mask[0, 1].tolist(), [0]*3+[9]*3+[1]*4)
+        self.assertEqual(mask[0, 2].tolist(), [0]*3+[1]*7)
+        self.assertTrue(np.all(m_topo.res_model[:, 1, 3:6] == .3))
+        self.assertTrue(np.all(m_topo.res_model[:, 1, 6:] == 100.))
+
+
+#==============================================================================
+# 1-D forward
+#==============================================================================
+class TestForward1D(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(0)
+        self.freq = np.logspace(-3, 3, 25)
+        self.res_x = 10**np.random.uniform(0, 3, (50, 5))
+        self.res_y = 10**np.random.uniform(0, 3, (50, 5))
+        self.strike = np.random.uniform(-90, 90, (50, 5))
+        self.thickness = np.random.uniform(10, 5000, (50, 4))
+
+    def test_half_space(self):
+        f1 = forward1d.Forward1D(resistivity=[[100.]], freq=self.freq)
+        z_obj = f1.get_z_list()[0]
+        self.assertTrue(np.allclose(z_obj.resistivity[:, 0, 1], 100.))
+        self.assertTrue(np.allclose(z_obj.resistivity[:, 1, 0], 100.))
+        self.assertTrue(np.allclose(z_obj.phase[:, 0, 1], 45.))
+
+    def test_anisotropic(self):
+        # equal resistivities have to give the isotropic response
+        z_iso = forward1d.compute_z_isotropic(self.res_x, self.thickness,
+                                              self.freq)
+        z_arr = forward1d.compute_z_anisotropic(self.res_x, self.res_x,
+                                                self.strike, self.thickness,
+                                                self.freq)
+        self.assertTrue(np.allclose(z_arr[:, :, 0, 1], z_iso))
+        self.assertTrue(np.allclose(z_arr[:, :, 1, 0], -z_iso))
+        self.assertTrue(np.allclose(z_arr[:, :, 0, 0], 0))
+
+        # with a constant strike the modes decouple
+        strike = np.zeros_like(self.strike)+30.
+        z_arr = forward1d.compute_z_anisotropic(self.res_x, self.res_y,
+                                                strike, self.thickness,
+                                                self.freq)
+        z_rot = forward1d._rotate_z(z_arr, np.cos(np.pi/6), np.sin(np.pi/6))
+        self.assertTrue(np.allclose(z_rot[:, :, 0, 1],
+                                    forward1d.compute_z_isotropic(
+                                        self.res_x, self.thickness,
+                                        self.freq)))
+        self.assertTrue(np.allclose(z_rot[:, :, 1, 0],
+                                    -forward1d.compute_z_isotropic(
+                                        self.res_y, self.thickness,
+                                        self.freq)))
+
+    def test_pad_layers(self):
+        res, thick = forward1d.pad_layers([(self.res_x[0, :2],
+                                            self.thickness[0, :1]),
+                                           (self.res_x[1],
+                                            self.thickness[1])])
+        self.assertEqual(res.shape, (2, 5))
+        self.assertTrue(np.allclose(
+                    forward1d.compute_z_isotropic(res, thick, self.freq)[0],
+                    forward1d.compute_z_isotropic(self.res_x[0, :2],
+                                                  self.thickness[0, :1],
+                                                  self.freq)[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,427 @@
+import unittest
+import os
+import numpy as np
+import mtpy.test.fixtures as fixtures
+import mtpy.processing.coherence as coherence
+import mtpy.processing.quality as quality
+import mtpy.utils.filehandling as filehandling
+import mtpy.test.benchmarks as benchmarks
+
+# zen needs win32api
+try:
+    import mtpy.usgs.zen as zen
+except ImportError:
+    zen = None
+
+# trace needs pyrocko
+try:
+    import mtpy.processing.trace as trace
+except ImportError:
+    trace = None
+
+#==============================================================================
+# coherence and quality
+#==============================================================================
+class TestCoherence(fixtures.TempDirTestCase):
+
+    def setUp(self):
+        super(TestCoherence, self).setUp()
+
+        # ex follows hx and hy, ey is mostly noise
+        np.random.seed(0)
+        n_samples = 2**14
+        hx = np.random.randn(n_samples)
+        hy = np.random.randn(n_samples)
+        ex = .8*hy+.3*hx+.1*np.random.randn(n_samples)
+        ey = np.random.randn(n_samples)
+        self.data_array = np.array([ex, ey, hx, hy])
+        self.channel_list = ['ex', 'ey', 'hx', 'hy']
+
+    def test_window_quality(self):
+        self.data_array[1, 3000:3100] = 0.
+        self.data_array[3, 5000:5004] = 10.
+        self.data_array[2, 7000] = np.nan
+        window_array = quality.get_window_array(self.data_array, 1024)
+        self.assertEqual(window_array.shape, (31, 4, 1024))
+        quality_dict = quality.get_window_quality(window_array)
+
+        # windows start every 512 samples
+        self.assertEqual(np.nonzero(quality_dict['gap'][:, 1])[0].tolist(),
+                         [4, 5, 6])
+        self.assertAlmostEqual(quality_dict['gap'][5, 1], 100/1024.)
+        self.assertEqual(np.nonzero(quality_dict['clipped'][:, 3])[0].tolist(),
+                         [8, 9])
+        self.assertEqual(np.nonzero(quality_dict['gap'][:, 2])[0].tolist(),
+                         [12, 13])
+        self.assertTrue(np.all(np.isfinite(quality_dict['rms'])))
+
+    def test_coherence_table(self):
+        table = coherence.get_coherence_table(self.data_array,
+                                              self.channel_list, 16., 512)
+        self.assertTrue(table['mcoh_ex'].mean() > .95)
+        self.assertTrue(table['mcoh_ey'].mean() < .5)
+        # ordinary coherence with one input is less than the multiple
+        self.assertTrue(np.all(table['coh_ex_hy'] <= table['mcoh_ex']+1e-12))
+
+        # white noise with unit variance has a density of 2/sampling rate
+        self.assertAlmostEqual(table['power_hx'].mean(), 2/16., places=2)
+
+        # the density does not depend on the window being odd or even,
+        # short windows show a wrong taper length the most
+        power_list = []
+        for window_length in [15, 16]:
+            window_table = coherence.get_coherence_table(self.data_array,
+                                                         self.channel_list,
+                                                         16., window_length)
+            power_list.append(window_table['power_hx'].mean())
+        self.assertAlmostEqual(power_list[0], power_list[1], delta=.003)
+
+        use = coherence.gate_windows(table, min_coherence=.9,
+                                     coherence_keys=['mcoh_ex'])
+        self.assertTrue(use.sum() > .9*len(table))
+
+    def test_streaming(self):
+        table = coherence.get_coherence_table(self.data_array,
+                                              self.channel_list, 16., 512)
+        chunk_iter = (self.data_array[:, ii:ii+3000]
+                      for ii in range(0, self.data_array.shape[1], 3000))
+        table_list = list(coherence.iter_coherence_tables(chunk_iter,
+                                                          self.channel_list,
+                                                          16., 512))
+        stream_table = np.concatenate(table_list)
+        self.assertEqual(len(stream_table), len(table))
+        for name in table.dtype.names:
+            self.assertTrue(np.allclose(stream_table[name], table[name]))
+
+        # the same from files in chunks
+        ts_list = [filehandling.write_ts_file_from_tuple(
+                                   os.path.join(self.save_path,
+                                                'mt01_{0}.ts'.format(ch)),
+                                   ('mt01', ch, 16., 0., len(data), 'mV',
+                                    0., 0., 0., data))
+                   for ch, data in zip(self.channel_list, self.data_array)]
+        table_dict = coherence.compute_station_tables({'mt01':ts_list}, 512,
+                                                      chunk_length=5000,
+                                                      n_processes=1)
+        self.assertTrue(np.allclose(table_dict['mt01']['mcoh_ex'],
+                                    table['mcoh_ex'], atol=1e-6))
+
+#==============================================================================
+# Z3D schedule blocks
+#==============================================================================
+@unittest.skipIf(zen is None, 'mtpy.usgs.zen can not be imported')
+class TestZ3DCollection(fixtures.TempDirTestCase):
+
+    def write_block(self, dir_name):
+        block_path = os.path.join(self.save_path, dir_name)
+        os.mkdir(block_path)
+        return [benchmarks.write_z3d_file(os.path.join(block_path,
+                                    'syn01_20150522_080000_256_{0}.Z3D'.format(
+                                                                    comp)),
+                                          20, seed=ii, component=comp)
+                for ii, comp in enumerate(['EX', 'EY', 'HX', 'HY', 'HZ'])]
+
+    def test_write_ascii_mt_files(self):
+        # threads have to write the same files as a single worker
+        fn_dict = {}
+        for n_workers in [1, 5]:
+            z3d_block = zen.Z3D_Collection(self.write_block(str(n_workers)),
+                                           max_workers=n_workers,
+                                           verbose=False)
+            z3d_block.read_z3d_files()
+            z3d_block.align_time_series()
+            fn_dict[n_workers] = z3d_block.write_ascii_mt_files()
+
+        self.assertEqual(len(fn_dict[1]), 5)
+        self.assertEqual([os.path.basename(fn) for fn in fn_dict[1]],
+                         [os.path.basename(fn) for fn in fn_dict[5]])
+        for fn_1, fn_5 in zip(fn_dict[1], fn_dict[5]):
+            self.assertEqual(open(fn_1).read(), open(fn_5).read())
+
+#==============================================================================
+# traces
+#==============================================================================
+def _degapper_reference(traces, maxgap=5, deoverlap='use_second', maxlap=None):
+    """
+    degapper as it was before the joins were planned, joining one trace at
+    a time by concatenating the samples, with fillmethod='interpolate'
+    """
+
+    in_traces = list(traces)
+    out_traces = [in_traces.pop(0)]
+    while in_traces:
+        a = out_traces[-1]
+        b = in_traces.pop(0)
+        virtual = a.ydata is None
+        if (a.nslc_id == b.nslc_id and a.deltat == b.deltat and
+            a.data_len() >= 1 and b.data_len() >= 1 and
+            (virtual or a.ydata.dtype == b.ydata.dtype)):
+            dist = (b.tmin-(a.tmin+(a.data_len()-1)*a.deltat))/a.deltat
+            idist = int(round(dist))
+            if abs(dist-idist) <= 0.05 or idist > maxgap:
+                join = False
+                if 1 < idist <= maxgap:
+                    if not virtual:
+                        filler = a.ydata[-1]+(((1.+np.arange(idist-1,
+                                 dtype=np.float))/idist)*
+                                 (b.ydata[0]-a.ydata[-1])).astype(
+                                                            a.ydata.dtype)
+                        a.ydata = np.concatenate((a.ydata, filler, b.ydata))
+                    join = True
+                elif idist == 1:
+                    if not virtual:
+                        a.ydata = np.concatenate((a.ydata, b.ydata))
+                    join = True
+                elif idist <= 0 and (maxlap is None or -maxlap < idist):
+                    if b.tmax <= a.tmax:
+                        continue
+                    if not virtual:
+                        na = a.ydata.size
+                        n = -idist+1
+                        if deoverlap == 'use_second':
+                            a.ydata = np.concatenate((a.ydata[:-n], b.ydata))
+                        else:
+                            a.ydata = np.concatenate((a.ydata, b.ydata[n:]))
+                        if deoverlap == 'crossfade_cos':
+                            taper = 0.5-0.5*np.cos((1.+np.arange(n))/
+                                                   (1.+n)*np.pi)
+                            a.ydata[na-n:na] *= 1.-taper
+                            a.ydata[na-n:na] += b.ydata[:n]*taper
+                    join = True
+                if join:
+                    a.tmax = b.tmax
+                    if a.mtime and b.mtime:
+                        a.mtime = max(a.mtime, b.mtime)
+                    continue
+        if b.data_len() >= 1:
+            out_traces.append(b)
+
+    for tr in out_traces:
+        tr._update_ids()
+
+    return out_traces
+
+@unittest.skipIf(trace is None, 'mtpy.processing.trace needs pyrocko')
+class TestDegapper(unittest.TestCase):
+
+    def make_traces(self, virtual=False):
+        # gaps, touching traces, overlaps, a short trace inside another one,
+        # a gap longer than maxgap and displaced sampling on two channels
+        np.random.seed(0)
+        tr_list = []
+        for channel in ['ex', 'ey']:
+            for tmin, n in [(0., 20), (22., 10), (32., 15), (40., 20),
+                            (45., 5), (70., 10), (80.3, 10), (93., 8)]:
+                tr = trace.Trace(station='mt01', channel=channel, tmin=tmin,
+                                 deltat=1., ydata=np.random.randn(n),
+                                 mtime=tmin)
+                if virtual:
+                    tr.ydata = None
+                tr_list.append(tr)
+        return tr_list
+
+    def assert_same_traces(self, tr_list, ref_list):
+        self.assertEqual(len(tr_list), len(ref_list))
+        for tr, ref in zip(tr_list, ref_list):
+            self.assertEqual(tr.nslc_id, ref.nslc_id)
+            self.assertEqual(tr.tmin, ref.tmin)
+            self.assertEqual(tr.tmax, ref.tmax)
+            self.assertEqual(tr.mtime, ref.mtime)
+            if ref.ydata is None:
+                self.assertTrue(tr.ydata is None)
+            else:
+                self.assertTrue(np.array_equal(tr.ydata, ref.ydata))
+
+    def test_degapper(self):
+        for deoverlap in ['use_second', 'use_first', 'crossfade_cos']:
+            for maxgap, maxlap in [(5, None), (1, 3)]:
+                kwargs = {'maxgap':maxgap, 'deoverlap':deoverlap,
+                          'maxlap':maxlap}
+                tr_list = self.make_traces()
+                out_list = trace.degapper(tr_list, **kwargs)
+                self.assertEqual(len(tr_list), 16)
+                self.assert_same_traces(out_list, _degapper_reference(
+                                            self.make_traces(), **kwargs))
+
+    def test_virtual(self):
+        self.assert_same_traces(trace.degapper(self.make_traces(True)),
+                                _degapper_reference(self.make_traces(True)))
+
+    def test_fill_zeros(self):
+        tr_list = [trace.Trace(station='mt01', channel='ex', tmin=tmin,
+                               deltat=1., ydata=np.ones(5))
+                   for tmin in [0., 8.]]
+        out_list = trace.degapper(tr_list, fillmethod='zeros')
+        self.assertEqual(len(out_list), 1)
+        self.assertTrue(np.array_equal(out_list[0].ydata,
+                                       np.r_[np.ones(5), np.zeros(3),
+                                             np.ones(5)]))
+
+@unittest.skipIf(trace is None, 'mtpy.processing.trace needs pyrocko')
+class TestFilterTraces(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(1)
+        self.tr_list = [trace.Trace(station='mt01', channel=channel,
+                                    tmin=.3, deltat=.01,
+                                    ydata=np.random.randn(5000)+5)
+                        for channel in ['ex', 'ey', 'hz']]
+
+    def assert_same_traces(self, tr_list, ref_list):
+        self.assertEqual(len(tr_list), len(ref_list))
+        for tr, ref in zip(tr_list, ref_list):
+            self.assertEqual(tr.nslc_id, ref.nslc_id)
+            self.assertEqual(tr.deltat, ref.deltat)
+            self.assertAlmostEqual(tr.tmin, ref.tmin, places=9)
+            self.assertAlmostEqual(tr.tmax, ref.tmax, places=9)
+            self.assertTrue(np.allclose(tr.ydata, ref.ydata, atol=1e-10))
+
+    def test_filter_traces(self):
+        # the same as filtering each trace on its own, after removing the
+        # mean once
+        steps = [('highpass', 4, .05), ('lowpass', 4, 10.),
+                 ('bandpass', 2, .1, 5.), ('downsample', 2),
+                 ('downsample_to', .12)]
+        ydata_list = [tr.ydata.copy() for tr in self.tr_list]
+        out_list, finals = trace.filter_traces(self.tr_list, steps,
+                                               snap=True)
+        self.assertTrue(finals is None)
+
+        ref_list = []
+        for tr, ydata in zip(self.tr_list, ydata_list):
+            self.assertTrue(np.array_equal(tr.ydata, ydata))
+            ref = tr.copy()
+            ref.ydata = ref.ydata-ref.ydata.mean()
+            ref.highpass(4, .05, demean=False)
+            ref.lowpass(4, 10., demean=False)
+            ref.bandpass(2, .1, 5., demean=False)
+            ref.downsample(2, snap=True, demean=False)
+            ref.downsample_to(.12, snap=True, demean=False)
+            ref_list.append(ref)
+        self.assert_same_traces(out_list, ref_list)
+
+    def test_initials(self):
+        # chunk by chunk with the final filter states carried over
+        steps = [('downsample_to', .06), ('downsample', 2)]
+        finals = True
+        ref_finals = [([True]*5, True) for tr in self.tr_list]
+        for ii in range(0, 5000, 1200):
+            chunk_list = [tr.chop(tr.tmin+ii*.01,
+                                  tr.tmin+min(ii+1200, 5000)*.01,
+                                  inplace=False)
+                          for tr in self.tr_list]
+            out_list, finals = trace.filter_traces(chunk_list, steps,
+                                                   initials=finals,
+                                                   demean=False)
+            for jj, ref in enumerate(chunk_list):
+                finals_to, finals_2 = ref_finals[jj]
+                ref_finals[jj] = (ref.downsample_to(.06, initials=finals_to,
+                                                    demean=False),
+                                  ref.downsample(2, initials=finals_2,
+                                                 demean=False))
+            self.assert_same_traces(out_list, chunk_list)
+
+def _peaks_reference(tr, threshold, tsearch, deadtime=False,
+                     nblock_duration_detection=100):
+    """
+    Trace.peaks as it was before the search windows were vectorized, one
+    argmax per threshold crossing and the deadtime searched block by block
+    """
+
+    y = tr.ydata
+    above = np.where(y > threshold, 1, 0)
+    deriv = np.zeros(y.size, dtype=np.int8)
+    deriv[1:] = above[1:]-above[:-1]
+    tpeaks, apeaks, tzeros = [], [], []
+    tzero = tr.tmin
+    for ibeg in np.nonzero(deriv > 0)[0]:
+        iend = min(len(y), ibeg+int(tsearch/tr.deltat))
+        ipeak = np.argmax(y[ibeg:iend])
+        tpeak = tr.tmin+(ipeak+ibeg)*tr.deltat
+        if tpeak < tzero:
+            continue
+
+        if deadtime:
+            nblock = nblock_duration_detection
+            iblock = 0
+            totalsum = 0.
+            while True:
+                if ibeg+iblock*nblock >= len(y):
+                    tzero = tr.tmin+(len(y)-1)*tr.deltat
+                    break
+                logy = np.log(y[ibeg+iblock*nblock:ibeg+(iblock+1)*nblock])
+                logy[0] += totalsum
+                ysum = np.cumsum(logy)
+                totalsum = ysum[-1]
+                below = np.where(ysum <= 0., 1, 0)
+                deriv_sum = np.zeros(ysum.size, dtype=np.int8)
+                deriv_sum[1:] = below[1:]-below[:-1]
+                izero_positions = np.nonzero(deriv_sum > 0)[0]+iblock*nblock
+                if len(izero_positions) > 0:
+                    tzero = tr.tmin+(ibeg+izero_positions[0])*tr.deltat
+                    break
+                iblock += 1
+        else:
+            tzero = ibeg*tr.deltat+tr.tmin+tsearch
+
+        tpeaks.append(tpeak)
+        apeaks.append(y[ibeg+ipeak])
+        tzeros.append(tzero)
+
+    if deadtime:
+        return tpeaks, apeaks, tzeros
+    return tpeaks, apeaks
+
+@unittest.skipIf(trace is None, 'mtpy.processing.trace needs pyrocko')
+class TestPeaks(unittest.TestCase):
+
+    def setUp(self):
+        # lognormal noise crosses the threshold often and its log sums to
+        # zero now and then, which ends the deadtime
+        np.random.seed(3)
+        self.ydata_list = [np.exp(.7*np.random.randn(2000)),
+                           np.random.randint(0, 5, 2000)+.5,
+                           np.abs(np.cumsum(np.random.randn(2000)))+.01]
+
+    def test_peaks(self):
+        for ydata in self.ydata_list:
+            for tsearch in [.01, .057, .5, 3.]:
+                for deadtime, nblock in [(False, 100), (True, 100),
+                                         (True, 7), (True, 1)]:
+                    tr = trace.Trace(station='mt01', channel='ex',
+                                     tmin=12.3, deltat=.01,
+                                     ydata=ydata.copy())
+                    result = tr.peaks(1.5, tsearch, deadtime=deadtime,
+                                      nblock_duration_detection=nblock)
+                    ref = _peaks_reference(tr, 1.5, tsearch,
+                                           deadtime=deadtime,
+                                           nblock_duration_detection=nblock)
+                    self.assertTrue(len(ref[0]) > 0)
+                    self.assertEqual([list(rr) for rr in result],
+                                     [list(rr) for rr in ref])
+
+    def test_sta_lta_peaks(self):
+        # spikes in noise, one trace shorter than the long window
+        ydata_list = []
+        for ii in range(3):
+            ydata_list.append(np.exp(.3*np.random.randn(2000)))
+            ydata_list[ii][100*(ii+1)::300] = 20.
+        tr_list = [trace.Trace(station='mt01', channel=channel, deltat=.01,
+                               ydata=ydata.copy())
+                   for channel, ydata in zip(['ex', 'ey', 'hz'], ydata_list)]
+        tr_list.append(trace.Trace(station='mt01', channel='hx', deltat=.01,
+                                   ydata=np.ones(50)))
+        result_list = trace.sta_lta_peaks(tr_list, .1, 2., .3, .5)
+        self.assertEqual(result_list[-1], ([], []))
+        for tr, ydata, result in zip(tr_list, ydata_list, result_list):
+            self.assertTrue(np.array_equal(tr.ydata, ydata))
+            ref = tr.copy()
+            ref.sta_lta_centered(.1, 2.)
+            ref_result = _peaks_reference(ref, .3, .5)
+            self.assertTrue(len(ref_result[0]) > 0)
+            self.assertEqual([list(rr) for rr in result],
+                             [list(rr) for rr in ref_result])
+
+
+if __name__ == '__main__':
+    unittest.main()
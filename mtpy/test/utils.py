@@ -1,7 +1,12 @@
 import unittest
 from mtpy.utils import *
+import os
+import json
 import tempfile
 import numpy as np
+import mtpy.test.fixtures as fixtures
+import mtpy.utils.filehandling as filehandling
+import mtpy.utils.timing as timing
 
 class TestFilehandling(unittest.TestCase):
 
@@ -73,6 +78,164 @@ class TestFilehandling(unittest.TestCase):
     #         self.assertTrue(element in self.seq)
 
 
+class TestTiming(fixtures.TempDirTestCase):
+
+    def setUp(self):
+        super(TestTiming, self).setUp()
+        self.registry = timing.StageRegistry(enabled=True, track_memory=True,
+                                             profile=['outer'],
+                                             profile_path=self.save_path)
+
+    def test_stages(self):
+        @self.registry.timed('inner')
+        def inner(n_bytes):
+            self.registry.add_read(n_bytes)
+            return np.ones(10**6).sum()
+
+        with self.registry.stage('outer', station='mt01') as record:
+            self.assertEqual(inner(100), 10**6)
+            inner(50)
+            record.add_written(25)
+        self.assertRaises(TypeError, inner, None)
+
+        s_dict = self.registry.summary()
+        self.assertEqual(s_dict.keys(), ['inner', 'outer'])
+        self.assertEqual(s_dict['inner']['count'], 3)
+        self.assertEqual(s_dict['inner']['errors'], 1)
+        self.assertEqual(s_dict['inner']['bytes_read'], 150)
+        self.assertEqual(s_dict['outer']['bytes_written'], 25)
+
+        outer = self.registry.get_records('outer')[0]
+        self.assertEqual(outer.info, {'station':'mt01'})
+        self.assertTrue(outer.wall_time >= s_dict['inner']['wall_time'])
+        self.assertTrue(os.path.isfile(outer.profile_fn))
+        self.assertEqual([rr.parent for rr in
+                          self.registry.get_records('inner')],
+                         ['outer', 'outer', None])
+
+        json_fn = self.registry.write_json(os.path.join(self.save_path,
+                                                        'timing.json'))
+        self.assertEqual(len(json.load(open(json_fn))['records']), 4)
+        csv_fn = self.registry.write_csv(os.path.join(self.save_path,
+                                                      'timing.csv'))
+        self.assertEqual(len(open(csv_fn).readlines()), 5)
+
+    def test_disabled(self):
+        # the default registry records nothing
+        registry = timing.StageRegistry()
+        self.assertFalse(registry.enabled)
+        self.assertFalse(registry.track_memory)
+        func = registry.timed('func')(lambda x: x + 1)
+        self.assertEqual(func(1), 2)
+        with registry.stage('outer'):
+            func(2)
+        self.assertEqual(len(registry.records), 0)
+        self.assertEqual(registry.summary(), {})
+
+    def test_max_records(self):
+        # old records are dropped, the summary still counts them
+        registry = timing.StageRegistry(enabled=True, max_records=3)
+        func = registry.timed('func')(lambda x: x + 1)
+        for ii in range(5):
+            func(ii)
+        self.assertEqual(len(registry.records), 3)
+        self.assertEqual(registry.summary()['func']['count'], 5)
+        registry.clear()
+        self.assertEqual(registry.summary(), {})
+
+    def test_file_stages(self):
+        # writing and reading a time series file is recorded in the registry
+        ts_fn = os.path.join(self.save_path, 'mt01.ex')
+        self.addCleanup(setattr, timing.registry, 'enabled',
+                        timing.registry.enabled)
+        self.addCleanup(timing.registry.clear)
+        timing.registry.clear()
+        timing.enable()
+        ts_fn = filehandling.write_ts_file_from_tuple(ts_fn,
+                                ('mt01', 'ex', 256., 0., 100, 'mV', 40.,
+                                 -120., 0., np.random.randn(100)))
+        filehandling.read_ts_file(ts_fn)
+        s_dict = timing.registry.summary()
+        self.assertEqual(s_dict['filehandling.write_ts_file']['bytes_written'],
+                         os.path.getsize(ts_fn))
+        self.assertEqual(s_dict['filehandling.read_ts_file']['bytes_read'],
+                         os.path.getsize(ts_fn))
+
+
+class TestMergePeriods(fixtures.QuietTestCase):
+
+    def setUp(self):
+        super(TestMergePeriods, self).setUp()
+        np.random.seed(0)
+        self.periods = 10**np.random.uniform(-3, 3, 200)
+
+    def test_regular_periods(self):
+        import mtpy.utils.merge_periods as merge_periods
+        bin_periods, bin_min, bin_max = merge_periods.get_period_bins(
+                                         self.periods, 15, no_periods=20,
+                                         t_min=1e-2, t_max=1e2)
+        new_list = merge_periods.regular_periods(self.periods, 15,
+                                                 no_periods=20, t_min=1e-2,
+                                                 t_max=1e2)[0]
+        # the last bin that contains the period, as in a loop over the bins
+        for period, new_p in zip(self.periods, new_list):
+            bin_index = [ii for ii in range(20)
+                         if bin_min[ii] <= period <= bin_max[ii]]
+            if len(bin_index) == 0:
+                self.assertTrue(new_p is None)
+            else:
+                self.assertEqual(new_p, round(bin_periods[bin_index[-1]], 5))
+
+        # t_min above the longest period gives decreasing bins
+        bin_periods, bin_min, bin_max = merge_periods.get_period_bins(
+                                         self.periods, 15, no_periods=20,
+                                         t_min=1e4)
+        self.assertTrue(np.all(np.diff(bin_min) < 0))
+        periods = 10**np.random.uniform(2.5, 4.5, 200)
+        bin_index = merge_periods.get_bin_index(periods, bin_min, bin_max)
+        self.assertTrue((bin_index >= 0).sum() > 100)
+        for period, index in zip(periods, bin_index):
+            in_bin = [ii for ii in range(20)
+                      if bin_min[ii] <= period <= bin_max[ii]]
+            if len(in_bin) == 0:
+                self.assertEqual(index, -1)
+            else:
+                self.assertEqual(index, in_bin[-1])
+        self.assertRaises(ValueError, merge_periods.get_bin_index,
+                          self.periods, bin_min[[0, 2, 1]],
+                          bin_max[[0, 2, 1]])
+
+        # clusters start at the shortest period not in a cluster yet
+        cluster_list = merge_periods.merge_periods(self.periods, 10)
+        sorted_periods = np.sort(self.periods)
+        self.assertEqual(cluster_list[0], sorted_periods[0])
+        for period, cluster in zip(sorted_periods, cluster_list):
+            self.assertTrue(cluster <= period <= cluster*1.1)
+
+    def test_common_periods(self):
+        import mtpy.utils.merge_periods as merge_periods
+        period_dict = {'mt01':self.periods[0:100],
+                       'mt02':self.periods[100:150]*10}
+        common_periods, index_dict = merge_periods.get_common_periods(
+                                                            period_dict,
+                                                            no_periods=30)
+        self.assertTrue(np.all(np.diff(common_periods) > 0))
+
+        # the same bins as regular_periods for all periods together
+        all_periods = np.concatenate([period_dict['mt01'],
+                                      period_dict['mt02']])
+        new_list = merge_periods.regular_periods(all_periods,
+                                                 no_periods=30)[0]
+        index = np.concatenate([index_dict['mt01'], index_dict['mt02']])
+        self.assertEqual(len(index), len(all_periods))
+        for ii, new_p in zip(index, new_list):
+            if new_p is None:
+                self.assertEqual(ii, -1)
+            else:
+                self.assertEqual(round(common_periods[ii], 5), new_p)
+        self.assertEqual(len(common_periods),
+                         len(np.unique(index[index >= 0])))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -21,16 +21,20 @@ import scipy.signal as sps
 import time
 import datetime
 import os
+import errno
 import struct
 import string
 import win32api
 import shutil
 from collections import Counter
+from multiprocessing.pool import ThreadPool
 import mtpy.utils.filehandling as mtfh
 import mtpy.processing.birrp as birrp
 import mtpy.utils.configfile as mtcfg
 import mtpy.utils.exceptions as mtex
 import mtpy.utils.configfile as mtcf
+import mtpy.utils.timing as timing
+import mtpy.utils.parallel as mtparallel
 import matplotlib.pyplot as plt
 import mtpy.imaging.plotspectrogram as plotspectrogram
 import mtpy.imaging.plotnresponses as plotnresponses
@@ -798,6 +802,7 @@ class Zen3D(object):
         self.metadata.read_metadata(fn=self.fn, fid=fid)
     
     #======================================    
+    @timing.timed('zen.read_z3d')
     def read_z3d(self):
         """
         read in z3d file and populate attributes accordingly
@@ -827,6 +832,7 @@ class Zen3D(object):
         
         #get the file size to get an estimate of how many data points there are
         file_size = os.path.getsize(self.fn)
+        timing.add_read(file_size)
         
         # using the with statement works in Python versions 2.7 or higher
         # the added benefit of the with statement is that it will close the
@@ -1225,6 +1231,7 @@ class Zen3D(object):
                     mtfilt.adaptive_notch_filter(self.time_series, **kwargs) 
         
     #==================================================
+    @timing.timed('zen.write_ascii_mt_file')
     def write_ascii_mt_file(self, save_fn=None, save_station='mb', fmt='%.8e',
                             ex=100., ey=100., notch_dict=None):
         """
@@ -1281,7 +1288,12 @@ class Zen3D(object):
         if save_fn is None:
             svfn_directory = os.path.join(os.path.dirname(self.fn), 'TS')
             if not os.path.exists(svfn_directory):
-                os.mkdir(svfn_directory)
+                # channels can be written by concurrent threads
+                try:
+                    os.mkdir(svfn_directory)
+                except OSError as error:
+                    if error.errno != errno.EEXIST:
+                        raise
                 
             svfn_date = ''.join(self.schedule.Date.split('-'))
             svfn_time = ''.join(self.schedule.Time.split(':'))
@@ -2485,6 +2497,322 @@ class Zen3D_old(object):
         
         return fig, ax
         
+#==============================================================================
+# Collection of Z3D files from one schedule block
+#==============================================================================
+class Z3D_Collection(object):
+    """
+    Read all the channels of a single schedule block at once and line them
+    up in time so they can be written to a cache file or to mtpy time series
+    files.
+    
+    The channels are read concurrently with a bounded pool of worker threads,
+    reading a Z3D file is mostly disk access and numpy work so threads keep
+    the channels in memory without having to pickle large arrays between
+    processes.  The channels are then aligned on integer GPS seconds using
+    sorted searches of the time stamps and can be decimated with a polyphase
+    filter (scipy.signal.resample_poly) instead of an FFT resample.
+    
+    Each stage is timed in the mtpy.utils.timing registry when it is
+    enabled.
+    
+    Arguments
+    -----------
+        **fn_list** : list
+                      list of full paths to .Z3D files of one schedule block
+                      
+        **max_workers** : int
+                          maximum number of threads used to read and write
+                          files. *default* is the number of files or the 
+                          number of cpus, whichever is smaller.
+    
+    ======================== ==================================================
+    Attributes               Description
+    ======================== ==================================================
+    chn_order                order of channels in the collection 
+                             *default* is ['hx', 'hy', 'hz', 'ex', 'ey']
+    df                       sampling rate of the aligned time series
+    fn_list                  list of Z3D files in the collection
+    max_workers              number of worker threads
+    n_points                 number of points in aligned time series
+    start_date_time          common start time of all channels in GPS time
+                             as YYYY-MM-DD,hh:mm:ss
+    ts                       np.ndarray(n_points, n_channels) of aligned 
+                             time series in counts
+    verbose                  [ True | False ] print alignment information
+    z3d_list                 list of Zen3D objects in channel order
+    ======================== ==================================================
+    
+    ======================== ==================================================
+    Methods                  Description
+    ======================== ==================================================
+    align_time_series        align all channels to a common start time and
+                             trim to a common length
+    check_sampling_rate      make sure all channels have the same sampling 
+                             rate
+    decimate_time_series     decimate the aligned time series with a 
+                             polyphase filter
+    read_z3d_files           read in all Z3D files concurrently
+    write_ascii_mt_files     write mtpy ascii time series files for each
+                             channel concurrently
+    ======================== ==================================================
+    
+    Example
+    -------------
+        >>> import mtpy.usgs.zen as zen
+        >>> fn_list = [r"/home/mt/mt01/mt01_20150522_080000_256_EX.Z3D",
+        >>> ...        r"/home/mt/mt01/mt01_20150522_080000_256_HX.Z3D"]
+        >>> z3d_block = zen.Z3D_Collection(fn_list, max_workers=5)
+        >>> z3d_block.read_z3d_files()
+        >>> z3d_block.align_time_series()
+        >>> z3d_block.decimate_time_series(4)
+        >>> z3d_block.write_ascii_mt_files(notch_dict={})
+    """
+    
+    def __init__(self, fn_list=None, **kwargs):
+        
+        self.fn_list = fn_list
+        self.max_workers = kwargs.pop('max_workers', None)
+        self.verbose = kwargs.pop('verbose', True)
+        self.chn_order = kwargs.pop('chn_order', ['hx', 'hy', 'hz', 'ex', 'ey'])
+        
+        self.z3d_list = None
+        self.ts = None
+        self.df = None
+        self.n_points = None
+        self.start_date_time = None
+        
+    def _get_pool(self, n_jobs):
+        """
+        get a bounded pool of worker threads
+        """
+        return ThreadPool(processes=mtparallel.get_n_processes(n_jobs,
+                                                        self.max_workers))
+        
+    def _sort_fn_list(self, fn_list):
+        """
+        sort the file list into channel order, files that do not match a 
+        channel are put at the end
+        """
+        
+        def chn_index(fn):
+            fn_cmp = os.path.splitext(os.path.basename(fn))[0].lower()
+            for ii, cs in enumerate(self.chn_order):
+                if fn_cmp.endswith(cs):
+                    return ii
+            return len(self.chn_order)
+            
+        return sorted(fn_list, key=chn_index)
+        
+    def _read_z3d_file(self, fn):
+        """
+        read a single Z3D file, used by the worker threads
+        """
+        z3d_obj = Zen3D(fn)
+        z3d_obj.read_z3d()
+        
+        return z3d_obj
+        
+    @timing.timed('zen.read_z3d_files')
+    def read_z3d_files(self, fn_list=None):
+        """
+        read in all the Z3D files concurrently with a pool of threads
+        
+        Arguments
+        -------------
+            **fn_list** : list
+                          list of full paths to Z3D files
+                          
+        Returns
+        ------------
+            **z3d_list** : list
+                           list of Zen3D objects in channel order
+        """
+        
+        if fn_list is not None:
+            self.fn_list = fn_list
+            
+        if self.fn_list is None or len(self.fn_list) == 0:
+            raise ZenInputFileError('No Z3D files to read in')
+            
+        self.fn_list = self._sort_fn_list(self.fn_list)
+        
+        pool = self._get_pool(len(self.fn_list))
+        try:
+            self.z3d_list = pool.map(self._read_z3d_file, self.fn_list)
+        finally:
+            pool.close()
+            pool.join()
+            
+        self.check_sampling_rate()
+        
+        return self.z3d_list
+            
+    def check_sampling_rate(self):
+        """
+        check to make sure the sampling rate is the same for all channels
+        
+        Raises ZenSamplingRateError if they are not the same
+        """
+        
+        df_arr = np.array([z3d_obj.df for z3d_obj in self.z3d_list])
+        if np.any(df_arr != df_arr[0]):
+            bad_fn = [z3d_obj.fn for z3d_obj in self.z3d_list
+                      if z3d_obj.df != df_arr[0]]
+            raise ZenSamplingRateError('Sampling rates are not the same for '
+                                       'all channels, check file(s) '
+                                       '{0}'.format(', '.join(bad_fn)))
+        self.df = df_arr[0]
+        
+    @timing.timed('zen.align_time_series')
+    def align_time_series(self):
+        """
+        align all channels to the latest first GPS second, trim them to the 
+        same number of points and stack them into self.ts.
+        
+        The GPS stamps are rounded to integer seconds and the common start 
+        is found in each channel with a sorted search.  The number of 
+        points to skip is the cumulative sum of the block lengths up to that
+        stamp.  Channels that do not contain the common start second are
+        dropped from the collection.
+        
+        Returns
+        -----------
+            **ts** : np.ndarray(n_points, n_channels)
+                     aligned time series in counts
+        """
+        
+        gps_sec_list = [np.round(z3d_obj.gps_stamps['time']).astype(np.int64)
+                        for z3d_obj in self.z3d_list]
+        time_start = max([gps_sec[0] for gps_sec in gps_sec_list])
+        
+        skip_list = []
+        z3d_list = []
+        for z3d_obj, gps_sec in zip(self.z3d_list, gps_sec_list):
+            s_index = np.searchsorted(gps_sec, time_start)
+            if s_index >= gps_sec.size or gps_sec[s_index] != time_start:
+                print '***SKIPPING {0} '.format(z3d_obj.fn)
+                print '   because it does not contain GPS time {0}'.format(
+                                                                  time_start)
+                continue
+            skip_list.append(
+                    int(z3d_obj.gps_stamps['block_len'][1:s_index+1].sum()))
+            z3d_list.append(z3d_obj)
+            
+        if len(z3d_list) == 0:
+            raise ZenGPSError('Could not find a common GPS time for channels')
+            
+        self.z3d_list = z3d_list
+        skip_arr = np.array(skip_list)
+        len_arr = np.array([z3d_obj.time_series.size 
+                            for z3d_obj in self.z3d_list])
+        self.n_points = int((len_arr-skip_arr).min())
+        
+        z3d_0 = self.z3d_list[0]
+        self.start_date_time = z3d_0.get_UTC_date_time(z3d_0.header.gpsweek,
+                                                       time_start+\
+                                                       z3d_0._leap_seconds)
+        
+        self.ts = np.zeros((self.n_points, len(self.z3d_list)))
+        for ii, (z3d_obj, skip) in enumerate(zip(self.z3d_list, skip_arr)):
+            self.ts[:, ii] = z3d_obj.time_series[skip:skip+self.n_points]
+            z3d_obj.time_series = self.ts[:, ii]
+            z3d_obj.zen_schedule = self.start_date_time
+            z3d_obj.schedule.Date = self.start_date_time.split(',')[0]
+            z3d_obj.schedule.Time = self.start_date_time.split(',')[1]
+            
+        if self.verbose:
+            print '    T0 = {0} (GPS time)'.format(self.start_date_time)
+            print '    TS length = {0}'.format(self.n_points)
+            
+        return self.ts
+        
+    @timing.timed('zen.decimate_time_series')
+    def decimate_time_series(self, decimate=1):
+        """
+        decimate the aligned time series along the time axis with a 
+        polyphase anti-aliasing filter.
+        
+        Arguments
+        -------------
+            **decimate** : int
+                           decimation factor
+                           
+        Returns
+        -----------
+            **ts** : np.ndarray(n_points/decimate, n_channels)
+                     decimated time series
+        """
+        
+        decimate = int(decimate)
+        if decimate <= 1:
+            return self.ts
+            
+        if self.ts is None:
+            self.align_time_series()
+            
+        # resample_poly is only in newer versions of scipy
+        if hasattr(sps, 'resample_poly'):
+            self.ts = sps.resample_poly(self.ts, 1, decimate, axis=0)
+        else:
+            self.ts = sps.decimate(self.ts, decimate, ftype='fir', axis=0)
+        self.n_points = self.ts.shape[0]
+        self.df = self.df/float(decimate)
+        
+        for ii, z3d_obj in enumerate(self.z3d_list):
+            z3d_obj.time_series = self.ts[:, ii]
+            z3d_obj.df = self.df
+        
+        return self.ts
+        
+    def _write_ascii_mt_file(self, write_args):
+        """
+        write a single mtpy ascii file, used by the worker threads
+        """
+        z3d_obj, kwargs = write_args
+        z3d_obj.write_ascii_mt_file(**kwargs)
+        
+        return z3d_obj.fn_mt_ascii
+        
+    @timing.timed('zen.write_ascii_mt_files')
+    def write_ascii_mt_files(self, save_station='mb', fmt='%.8e', ex=100., 
+                             ey=100., notch_dict=None):
+        """
+        write mtpy ascii time series files for all channels concurrently.
+        
+        See Zen3D.write_ascii_mt_file for a description of the arguments.
+        
+        Returns
+        -----------
+            **fn_mt_list** : list
+                             list of full paths to mtpy time series files
+        """
+        
+        if self.ts is None:
+            self.align_time_series()
+            
+        write_list = []
+        for z3d_obj in self.z3d_list:
+            # the notch dictionary gets popped so each channel needs a copy
+            if notch_dict is not None:
+                z_notch_dict = dict(notch_dict)
+            else:
+                z_notch_dict = None
+            write_list.append((z3d_obj, {'save_station':save_station,
+                                         'fmt':fmt, 
+                                         'ex':ex, 
+                                         'ey':ey,
+                                         'notch_dict':z_notch_dict}))
+        
+        pool = self._get_pool(len(write_list))
+        try:
+            fn_mt_list = pool.map(self._write_ascii_mt_file, write_list)
+        finally:
+            pool.close()
+            pool.join()
+        
+        return fn_mt_list
+        
 #==============================================================================
 # Cache files
 #==============================================================================
@@ -3023,56 +3351,71 @@ class ZenCache(object):
         return ts_array, ts_min
     
     #==================================================    
-    def write_cache_file(self, fn_list, save_fn, station='ZEN', decimate=1):
+    @timing.timed('zen.write_cache_file')
+    def write_cache_file(self, fn_list, save_fn, station='ZEN', decimate=1,
+                         max_workers=None):
         """
         write a cache file from given filenames
         
+        The channels are read concurrently and aligned with a 
+        Z3D_Collection, see that class for details.
+        
+        Arguments
+        -------------
+            **fn_list** : list
+                          list of Z3D files of one schedule block
+                          
+            **save_fn** : string
+                          full path to .cac file or directory to save to
+                          
+            **station** : string
+                          station name used for the file name
+                          
+            **decimate** : int
+                           decimation factor, uses a polyphase filter
+                           
+            **max_workers** : int
+                              maximum number of threads used to read files
+        
         """
-        #sort the files so they are in order
-        fn_sort_list = []
-        for cs in self.chn_order:
-            for fn in fn_list:
-                if cs in fn.lower():
-                    fn_sort_list.append(fn)
-
-        fn_list = fn_sort_list
-        print fn_list
+        
+        z3d_block = Z3D_Collection(fn_list, max_workers=max_workers,
+                                   verbose=self.verbose,
+                                   chn_order=self.chn_order)
+        z3d_block.read_z3d_files()
+        self.fn_list = z3d_block.fn_list
+        if self.verbose:
+            print self.fn_list
             
-        n_fn = len(fn_list)
-        self.zt_list = []
-        for fn in fn_list:
-            zt1 = Zen3D(fn=fn)
-            zt1.verbose = self.verbose
-            try:
-                zt1.read_3d()
-            except ZenGPSError:
-                zt1._seconds_diff = 59
-                zt1.read_3d()
-            self.zt_list.append(zt1)
-        
-            #fill in meta data from the time series file
-            self.meta_data['DATA.DATE0'] = ','+zt1.date_time[0].split(',')[0]
-            self.meta_data['DATA.TIME0'] = ','+zt1.date_time[0].split(',')[1]
-            self.meta_data['TS.ADFREQ'] = ',{0}'.format(int(zt1.df))
+        #make sure the length of time series is the same for all channels
+        z3d_block.align_time_series()
+        z3d_block.decimate_time_series(decimate)
+        self.zt_list = z3d_block.z3d_list
+        self.ts = z3d_block.ts
+        ts_len = z3d_block.n_points
+        n_fn = len(self.zt_list)
+        
+        #fill in meta data from the time series file
+        self.meta_data['DATA.DATE0'] = ','+\
+                                    z3d_block.start_date_time.split(',')[0]
+        self.meta_data['DATA.TIME0'] = ','+\
+                                    z3d_block.start_date_time.split(',')[1]
+        self.meta_data['TS.ADFREQ'] = ',{0}'.format(int(z3d_block.df))
+        for zt1 in self.zt_list:
             self.meta_data['CH.FACTOR'] += ','+self._ch_factor 
             self.meta_data['CH.GAIN'] += ','+self._ch_gain
-            self.meta_data['CH.CMP'] += ','+zt1.ch_cmp.upper()
-            self.meta_data['CH.LENGTH'] += ','+zt1.ch_length
+            self.meta_data['CH.CMP'] += ','+zt1.metadata.ch_cmp.upper()
+            self.meta_data['CH.LENGTH'] += ',{0}'.format(zt1.metadata.ch_length)
             self.meta_data['CH.EXTGAIN'] += ',1'
             self.meta_data['CH.NOTCH'] += ',NONE'
             self.meta_data['CH.HIGHPASS'] += ',NONE'
             self.meta_data['CH.LOWPASS'] += ','+\
-                                       self._ch_lowpass_dict[str(int(zt1.df))]
-            self.meta_data['CH.ADCARDSN'] += ','+zt1.ch_adcard_sn
-            self.meta_data['CH.NUMBER'] += ',{0}'.format(zt1.ch_number)
-            self.meta_data['RX.STN'] += ','+zt1.rx_stn
-            
-        #make sure all files have the same sampling rate
-        self.check_sampling_rate(self.zt_list)
-        
-        #make sure the length of time series is the same for all channels
-        self.ts, ts_len = self.check_time_series(self.zt_list,
-                                                 decimate=decimate)
+                           self._ch_lowpass_dict.get(str(int(zt1.header.ad_rate)),
+                                                     'NONE')
+            self.meta_data['CH.ADCARDSN'] += ',{0}'.format(
+                                                    zt1.header.channelserial)
+            self.meta_data['CH.NUMBER'] += ',{0}'.format(zt1.metadata.ch_number)
+            self.meta_data['RX.STN'] += ','+zt1.metadata.rx_xyz0.split(':')[0]
         
         self.meta_data['TS.NPNT'] = ',{0}'.format(ts_len)
         
@@ -3095,7 +3438,6 @@ class ZenCache(object):
             self.save_fn = os.path.join(save_fn, general_fn)
                 
                 
-            
         cfid = file(self.save_fn, 'wb+')
         #--> write navigation records first        
         cfid.write(struct.pack('<i', self._nav_len))
@@ -3137,21 +3479,18 @@ class ZenCache(object):
         ts_block_len = int(ts_len)*n_fn*4+2
         
         #--> Need to scale the time series into counts cause that is apparently
-        #    what MTFT24 expects
-        self.ts = self.ts.astype(np.int32)
-        
-        #--> make sure none of the data is above the allowed level
-        self.ts[np.where(self.ts>2.14e9)] = 2.14e9
-        self.ts[np.where(self.ts<-2.14e9)] = -2.14e9
+        #    what MTFT24 expects, make sure none of the data is above the 
+        #    allowed level before converting
+        self.ts = np.clip(self.ts, -2.14e9, 2.14e9).astype(np.int32)
         
         #--> write time series block
         cfid.write(struct.pack('<i', ts_block_len))
         cfid.write(struct.pack('<i', self._flag))
         cfid.write(struct.pack('<h', self._type_dict['ts']))
         
-        #--> need to pack the data as signed integers
-        for zz in range(ts_len):
-            cfid.write(struct.pack('<'+'i'*n_fn, *self.ts[zz]))
+        #--> need to pack the data as little endian signed integers, the 
+        #    array is written row by row so channels are interleaved
+        cfid.write(self.ts.astype('<i4').tostring())
                                 
         cfid.write(struct.pack('<i', ts_block_len))
          
@@ -3226,8 +3565,7 @@ class ZenCache(object):
         cfid.write(struct.pack('<i', ts_block_len))
         cfid.write(struct.pack('<i', self._flag))
         cfid.write(struct.pack('<h', self._type_dict['ts']))
-        for zz in range(self.ts.shape[0]):
-            cfid.write(struct.pack('<'+'i'*n_fn, *self.ts[zz]))
+        cfid.write(self.ts.astype('<i4').tostring())
                                 
         cfid.write(struct.pack('<i', ts_block_len))
                  
@@ -4800,12 +5138,18 @@ class Z3D_to_edi(object):
         
         return s_dict
         
+    @timing.timed('zen.make_mtpy_ascii_files')
     def make_mtpy_ascii_files(self, station_dir=None, fmt='%.8', 
                               station_name='mb', notch_dict={},
-                              df_list=None, max_blocks=3, ex=100., ey=100.,): 
+                              df_list=None, max_blocks=3, ex=100., ey=100.,
+                              max_workers=None): 
         """
         makes mtpy_mt files from .Z3D files
         
+        The files are sorted into schedule blocks from their headers, then
+        all channels of a block are read concurrently, aligned to a common
+        start time and written with a Z3D_Collection.
+        
         Arguments:
         -----------
             **dirpath** : full path to .Z3D files
@@ -4814,6 +5158,9 @@ class Z3D_to_edi(object):
             
             **fmt** : format of data numbers for mt_files
             
+            **max_workers** : maximum number of threads used to read and
+                              write the channels of a schedule block
+            
         Outputs:
         --------
             **fn_arr** : np.ndarray(file, length, df, start_dt)
@@ -4835,6 +5182,25 @@ class Z3D_to_edi(object):
             raise IOError('Could not find any .Z3D files in {0}'.format(
                             self.station_dir))
                             
+        # sort the files into schedule blocks from the headers, which are 
+        # quick to read
+        block_dict = {}
+        for fn in fn_list:
+            zd = Zen3D(fn)
+            zd.read_header()
+            zd.read_schedule()
+            if df_list is not None and zd.header.ad_rate not in df_list:
+                continue
+            block_key = (zd.header.ad_rate, zd.zen_schedule)
+            block_dict.setdefault(block_key, []).append(fn)
+            
+        # only keep max_blocks schedule blocks for each sampling rate
+        block_list = []
+        for df in sorted(set([b_key[0] for b_key in block_dict.keys()])):
+            df_blocks = sorted([b_key for b_key in block_dict.keys()
+                                if b_key[0] == df], key=lambda b_key: b_key[1])
+            block_list += df_blocks[0:max_blocks]
+                            
         # make an array that has all the information about each file
         fn_arr = np.zeros(len(fn_list), 
                           dtype=[('station','|S6'), 
@@ -4844,60 +5210,50 @@ class Z3D_to_edi(object):
                                  ('comp','|S2'),
                                  ('fn','|S100')])
         fn_lines = []
-        z3d_count = 0             
-        for ii, fn in enumerate(fn_list):
-            if z3d_count > len(df_list)*self.num_comp*max_blocks-1:
-                   break
-            if df_list is not None:
-               zd = Zen3D(fn)
-               zd.read_header()
-               
-               
-               if zd.header.ad_rate in df_list:
-                   zd.read_z3d()
-                   z3d_count += 1
-
-               else:
-                   continue
-            else:
-                zd = Zen3D(fn)
-                zd.read_z3d()
-            
-            if zd.metadata.ch_cmp.lower() == 'hx':
-                self.survey_config.hx = zd.metadata.ch_number
-            if zd.metadata.ch_cmp.lower() == 'hy':
-                self.survey_config.hy = zd.metadata.ch_number
-            if zd.metadata.ch_cmp.lower() == 'hz':
-                self.survey_config.hz = zd.metadata.ch_number
-            if zd.metadata.ch_cmp.lower() == 'ex':
-                self.survey_config.e_xaxis_length = zd.metadata.ch_length
-            if zd.metadata.ch_cmp.lower() == 'ey':
-                self.survey_config.e_yaxis_length = zd.metadata.ch_length
-
-            # get station configuration from the first Z3D file            
-            if ii == 0:
-                self.survey_config.lat = zd.header.lat
-                self.survey_config.lon = zd.header.long
-                self.survey_config.date = zd.schedule.Date.replace('-','/')
-                self.survey_config.box = int(zd.header.box_number)
-            
-            #write mtpy mt file
-            zd.write_ascii_mt_file(notch_dict=notch_dict, ex=ex, ey=ey)
-            
-            #create lines to write to a log file                       
-            station = zd.metadata.rx_xyz0.split(':')[0]
-            fn_arr[ii]['station'] = '{0}{1}'.format(station_name, station)
-            fn_arr[ii]['npts'] = zd.time_series.shape[0]
-            fn_arr[ii]['df'] = zd.df
-            fn_arr[ii]['start_dt'] = zd.zen_schedule
-            fn_arr[ii]['comp'] = zd.metadata.ch_cmp.lower()
-            fn_arr[ii]['fn'] = zd.fn_mt_ascii
-            fn_lines.append(''.join(['--> station: {0}{1}\n'.format(station_name, station),
-                                     '    ts_len = {0}\n'.format(zd.time_series.shape[0]),
-                                     '    df = {0}\n'.format(zd.df),
-                                     '    start_dt = {0}\n'.format(zd.zen_schedule),
-                                     '    comp = {0}\n'.format(zd.metadata.ch_cmp),
-                                     '    fn = {0}\n'.format(zd.fn)]))
+        ii = 0
+        for block_key in block_list:
+            z3d_block = Z3D_Collection(block_dict[block_key], 
+                                       max_workers=max_workers)
+            z3d_block.read_z3d_files()
+            z3d_block.align_time_series()
+            
+            #write mtpy mt files
+            z3d_block.write_ascii_mt_files(notch_dict=notch_dict, ex=ex, ey=ey)
+            
+            for zd in z3d_block.z3d_list:
+                if zd.metadata.ch_cmp.lower() == 'hx':
+                    self.survey_config.hx = zd.metadata.ch_number
+                if zd.metadata.ch_cmp.lower() == 'hy':
+                    self.survey_config.hy = zd.metadata.ch_number
+                if zd.metadata.ch_cmp.lower() == 'hz':
+                    self.survey_config.hz = zd.metadata.ch_number
+                if zd.metadata.ch_cmp.lower() == 'ex':
+                    self.survey_config.e_xaxis_length = zd.metadata.ch_length
+                if zd.metadata.ch_cmp.lower() == 'ey':
+                    self.survey_config.e_yaxis_length = zd.metadata.ch_length
+    
+                # get station configuration from the first Z3D file            
+                if ii == 0:
+                    self.survey_config.lat = zd.header.lat
+                    self.survey_config.lon = zd.header.long
+                    self.survey_config.date = zd.schedule.Date.replace('-','/')
+                    self.survey_config.box = int(zd.header.box_number)
+                
+                #create lines to write to a log file                       
+                station = zd.metadata.rx_xyz0.split(':')[0]
+                fn_arr[ii]['station'] = '{0}{1}'.format(station_name, station)
+                fn_arr[ii]['npts'] = zd.time_series.shape[0]
+                fn_arr[ii]['df'] = zd.df
+                fn_arr[ii]['start_dt'] = zd.zen_schedule
+                fn_arr[ii]['comp'] = zd.metadata.ch_cmp.lower()
+                fn_arr[ii]['fn'] = zd.fn_mt_ascii
+                fn_lines.append(''.join(['--> station: {0}{1}\n'.format(station_name, station),
+                                         '    ts_len = {0}\n'.format(zd.time_series.shape[0]),
+                                         '    df = {0}\n'.format(zd.df),
+                                         '    start_dt = {0}\n'.format(zd.zen_schedule),
+                                         '    comp = {0}\n'.format(zd.metadata.ch_cmp),
+                                         '    fn = {0}\n'.format(zd.fn)]))
+                ii += 1
                                      
         self.station_dir = os.path.join(self.station_dir, 'TS')
         self.survey_config.save_path = self.station_dir
@@ -4907,6 +5263,7 @@ class Z3D_to_edi(object):
             
         return fn_arr[np.nonzero(fn_arr['npts'])], fn_lines
         
+    @timing.timed('zen.write_script_files')
     def write_script_files(self, fn_birrp_dict, save_path=None):
         """
         write a script file from a generic processing dictionary
@@ -4947,6 +5304,7 @@ class Z3D_to_edi(object):
         
         return script_fn_list   
         
+    @timing.timed('zen.run_birrp')
     def run_birrp(self, script_fn_list=None, birrp_exe=None):
         """
         run birrp given the specified files
@@ -5029,10 +5387,15 @@ class Z3D_to_edi(object):
                                                          
         return resp_plot
  
-    def process_data(self, df_list=None, max_blocks=2, num_comp=5):
+    @timing.timed('zen.process_data')
+    def process_data(self, df_list=None, max_blocks=2, num_comp=5, 
+                     max_workers=None):
         """
         from the input station directory, convert files to ascii, run through
         BIRRP, convert to .edi files and plot
+        
+        **max_workers** is the maximum number of threads used to read and 
+        write the channels of each schedule block.
         """
         
         st = time.time()
@@ -5045,7 +5408,8 @@ class Z3D_to_edi(object):
         
         # make files into mtpy files
         z3d_fn_list, log_lines = self.make_mtpy_ascii_files(df_list=df_list,
-                                                            max_blocks=max_blocks)
+                                                            max_blocks=max_blocks,
+                                                            max_workers=max_workers)
         
         # get all information from mtpy files
         schedule_dict = self.get_schedules_fn(z3d_fn_list)
@@ -329,6 +329,53 @@ def rotatematrix_incl_errors(inmatrix, angle, inmatrix_err = None) :
     return rotated_matrix, errmat
 
 
+def rotatematrices_incl_errors(inmatrices, angles, inmatrices_err=None):
+    """
+    rotate a stack of 2x2 matrices (..., 2, 2) by the angles (...) in degrees
+    at once, same as rotatematrix_incl_errors for each matrix.
+
+    returns the rotated matrices and the propagated errors (None if 
+    inmatrices_err is None)
+    """
+
+    if (inmatrices_err is not None) and \
+       (inmatrices.shape != inmatrices_err.shape):
+        raise MTex.MTpyError_inputarguments('Matrix and err-matrix shapes '
+                                'do not match: %s - %s'%(str(inmatrices.shape),
+                                str(inmatrices_err.shape)))
+
+    phi = np.radians(np.asarray(angles, dtype=np.float)%360)
+    cphi = np.cos(phi)
+    sphi = np.sin(phi)
+
+    rotmat = np.zeros(phi.shape+(2, 2))
+    rotmat[..., 0, 0] = cphi
+    rotmat[..., 0, 1] = sphi
+    rotmat[..., 1, 0] = -sphi
+    rotmat[..., 1, 1] = cphi
+
+    rotated_matrices = np.einsum('...ij,...jk,...lk->...il', rotmat, 
+                                 inmatrices, rotmat)
+
+    errmat = None
+    if inmatrices_err is not None:
+        err_orig = np.real(inmatrices_err)
+        errmat = np.zeros_like(inmatrices_err)
+        c2 = cphi**2
+        s2 = sphi**2
+        cs = cphi*sphi
+        for (ii, jj), (kk, ll), (mm, nn) in [((0, 0), (1, 1), (0, 1)), 
+                                            ((0, 1), (1, 0), (1, 1)), 
+                                            ((1, 0), (0, 1), (1, 1)), 
+                                            ((1, 1), (0, 0), (0, 1))]:
+            errmat[..., ii, jj] = np.sqrt((c2*err_orig[..., ii, jj])**2+\
+                                          (cs*err_orig[..., mm, nn])**2+\
+                                          (cs*err_orig[..., 1-mm, 1-nn])**2+\
+                                          (s2*err_orig[..., kk, ll])**2)
+
+    return rotated_matrices, errmat
+
+
 def rotatevector_incl_errors(invector, angle, invector_err = None):
     #check for row or column vector 
     
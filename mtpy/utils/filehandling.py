@@ -23,18 +23,15 @@ import os.path as op
 import calendar
 import time
 import fnmatch
+import itertools
 import shutil
 
 import mtpy.utils.calculator as MTcc
-import mtpy.processing.general as MTgn
 import mtpy.utils.exceptions as MTex
 import mtpy.utils.format as MTft
 import mtpy.utils.configfile as MTcf
+import mtpy.utils.timing as timing
 
-reload(MTgn)
-reload(MTcc)
-reload(MTex)
-reload(MTcf)
 #import ipdb
 
 #=================================================================
@@ -1228,6 +1225,7 @@ def get_ts_header_string(header_dictionary):
 
 
 
+@timing.timed('filehandling.write_ts_file')
 def write_ts_file_from_tuple(outfile,ts_tuple, fmt='%.8e'):
     """
         Write an MTpy TS data file, where the content is provided as tuple:
@@ -1256,6 +1254,7 @@ def write_ts_file_from_tuple(outfile,ts_tuple, fmt='%.8e'):
         outF.write(header_string)
         np.savetxt(outF, data, fmt=fmt)
         outF.close()
+        timing.add_written(outfilename)
     except ValueError:
         raise MTex.MTpyError_inputarguments('ERROR - could not write content'
                             ' of TS tuple to file : {0}'.format(outfilename))
@@ -1263,6 +1262,7 @@ def write_ts_file_from_tuple(outfile,ts_tuple, fmt='%.8e'):
     return outfilename
 
 
+@timing.timed('filehandling.read_ts_file')
 def read_ts_file(mtdatafile):
     """
         Read an MTpy TS data file and provide the content as tuple:
@@ -1283,6 +1283,7 @@ def read_ts_file(mtdatafile):
                                         'header is missing : {0}'.format(infile))
 
     data = np.loadtxt(infile)
+    timing.add_read(infile)
     if len(data) != int(float(header['nsamples'])):
         raise MTex.MTpyError_inputarguments('ERROR - Data file not valid '
                                     '- wrong number of samples in data ({1} '
@@ -1303,6 +1304,50 @@ def read_ts_file(mtdatafile):
     return tuple(lo_header_contents)
 
 
+def read_ts_file_chunks(lo_ts_files, chunk_length=2**20):
+    """
+        Read MTpy TS data files of channels recorded together in chunks,
+        so long recordings do not have to be held in memory.
+
+        Generator of np.ndarray(len(lo_ts_files), n) with n up to
+        chunk_length samples, one row per file.  Stops at the end of the 
+        shortest file.
+
+    """
+
+    lo_fids = []
+    lo_lines = []
+    for tsfile in lo_ts_files:
+        infile = op.abspath(tsfile)
+        if not op.isfile(infile):
+            raise MTex.MTpyError_inputarguments('ERROR - Data file not '
+                                                'existing: {0}'.format(infile))
+        fid = open(infile, 'r')
+        lo_fids.append(fid)
+        #skip the header and empty lines
+        lo_lines.append(itertools.dropwhile(
+                        lambda line: line.strip() in ['', '#'] or 
+                                     line.strip()[0] == '#', fid))
+
+    try:
+        while True:
+            lo_chunks = [np.fromstring(''.join(itertools.islice(lines, 
+                                                            chunk_length)), 
+                                       dtype=np.float, sep=' ')
+                         for lines in lo_lines]
+            n_samples = min([len(chunk) for chunk in lo_chunks])
+            if n_samples == 0:
+                break
+            yield np.array([chunk[:n_samples] for chunk in lo_chunks])
+            if n_samples < chunk_length:
+                break
+    finally:
+        for fid in lo_fids:
+            fid.close()
+        for tsfile in lo_ts_files:
+            timing.add_read(tsfile)
+
+
 def reorient_files(lo_files, configfile, lo_stations = None, outdir = None):
 
     #read config file
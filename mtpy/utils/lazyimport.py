@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+"""
+mtpy/utils/lazyimport.py
+
+Load modules on first use instead of at import.
+
+Plotting (matplotlib), scipy and pyproj take most of the time it takes to
+import mtpy.  Modules that only need them for some methods can bind a lazy
+module at import instead, the real module is imported the first time an
+attribute of it is used:
+
+    >>> import mtpy.utils.lazyimport as lazyimport
+    >>> plt = lazyimport.lazy_import('matplotlib.pyplot')
+    >>> # matplotlib is not imported yet
+    >>> fig = plt.figure()
+    >>> # now it is
+
+Names that would be imported with "from module import name" have to be
+accessed through the module, e.g. mticker.MultipleLocator.
+
+"""
+
+#=================================================================
+import sys
+import types
+import importlib
+
+#=================================================================
+
+class LazyModule(types.ModuleType):
+    """
+    stand in for a module that imports the module on first attribute
+    access.  After that all attributes of the module are copied onto this
+    object, so later look ups are as fast as on the module itself.
+    """
+
+    def __init__(self, name):
+        super(LazyModule, self).__init__(name)
+        self.__dict__['_lazy_loaded'] = False
+
+    def _load(self):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        self.__dict__['_lazy_loaded'] = True
+        return module
+
+    def __getattr__(self, attr):
+        # only called for attributes that are not set yet
+        if self.__dict__['_lazy_loaded']:
+            raise AttributeError("module '{0}' has no attribute '{1}'".format(
+                                 self.__name__, attr))
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        if not self.__dict__['_lazy_loaded']:
+            self._load()
+        return sorted(self.__dict__.keys())
+
+    def __repr__(self):
+        if self.__dict__['_lazy_loaded']:
+            state = 'loaded'
+        else:
+            state = 'not loaded'
+        return "<lazy module '{0}' ({1})>".format(self.__name__, state)
+
+
+def lazy_import(name):
+    """
+    return a module that is imported on first use.  If the module has
+    already been imported it is returned as is.
+
+    Arguments
+    -------------
+        **name** : full name of the module, e.g. 'matplotlib.pyplot'
+
+    Returns
+    ------------
+        **module** : module or LazyModule
+    """
+
+    if name in sys.modules and sys.modules[name] is not None:
+        return sys.modules[name]
+
+    return LazyModule(name)
+
+
+def is_loaded(name):
+    """
+    True if the module has been imported
+    """
+
+    return name in sys.modules and sys.modules[name] is not None
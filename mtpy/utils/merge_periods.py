@@ -1,224 +1,380 @@
 #!/usr/bin/env python
 
+"""
+mtpy/utils/merge_periods.py
 
+Merge the periods of MT data into clusters or regular bins.
 
-import numpy as np
-from pylab import *
+    * regular_periods puts the periods into bins that are regularly spaced
+      on a log10 axis
+    * merge_periods clusters periods that are within a threshold of each
+      other
+    * get_common_periods makes one set of regular bins for many stations
+      and returns for every period of every station the index of its bin,
+      which can be used to pick or interpolate the data of each station
+      onto the common periods
 
+Periods are put into bins with sorted array searches, so all periods are
+done at once.
 
-def regular_periods(periodlist,merge_threshold=15, no_periods=None, t_min=None,
-                    t_max=None, max_merge_error=None):
-    """merging bins are rgegularly shaped on the log10 axis around the respective center frequencies
+    >>> import mtpy.utils.merge_periods as merge_periods
+    >>> period_dict = {'mt01':1./mt_obj1.Z.freq, 'mt02':1./mt_obj2.Z.freq}
+    >>> common_periods, index_dict = merge_periods.get_common_periods(
+    >>> ...                                   period_dict, no_periods=30)
 
-    """
+"""
 
-    if no_periods is None:
-        no_periods = 20
-    if t_min is None or min(periodlist)>t_min:
-        t_min = min(periodlist)
-    if t_max is None or max(periodlist)<t_max:
-        t_max = max(periodlist)
-    if max_merge_error is None:
-        max_merge_error = 10.
+#=================================================================
+import numpy as np
+import mtpy.utils.lazyimport as MTlazy
 
+plt = MTlazy.lazy_import('matplotlib.pyplot')
 
-    new_periods = np.logspace(np.log10(t_min),np.log10(t_max),no_periods)
+#=================================================================
 
-    new_periods_log = log10(new_periods)
-    bin_width = merge_threshold/100. *(max(new_periods_log)-min(new_periods_log))
-    new_periods = np.logspace(np.log10(t_min)+0.25*bin_width,np.log10(t_max)-0.25*bin_width,no_periods)
+def get_period_bins(periodlist, merge_threshold=15, no_periods=None,
+                    t_min=None, t_max=None):
+    """
+    regular period bins on a log10 axis.
 
-    new_period_bins = []
+    Arguments:
+    -----------
+        **periodlist** : list or np.ndarray
+                         periods in seconds
 
-    for log_p in new_periods_log:
-        min_p = 10**(log_p-bin_width/2.)
-        max_p = 10**(log_p+bin_width/2.)
-        new_period_bins.append([min_p,max_p])
+        **merge_threshold** : float
+                              width of the bins in percent of the period
+                              range on a log10 axis. *default* is 15
 
-    new_period_list = []
-    merge_errors = []
+        **no_periods** : int
+                         number of bins. *default* is 20
 
-    for p in periodlist:
-        new_p = None
-        p_error = None
-        for idx_p, p_bin in enumerate(new_period_bins):
-            if p_bin[0] <= p <= p_bin[1]:                
-                new_p = new_periods[idx_p]
-                deviation = np.abs(p-new_p)
-                try:
-                    max_deviation = max(np.abs(new_p-p_bin[0]),np.abs(p_bin[1])-new_p)                    
-                    p_error = deviation/max_deviation
-                except:
-                    #only possible, if bin-width is zero, so it's exactly correct:
-                    p_error = 0.
+        **t_min**, **t_max** : float
+                               period range of the bins, limited to the
+                               range of periodlist. *default* is the range
+                               of periodlist
 
+    Returns:
+    ---------
+        **bin_periods** : np.ndarray(no_periods)
+                          periods the bins are merged into, increasing
+                          unless t_min is above the longest period in
+                          periodlist, then they go from t_min down to it
 
-        new_period_list.append(new_p)
-        merge_errors.append(p_error)
+        **bin_min** : np.ndarray(no_periods)
+                      lower limit of each bin
 
-    merged_periods = set([i for i in new_period_list if i is not None])
+        **bin_max** : np.ndarray(no_periods)
+                      upper limit of each bin
+    """
 
-    ignored_points = [True for i in new_period_list if i is None]
+    periodlist = np.asarray(periodlist, dtype=np.float)
 
-    if len(merged_periods) != len(periodlist):
-        print '\n\tMerged {0} periods into {1} period-clusters -'\
-        ' {2} points outside the bins\n'.format(len(periodlist),len(merged_periods),len(ignored_points))
+    if no_periods is None:
+        no_periods = 20
+    if t_min is None or periodlist.min() > t_min:
+        t_min = periodlist.min()
+    if t_max is None or periodlist.max() < t_max:
+        t_max = periodlist.max()
 
-    new_period_list = [round(i,5)  if i is not None else i for i in new_period_list] 
+    bin_centers_log = np.log10(np.logspace(np.log10(t_min), np.log10(t_max),
+                                           no_periods))
+    bin_width = merge_threshold/100.*(bin_centers_log.max()-
+                                      bin_centers_log.min())
+    bin_periods = np.logspace(np.log10(t_min)+0.25*bin_width,
+                              np.log10(t_max)-0.25*bin_width, no_periods)
 
-    return new_period_list, merge_errors
+    bin_min = 10**(bin_centers_log-bin_width/2.)
+    bin_max = 10**(bin_centers_log+bin_width/2.)
 
+    return bin_periods, bin_min, bin_max
 
-def merge_periods(periods,merge_threshold):
+def get_bin_index(periods, bin_min, bin_max):
     """
-    - assume that the periods are in increasing order
-    - merge_threshold given in percent
-
+    index of the bin each period falls into.  Where bins overlap the bin
+    with the higher index is used, as in a loop over the bins.
+
+    Arguments:
+    -----------
+        **periods** : np.ndarray(n)
+                      periods in seconds
+
+        **bin_min**, **bin_max** : np.ndarray(n_bins)
+                                   limits of the bins, see get_period_bins.
+                                   Both have to be increasing or both
+                                   decreasing.
+
+    Returns:
+    ---------
+        **bin_index** : np.ndarray(n, dtype=int)
+                        index of the bin, -1 for periods outside the bins
     """
-    old_periods = sorted(list(periods),reverse=False)
-
-    in_values = [(x) for x in old_periods]
-
-
-    out_values = []
-    cluster_counter = 0
-    periods_in_cluster = []
-    finished_cluster = False
-    cluster_flags = np.zeros_like(in_values)+1 
-    
-    idx = 0 
-    while idx < len(in_values):
-
-
-        base_period = in_values[idx]
-
-        while finished_cluster is False:
-            
-
-            periods_in_cluster.append(base_period)
-            if idx != 0 :
-                cluster_flags[idx] = cluster_counter
-    
-            if idx == len(in_values) - 1:
-                finished_cluster = True
-                continue
-
-
-            #check, if the next period is too far away from the current mean:           
-            mean_period = np.mean(periods_in_cluster)
-            distance = in_values[idx+1] - mean_period
-
-
-            if distance/mean_period >  merge_threshold/100.:
-                #print 'next point too far...finishing cluster'
-                finished_cluster = True
-                continue
-        
-            #check, if the first period would drop out of the threshold range,
-            # if the cluster gets extended:
-            extended_periods = periods_in_cluster[:]
-            extended_periods.append(in_values[idx+1])
-            new_mean = np.mean(extended_periods) 
-            distance_period1 = new_mean - extended_periods[0]
-
 
-            if distance_period1/new_mean > merge_threshold/100.:
-                #print 'first point would drop out...finishing cluster'
-                finished_cluster = True
-                continue
-            #otherwise just continue filling the same cluster
-            idx += 1
+    periods = np.asarray(periods, dtype=np.float)
+    bin_min = np.asarray(bin_min, dtype=np.float)
+    bin_max = np.asarray(bin_max, dtype=np.float)
+
+    if np.all(np.diff(bin_min) <= 0) and np.all(np.diff(bin_max) <= 0) and \
+       np.any(np.diff(bin_min) < 0):
+        # decreasing bins, the first bin ending at or above the period in
+        # the reversed bins is the one with the highest index
+        n_bins = len(bin_min)
+        bin_index = np.searchsorted(bin_max[::-1], periods, side='left')
+        in_bin = bin_index < n_bins
+        in_bin[in_bin] = bin_min[::-1][bin_index[in_bin]] <= periods[in_bin]
+        bin_index = n_bins-1-bin_index
+        bin_index[np.invert(in_bin)] = -1
+        return bin_index
+
+    if np.any(np.diff(bin_min) < 0) or np.any(np.diff(bin_max) < 0):
+        raise ValueError('bin_min and bin_max have to be both increasing or '
+                         'both decreasing, see get_period_bins')
+
+    # the last bin starting at or below the period
+    bin_index = np.searchsorted(bin_min, periods, side='right')-1
+    in_bin = bin_index >= 0
+    in_bin[in_bin] = periods[in_bin] <= bin_max[bin_index[in_bin]]
+    bin_index[np.invert(in_bin)] = -1
+
+    return bin_index
+
+def regular_periods(periodlist, merge_threshold=15, no_periods=None,
+                    t_min=None, t_max=None, max_merge_error=None):
+    """
+    merge periods into bins that are regularly spaced on a log10 axis.
+
+    Arguments:
+    -----------
+        **periodlist**, **merge_threshold**, **no_periods**, **t_min**,
+        **t_max** : see get_period_bins
+
+        **max_merge_error** : not used, kept for older scripts
+
+    Returns:
+    ---------
+        **new_period_list** : list
+                              period of the bin for each period in
+                              periodlist rounded to 5 decimals, None for
+                              periods outside the bins
+
+        **merge_errors** : list
+                           distance of each period to the period of its bin
+                           relative to the largest possible distance in the
+                           bin, None for periods outside the bins
+    """
 
-        if finished_cluster is True:
-            mean_period = [np.mean(periods_in_cluster)]
-            if len(periods_in_cluster) > 1:
-                #print 'merging periods', periods_in_cluster,'into' , mean_period 
-                pass
+    periodlist = np.asarray(periodlist, dtype=np.float)
+    bin_periods, bin_min, bin_max = get_period_bins(periodlist,
+                                                    merge_threshold,
+                                                    no_periods=no_periods,
+                                                    t_min=t_min, t_max=t_max)
+    bin_index = get_bin_index(periodlist, bin_min, bin_max)
+    in_bin = bin_index >= 0
+
+    new_p = bin_periods[bin_index[in_bin]]
+    deviation = np.abs(periodlist[in_bin]-new_p)
+    max_deviation = np.maximum(np.abs(new_p-bin_min[bin_index[in_bin]]),
+                               np.abs(bin_max[bin_index[in_bin]])-new_p)
+    # only 0 if the bin width is 0, so the period is exactly right
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p_error = np.where(max_deviation > 0, deviation/max_deviation, 0.)
+
+    new_period_list = [None]*len(periodlist)
+    merge_errors = [None]*len(periodlist)
+    for ii, pp, ee in zip(np.nonzero(in_bin)[0], new_p, p_error):
+        new_period_list[ii] = round(pp, 5)
+        merge_errors[ii] = ee
+
+    n_merged = len(np.unique(new_p))
+    if n_merged != len(periodlist):
+        print '\n\tMerged {0} periods into {1} period-clusters -'\
+        ' {2} points outside the bins\n'.format(len(periodlist), n_merged,
+                                                 len(periodlist)-in_bin.sum())
 
-            out_values.extend(len(periods_in_cluster)*mean_period)
-            finished_cluster = False
-            periods_in_cluster = []
-            idx += 1
-            cluster_counter += 1
+    return new_period_list, merge_errors
 
+def get_common_periods(period_dict, merge_threshold=15, no_periods=None,
+                       t_min=None, t_max=None):
+    """
+    regular period bins for many stations at once.
+
+    The bins are made from the periods of all stations, see get_period_bins,
+    only bins that have data of at least one station are kept.
+
+    Arguments:
+    -----------
+        **period_dict** : dictionary keyed by station of np.ndarray of the
+                          periods of that station
+
+        **merge_threshold**, **no_periods**, **t_min**, **t_max** :
+                          see get_period_bins
+
+    Returns:
+    ---------
+        **common_periods** : np.ndarray(n_common)
+                             periods of the bins that have data, in the
+                             order of get_period_bins
+
+        **index_dict** : dictionary keyed by station of np.ndarray(n) with
+                         the index into common_periods for each period of
+                         the station, -1 for periods outside the bins.
+                         Several periods of a station can have the same
+                         index.
+
+    :Example: ::
+
+        >>> import mtpy.core.mt as mt
+        >>> import mtpy.utils.merge_periods as merge_periods
+        >>> mt_dict = dict([(mt_obj.station, mt_obj) for mt_obj in
+        >>> ...             [mt.MT(edi_fn) for edi_fn in edi_list]])
+        >>> period_dict = dict([(station, 1./mt_dict[station].Z.freq)
+        >>> ...                 for station in mt_dict.keys()])
+        >>> common_periods, index_dict = merge_periods.get_common_periods(
+        >>> ...                                   period_dict, no_periods=30)
+        >>> # impedance of mt01 at the common periods it has data for
+        >>> index = index_dict['mt01']
+        >>> z_mt01 = np.zeros((len(common_periods), 2, 2), dtype=np.complex)
+        >>> z_mt01[index[index >= 0]] = mt_dict['mt01'].Z.z[index >= 0]
+    """
 
-    new_period_list = out_values
-    if len(in_values) != cluster_counter:
-        print '\n\tDone -- merged {0} periods into {1} period-clusters\n'.format(len(in_values),cluster_counter)
-    return new_period_list
+    station_list = sorted(period_dict.keys())
+    lo_periods = [np.asarray(period_dict[station], dtype=np.float)
+                  for station in station_list]
 
+    bin_periods, bin_min, bin_max = get_period_bins(
+                                                np.concatenate(lo_periods),
+                                                merge_threshold,
+                                                no_periods=no_periods,
+                                                t_min=t_min, t_max=t_max)
+    lo_index = [get_bin_index(periods, bin_min, bin_max)
+                for periods in lo_periods]
 
-def plot_merging(periods,merge_threshold,no_periods=None, t_min=None,
-                    t_max=None, max_merge_error=None):
+    # number the bins that have data from 0
+    used = np.zeros(len(bin_periods), dtype=np.bool)
+    for bin_index in lo_index:
+        used[bin_index[bin_index >= 0]] = True
+    common_index = np.cumsum(used)-1
+    common_index = np.append(common_index, -1)
 
+    index_dict = dict([(station, common_index[bin_index])
+                       for station, bin_index in zip(station_list, lo_index)])
 
-    # import platform,os,sys 
-    # if not platform.system().lower().startswith('win') :
+    return bin_periods[used], index_dict
 
-    #     #generate an interactive plot window, which remains open after this script has finshed: 
-    #     proc_num = os.fork()
+def merge_periods(periods, merge_threshold):
+    """
+    cluster periods, each cluster starts at the shortest period not in a
+    cluster yet and takes all periods up to merge_threshold percent longer.
+
+    Arguments:
+    -----------
+        **periods** : list or np.ndarray
+                      periods in seconds
+
+        **merge_threshold** : float
+                              maximum distance to the first period of a
+                              cluster in percent
+
+    Returns:
+    ---------
+        **new_period_list** : list
+                              for each period in increasing order the first
+                              period of its cluster
+    """
 
-    #     if proc_num != 0:
-    #         #This is the parent process, that should quit immediately to return to the
-    #         #shell.
-    #         print "You can kill the plot window with the command \"kill %d\"." % proc_num
-    #         sys.exit()
+    old_periods = np.sort(np.asarray(periods, dtype=np.float))
+    n_periods = len(old_periods)
+    threshold = merge_threshold/100.
 
+    new_periods = np.zeros(n_periods)
+    cluster_counter = 0
+    idx = 0
+    while idx < n_periods:
+        base_period = old_periods[idx]
+        end = np.searchsorted(old_periods, base_period*(1+threshold),
+                              side='right')
+        # the search is rounded, make sure the limit is as in the test below
+        while end < n_periods and \
+              (old_periods[end]-base_period)/base_period <= threshold:
+            end += 1
+        while end > idx+1 and \
+              (old_periods[end-1]-base_period)/base_period > threshold:
+            end -= 1
+
+        new_periods[idx:end] = base_period
+        cluster_counter += 1
+        idx = end
+
+    if n_periods != cluster_counter:
+        print '\n\tDone -- merged {0} periods into {1} '.format(n_periods,
+                                                        cluster_counter)+\
+              'period-clusters\n'
+
+    return new_periods.tolist()
+
+
+def plot_merging(periods, merge_threshold, no_periods=None, t_min=None,
+                 t_max=None, max_merge_error=None):
+    """
+    plot periods and the periods they are merged into, with the bins.
+    If no_periods is given the periods are put into regular bins, see
+    regular_periods, otherwise they are clustered, see merge_periods.
+    """
 
-    close('all')
-    ion()
+    periods = np.asarray(periods, dtype=np.float)
 
     if no_periods is not None:
-        mergedperiods,dummy = regular_periods(periods,merge_threshold,no_periods,
-                                    t_min,t_max, max_merge_error)
+        bin_periods, bin_min, bin_max = get_period_bins(periods,
+                                                        merge_threshold,
+                                                        no_periods=no_periods,
+                                                        t_min=t_min,
+                                                        t_max=t_max)
+        bin_index = get_bin_index(periods, bin_min, bin_max)
+        used = np.unique(bin_index[bin_index >= 0])
+        mergedperiods = bin_periods[used]
+        lo_limits = np.append(bin_min[used], bin_max[used])
+        n_points_outside = (bin_index < 0).sum()
     else:
-        mergedperiods = merge_periods(periods,merge_threshold)
-    
-
-
-    ax = subplot2grid((1, 1), (0, 0), colspan=1)
-    orig = ax.scatter(periods,zeros(len(periods)),label='original periods')
-    #ax.set_xlim([10**(-rng),10**(rng)])
+        mergedperiods = np.unique(merge_periods(periods, merge_threshold))
+        new_periods_log = np.log10(mergedperiods)
+        bin_width = merge_threshold/100.*(new_periods_log.max()-
+                                          new_periods_log.min())
+        lo_limits = np.append(10**(new_periods_log-bin_width/2.),
+                              10**(new_periods_log+bin_width/2.))
+        n_points_outside = 0
+    n_points_used = len(periods)-n_points_outside
+
+    # interactive mode redraws the figure after every change, so it is only
+    # switched on to show the finished plot
+    plt.close('all')
+    plt.ioff()
+
+    ax = plt.subplot2grid((1, 1), (0, 0), colspan=1)
+    orig = ax.scatter(periods, np.zeros(len(periods)),
+                      label='original periods')
     ax.set_xscale('log')
 
-    hold(True)
-
-    n_points_used = len([i for i in mergedperiods if i is not None])
-    n_points_outside = len([i for i in mergedperiods if i is  None])
-
-    mergedperiods = [i for i in mergedperiods if i is not None]
-
-    mergedperiods = sorted(list(set(mergedperiods)),reverse=False)
-
-    lo_limits = []
-
-    new_periods_log = log10(np.array(mergedperiods))
-    bin_width = merge_threshold/100. *(max(new_periods_log)-min(new_periods_log))
-
-    new_period_bins = []
-
-    for log_p in new_periods_log:
-        min_p = 10**(log_p-bin_width/2.)
-        max_p = 10**(log_p+bin_width/2.)
-        lo_limits.append(min_p)
-        lo_limits.append(max_p)
-
-
-
-    ax.set_xticks(lo_limits, minor=True)
+    # bin limits as minor ticks without labels
+    ax.set_xticks(np.sort(lo_limits), minor=True)
+    ax.xaxis.set_minor_formatter(plt.NullFormatter())
     ax.xaxis.grid(False, which='major')
-    ax.xaxis.grid(True, which='minor',c='g')
-
-    merge = ax.scatter(mergedperiods,ones(len(mergedperiods)),c='r',label='merged periods')
-    ax.set_ylim([-1,2])
-    ax.set_xlim([10**(min(new_periods_log)-0.5),10**(max(new_periods_log)+0.5)])
-    handles, labels = ax.get_legend_handles_labels()
-    ax.legend([orig, merge], ["original ({0})".format(len(periods)), "merged ({0})".format(len(mergedperiods))],scatterpoints=1,loc='upper center', 
-                ncol=2)
-    ax.set_title('{0} periods in bins - {1} periods left out'.format(n_points_used, n_points_outside))
-    
-    tight_layout()
-    show()#block=True)
+    ax.xaxis.grid(True, which='minor', c='g')
+
+    merge = ax.scatter(mergedperiods, np.ones(len(mergedperiods)), c='r',
+                       label='merged periods')
+    ax.set_ylim([-1, 2])
+    new_periods_log = np.log10(mergedperiods)
+    ax.set_xlim([10**(new_periods_log.min()-0.5),
+                 10**(new_periods_log.max()+0.5)])
+    ax.legend([orig, merge], ["original ({0})".format(len(periods)),
+                              "merged ({0})".format(len(mergedperiods))],
+              scatterpoints=1, loc='upper center', ncol=2)
+    ax.set_title('{0} periods in bins - {1} periods left out'.format(
+                 n_points_used, n_points_outside))
+
+    plt.tight_layout()
+    plt.ion()
+    plt.show()
     raw_input()
 
 
@@ -233,7 +389,7 @@ if __name__ == '__main__':
     threshold = 10
     print """
 
-        This is a module - not to be run as as a script! 
+        This is a module - not to be run as as a script!
 
 This call yields an example result plot for merging {0} random periods.
 
@@ -243,4 +399,3 @@ This call yields an example result plot for merging {0} random periods.
     print min(periods),max(periods)
 
     plot_merging(periods,threshold,no_periods)
-
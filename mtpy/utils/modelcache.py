@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+
+"""
+mtpy/utils/modelcache.py
+
+Binary .npy cache of model files, so a model that is read again does not
+need to be parsed from text.
+
+The cache is saved next to the model file with .npy added to the name.  It
+holds one record with a field for each model array plus the modification
+time and size of the model file, a cache that does not match the model file
+any more is ignored.  Used by the ModEM and WS3DINV model readers.
+
+    >>> import mtpy.utils.modelcache as modelcache
+    >>> model_dict = modelcache.read_model_cache(r"/home/mt/ModEM_model.rho")
+    >>> if model_dict is None:
+    >>>     ...
+    >>>     modelcache.write_model_cache(r"/home/mt/ModEM_model.rho",
+    >>> ...                              {'res_model':res_model})
+
+"""
+
+#==============================================================================
+import os
+import numpy as np
+
+#==============================================================================
+def get_model_cache_fn(model_fn):
+    """
+    get the file name of the binary cache of a model file, which is the
+    model file name with .npy added on.
+    """
+
+    return '{0}.npy'.format(model_fn)
+
+def write_model_cache(model_fn, model_dict):
+    """
+    write a binary .npy cache next to a model file so the next read does not
+    need to parse the text file.
+
+    The cache is a single record structured array, one field for each key in
+    model_dict plus the modification time and size of model_fn, which are
+    used to check that the cache is still valid.
+
+    Arguments:
+    -----------
+        **model_fn** : string
+                       full path to model file the cache is made for
+
+        **model_dict** : dictionary
+                         keys are attribute names, values are np.ndarrays,
+                         floats or strings.  Values that are None are
+                         skipped.
+
+    Returns:
+    ----------
+        **cache_fn** : string
+                       full path to cache file, None if it could not be
+                       written
+    """
+
+    cache_fn = get_model_cache_fn(model_fn)
+    f_stat = os.stat(model_fn)
+
+    c_dtype = [('mtime', np.float), ('size', np.int64)]
+    c_values = [f_stat.st_mtime, f_stat.st_size]
+    for key in sorted(model_dict.keys()):
+        value = model_dict[key]
+        if value is None:
+            continue
+        if type(value) is str:
+            c_dtype.append((key, '|S{0}'.format(max(len(value), 1))))
+        else:
+            value = np.asarray(value, dtype=np.float)
+            c_dtype.append((key, np.float, value.shape))
+        c_values.append(value)
+
+    cache_arr = np.zeros(1, dtype=c_dtype)
+    for name, value in zip(cache_arr.dtype.names, c_values):
+        cache_arr[name] = value
+
+    try:
+        np.save(cache_fn, cache_arr)
+    except (IOError, OSError) as error:
+        print 'Could not write model cache {0}: {1}'.format(cache_fn, error)
+        return None
+
+    return cache_fn
+
+def read_model_cache(model_fn, mmap_mode='c'):
+    """
+    read the binary cache of a model file if it exists and is newer than
+    the model file.
+
+    Arguments:
+    -----------
+        **model_fn** : string
+                       full path to model file
+
+        **mmap_mode** : [ None | 'r' | 'c' ]
+                        memory map mode passed to np.load.  The *default*
+                        'c' is copy on write, so arrays can be changed
+                        without changing the cache on disk.
+
+    Returns:
+    ----------
+        **model_dict** : dictionary
+                         keys are attribute names as input to
+                         write_model_cache, None if there is no valid cache.
+    """
+
+    cache_fn = get_model_cache_fn(model_fn)
+    if not os.path.isfile(cache_fn) or not os.path.isfile(model_fn):
+        return None
+
+    try:
+        cache_arr = np.load(cache_fn, mmap_mode=mmap_mode)
+    except (IOError, ValueError):
+        return None
+
+    f_stat = os.stat(model_fn)
+    if cache_arr['mtime'][0] != f_stat.st_mtime or \
+       cache_arr['size'][0] != f_stat.st_size:
+        return None
+
+    model_dict = {}
+    for name in cache_arr.dtype.names:
+        if name in ['mtime', 'size']:
+            continue
+        value = cache_arr[name][0]
+        if cache_arr.dtype[name].kind == 'S':
+            value = str(value)
+        elif value.shape == ():
+            value = float(value)
+        model_dict[name] = value
+
+    return model_dict
@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+
+"""
+mtpy/utils/modelexport.py
+
+Export 3D resistivity models (ModEM and WS3DINV) for viewing in Paraview,
+Mayavi or a spreadsheet.
+
+The models are stored as cell widths along north, east and down and one
+resistivity value per cell, going S --> N, then W --> E, then top --> bottom
+with the northern most cell first.  Everything here works on whole arrays:
+
+    * read_model_file reads the cell widths and resistivity volume with one
+      parse of the file, it is also the parser of the ModEM and WS3DINV
+      Model classes
+    * get_cell_edges and get_cell_centers build the coordinates with
+      cumulative sums
+    * the resistivity volume is reordered with a reshape, so index 0 along
+      north is the southern most cell
+    * write_vtk_grid and write_vtk_points write VTK files with evtk,
+      write_point_file writes north, east, z, value columns to a csv or
+      numpy file
+
+    >>> import mtpy.utils.modelexport as modelexport
+    >>> model_dict = modelexport.read_model_file(r"/home/mt/ModEM_model.rho")
+    >>> north = modelexport.get_cell_edges(model_dict['nodes_north'])
+    >>> east = modelexport.get_cell_edges(model_dict['nodes_east'])
+    >>> z = modelexport.get_cell_edges(model_dict['nodes_z'])
+    >>> modelexport.write_vtk_grid(r"/home/mt/ModEM_res", north, east, z,
+    >>> ...                        cell_data={'resistivity':
+    >>> ...                                   model_dict['res_model']})
+
+evtk is only needed to write VTK files, get it from
+https://bitbucket.org/pauloh/pyevtk
+
+"""
+
+#==============================================================================
+import numpy as np
+import mtpy.utils.exceptions as mtex
+
+try:
+    from evtk.hl import gridToVTK, pointsToVTK
+except ImportError:
+    gridToVTK = None
+    pointsToVTK = None
+
+#==============================================================================
+
+def read_model_file(model_fn):
+    """
+    read a ModEM or WS3DINV model file.  modem_new.Model.read_model_file
+    and ws3dinv.WSModel.read_model_file use this, so changes to the file
+    format only need to be made here.
+
+    Arguments:
+    -----------
+        **model_fn** : string
+                       full path to model file
+
+    Returns:
+    ---------
+        **model_dict** : dictionary with keys
+
+                ============== ===============================================
+                Key            Description
+                ============== ===============================================
+                title          first line of the file
+                nodes_north    cell widths S --> N (m)
+                nodes_east     cell widths W --> E (m)
+                nodes_z        cell widths top --> bottom (m)
+                res_model      linear resistivity (n_north, n_east, n_z),
+                               index 0 along north is the southern most cell
+                origin         (north, east, z) of the lower left corner if
+                               given in the file (ModEM), else None
+                rotation_angle rotation angle if given in the file, else None
+                ============== ===============================================
+
+    :Example: ::
+
+        >>> import mtpy.utils.modelexport as modelexport
+        >>> model_dict = modelexport.read_model_file(r"/home/mt/ws_model_05")
+        >>> model_dict['res_model'].shape
+        (55, 60, 40)
+    """
+
+    mfid = file(model_fn, 'r')
+    mlines = mfid.readlines()
+    mfid.close()
+
+    # the second line has the dimensions and, for ModEM, the scale of the
+    # resistivity values
+    header = mlines[1].strip().split()
+    n_north, n_east, n_z = [int(nn) for nn in header[0:3]]
+    try:
+        res_scale = header[4].lower()
+    except IndexError:
+        res_scale = 'linear'
+
+    # count the values on each line to find where the model ends, then
+    # read the nodes and resistivity values in one go
+    n_nodes = n_north+n_east+n_z
+    n_values = n_nodes+n_north*n_east*n_z
+    count_arr = np.cumsum([len(mline.split()) for mline in mlines[2:]])
+    line_index = 2+np.searchsorted(count_arr, n_values)+1
+    value_arr = np.fromstring(''.join(mlines[2:line_index]), dtype=np.float,
+                              sep=' ')
+    if value_arr.shape[0] != n_values:
+        raise mtex.MTpyError_file_handling('Found {0} values in {1}, '.format(
+                                          value_arr.shape[0], model_fn)+
+                                          'expected {0}'.format(n_values))
+
+    res_model = value_arr[n_nodes:].reshape(n_z, n_east, n_north).transpose(
+                                            2, 1, 0)[::-1, :, :].copy()
+    if res_scale == 'loge':
+        res_model = np.exp(res_model)
+    elif res_scale in ['log', 'log10']:
+        res_model = 10**res_model
+
+    # ModEM puts the lower left corner and rotation angle after the model
+    origin = None
+    rotation_angle = None
+    for mline in mlines[line_index:]:
+        mlist = mline.strip().split()
+        try:
+            if len(mlist) == 3:
+                origin = np.array(mlist, dtype=np.float)
+            elif len(mlist) == 1:
+                rotation_angle = float(mlist[0])
+        except ValueError:
+            continue
+
+    return {'title':mlines[0].strip(),
+            'nodes_north':value_arr[0:n_north].copy(),
+            'nodes_east':value_arr[n_north:n_north+n_east].copy(),
+            'nodes_z':value_arr[n_north+n_east:n_nodes].copy(),
+            'res_model':res_model,
+            'origin':origin,
+            'rotation_angle':rotation_angle}
+
+def get_cell_edges(nodes, origin=0.):
+    """
+    get the location of cell edges from cell widths.
+
+    Arguments:
+    -----------
+        **nodes** : np.ndarray(n)
+                    cell widths
+
+        **origin** : float
+                     location of the first edge. *default* is 0
+
+    Returns:
+    ---------
+        **edges** : np.ndarray(n+1)
+                    location of the cell edges
+    """
+
+    return origin+np.append(0, np.cumsum(nodes))
+
+def get_cell_centers(nodes, origin=0.):
+    """
+    get the location of cell centers from cell widths.
+
+    Arguments:
+    -----------
+        **nodes** : np.ndarray(n)
+                    cell widths
+
+        **origin** : float
+                     location of the first edge. *default* is 0
+
+    Returns:
+    ---------
+        **centers** : np.ndarray(n)
+                      location of the cell centers
+    """
+
+    nodes = np.asarray(nodes, dtype=np.float)
+
+    return origin+np.cumsum(nodes)-nodes/2.
+
+def get_point_array(north, east, z, values):
+    """
+    make an array of points with one row of north, east, z, value for each
+    value, going north first, then east, then down.
+
+    Arguments:
+    -----------
+        **north** : np.ndarray(n_north)
+                    north coordinates of the values
+
+        **east** : np.ndarray(n_east)
+                   east coordinates of the values
+
+        **z** : np.ndarray(n_z)
+                vertical coordinates of the values
+
+        **values** : np.ndarray(n_north, n_east, n_z)
+                     values at the coordinates
+
+    Returns:
+    ---------
+        **point_array** : np.ndarray(n_north*n_east*n_z, 4)
+                          columns of north, east, z, value
+    """
+
+    values = np.asarray(values)
+    if values.shape != (len(north), len(east), len(z)):
+        raise mtex.MTpyError_inputarguments('values has shape {0}, '.format(
+                                            values.shape)+
+                                            'expected {0}'.format(
+                                            (len(north), len(east), len(z))))
+
+    grid_list = np.meshgrid(north, east, z, indexing='ij')
+
+    return np.column_stack([grid.ravel(order='F')
+                            for grid in grid_list+[values]])
+
+def write_point_file(save_fn, north, east, z, values,
+                     value_name='resistivity', file_format='csv'):
+    """
+    write values on a grid as points, one row of north, east, z, value for
+    each value.  Paraview can read the csv files directly.
+
+    Arguments:
+    -----------
+        **save_fn** : string
+                      full path to save file to, the extension is added if
+                      it is not there.
+
+        **north**, **east**, **z**, **values** : see get_point_array
+
+        **value_name** : string
+                         name of the value column in the csv header.
+                         *default* is resistivity
+
+        **file_format** : [ 'csv' | 'npy' ]
+                          * 'csv' writes a comma separated text file
+                          * 'npy' writes the array with numpy.save
+                          *default* is 'csv'
+
+    Returns:
+    ---------
+        **save_fn** : string
+                      full path to the file written
+    """
+
+    point_array = get_point_array(north, east, z, values)
+
+    if file_format not in ['csv', 'npy']:
+        raise mtex.MTpyError_inputarguments('file_format {0} '.format(
+                                            file_format)+
+                                            'not understood, use csv or npy')
+
+    if not save_fn.endswith('.'+file_format):
+        save_fn = '{0}.{1}'.format(save_fn, file_format)
+
+    if file_format == 'csv':
+        np.savetxt(save_fn, point_array, fmt='%.6e', delimiter=',',
+                   header='north,east,z,{0}'.format(value_name), comments='')
+    elif file_format == 'npy':
+        np.save(save_fn, point_array)
+
+    return save_fn
+
+def _check_evtk():
+    if gridToVTK is None:
+        raise mtex.MTpyError_module_import('To write a vtk file for 3d '
+                          'viewing, download and install evtk from '
+                          'https://bitbucket.org/pauloh/pyevtk.  On Windows '
+                          'build evtk first with either MinGW or cygwin '
+                          'using "python setup.py build -compiler=mingw32"')
+
+def write_vtk_grid(save_fn, north, east, z, cell_data=None,
+                   point_data=None):
+    """
+    write a VTK rectilinear grid file (.vtr).
+
+    Arguments:
+    -----------
+        **save_fn** : string
+                      full path to save file to, evtk adds the extension
+
+        **north**, **east**, **z** : np.ndarray
+                                     coordinates of the grid lines, for
+                                     cell_data these are the n+1 cell edges,
+                                     for point_data the n points.
+
+        **cell_data** : dictionary
+                        arrays (n_north, n_east, n_z) of values in the cells
+                        keyed by name
+
+        **point_data** : dictionary
+                         arrays (n_north, n_east, n_z) of values at the
+                         grid points keyed by name
+
+    Returns:
+    ---------
+        **vtk_fn** : string
+                     full path to the file written
+    """
+
+    _check_evtk()
+
+    return gridToVTK(save_fn,
+                     np.asarray(north, dtype=np.float),
+                     np.asarray(east, dtype=np.float),
+                     np.asarray(z, dtype=np.float),
+                     cellData=cell_data,
+                     pointData=point_data)
+
+def write_vtk_points(save_fn, north, east, z, point_data=None):
+    """
+    write a VTK unstructured grid file (.vtu) of points, like station
+    locations.
+
+    Arguments:
+    -----------
+        **save_fn** : string
+                      full path to save file to, evtk adds the extension
+
+        **north**, **east**, **z** : np.ndarray(n)
+                                     coordinates of the points
+
+        **point_data** : dictionary
+                         arrays (n) of values at the points keyed by name.
+                         *default* is None, which writes a value of 1 for
+                         every point, as evtk needs at least one.
+
+    Returns:
+    ---------
+        **vtk_fn** : string
+                     full path to the file written
+    """
+
+    _check_evtk()
+
+    north = np.asarray(north, dtype=np.float)
+    if point_data is None:
+        point_data = {'value':np.ones_like(north)}
+
+    return pointsToVTK(save_fn,
+                       north,
+                       np.asarray(east, dtype=np.float),
+                       np.asarray(z, dtype=np.float),
+                       data=point_data)
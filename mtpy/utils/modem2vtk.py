@@ -8,10 +8,10 @@
 ######################################################################
 #
 
-from evtk.hl import gridToVTK, pointsToVTK
 import numpy as np
 import os
 import sys
+import mtpy.utils.modelexport as modelexport
 
 ######################################################################
 
@@ -42,14 +42,18 @@ def main():
 
     - [optional] VTK resistivity grid file - output file name
     - [optional] VTK station grid file - output file name
+    
+    - [optional] --csv or --npy to also write the resistivity grid as 
+      points (north, east, down, resistivity) to a csv or numpy file
 
     """
 
-    arguments = sys.argv
+    arguments = [arg for arg in sys.argv if arg not in ['--csv', '--npy']]
+    point_formats = [arg[2:] for arg in sys.argv if arg in ['--csv', '--npy']]
 
     if len(arguments) < 2:
         sys.exit('\nERROR - provide at least 1 file name: <model file> [<data>]'\
-            ' [out:rho] [out:stations]\n')
+            ' [out:rho] [out:stations] [--csv] [--npy]\n')
 
     try:
         Mmodel = os.path.abspath(os.path.realpath(arguments[1]))
@@ -75,159 +79,40 @@ def main():
         sys.exit('ERROR - could not find file(s)')
 
 
-    f = open(Mmodel, 'r')
-
-    # skip first line in file
-    f.readline()
-
-    # read X,Y,Z mesh dimensions
-    dims = []
-    modeldata_firstline = f.readline().split()
+    model_dict = modelexport.read_model_file(Mmodel)
 
-    try:
-        function =  modeldata_firstline[4].lower()
-    except:
-        function = None
-
-    for n in range(3):
-        dims.append(int(modeldata_firstline[n]))
-    size = dims[0]*dims[1]*dims[2]
+    # resistivity with the first index furthest south
+    mtNS = model_dict['res_model']
+    dims = list(mtNS.shape)
     print 'Mesh:     ', dims
-    print 'Datapoints:     ', size
-
-    # read N,E,D spacing
-    #  (depends on line break only after final value)
-    spacing = []
-    for n in range(3):
-        i=0
-        while i < dims[n]:
-            modeldata_nextlines = f.readline().split()
-            for j in modeldata_nextlines:
-                spacing.append(float(j)/1000.0)
-                i += 1
-
-    # read model values
-    #  (depends on line break only after final value)
-    mt = np.zeros(size)
-    i=0
-    while i < size:
-        modeldata_morelines = f.readline().split()
-        if len(modeldata_morelines) == 0:
-            continue
-        for j in modeldata_morelines:
-            if function is None:
-                mt[i] = float(j)
-            elif function in ['loge']:
-                mt[i] = np.e**(float(j))
-            elif function in ['log','log10']:
-                mt[i] = 10**(float(j))
-            i += 1
-    #reading the mesh blocks and calculate coordinates.
-    #Coords are taken at the center points of the blocks
-
-    #read the lines following the model:
-    appendix = f.readlines()
-    
-    # the second last non empty line contains a triple that defines the 
-    # lower left corner coordinates of the model 
-    x0 = None
-    for line in appendix[::-1]:
-        line = line.strip().split()
-        if len(line) != 3:
-            continue
-        else:
-            try:
-                x0 = float(line[0])/1000.
-                y0 = float(line[1])/1000.
-                z0 = float(line[2])/1000.
-                break
-            except:
-                continue
-    if x0 is None:
-        x0 = 0
-        y0 = 0
-        z0 = 0 
+    print 'Datapoints:     ', mtNS.size
+
+    # the lower left corner coordinates of the model are given after the 
+    # model
+    if model_dict['origin'] is None:
+        x0, y0, z0 = 0, 0, 0
         print 'Warning - no reference point found - lower left corner of model'\
         ' set to 0,0,0'
+    else:
+        x0, y0, z0 = model_dict['origin']/1000.
 
-    Xspacing = spacing[:dims[0]]
-
-    # calc North coordinates of vtk mesh
-    Xdist = 0 # calculate total North distance by summing all blocks
-    for i in range(dims[0]):
-        Xdist += Xspacing[i]
+    # Coords are taken at the center points of the blocks, zero at the lower 
+    # left corner of the model plus the reference point
+    X = modelexport.get_cell_centers(model_dict['nodes_north']/1000., x0)
+    Y = modelexport.get_cell_centers(model_dict['nodes_east']/1000., y0)
+    D = modelexport.get_cell_centers(model_dict['nodes_z']/1000., z0)
 
-    X = np.zeros(dims[0])
-    #X[0] = -0.5 * Xdist + 0.5*(Xspacing[0])# define zero at the center of the model
-    X[0] = 0.5*(Xspacing[0])# define zero at the lower left corner of the model
-    for i in range(dims[0]-1):
-        local_spacing = 0.5*(Xspacing[i]+Xspacing[i+1])
-        X[i+1] = X[i] + local_spacing
-    
-    #add reference point coordinate
-    X += x0
-
-    Yspacing = spacing[dims[0]:dims[0]+dims[1]]
-    # calc Yast coordinates of vtk mesh
-    Ydist = 0 # calculate total Yast distance by summing all blocks
-    for i in range(dims[1]):
-        Ydist += Yspacing[i]
-
-    Y = np.zeros(dims[1])
-    #Y[0] = -0.5 * Ydist + 0.5*(Yspacing[0])# define zero at the center of the model
-    Y[0] = 0.5*(Yspacing[0])# define zero at the lower left corner of the model
-    for i in range(dims[1]-1):
-        local_spacing = 0.5*(Yspacing[i]+Yspacing[i+1])
-        Y[i+1] = Y[i] + local_spacing
-    
-    #add reference point coordinate
-    Y += y0
-
-    Dspacing=spacing[dims[0]+dims[1]:]
-    # calc Down coordinates of vtk mesh
-    D = np.zeros(dims[2])
-    D[0] = 0.5*Dspacing[0]
-    for i in range(dims[2]-1):
-        local_spacing = 0.5*(Dspacing[i]+Dspacing[i+1])
-        D[i+1] = D[i] + local_spacing
-
-    
-    #add reference point coordinate
-    D+= z0
+    modelexport.write_vtk_grid(VTKresist, X, Y, D, 
+                               point_data={'resistivity':mtNS})
 
-    # output to vtk format
-    # first components read in reverse order!!
-    mtNS = np.zeros((dims[0],dims[1],dims[2])) 
-
-    n=0
-
-    #define array for alternative output as csv file, which
-    #can be read by paraview directly 
-    arr = np.zeros((len(X)*len(Y)*len(D),4))
-    
-    for idx_D in range(dims[2]):
-        for idx_Y in range(dims[1]):
-            for idx_X in range(dims[0]):
-                #switch North/South by convention
-                mtNS[-(idx_X+1),idx_Y,idx_D] = mt[n]
-                arr[n,0] = X[idx_X]
-                arr[n,1] = Y[idx_Y]
-                arr[n,2] = D[idx_D]
-                arr[n,3] = mt[n]
-                n += 1
-    gridToVTK(VTKresist, X, Y, D, pointData = {'resistivity' : mtNS})
-
-    f.close()
-
-    #fn2 = VTKresist+'.csv'
-    #F = open(fn2,'w')
-    #F.write('X , Y , Down , Rho \n')
-    #np.savetxt(F,arr,delimiter=',')
-    #F.close()
-
-    #print 'Created Resistivity Array: {0}.csv'.format(VTKresist)
     print 'Created Resistivity VTK File: {0}.vtr'.format(VTKresist)
 
+    # alternative output as points, which can be read by paraview directly
+    for point_format in point_formats:
+        point_fn = modelexport.write_point_file(VTKresist, X, Y, D, mtNS, 
+                                                file_format=point_format)
+        print 'Created Resistivity Array: {0}'.format(point_fn)
+
     try:
         f = open(Mdata, 'r')
 
@@ -241,13 +126,15 @@ def main():
                 lo_datalines.append(l.strip())
     
         lo_coords = []
+        found_coords = set()
         for line in lo_datalines:
             line = line.split()
             x = float(line[4])/1000.
             y = float(line[5])/1000.
             z = float(line[6])/1000.
             point = (x,y,z)
-            if point not in lo_coords:
+            if point not in found_coords:
+                found_coords.add(point)
                 lo_coords.append(point)
 
         all_coords = np.array(lo_coords)[:]
@@ -263,7 +150,8 @@ def main():
 
         dummy = np.ones(len(all_coords))
 
-        pointsToVTK(VTKstations, N, E, D, data = {"dummyvalue" : dummy})
+        modelexport.write_vtk_points(VTKstations, N, E, D, 
+                                     point_data={"dummyvalue" : dummy})
 
 
 
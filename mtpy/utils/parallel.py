@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+
+"""
+mtpy/utils/parallel.py
+
+Run independent jobs of a survey, one per station or file, across a
+multiprocessing pool.
+
+The job function has to be defined at module level so it can be sent to the
+worker processes.  With one process the jobs run in this process, which is
+also what happens for a single job.  Used by the batch edi writer of
+mtpy.core.mt, the edi merger of mtpy.core.edimerge and the station tables
+of mtpy.processing.coherence.  get_n_processes also sizes the plot pool of
+mtpy.imaging.batchplot and the thread pool of mtpy.usgs.zen.
+
+    >>> import mtpy.utils.parallel as parallel
+    >>> result_list, n_processes = parallel.map_jobs(_write_edi_job, jobs,
+    >>> ...                                          n_processes=4)
+
+"""
+
+#==============================================================================
+import multiprocessing
+
+#==============================================================================
+def get_station_value(value, station):
+    """
+    get the value for a station from a dictionary keyed by station name,
+    anything else is used for all stations
+    """
+
+    if isinstance(value, dict):
+        return value.get(station, None)
+    return value
+
+def get_n_processes(n_jobs, n_processes=None):
+    """
+    number of processes to use for n_jobs, never more than the number of
+    jobs and at least 1.  If n_processes is None the number of cpus is used.
+    """
+
+    if n_processes is None:
+        n_processes = min(n_jobs, multiprocessing.cpu_count())
+    else:
+        n_processes = min(n_jobs, int(n_processes))
+
+    return max(n_processes, 1)
+
+def map_jobs(func, jobs, n_processes=None):
+    """
+    apply func to each job across a process pool.
+
+    Arguments:
+    -----------
+        **func** : function defined at module level that takes one job
+
+        **jobs** : list of jobs
+
+        **n_processes** : int
+                          number of processes, *default* is the number of
+                          cpus.  If 1 the jobs are run in this process.
+
+    Returns:
+    ---------
+        **result_list** : list of the results of func in the order of jobs
+
+        **n_processes** : number of processes used
+    """
+
+    n_processes = get_n_processes(len(jobs), n_processes)
+    if n_processes == 1:
+        return [func(job) for job in jobs], n_processes
+
+    pool = multiprocessing.Pool(processes=n_processes)
+    try:
+        result_list = pool.map(func, jobs)
+    finally:
+        pool.close()
+        pool.join()
+
+    return result_list, n_processes
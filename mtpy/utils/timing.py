@@ -0,0 +1,552 @@
+#!/usr/bin/env python
+
+"""
+mtpy/utils/timing.py
+
+Record how long each stage of a processing run takes.
+
+A stage is a named block of work, like reading a Z3D file or running BIRRP.
+For each stage the registry records
+
+    * wall time in seconds
+    * cpu time in seconds of this process and of finished child processes,
+      so external programs like BIRRP are included
+    * bytes read and written, added by the stage with add_read and
+      add_written
+    * peak resident memory above the start of the stage in MB, sampled in a
+      background thread (process wide, so concurrent stages overlap)
+    * optionally a cProfile of the stage saved to a .prof file
+
+Stages can be nested, each record keeps the name of the stage it was called
+from.  Records are kept in a registry that can be summarised or written to
+json or csv.  The registry keeps the last max_records records and running
+totals of every stage, so it does not grow in a long running process.
+
+The mtpy registry is off by default, timed functions then run with a single
+extra attribute lookup.  Turn it on with enable() or by setting the
+environment variable MTPY_TIMING to 1 before mtpy is imported, set it to
+memory to also sample the peak memory of each stage, which starts a
+sampling thread for every stage.
+
+    >>> import mtpy.utils.timing as timing
+    >>> timing.enable()
+    >>> @timing.timed('read_data')
+    >>> def read_data(fn):
+    >>>     timing.add_read(fn)
+    >>>     ...
+    >>> with timing.stage('process', station='mt01') as record:
+    >>>     read_data(fn)
+    >>>     record.add_written(out_fn)
+    >>> timing.registry.print_summary()
+    >>> timing.registry.write_csv('timing.csv')
+
+To profile stages set registry.profile to True for all stages or to a list of
+stage names, the profiles are saved in registry.profile_path and can be read
+with pstats:
+
+    >>> timing.registry.profile = ['zen.read_z3d']
+    >>> timing.registry.profile_path = '/home/mt/profiles'
+
+"""
+
+#=================================================================
+import os
+import csv
+import json
+import time
+import threading
+import functools
+import contextlib
+from collections import OrderedDict, deque
+
+try:
+    import resource
+    _page_size = resource.getpagesize()
+except ImportError:
+    _page_size = 4096
+
+_mb = 1024.**2
+
+#=================================================================
+def get_rss():
+    """
+    resident memory of this process in bytes, None if /proc is not there
+    """
+
+    try:
+        with open('/proc/self/statm', 'r') as fid:
+            return int(fid.read().split()[1])*_page_size
+    except (IOError, IndexError, ValueError):
+        return None
+
+def get_cpu_time():
+    """
+    user and system time of this process and its finished children in
+    seconds
+    """
+
+    return sum(os.times()[0:4])
+
+def get_n_bytes(value):
+    """
+    number of bytes in value, value can be a number of bytes or a file name
+    """
+
+    if isinstance(value, basestring):
+        try:
+            return os.path.getsize(value)
+        except OSError:
+            return 0
+    return int(value)
+
+
+class MemorySampler(threading.Thread):
+    """
+    sample the resident memory of the process every interval seconds until
+    stop is called, the largest value is in peak (bytes).  peak is None if
+    the resident memory can not be read.
+    """
+
+    def __init__(self, interval=.001):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.interval = interval
+        self.peak = get_rss()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.peak = max(self.peak, get_rss())
+            time.sleep(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.peak = max(self.peak, get_rss())
+        return self.peak
+
+
+class StageRecord(object):
+    """
+    timing of one call of a stage
+
+    ======================== ==================================================
+    Attributes               Description
+    ======================== ==================================================
+    bytes_read               bytes read by the stage
+    bytes_written            bytes written by the stage
+    cpu_time                 cpu time in seconds, includes child processes
+    error                    name of the exception if the stage failed
+    info                     dictionary of key words given to the stage
+    name                     name of the stage
+    parent                   name of the stage this one was called from
+    peak_memory              peak memory above the start in MB, None if it
+                             was not tracked
+    profile_fn               file the cProfile was saved to
+    start                    start time in seconds since the epoch
+    thread                   name of the thread the stage ran in
+    wall_time                wall time in seconds
+    ======================== ==================================================
+    """
+
+    fields = ['name', 'parent', 'thread', 'start', 'wall_time', 'cpu_time',
+              'bytes_read', 'bytes_written', 'peak_memory', 'profile_fn',
+              'error', 'info']
+
+    def __init__(self, name, parent=None, **info):
+        self.name = name
+        self.parent = parent
+        self.thread = threading.current_thread().name
+        self.info = info
+
+        self.start = None
+        self.wall_time = None
+        self.cpu_time = None
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.peak_memory = None
+        self.profile_fn = None
+        self.error = None
+
+    def add_read(self, value):
+        """
+        add bytes read, value is a number of bytes or a file name
+        """
+        self.bytes_read += get_n_bytes(value)
+
+    def add_written(self, value):
+        """
+        add bytes written, value is a number of bytes or a file name
+        """
+        self.bytes_written += get_n_bytes(value)
+
+    def to_dict(self):
+        return OrderedDict([(key, getattr(self, key)) for key in self.fields])
+
+    def __repr__(self):
+        return '<StageRecord {0}: {1:.3f} s>'.format(self.name,
+                                                     self.wall_time or 0)
+
+
+class StageRegistry(object):
+    """
+    collect StageRecords of all stages run in this process
+
+    ======================== ==================================================
+    Attributes               Description
+    ======================== ==================================================
+    enabled                  [ True | False ] record stages, if False stages
+                             run without being timed. *default* is False
+    max_records              number of records kept, older records are
+                             dropped but still counted in the summary.
+                             *default* is 10000
+    memory_interval          seconds between memory samples *default* is .01
+    profile                  [ True | False | list of stage names ] profile
+                             stages with cProfile *default* is False
+    profile_path             directory to save profiles to, *default* is the
+                             current directory
+    records                  deque of the last max_records StageRecords in
+                             the order they finished
+    track_memory             [ True | False ] sample peak memory of each
+                             stage in a background thread. *default* is
+                             False
+    ======================== ==================================================
+
+    ======================== ==================================================
+    Methods                  Description
+    ======================== ==================================================
+    add_read                 add bytes read to the current stage
+    add_written              add bytes written to the current stage
+    clear                    remove all records
+    current_stage            innermost running stage of this thread
+    get_records              records of a given stage
+    print_summary            print a table of summary
+    stage                    context manager to time a block of code
+    summary                  totals of each stage
+    timed                    decorator to time each call of a function
+    write_csv                write records to a csv file
+    write_json               write records and summary to a json file
+    ======================== ==================================================
+    """
+
+    def __init__(self, **kwargs):
+        self.enabled = kwargs.pop('enabled', False)
+        self.track_memory = kwargs.pop('track_memory', False)
+        self.memory_interval = kwargs.pop('memory_interval', .01)
+        self.profile = kwargs.pop('profile', False)
+        self.profile_path = kwargs.pop('profile_path', None)
+        self.max_records = kwargs.pop('max_records', 10000)
+
+        self.records = deque(maxlen=self.max_records)
+        self._summary_dict = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiling = False
+        self._profile_count = 0
+
+    def _get_stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def current_stage(self):
+        """
+        innermost stage running in this thread, None if there is none
+        """
+        stack = self._get_stack()
+        if len(stack) == 0:
+            return None
+        return stack[-1]
+
+    def add_read(self, value):
+        """
+        add bytes read to the current stage, value is a number of bytes or a
+        file name.  Does nothing outside of a stage.
+        """
+        record = self.current_stage()
+        if record is not None:
+            record.add_read(value)
+
+    def add_written(self, value):
+        """
+        add bytes written to the current stage, value is a number of bytes or
+        a file name.  Does nothing outside of a stage.
+        """
+        record = self.current_stage()
+        if record is not None:
+            record.add_written(value)
+
+    def _start_profile(self, name):
+        """
+        start a cProfile if this stage should be profiled, only one stage is
+        profiled at a time so nested stages are part of the outer profile
+        """
+        if self.profile is False or self.profile is None:
+            return None
+        if self.profile is not True and name not in self.profile:
+            return None
+
+        with self._lock:
+            if self._profiling:
+                return None
+            self._profiling = True
+            self._profile_count += 1
+            count = self._profile_count
+
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler, count
+
+    def _stop_profile(self, profile, record):
+        profiler, count = profile
+        profiler.disable()
+
+        save_path = self.profile_path
+        if save_path is None:
+            save_path = os.getcwd()
+        if not os.path.exists(save_path):
+            os.makedirs(save_path)
+        record.profile_fn = os.path.join(save_path, '{0}_{1:03}.prof'.format(
+                                         record.name.replace(' ', '_'), count))
+        profiler.dump_stats(record.profile_fn)
+
+        with self._lock:
+            self._profiling = False
+
+    @contextlib.contextmanager
+    def stage(self, name, **info):
+        """
+        time the code in a with block as stage name, any key words are kept
+        in record.info.  Yields the StageRecord.
+
+        :Example: ::
+
+            >>> with registry.stage('write_edi', station='mt01') as record:
+            >>>     edi_obj.writefile(edi_fn)
+            >>>     record.add_written(edi_fn)
+        """
+
+        stack = self._get_stack()
+        parent = None
+        if len(stack) > 0:
+            parent = stack[-1].name
+        record = StageRecord(name, parent=parent, **info)
+
+        if not self.enabled:
+            yield record
+            return
+
+        sampler = None
+        start_rss = None
+        if self.track_memory:
+            start_rss = get_rss()
+            if start_rss is not None:
+                sampler = MemorySampler(interval=self.memory_interval)
+                sampler.start()
+        profile = self._start_profile(name)
+
+        stack.append(record)
+        record.start = time.time()
+        cpu_start = get_cpu_time()
+        try:
+            yield record
+        except BaseException as error:
+            record.error = type(error).__name__
+            raise
+        finally:
+            record.wall_time = time.time()-record.start
+            record.cpu_time = get_cpu_time()-cpu_start
+            stack.pop()
+            if profile is not None:
+                self._stop_profile(profile, record)
+            if sampler is not None:
+                record.peak_memory = (sampler.stop()-start_rss)/_mb
+            with self._lock:
+                self.records.append(record)
+                self._add_to_summary(record)
+
+    def _add_to_summary(self, record):
+        """
+        add a finished record to the running totals of its stage
+        """
+        if record.name not in self._summary_dict:
+            self._summary_dict[record.name] = OrderedDict([('count', 0),
+                                                          ('wall_time', 0.),
+                                                          ('cpu_time', 0.),
+                                                          ('bytes_read', 0),
+                                                          ('bytes_written', 0),
+                                                          ('peak_memory', None),
+                                                          ('errors', 0)])
+        s_dict = self._summary_dict[record.name]
+        s_dict['count'] += 1
+        s_dict['wall_time'] += record.wall_time
+        s_dict['cpu_time'] += record.cpu_time
+        s_dict['bytes_read'] += record.bytes_read
+        s_dict['bytes_written'] += record.bytes_written
+        if record.peak_memory is not None:
+            s_dict['peak_memory'] = max(s_dict['peak_memory'],
+                                        record.peak_memory)
+        if record.error is not None:
+            s_dict['errors'] += 1
+
+    def timed(self, name=None):
+        """
+        decorator that runs each call of a function as a stage, name is the
+        name of the function if not given
+
+        :Example: ::
+
+            >>> @registry.timed('read_edi')
+            >>> def readfile(self, fn):
+            >>>     ...
+        """
+
+        def decorator(func):
+            stage_name = name
+            if stage_name is None:
+                stage_name = func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.stage(stage_name):
+                    return func(*args, **kwargs)
+            return wrapper
+
+        return decorator
+
+    def clear(self):
+        """
+        remove all records and totals
+        """
+        with self._lock:
+            self.records = deque(maxlen=self.max_records)
+            self._summary_dict = OrderedDict()
+
+    def get_records(self, name=None):
+        """
+        records of stage name, all records if name is None
+        """
+        with self._lock:
+            records = list(self.records)
+        if name is None:
+            return records
+        return [record for record in records if record.name == name]
+
+    def summary(self):
+        """
+        totals of each stage in the order they first finished, these
+        include records that were dropped because of max_records
+
+        Returns
+        ------------
+            **summary_dict** : OrderedDict keyed by stage name with
+                               dictionaries of count, wall_time, cpu_time,
+                               bytes_read, bytes_written, peak_memory (max)
+                               and errors
+        """
+
+        with self._lock:
+            return OrderedDict([(name, OrderedDict(s_dict))
+                                for name, s_dict in self._summary_dict.items()])
+
+    def print_summary(self):
+        """
+        print the total time, data and memory of each stage
+        """
+
+        print '-'*78
+        print '{0:<28}{1:>6}{2:>10}{3:>10}{4:>8}{5:>8}{6:>8}'.format('stage',
+                     'count', 'wall', 'cpu', 'MB in', 'MB out', 'peak')
+        print '-'*78
+        for name, s_dict in self.summary().items():
+            if s_dict['peak_memory'] is None:
+                peak = '{0:>8}'.format('-')
+            else:
+                peak = '{0:>8.1f}'.format(s_dict['peak_memory'])
+            print '{0:<28}{1:>6}{2:>9.3f}s{3:>9.3f}s{4:>8.1f}{5:>8.1f}{6}'.format(
+                                                name[:27],
+                                                s_dict['count'],
+                                                s_dict['wall_time'],
+                                                s_dict['cpu_time'],
+                                                s_dict['bytes_read']/_mb,
+                                                s_dict['bytes_written']/_mb,
+                                                peak)
+        print '-'*78
+
+    def write_json(self, json_fn):
+        """
+        write all records and the summary to a json file
+        """
+
+        with open(json_fn, 'w') as fid:
+            json.dump({'records':[record.to_dict()
+                                  for record in self.get_records()],
+                       'summary':self.summary()}, fid, indent=1)
+
+        return json_fn
+
+    def write_csv(self, csv_fn):
+        """
+        write one line per record to a csv file, info is written as json
+        """
+
+        with open(csv_fn, 'wb') as fid:
+            writer = csv.writer(fid)
+            writer.writerow(StageRecord.fields)
+            for record in self.get_records():
+                r_dict = record.to_dict()
+                r_dict['info'] = json.dumps(r_dict['info'])
+                writer.writerow([r_dict[key] if r_dict[key] is not None
+                                 else '' for key in StageRecord.fields])
+
+        return csv_fn
+
+#=================================================================
+# registry used by mtpy, off unless asked for
+registry = StageRegistry()
+
+def enable(track_memory=False):
+    """
+    start recording stages in the mtpy registry, if track_memory is True the
+    peak memory of each stage is sampled in a background thread
+    """
+    registry.track_memory = track_memory
+    registry.enabled = True
+
+def disable():
+    """
+    stop recording stages in the mtpy registry, records are kept
+    """
+    registry.enabled = False
+
+if os.environ.get('MTPY_TIMING', '0').lower() not in ['', '0', 'false']:
+    enable(track_memory=os.environ['MTPY_TIMING'].lower() == 'memory')
+
+def stage(name, **info):
+    """
+    time a with block as stage name in the mtpy registry, see
+    StageRegistry.stage
+    """
+    return registry.stage(name, **info)
+
+def timed(name=None):
+    """
+    decorator to time each call of a function in the mtpy registry, see
+    StageRegistry.timed
+    """
+    return registry.timed(name)
+
+def add_read(value):
+    """
+    add bytes read to the current stage of the mtpy registry
+    """
+    registry.add_read(value)
+
+def add_written(value):
+    """
+    add bytes written to the current stage of the mtpy registry
+    """
+    registry.add_written(value)
@@ -18,10 +18,10 @@
 ######################################################################
 #
 
-from evtk.hl import gridToVTK, pointsToVTK
 import numpy as np
 import os
 import sys
+import mtpy.utils.modelexport as modelexport
 
 ######################################################################
 
@@ -49,9 +49,13 @@ def main():
     - ws3DInv response file name
     - [optional] VTK resistivity grid file - output file name
     - [optional] VTK stations grid file - output file name
+    - [optional] --csv or --npy to also write the resistivity model as 
+      points (north, east, down, resistivity) at the cell centres to a csv 
+      or numpy file
     """
 
-    arguments = sys.argv
+    arguments = [arg for arg in sys.argv if arg not in ['--csv', '--npy']]
+    point_formats = [arg[2:] for arg in sys.argv if arg in ['--csv', '--npy']]
 
     if len(arguments) < 3:
         sys.exit('ERROR - provide at least 2 file names: <modeldata file>  <responses file>')
@@ -75,77 +79,34 @@ def main():
         sys.exit('ERROR - could not find file(s)')
 
 
-    f = open(WSMTmodel, 'r')
+    model_dict = modelexport.read_model_file(WSMTmodel)
 
-    # skip first line in file
-    f.readline()
-
-    # read N,E,D mesh dimensions
-    dims = []
-    modeldata_firstline = f.readline().split()
-    for n in range(3):
-        dims.append(int(modeldata_firstline[n]))
-    size = dims[0]*dims[1]*dims[2]
+    # North-to-South conversion, first index is furthest south
+    mtNS = model_dict['res_model']
+    dims = list(mtNS.shape)
     print 'Mesh     ', dims
-    print 'Data     ', size
-
-    # read N,E,D spacing
-    #  (depends on line break only after final value)
-    spacing = []
-    for n in range(3):
-        i=0
-        while i < dims[n]:
-            modeldata_nextlines = f.readline().split()
-            for j in modeldata_nextlines:
-                spacing.append(float(j)/1000.0)
-                i += 1
-
-    # read mt data
-    #  (depends on line break only after final value)
-    mt = np.zeros(size)
-    i=0
-    while i < size:
-        modeldata_morelines = f.readline().split()
-        for j in modeldata_morelines:
-            mt[i] = float(j)
-            i += 1
-
-    # calc North coordinates of vtk mesh
-    Ndist = 0 # calculate total North distance
-    for i in range(dims[0]):
-        Ndist += spacing[i]
-    N = np.zeros(dims[0]+1)
-    N[0] = -0.5 * Ndist # zero center of model
-    for i in range(dims[0]):
-        N[i+1] = N[i] + spacing[i]
-
-    # calc East coordinates of vtk mesh
-    Edist = 0 # calculate total y distance
-    for i in range(dims[1]):
-        Edist += spacing[dims[0] + i]
-    E = np.zeros(dims[1]+1)
-    E[0] = -0.5 * Edist # zero center of model
-    for i in range(dims[1]):
-        E[i+1] = E[i] + spacing[dims[0] + i]
-
-    # calc Down coordinates of vtk mesh
-    D = np.zeros(dims[2]+1)
-    D[0] = 0.0
-    for i in range(dims[2]):
-        D[i+1] = D[i] + spacing[dims[0] + dims[1] + i]
-
-    # output to vtk format
-    # first components read in reverse order!!
-    mtNS = np.zeros((dims[0],dims[1],dims[2])) # North-to-South conversion
-    n=0
-    for idx_D in range(dims[2]):
-        for idx_E in range(dims[1]):
-            for idx_S in range(dims[0]):
-                mtNS[(dims[0]-1)-idx_S,idx_E,idx_D] = mt[n]
-                n += 1
-    gridToVTK(VTKresist, N, E, D, cellData = {'resistivity' : mtNS})
-
-    f.close()
+    print 'Data     ', mtNS.size
+
+    # calc coordinates of the cell edges of the vtk mesh in km, zero at the 
+    # center of the model in North and East and at the surface
+    nodes_north = model_dict['nodes_north']/1000.
+    nodes_east = model_dict['nodes_east']/1000.
+    nodes_z = model_dict['nodes_z']/1000.
+    N = modelexport.get_cell_edges(nodes_north, -0.5*nodes_north.sum())
+    E = modelexport.get_cell_edges(nodes_east, -0.5*nodes_east.sum())
+    D = modelexport.get_cell_edges(nodes_z)
+
+    modelexport.write_vtk_grid(VTKresist, N, E, D, 
+                               cell_data={'resistivity':mtNS})
+
+    # alternative output as points at the cell centres
+    for point_format in point_formats:
+        point_fn = modelexport.write_point_file(VTKresist, 
+                              modelexport.get_cell_centers(nodes_north, N[0]),
+                              modelexport.get_cell_centers(nodes_east, E[0]),
+                              modelexport.get_cell_centers(nodes_z),
+                              mtNS, file_format=point_format)
+        print 'Created Resistivity Array: {0}'.format(point_fn)
 
     f = open(WSMTresp, 'r')
 
@@ -186,7 +147,8 @@ def main():
 
     print np.shape(dummy),np.shape(N),np.shape(E),np.shape(D)
 
-    pointsToVTK(VTKstations, N, E, D, data = {"dummyvalue" : dummy})
+    modelexport.write_vtk_points(VTKstations, N, E, D, 
+                                 point_data={"dummyvalue" : dummy})
 
 
 